@@ -0,0 +1,78 @@
+"""
+Script para agregar la columna estado_validacion a historial_avance_actividad
+Ejecutar: docker-compose exec proyectos_app python agregar_estado_validacion.py
+
+1. Agrega la columna ENUM('pendiente', 'validado', 'rechazado').
+2. La completa a partir de validado y del marcador 'RECHAZADO' en comentario_validacion.
+3. Agrega el índice (estado_validacion, fecha_cambio, id).
+"""
+
+from app import create_app, db
+from sqlalchemy import text
+
+def agregar_estado_validacion():
+    app = create_app()
+
+    with app.app_context():
+        print("\n" + "="*80)
+        print("🔧 AGREGANDO ESTADO DE VALIDACIÓN INDEXADO")
+        print("="*80 + "\n")
+
+        try:
+            print("📋 Agregando estado_validacion a historial_avance_actividad...")
+            try:
+                db.session.execute(text("""
+                    ALTER TABLE historial_avance_actividad
+                    ADD COLUMN estado_validacion ENUM('pendiente', 'validado', 'rechazado')
+                    NOT NULL DEFAULT 'pendiente'
+                    COMMENT 'Estado de validación del avance'
+                    AFTER comentario_validacion
+                """))
+                db.session.commit()
+                print("✅ Columna estado_validacion agregada")
+            except Exception as e:
+                if "Duplicate column name" in str(e):
+                    print("⚠️  Columna estado_validacion ya existe")
+                    db.session.rollback()
+                else:
+                    raise
+
+            print("\n📋 Completando estado_validacion desde los comentarios...")
+            resultado = db.session.execute(text("""
+                UPDATE historial_avance_actividad
+                SET estado_validacion = CASE
+                    WHEN validado = 0 THEN 'pendiente'
+                    WHEN comentario_validacion LIKE '%RECHAZADO%' THEN 'rechazado'
+                    ELSE 'validado'
+                END
+            """))
+            db.session.commit()
+            print(f"✅ {resultado.rowcount} registros actualizados")
+
+            print("\n📋 Agregando índice idx_historial_avance_estado_fecha...")
+            try:
+                db.session.execute(text("""
+                    ALTER TABLE historial_avance_actividad
+                    ADD INDEX idx_historial_avance_estado_fecha (estado_validacion, fecha_cambio, id)
+                """))
+                db.session.commit()
+                print("✅ Índice agregado")
+            except Exception as e:
+                if "Duplicate key name" in str(e):
+                    print("⚠️  Índice idx_historial_avance_estado_fecha ya existe")
+                    db.session.rollback()
+                else:
+                    raise
+
+            print("\n" + "="*80)
+            print("🎉 ESTADO DE VALIDACIÓN AGREGADO EXITOSAMENTE")
+            print("="*80 + "\n")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    agregar_estado_validacion()
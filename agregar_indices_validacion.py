@@ -0,0 +1,50 @@
+"""
+Script para agregar los índices del listado paginado de validación de avances
+Ejecutar: docker-compose exec proyectos_app python agregar_indices_validacion.py
+"""
+
+from app import create_app, db
+from sqlalchemy import text
+
+INDICES = [
+    ("idx_historial_avance_fecha", "fecha_cambio, id"),
+    ("idx_historial_avance_req_fecha", "requerimiento_id, fecha_cambio, id"),
+    ("idx_historial_avance_trab_fecha", "trabajador_id, fecha_cambio, id"),
+]
+
+def agregar_indices():
+    app = create_app()
+
+    with app.app_context():
+        print("\n" + "="*80)
+        print("🔧 AGREGANDO ÍNDICES DE VALIDACIÓN DE AVANCES")
+        print("="*80 + "\n")
+
+        try:
+            for nombre, columnas in INDICES:
+                try:
+                    db.session.execute(text(f"""
+                        ALTER TABLE historial_avance_actividad
+                        ADD INDEX {nombre} ({columnas})
+                    """))
+                    db.session.commit()
+                    print(f"✅ Índice {nombre} agregado")
+                except Exception as e:
+                    if "Duplicate key name" in str(e):
+                        print(f"⚠️  Índice {nombre} ya existe")
+                        db.session.rollback()
+                    else:
+                        raise
+
+            print("\n" + "="*80)
+            print("🎉 ÍNDICES AGREGADOS EXITOSAMENTE")
+            print("="*80 + "\n")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    agregar_indices()
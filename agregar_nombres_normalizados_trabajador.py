@@ -0,0 +1,98 @@
+"""
+Script para las claves normalizadas de trabajador (resolución de recursos Gantt):
+agrega nombre_normalizado y nombrecorto_normalizado con sus índices y completa
+los valores de los trabajadores existentes.
+Ejecutar: docker-compose exec proyectos_app python agregar_nombres_normalizados_trabajador.py
+
+Los trabajadores creados o editados desde la aplicación mantienen las claves al
+día (Trabajador.validate_nombres); el script se puede volver a ejecutar para
+completar filas cargadas por fuera (SQL directo, restauraciones).
+"""
+
+from app import create_app, db
+from sqlalchemy import text, bindparam
+
+COLUMNAS = [
+    ("nombre_normalizado", "VARCHAR(255) NULL COMMENT 'Nombre sin tildes, en minúsculas' AFTER nombrecorto"),
+    ("nombrecorto_normalizado", "VARCHAR(100) NULL COMMENT 'Nombre corto sin tildes, en minúsculas' AFTER nombre_normalizado"),
+]
+
+INDICES = [
+    ("idx_trabajador_nombre_normalizado", "nombre_normalizado"),
+    ("idx_trabajador_nombrecorto_normalizado", "nombrecorto_normalizado"),
+]
+
+TAMANO_LOTE = 1000
+
+
+def _completar_claves():
+    """Calcula las claves en Python (misma normalización que el modelo) y las guarda por lotes"""
+    from app.models import Trabajador
+
+    tabla = Trabajador.__table__
+    filas = db.session.execute(db.select(tabla.c.id, tabla.c.nombre, tabla.c.nombrecorto)).all()
+    cambios = [
+        {
+            'b_id': fila.id,
+            'b_nombre': Trabajador.normalizar_clave(fila.nombre),
+            'b_nombrecorto': Trabajador.normalizar_clave(fila.nombrecorto)
+        }
+        for fila in filas
+    ]
+    sentencia = tabla.update().where(tabla.c.id == bindparam('b_id')).values(
+        nombre_normalizado=bindparam('b_nombre'), nombrecorto_normalizado=bindparam('b_nombrecorto')
+    )
+    for inicio in range(0, len(cambios), TAMANO_LOTE):
+        db.session.execute(sentencia, cambios[inicio:inicio + TAMANO_LOTE])
+    db.session.commit()
+    return len(cambios)
+
+
+def agregar_nombres_normalizados():
+    app = create_app()
+
+    with app.app_context():
+        print("\n" + "="*80)
+        print("🔧 CLAVES NORMALIZADAS DE TRABAJADOR")
+        print("="*80 + "\n")
+
+        try:
+            for nombre, definicion in COLUMNAS:
+                try:
+                    db.session.execute(text(f"ALTER TABLE trabajador ADD COLUMN {nombre} {definicion}"))
+                    db.session.commit()
+                    print(f"✅ Columna trabajador.{nombre} agregada")
+                except Exception as e:
+                    if "Duplicate column name" in str(e):
+                        print(f"⚠️  Columna trabajador.{nombre} ya existe")
+                        db.session.rollback()
+                    else:
+                        raise
+
+            for nombre, columnas in INDICES:
+                try:
+                    db.session.execute(text(f"ALTER TABLE trabajador ADD INDEX {nombre} ({columnas})"))
+                    db.session.commit()
+                    print(f"✅ Índice {nombre} agregado")
+                except Exception as e:
+                    if "Duplicate key name" in str(e):
+                        print(f"⚠️  Índice {nombre} ya existe")
+                        db.session.rollback()
+                    else:
+                        raise
+
+            total = _completar_claves()
+            print(f"\n✅ Claves calculadas para {total} trabajadores")
+
+            print("\n" + "="*80)
+            print("🎉 CLAVES NORMALIZADAS LISTAS")
+            print("="*80 + "\n")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    agregar_nombres_normalizados()
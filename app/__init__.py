@@ -28,6 +28,32 @@ csrf = CSRFProtect()
 _db_initialized = False
 _init_lock = threading.Lock()
 
+# Variables de sesión MySQL aplicadas una vez por conexión física del pool
+SESION_MYSQL_SQL = [
+    "SET NAMES 'utf8mb4'",
+    "SET CHARACTER SET utf8mb4",
+    "SET character_set_connection=utf8mb4",
+    "SET SESSION wait_timeout = 1800, interactive_timeout = 1800, "
+    "net_read_timeout = 600, net_write_timeout = 600, max_execution_time = 1800000"
+]
+
+# Marca en connection_record.info; SQLAlchemy limpia info al reciclar/invalidar la conexión
+SESION_MYSQL_MARCADOR = 'sesion_mysql_configurada'
+
+def configurar_sesion_mysql(dbapi_connection, connection_record):
+    """Aplicar charset y timeouts a una conexión MySQL y marcarla como configurada"""
+    try:
+        cursor = dbapi_connection.cursor()
+        try:
+            for config_sql in SESION_MYSQL_SQL:
+                cursor.execute(config_sql)
+        finally:
+            cursor.close()
+        connection_record.info[SESION_MYSQL_MARCADOR] = True
+        logger.debug("✅ Timeouts MySQL configurados automáticamente en nueva conexión")
+    except Exception as e:
+        logger.debug(f"⚠️ Error configurando timeouts en conexión: {e}")
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
@@ -56,61 +82,27 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     csrf.init_app(app)
     
-    # Configurar timeouts automáticamente en cada conexión de SQLAlchemy
+    # Configurar charset y timeouts una sola vez por conexión del pool
+    # (antes se enviaban 8 SET en cada request, incluso para /health y estáticos)
     with app.app_context():
         from sqlalchemy import event
         
-        @event.listens_for(db.engine, "connect")
-        def set_mysql_timeouts(dbapi_connection, connection_record):
-            """Configurar automáticamente cada nueva conexión MySQL"""
-            if hasattr(dbapi_connection, 'cursor'):  # Es MySQL/PyMySQL
-                try:
-                    cursor = dbapi_connection.cursor()
-                    
-                    # Configurar charset y timeouts
-                    timeout_configs = [
-                        "SET NAMES 'utf8mb4'",
-                        "SET CHARACTER SET utf8mb4",
-                        "SET character_set_connection=utf8mb4",
-                        "SET SESSION wait_timeout = 1800",
-                        "SET SESSION interactive_timeout = 1800", 
-                        "SET SESSION net_read_timeout = 600",
-                        "SET SESSION net_write_timeout = 600",
-                        "SET SESSION max_execution_time = 1800000"
-                    ]
-                    
-                    for config_sql in timeout_configs:
-                        cursor.execute(config_sql)
-                    
-                    cursor.close()
-                    logger.debug("✅ Timeouts MySQL configurados automáticamente en nueva conexión")
-                    
-                except Exception as e:
-                    logger.debug(f"⚠️ Error configurando timeouts en conexión: {e}")
-    
-    
-    
-    # Forzar UTF-8 y configurar timeouts en todas las conexiones MySQL
-    @app.before_request
-    def before_request():
-        """Configurar charset UTF-8 y timeouts en cada petición"""
-        try:
-            db.session.execute(text("SET NAMES 'utf8mb4'"))
-            db.session.execute(text("SET CHARACTER SET utf8mb4"))
-            db.session.execute(text("SET character_set_connection=utf8mb4"))
+        if db.engine.dialect.name == 'mysql':
+            @event.listens_for(db.engine, "connect")
+            def set_mysql_timeouts(dbapi_connection, connection_record):
+                """Configurar automáticamente cada nueva conexión MySQL"""
+                configurar_sesion_mysql(dbapi_connection, connection_record)
             
-            # Configurar timeouts para operaciones largas (backups/restore)
-            db.session.execute(text("SET SESSION wait_timeout = 1800"))
-            db.session.execute(text("SET SESSION interactive_timeout = 1800"))
-            db.session.execute(text("SET SESSION net_read_timeout = 600"))
-            db.session.execute(text("SET SESSION net_write_timeout = 600"))
-            db.session.execute(text("SET SESSION max_execution_time = 1800000"))
-        except Exception as e:
-            # Log solo en debug, ignorar errores para mantener compatibilidad
-            if app.debug:
-                app.logger.debug(f"Error configurando sesión MySQL: {e}")
-            pass
-    
+            @event.listens_for(db.engine, "checkout")
+            def verificar_sesion_mysql(dbapi_connection, connection_record, connection_proxy):
+                """Reconfigurar solo si la conexión perdió la marca (p. ej. tras invalidarse)"""
+                if not connection_record.info.get(SESION_MYSQL_MARCADOR):
+                    configurar_sesion_mysql(dbapi_connection, connection_record)
+
+    # Perfil SQL por request (Server-Timing, log estructurado y presupuestos de consultas)
+    from app.performance import setup_performance_monitoring
+    setup_performance_monitoring(app)
+
     # Configurar Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -288,7 +280,15 @@ def create_app(config_class=Config):
         logger.info('Blueprint de validación de avances registrado correctamente')
     except ImportError as e:
         logger.warning(f'No se pudo registrar blueprint de validación de avances: {e}')
-    
+
+    # Registrar Blueprint de tareas en segundo plano
+    try:
+        from app.controllers.tareas_controller import tareas_bp
+        app.register_blueprint(tareas_bp)
+        logger.info('Blueprint de tareas registrado correctamente')
+    except ImportError as e:
+        logger.warning(f'No se pudo registrar blueprint de tareas: {e}')
+
     # Inicializar rutas dinámicas después de registrar los blueprints
     try:
         from app.utils.dynamic_routes import initialize_dynamic_routes
@@ -42,30 +42,42 @@ import logging
 # Configurar logging
 logger = logging.getLogger(__name__)
 
-# 🔑 SOLUCIÓN PROGRAMADOR SENIOR: STORAGE PERSISTENTE CON FLASK SESSION
 # ✅ FUNCIONES HELPER PARA GESTIONAR ACTIVIDADES TEMPORALES
-def get_actividades_temp_storage():
-    """Obtener storage de actividades temporales de la sesión"""
-    if 'actividades_temp_storage' not in session:
-        session['actividades_temp_storage'] = {}
-        session.permanent = True  # Hacer la sesión persistente
+# Las actividades viven en el StagingStore (disco, con TTL); en la sesión solo
+# se guarda el token opaco por usuario.
+def _token_actividades_temp(user_id):
+    # Sesiones antiguas guardaban la lista completa en la cookie
+    if session.pop('actividades_temp_storage', None) is not None:
         session.modified = True
-    return session['actividades_temp_storage']
+    return session.get('actividades_temp_tokens', {}).get(str(user_id))
+
+def get_actividades_temp(user_id):
+    """Actividades temporales del usuario ([] si no hay o expiraron)"""
+    from app.services.staging_store import obtener_staging_store
+    token = _token_actividades_temp(user_id)
+    if not token:
+        return []
+    return obtener_staging_store().cargar(token, defecto=[])
 
 def set_actividades_temp_storage(user_id, actividades):
-    """Guardar actividades temporales en la sesión"""
-    storage = get_actividades_temp_storage()
-    storage[str(user_id)] = actividades  # Convertir a string para JSON
-    session['actividades_temp_storage'] = storage
-    session.modified = True  # Marcar sesión como modificada
+    """Guardar actividades temporales en el staging del servidor"""
+    from app.services.staging_store import obtener_staging_store
+    token = obtener_staging_store().guardar(actividades, token=_token_actividades_temp(user_id))
+    tokens = session.get('actividades_temp_tokens', {})
+    if tokens.get(str(user_id)) != token:
+        session['actividades_temp_tokens'] = {**tokens, str(user_id): token}
+        session.permanent = True  # Hacer la sesión persistente
+        session.modified = True
 
 def clear_actividades_temp_storage(user_id):
     """Limpiar actividades temporales de un usuario"""
-    storage = get_actividades_temp_storage()
-    user_key = str(user_id)
-    if user_key in storage:
-        del storage[user_key]
-        session['actividades_temp_storage'] = storage
+    from app.services.staging_store import obtener_staging_store
+    token = _token_actividades_temp(user_id)
+    if token:
+        obtener_staging_store().eliminar(token)
+        tokens = dict(session.get('actividades_temp_tokens', {}))
+        tokens.pop(str(user_id), None)
+        session['actividades_temp_tokens'] = tokens
         session.modified = True
         print(f"🧹 Variables temporales limpiadas para usuario {user_id}")
 
@@ -773,11 +785,9 @@ def procesar_proyecto_xlsx():
         print(f"   Proyectos encontrados: {list(proyectos_map.values())}")
         print(f"   Primeros 10 registros: {df_ordenado[['_proyecto_inferido', edt_columna]].head(10).values.tolist()}")
         
-        # 🔑 INICIALIZAR STORAGE Y LISTA TEMPORAL
+        # 🔑 INICIALIZAR LISTA TEMPORAL (se guarda en staging al final del bucle)
         user_id = current_user.id
-        set_actividades_temp_storage(user_id, [])
         actividades_acumuladas = []  # Lista temporal para acumular actividades
-        print(f"🔑 Storage inicializado para usuario {user_id}")
         print(f"🔄 DEBUG: Iniciando bucle de procesamiento de {len(df_ordenado)} filas...")
         
         # FASE 1: SOLO DETECTAR PROYECTOS Y GUARDAR ACTIVIDADES TEMPORALES
@@ -885,16 +895,14 @@ def procesar_proyecto_xlsx():
                 traceback.print_exc()
                 continue
         
-        # � GUARDAR TODAS LAS ACTIVIDADES ACUMULADAS AL FINAL DEL LOOP
+        # 💾 GUARDAR TODAS LAS ACTIVIDADES ACUMULADAS AL FINAL DEL LOOP
         print(f"💾 Guardando {len(actividades_acumuladas)} actividades en storage...")
         set_actividades_temp_storage(user_id, actividades_acumuladas)
         print(f"✅ Actividades guardadas exitosamente en storage para usuario {user_id}")
         
-        # �📊 RESUMEN FINAL DEL PROCESAMIENTO
-        storage = get_actividades_temp_storage()
-        user_key = str(user_id)
-        total_actividades_guardadas = len(storage.get(user_key, []))
-        print(f"✅ BUCLE COMPLETADO: {total_actividades_guardadas} actividades guardadas en storage para usuario {user_id}")
+        # 📊 RESUMEN FINAL DEL PROCESAMIENTO
+        total_actividades = len(actividades_acumuladas)
+        print(f"✅ BUCLE COMPLETADO: {total_actividades} actividades guardadas en storage para usuario {user_id}")
         
         # Si hay proyectos nuevos para asignar, retornar JSON para el modal
         if proyectos_nuevos:
@@ -921,16 +929,6 @@ def procesar_proyecto_xlsx():
             for i, proyecto in enumerate(proyectos_nuevos_limpios, 1):
                 print(f"   {i}. '{proyecto['nombre_tarea']}' (Proyecto: {proyecto['proyecto']}, EDT: {proyecto['edt']})")
             
-            # 🚨 CRÍTICO: GUARDAR ACTIVIDADES ANTES DEL RETURN
-            print(f"💾 CRÍTICO: Guardando {len(actividades_acumuladas)} actividades antes de devolver modal...")
-            set_actividades_temp_storage(user_id, actividades_acumuladas)
-            
-            # Verificación inmediata
-            storage_check = get_actividades_temp_storage()
-            actividades_check = storage_check.get(str(user_id), [])
-            print(f"✅ CRÍTICO: Verificado - {len(actividades_check)} actividades guardadas en storage")
-            print(f"🔍 CRÍTICO: Muestra de actividades guardadas: {actividades_check[:2] if actividades_check else 'ninguna'}")
-            
             # Obtener requerimientos disponibles para asignación directa
             requerimientos_disponibles = Requerimiento.query.filter_by(
                 id_estado=4, activo=True
@@ -953,18 +951,8 @@ def procesar_proyecto_xlsx():
                 ]
             })
             
-        # 🔍 DEBUG: Verificar storage antes de devolver respuesta
-        debug_storage = get_actividades_temp_storage()
-        debug_user_key = str(user_id)
-        debug_actividades = debug_storage.get(debug_user_key, [])
-        print(f"🔍 DEBUG PRE-RESPONSE: Usuario {user_id} tiene {len(debug_actividades)} actividades antes de response")
-        print(f"🔍 DEBUG PRE-RESPONSE: Primeras 3 actividades: {debug_actividades[:3] if debug_actividades else 'ninguna'}")
-
         # 📊 SIN PROYECTOS NUEVOS - PROCESAMIENTO COMPLETADO
         print(f"📊 No se detectaron proyectos nuevos para asignación")
-        storage = get_actividades_temp_storage()
-        user_key = str(user_id)
-        total_actividades = len(storage.get(user_key, []))
         print(f"💾 Total actividades procesadas: {total_actividades}")
         
         return jsonify({
@@ -986,14 +974,6 @@ def guardar_asignaciones_proyecto():
     try:
         print(f"🚀 DEBUG INICIO: guardar_asignaciones_proyecto() iniciada")
         
-        # 🔍 DEBUG: Verificar storage al inicio
-        debug_user_id = current_user.id
-        debug_storage = get_actividades_temp_storage()
-        debug_user_key = str(debug_user_id)
-        debug_actividades = debug_storage.get(debug_user_key, [])
-        print(f"🔍 DEBUG INICIO: Usuario {debug_user_id} tiene {len(debug_actividades)} actividades al inicio")
-        print(f"🔍 DEBUG INICIO: Primeras 3 actividades: {debug_actividades[:3] if debug_actividades else 'ninguna'}")
-        
         # Verificar que sea una petición AJAX con datos JSON
         if not request.is_json:
             return jsonify({'success': False, 'message': 'Petición debe ser JSON'}), 400
@@ -1018,9 +998,7 @@ def guardar_asignaciones_proyecto():
         # NUEVO: Crear mapeo de EDT a nombre de proyecto usando las actividades temporales
         user_id = current_user.id
         edt_to_proyecto = {}
-        storage = get_actividades_temp_storage()
-        user_key = str(user_id)
-        actividades_temp = storage.get(user_key, [])
+        actividades_temp = get_actividades_temp(user_id)
         
         print(f"🔍 DEBUG: Usuario {user_id} tiene {len(actividades_temp)} actividades temporales")
         
@@ -0,0 +1,46 @@
+"""
+Estado y cancelación de tareas en segundo plano
+===============================================
+
+Las pantallas que encolan trabajo (Carta Gantt, control de actividades,
+backups) consultan aquí el progreso de la tarea devuelta por el encolado.
+Cada usuario ve sus propias tareas; los administradores, todas.
+"""
+
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+
+from app.services import tareas_service
+
+tareas_bp = Blueprint('tareas', __name__, url_prefix='/tareas')
+
+
+def _tarea_visible(tarea_id):
+    tarea = tareas_service.obtener(tarea_id)
+    if tarea is None:
+        return None, (jsonify({'success': False, 'message': 'Tarea no encontrada'}), 404)
+    if tarea.creado_por_id != current_user.id and not current_user.is_admin():
+        return None, (jsonify({'success': False, 'message': 'Sin permisos para esta tarea'}), 403)
+    return tarea, None
+
+
+@tareas_bp.route('/<int:tarea_id>', methods=['GET'])
+@login_required
+def estado_tarea(tarea_id):
+    """Estado, progreso y resultado de una tarea"""
+    tarea, error = _tarea_visible(tarea_id)
+    if error:
+        return error
+    return jsonify({'success': True, 'tarea': tarea.to_dict()})
+
+
+@tareas_bp.route('/<int:tarea_id>/cancelar', methods=['POST'])
+@login_required
+def cancelar_tarea(tarea_id):
+    """Cancelar una tarea pendiente o pedir la detención de una en curso"""
+    tarea, error = _tarea_visible(tarea_id)
+    if error:
+        return error
+    if not tareas_service.cancelar(tarea_id):
+        return jsonify({'success': False, 'message': 'La tarea ya terminó'}), 409
+    return jsonify({'success': True, 'tarea': tareas_service.obtener(tarea_id).to_dict()})
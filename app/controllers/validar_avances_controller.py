@@ -27,10 +27,11 @@ from flask_login import login_required, current_user
 from app import csrf
 from app.models import (
     HistorialAvanceActividad, ActividadProyecto, Requerimiento, 
-    Trabajador, db
+    Trabajador, db, ESTADO_VALIDADO, ESTADO_RECHAZADO
 )
+from app.services.progreso_service import ArbolProgresoEDT
+from app.services.validacion_avances_service import estadisticas_validacion, invalidar_estadisticas
 from datetime import datetime
-from sqlalchemy import func, or_, and_, desc
 import logging
 
 # Configurar logging
@@ -74,12 +75,17 @@ def index():
 @login_required
 def listar_avances():
     """
-    API: Listar avances pendientes de validación
-    Filtros: proyecto, trabajador, estado (pendiente/validado/todos)
+    API: Listar avances pendientes de validación, paginado por cursor
+    Filtros: proyecto, trabajador, estado (pendiente/validado/rechazado/todos)
+    Paginación: limite (filas por página) y cursor (siguiente_cursor de la respuesta anterior)
     """
     print(f"🔍 API validar_avances.listar_avances llamado por {current_user.email}")
     
     try:
+        from app.services.validacion_avances_service import (
+            FILTROS_ESTADO, TAMANO_PAGINA, filtros_avances, contar_avances, pagina_avances
+        )
+        
         # VERIFICAR PERMISOS
         if not (current_user.is_superadmin() or current_user.has_page_permission('/validar-avances')):
             return jsonify({'success': False, 'message': 'Sin permisos'}), 403
@@ -88,87 +94,41 @@ def listar_avances():
         proyecto_id = request.args.get('proyecto_id', type=int)
         trabajador_id = request.args.get('trabajador_id', type=int)
         estado_validacion = request.args.get('estado', 'pendiente')  # pendiente, validado, rechazado, todos
+        cursor = request.args.get('cursor') or None
+        limite = request.args.get('limite', TAMANO_PAGINA, type=int)
         
-        # Query base
-        query = db.session.query(
-            HistorialAvanceActividad,
-            ActividadProyecto,
-            Requerimiento,
-            Trabajador
-        ).join(
-            ActividadProyecto, HistorialAvanceActividad.actividad_id == ActividadProyecto.id
-        ).join(
-            Requerimiento, HistorialAvanceActividad.requerimiento_id == Requerimiento.id
-        ).join(
-            Trabajador, HistorialAvanceActividad.trabajador_id == Trabajador.id
-        )
+        if estado_validacion not in FILTROS_ESTADO:
+            return jsonify({'success': False, 'message': f'Estado inválido: {estado_validacion}'}), 400
         
         # Filtrar según nivel de acceso
-        if not current_user.is_superadmin():
-            query = query.filter(Requerimiento.id_recinto == current_user.recinto_id)
+        condiciones = filtros_avances(
+            proyecto_id=proyecto_id,
+            trabajador_id=trabajador_id,
+            estado=estado_validacion,
+            recinto_id=None if current_user.is_superadmin() else current_user.recinto_id
+        )
         
-        # Aplicar filtros
-        if proyecto_id:
-            query = query.filter(HistorialAvanceActividad.requerimiento_id == proyecto_id)
-        
-        if trabajador_id:
-            query = query.filter(HistorialAvanceActividad.trabajador_id == trabajador_id)
-        
-        if estado_validacion == 'pendiente':
-            query = query.filter(HistorialAvanceActividad.validado == False)
-        elif estado_validacion == 'validado':
-            query = query.filter(
-                HistorialAvanceActividad.validado == True,
-                HistorialAvanceActividad.comentario_validacion.is_(None) | 
-                (HistorialAvanceActividad.comentario_validacion != 'RECHAZADO')
-            )
-        elif estado_validacion == 'rechazado':
-            query = query.filter(
-                HistorialAvanceActividad.validado == True,
-                HistorialAvanceActividad.comentario_validacion.like('%RECHAZADO%')
-            )
-        # 'todos' no filtra por estado
-        
-        # Ordenar por fecha más reciente
-        query = query.order_by(desc(HistorialAvanceActividad.fecha_cambio))
-        
-        resultados = query.all()
-        
-        # Preparar datos para respuesta
-        avances = []
-        for historial, actividad, proyecto, trabajador in resultados:
-            avances.append({
-                'id': historial.id,
-                'proyecto_id': proyecto.id,
-                'proyecto_nombre': proyecto.nombre,
-                'proyecto_edt': proyecto.id,  # Usar id en lugar de codigo que no existe
-                'actividad_id': actividad.id,
-                'actividad_nombre': actividad.nombre_tarea,
-                'actividad_edt': actividad.edt,
-                'trabajador_id': trabajador.id,
-                'trabajador_nombre': trabajador.nombre,
-                'trabajador_email': trabajador.email,
-                'progreso_anterior': float(historial.progreso_anterior),
-                'progreso_nuevo': float(historial.progreso_nuevo),
-                'diferencia': float(historial.diferencia),
-                'comentarios': historial.comentarios,
-                'fecha_cambio': historial.fecha_cambio.strftime('%Y-%m-%d %H:%M:%S'),
-                'validado': historial.validado,
-                'validado_por_id': historial.validado_por_id,
-                'validado_por_nombre': historial.validado_por.nombre if historial.validado_por else None,
-                'fecha_validacion': historial.fecha_validacion.strftime('%Y-%m-%d %H:%M:%S') if historial.fecha_validacion else None,
-                'comentario_validacion': historial.comentario_validacion,
-                'porcentaje_validado_actual': float(actividad.porcentaje_avance_validado),
-                'estado_visual': 'Validado' if historial.validado and 'RECHAZADO' not in (historial.comentario_validacion or '') else ('Rechazado' if historial.validado and 'RECHAZADO' in (historial.comentario_validacion or '') else 'Pendiente')
-            })
-        
-        print(f"✅ Listados {len(avances)} avances")
+        try:
+            pagina = pagina_avances(condiciones, cursor=cursor, limite=limite)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
-        return jsonify({
+        respuesta = {
             'success': True,
-            'avances': avances,
-            'total': len(avances)
-        })
+            'avances': pagina['avances'],
+            'siguiente_cursor': pagina['siguiente_cursor'],
+            'hay_mas': pagina['siguiente_cursor'] is not None
+        }
+        
+        # El total solo se calcula con la primera página de cada combinación de filtros
+        if not cursor:
+            total, exacto = contar_avances(condiciones)
+            respuesta['total'] = total
+            respuesta['total_exacto'] = exacto
+        
+        print(f"✅ Listados {len(pagina['avances'])} avances")
+        
+        return jsonify(respuesta)
         
     except Exception as e:
         print(f"❌ Error en listar_avances: {str(e)}")
@@ -215,6 +175,7 @@ def validar_avance():
         historial.validado_por_id = current_user.id
         historial.fecha_validacion = datetime.utcnow()
         historial.comentario_validacion = comentario or 'Aprobado'
+        historial.estado_validacion = ESTADO_VALIDADO
         
         # Actualizar porcentaje_avance_validado en actividad_proyecto
         actividad = ActividadProyecto.query.get(historial.actividad_id)
@@ -222,19 +183,13 @@ def validar_avance():
             actividad.porcentaje_avance_validado = historial.progreso_nuevo
             
             # **NUEVO: Recalcular progreso jerárquico tras validación**
+            # Actividad (promedio trabajadores) y todos sus padres en una sola pasada
             print(f"🌳 Recalculando progreso jerárquico tras validación de {actividad.edt}...")
-            from app.controllers_main import calcular_progreso_actividad, recalcular_padres_recursivo
-            
-            # 1. Recalcular progreso de la actividad (promedio trabajadores)
-            progreso_calculado = calcular_progreso_actividad(actividad.id)
-            actividad.progreso = progreso_calculado
-            print(f"   📊 Progreso actividad {actividad.edt}: {progreso_calculado:.2f}%")
-            
-            # 2. Recalcular todos los padres en la jerarquía
-            recalcular_padres_recursivo(actividad.edt, historial.requerimiento_id)
-            print(f"   ✅ Jerarquía recalculada desde {actividad.edt}")
+            cambios = ArbolProgresoEDT(historial.requerimiento_id).recalcular([actividad.id])
+            print(f"   ✅ Jerarquía recalculada desde {actividad.edt}: {len(cambios)} actividades actualizadas")
         
         db.session.commit()
+        invalidar_estadisticas()
         
         print(f"✅ Avance validado: Historial {historial_id}, Actividad {actividad.edt}, {historial.progreso_nuevo}%")
         
@@ -305,6 +260,7 @@ def corregir_avance():
         historial_original.validado_por_id = current_user.id
         historial_original.fecha_validacion = datetime.utcnow()
         historial_original.comentario_validacion = f"CORREGIDO por supervisor de {historial_original.progreso_nuevo}% a {porcentaje_corregido}%"
+        historial_original.estado_validacion = ESTADO_VALIDADO
         
         print(f"📝 Registro original {historial_id} marcado como corregido")
         print(f"   Valor reportado por trabajador: {historial_original.progreso_nuevo}%")
@@ -326,7 +282,8 @@ def corregir_avance():
             validado=True,  # Ya viene validado
             validado_por_id=current_user.id,
             fecha_validacion=datetime.utcnow(),
-            comentario_validacion=f"Corregido de {historial_original.progreso_nuevo}% a {porcentaje_corregido}%. {comentario}"
+            comentario_validacion=f"Corregido de {historial_original.progreso_nuevo}% a {porcentaje_corregido}%. {comentario}",
+            estado_validacion=ESTADO_VALIDADO
         )
         db.session.add(nuevo_historial)
         
@@ -354,19 +311,13 @@ def corregir_avance():
             actividad.porcentaje_avance_validado = porcentaje_corregido
             
             # 5. Recalcular progreso jerárquico tras corrección
+            # Actividad (promedio trabajadores) y todos sus padres en una sola pasada
             print(f"🌳 Recalculando progreso jerárquico tras corrección de {actividad.edt}...")
-            from app.controllers_main import calcular_progreso_actividad, recalcular_padres_recursivo
-            
-            # Recalcular progreso de la actividad (promedio trabajadores)
-            progreso_calculado = calcular_progreso_actividad(actividad.id)
-            actividad.progreso = progreso_calculado
-            print(f"   📊 Progreso actividad {actividad.edt}: {progreso_calculado:.2f}%")
-            
-            # Recalcular todos los padres en la jerarquía
-            recalcular_padres_recursivo(actividad.edt, historial_original.requerimiento_id)
-            print(f"   ✅ Jerarquía recalculada desde {actividad.edt}")
+            cambios = ArbolProgresoEDT(historial_original.requerimiento_id).recalcular([actividad.id])
+            print(f"   ✅ Jerarquía recalculada desde {actividad.edt}: {len(cambios)} actividades actualizadas")
         
         db.session.commit()
+        invalidar_estadisticas()
         
         print(f"✅ Avance corregido exitosamente:")
         print(f"   Historial original: {historial_id} (conservado para auditoría)")
@@ -428,10 +379,12 @@ def rechazar_avance():
         historial.validado_por_id = current_user.id
         historial.fecha_validacion = datetime.utcnow()
         historial.comentario_validacion = f"RECHAZADO - Motivo: {motivo}"
+        historial.estado_validacion = ESTADO_RECHAZADO
         
         # NO actualizar porcentaje_avance_validado (mantener el anterior)
         
         db.session.commit()
+        invalidar_estadisticas()
         
         print(f"✅ Avance rechazado: Historial {historial_id}, Motivo: {motivo}")
         
@@ -448,6 +401,60 @@ def rechazar_avance():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@validar_avances_bp.route('/validar-lote', methods=['POST'])
+@csrf.exempt
+@login_required
+def validar_lote():
+    """
+    API: Validar, corregir o rechazar muchos avances en una sola transacción
+    Body: {'operaciones': [{'historial_id', 'accion': 'validar'|'corregir'|'rechazar',
+                            'porcentaje_corregido'?, 'comentario'?, 'motivo'?}, ...]}
+    Si alguna operación es inválida no se aplica ninguna.
+    """
+    print(f"🔍 API validar_avances.validar_lote llamado por {current_user.email}")
+    start_time = datetime.now()
+    
+    try:
+        from app.services.validacion_avances_service import ValidacionLote
+        
+        # VERIFICAR PERMISOS
+        if not (current_user.is_superadmin() or current_user.has_page_permission('/validar-avances')):
+            return jsonify({'success': False, 'message': 'Sin permisos'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        lote = ValidacionLote(
+            data.get('operaciones'),
+            current_user,
+            recinto_id=None if current_user.is_superadmin() else current_user.recinto_id
+        )
+        
+        errores = lote.validar_operaciones()
+        if errores:
+            return jsonify({'success': False, 'message': 'Lote inválido, no se aplicó ningún cambio', 'errores': errores}), 400
+        
+        resumen = lote.aplicar()
+        db.session.commit()
+        invalidar_estadisticas()
+        
+        duration = (datetime.now() - start_time).total_seconds()
+        print(f"✅ Lote aplicado en {duration:.3f}s: {resumen['validados']} validados, {resumen['corregidos']} corregidos, "
+              f"{resumen['rechazados']} rechazados, {len(resumen['omitidos'])} omitidos, "
+              f"{len(resumen['proyectos'])} proyectos recalculados")
+        
+        return jsonify({
+            'success': True,
+            'message': 'Lote aplicado exitosamente',
+            'resumen': resumen
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error en validar_lote: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 @validar_avances_bp.route('/estadisticas', methods=['GET'])
 @login_required
 def estadisticas():
@@ -462,38 +469,16 @@ def estadisticas():
         if not (current_user.is_superadmin() or current_user.has_page_permission('/validar-avances')):
             return jsonify({'success': False, 'message': 'Sin permisos'}), 403
         
-        # Query base
-        query = HistorialAvanceActividad.query
+        # Un GROUP BY sobre estado_validacion (cacheado hasta la próxima escritura de historial)
+        recinto_id = None if current_user.is_superadmin() else current_user.recinto_id
+        datos = estadisticas_validacion(recinto_id)
         
-        # Filtrar según nivel de acceso
-        if not current_user.is_superadmin():
-            query = query.join(Requerimiento).filter(Requerimiento.id_recinto == current_user.recinto_id)
-        
-        # Contar estados
-        total = query.count()
-        pendientes = query.filter(HistorialAvanceActividad.validado == False).count()
-        validados = query.filter(
-            HistorialAvanceActividad.validado == True,
-            or_(
-                HistorialAvanceActividad.comentario_validacion.is_(None),
-                ~HistorialAvanceActividad.comentario_validacion.like('%RECHAZADO%')
-            )
-        ).count()
-        rechazados = query.filter(
-            HistorialAvanceActividad.validado == True,
-            HistorialAvanceActividad.comentario_validacion.like('%RECHAZADO%')
-        ).count()
-        
-        print(f"✅ Estadísticas: {total} total, {pendientes} pendientes, {validados} validados, {rechazados} rechazados")
+        print(f"✅ Estadísticas: {datos['total']} total, {datos['pendientes']} pendientes, "
+              f"{datos['validados']} validados, {datos['rechazados']} rechazados")
         
         return jsonify({
             'success': True,
-            'estadisticas': {
-                'total': total,
-                'pendientes': pendientes,
-                'validados': validados,
-                'rechazados': rechazados
-            }
+            'estadisticas': datos
         })
         
     except Exception as e:
@@ -1,11 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app, make_response, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, session
 from flask_login import current_user, login_required
 from sqlalchemy.orm import joinedload
 from app.models import (
     Requerimiento, TipoRecinto, Recinto, Sector, Trabajador, 
     Financiamiento, Especialidad, 
     Equipo, Tipologia, Fase, TipoProyecto, Estado, Prioridad, Grupo, Area, db,  # Agregar Prioridad, Area y Fase
-    requerimiento_trabajador_especialidad, EquipoTrabajo, GanttArchivo, ActividadProyecto, AvanceActividad, HistorialAvanceActividad, HistorialControl,  # Agregar HistorialControl
+    requerimiento_trabajador_especialidad, EquipoTrabajo, GanttArchivo, ActividadProyecto, AvanceActividad, HistorialAvanceActividad,
     AdministradorRecinto, TrabajadorRecinto,  # Agregar modelos para gestión de permisos por recintos
     ObservacionRequerimiento,  # Nuevo modelo para observaciones
     ActividadGantt  # Modelo para carta Gantt (actividades del Gantt)
@@ -14,7 +14,6 @@ from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
 import pandas as pd
-import openpyxl
 from io import BytesIO
 import json
 import re
@@ -26,6 +25,9 @@ import locale
 from werkzeug.exceptions import BadRequest
 import time
 
+from app.services.tareas_service import registrar_tarea
+from app.performance import presupuesto_consultas
+
 # Configurar logger
 logger = logging.getLogger(__name__)
 
@@ -2705,10 +2707,11 @@ def ver_gantt(req_id):
 @controllers_bp.route('/subir_gantt_xlsx/<int:req_id>', methods=['POST'])
 def subir_gantt_xlsx(req_id):
     """
-    Sube y procesa un archivo XLSX de Gantt para un requerimiento específico.
-    Guarda las actividades, procesa los recursos y crea registros de avance_actividad.
+    Sube un archivo XLSX de Gantt (o el XML que exporta MS Project) para un
+    requerimiento específico y encola su procesamiento (tarea 'gantt_procesar'):
+    el worker guarda las actividades, procesa los recursos y crea registros de
+    avance_actividad.
     """
-    file_path = None
     try:
         # Verificar que el requerimiento existe
         requerimiento = Requerimiento.query.get_or_404(req_id)
@@ -2724,26 +2727,16 @@ def subir_gantt_xlsx(req_id):
             flash('No se seleccionó ningún archivo.', 'error')
             return redirect(url_for('controllers.ruta_proyectos_completar'))
         
-        if not file.filename.lower().endswith('.xlsx'):
-            flash('Por favor, seleccione un archivo XLSX válido.', 'error')
+        if not file.filename.lower().endswith(('.xlsx', '.xml')):
+            flash('Por favor, seleccione un archivo XLSX o XML de MS Project válido.', 'error')
             return redirect(url_for('controllers.ruta_proyectos_completar'))
+        tipo_archivo = file.filename.rsplit('.', 1)[-1].lower()
         
-        # Crear directorio para archivos Gantt si no existe
-        gantt_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'gantt')
-        os.makedirs(gantt_dir, exist_ok=True)
-        
-        # Generar nombre único para el archivo
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"gantt_req_{req_id}_{timestamp}_{secure_filename(file.filename)}"
-        file_path = os.path.join(gantt_dir, filename)
-        
-        # Guardar archivo temporalmente
-        file.save(file_path)
-        print(f"📁 Archivo guardado temporalmente en: {file_path}")
-        
-        # Leer el archivo para guardarlo en la base de datos
-        with open(file_path, 'rb') as f:
-            archivo_bytes = f.read()
+        # Guardar en el almacén direccionado por contenido (sha256 calculado al vuelo)
+        from app.services.gantt_store import obtener_gantt_store
+        store = obtener_gantt_store()
+        sha256, tamano, nuevo = store.guardar_stream(file.stream)
+        print(f"📁 Archivo en almacén Gantt: {sha256[:12]} ({'nuevo' if nuevo else 'ya existente'})")
         
         # Limpiar cualquier transacción pendiente
         try:
@@ -2753,12 +2746,21 @@ def subir_gantt_xlsx(req_id):
         
         # Verificar si ya existe un archivo para este requerimiento
         gantt_existente = GanttArchivo.query.filter_by(id_requerimiento=req_id).first()
+        
+        # Mismo contenido ya importado: no hay nada que reprocesar
+        if gantt_existente and gantt_existente.sha256 == sha256 and \
+                db.session.query(ActividadProyecto.id).filter_by(requerimiento_id=req_id).first():
+            print(f"ℹ️ Archivo idéntico al ya cargado para requerimiento {req_id}, sin cambios")
+            flash('ℹ️ El archivo es idéntico al ya cargado; no hay cambios que procesar.', 'info')
+            return redirect(url_for('controllers.ruta_proyectos_completar'))
+        
         if gantt_existente:
             # Actualizar archivo existente
-            gantt_existente.archivo = archivo_bytes
+            gantt_existente.sha256 = sha256
+            gantt_existente.archivo = None
             gantt_existente.nombre_archivo = file.filename
-            gantt_existente.tipo_archivo = 'xlsx'
-            gantt_existente.tamano_archivo = len(archivo_bytes)
+            gantt_existente.tipo_archivo = tipo_archivo
+            gantt_existente.tamano_archivo = tamano
             gantt_existente.fecha_subida = datetime.now()
             print(f"📝 Actualizando archivo existente en GanttArchivo")
         else:
@@ -2766,9 +2768,9 @@ def subir_gantt_xlsx(req_id):
             gantt_archivo = GanttArchivo(
                 id_requerimiento=req_id,
                 nombre_archivo=file.filename,
-                tipo_archivo='xlsx',
-                archivo=archivo_bytes,
-                tamano_archivo=len(archivo_bytes),
+                tipo_archivo=tipo_archivo,
+                sha256=sha256,
+                tamano_archivo=tamano,
                 fecha_subida=datetime.now()
             )
             db.session.add(gantt_archivo)
@@ -2784,29 +2786,19 @@ def subir_gantt_xlsx(req_id):
             flash(f"❌ Error al guardar el archivo: {str(e)}", 'error')
             return redirect(url_for('controllers.ruta_proyectos_completar'))
         
-        # Procesar archivo y guardar actividades con recursos
-        resultado = procesar_gantt_con_recursos(file_path, req_id)
-        
-        if resultado['success']:
-            print(f"✅ Archivo procesado exitosamente")
-            
-            mensaje = (f"✅ Archivo procesado exitosamente: "
-                       f"{resultado['actividades_procesadas']} actividades, "
-                       f"{resultado['recursos_procesados']} asignaciones de recursos y "
-                       f"{resultado['avances_creados']} registros de avance creados.")
-            if resultado['errores']:
-                mensaje += f" Se encontraron {len(resultado['errores'])} filas con errores."
-                # Agregar detalles de los errores más comunes
-                print(f"📋 Detalles de errores encontrados:")
-                for i, error in enumerate(resultado['errores'][:5]):  # Mostrar máximo 5 errores
-                    print(f"   {i+1}. {error}")
-                if len(resultado['errores']) > 5:
-                    print(f"   ... y {len(resultado['errores']) - 5} errores más.")
-            flash(mensaje, 'success')
+        # Procesar archivo y guardar actividades con recursos en el worker
+        from app.models import TAREA_COMPLETADA
+        from app.services.tareas_service import encolar, obtener
+        tarea_id = encolar('gantt_procesar', {'req_id': req_id, 'sha256': sha256},
+                           creado_por_id=current_user.id if current_user.is_authenticated else None)
+        tarea = obtener(tarea_id)
+        
+        if tarea.estado == TAREA_COMPLETADA:
+            flash(tarea.resultado['mensaje'], 'success')
+        elif tarea.finalizada:
+            flash(f"❌ Error al procesar las actividades: {tarea.error}.", 'error')
         else:
-            error_detalle = resultado.get('error', 'Error desconocido')
-            print(f"❌ Error procesando archivo: {error_detalle}")
-            flash(f"❌ Error al procesar las actividades: {error_detalle}.", 'error')
+            flash(f"📥 Archivo recibido. Las actividades se están procesando en segundo plano (tarea #{tarea_id}).", 'info')
 
     except Exception as e:
         import traceback
@@ -2814,83 +2806,95 @@ def subir_gantt_xlsx(req_id):
         flash(f'Ocurrió un error inesperado al procesar el archivo: {str(e)}', 'error')
         db.session.rollback()
     
-    finally:
-        # Eliminar archivo temporal después de procesarlo
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"🗑️ Archivo temporal eliminado: {file_path}")
-            except Exception as e:
-                print(f"⚠️ No se pudo eliminar el archivo temporal: {str(e)}")
-    
     return redirect(url_for('controllers.ruta_proyectos_completar'))
 
+@registrar_tarea('gantt_procesar')
+def tarea_procesar_gantt(contexto, req_id, sha256):
+    """Procesa en el worker la Carta Gantt que subir_gantt_xlsx dejó en el almacén"""
+    from app.services.gantt_store import obtener_gantt_store
+    from app.services.tareas_service import TareaFallida
+    
+    contexto.progreso(5, 'Procesando Carta Gantt', forzar=True)
+    resultado = procesar_gantt_con_recursos(obtener_gantt_store().ruta(sha256), req_id)
+    
+    if not resultado['success']:
+        raise TareaFallida(resultado.get('error', 'Error desconocido'))
+    
+    mensaje = (f"✅ Archivo procesado exitosamente: "
+               f"{resultado['actividades_procesadas']} actividades, "
+               f"{resultado['recursos_procesados']} asignaciones de recursos y "
+               f"{resultado['avances_creados']} registros de avance creados.")
+    if resultado['errores']:
+        mensaje += f" Se encontraron {len(resultado['errores'])} filas con errores."
+        # Agregar detalles de los errores más comunes
+        print(f"📋 Detalles de errores encontrados:")
+        for i, error in enumerate(resultado['errores'][:5]):  # Mostrar máximo 5 errores
+            print(f"   {i+1}. {error}")
+        if len(resultado['errores']) > 5:
+            print(f"   ... y {len(resultado['errores']) - 5} errores más.")
+    
+    return {
+        'mensaje': mensaje,
+        'actividades_procesadas': resultado['actividades_procesadas'],
+        'recursos_procesados': resultado['recursos_procesados'],
+        'avances_creados': resultado['avances_creados'],
+        'errores': [str(error) for error in resultado['errores'][:50]]
+    }
+
 @controllers_bp.route('/gantt_data/<int:req_id>', methods=['GET'])
+@presupuesto_consultas(8)  # 4 con la ruta crítica vigente; 8 cuando hay que recalcularla
 def gantt_data(req_id):
     """
     Obtiene los datos de actividades del Gantt para un requerimiento específico
     desde la base de datos o desde el archivo XLSX almacenado.
+    
+    Respuesta columnar ({'columnas': {campo: [valores]}}) con ETag: si el
+    navegador envía un If-None-Match vigente se responde 304 tras una sola
+    consulta de versión.
     """
+    from app.services.gantt_data_service import version_gantt, columnas_actividades, filas_a_columnas
+    from app.services.ruta_critica_service import asegurar_cronogramas
+    
+    def respuesta_con_etag(response):
+        # no-cache: el navegador guarda la respuesta pero revalida en cada carga
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
     try:
         print(f"📡 Solicitando datos de Gantt para requerimiento ID: {req_id}")
         
+        etag, fecha_actualizacion = version_gantt(req_id)
+        if request.if_none_match.contains(etag):
+            return respuesta_con_etag(make_response('', 304))
+        
+        # Ruta crítica invalidada por cambios de fechas o vínculos: se recalcula
+        # antes de leer (no cambia el ETag, ya cambiado por esa misma edición)
+        if asegurar_cronogramas([req_id]):
+            db.session.commit()
+        
         # Verificar que el requerimiento existe
         requerimiento = Requerimiento.query.get_or_404(req_id)
         
         # Primero intentar obtener desde la base de datos (actividades procesadas)
-        actividades_bd = ActividadProyecto.query.filter_by(
-            requerimiento_id=req_id, 
-            activo=True
-        ).order_by(ActividadProyecto.edt).all()
+        columnas = columnas_actividades(req_id)
+        total_actividades = len(columnas['ID'])
         
-        if actividades_bd:
-            print(f"📊 Obteniendo {len(actividades_bd)} actividades desde la base de datos")
+        if total_actividades:
+            print(f"📊 Obteniendo {total_actividades} actividades desde la base de datos")
             
-            # Convertir actividades de BD a formato compatible con el frontend
-            actividades = []
-            for act in actividades_bd:
-                actividad_dict = {
-                    'ID': act.id,
-                    'EDT': act.edt,
-                    'E.D.T.': act.edt,
-                    'Edt': act.edt,
-                    'WBS': act.edt,
-                    'Nivel de esquema': act.nivel_esquema,
-                    'Nombre de tarea': act.nombre_tarea,
-                    'Actividad': act.nombre_tarea,
-                    'Nombre': act.nombre_tarea,
-                    'Task Name': act.nombre_tarea,
-                    'Comienzo': act.fecha_inicio.strftime('%Y-%m-%d') if act.fecha_inicio else '',
-                    'Inicio': act.fecha_inicio.strftime('%Y-%m-%d') if act.fecha_inicio else '',
-                    'Start': act.fecha_inicio.strftime('%Y-%m-%d') if act.fecha_inicio else '',
-                    'Fecha Inicio': act.fecha_inicio.strftime('%Y-%m-%d') if act.fecha_inicio else '',
-                    'Fin': act.fecha_fin.strftime('%Y-%m-%d') if act.fecha_fin else '',
-                    'End': act.fecha_fin.strftime('%Y-%m-%d') if act.fecha_fin else '',
-                    'Fecha Fin': act.fecha_fin.strftime('%Y-%m-%d') if act.fecha_fin else '',
-                    'Duración': act.duracion,
-                    'Duration': act.duracion,
-                    'Días': act.duracion,
-                    'Recursos': act.recursos or '',
-                    'Resource Names': act.recursos or '',
-                    'Nombres de los recursos': act.recursos or '',
-                    'Progreso': float(act.progreso) if act.progreso else 0.0,
-                    'Progress': float(act.progreso) if act.progreso else 0.0,
-                    '% Completado': float(act.progreso) if act.progreso else 0.0,
-                    'Porcentaje completado': float(act.progreso) if act.progreso else 0.0
-                }
-                actividades.append(actividad_dict)
-            
-            return jsonify({
+            return respuesta_con_etag(jsonify({
                 'success': True,
-                'actividades': actividades,
+                'formato': 'columnar',
+                'columnas': columnas,
                 'info': {
-                    'total_actividades': len(actividades),
+                    'total_actividades': total_actividades,
                     'fuente': 'base_de_datos',
-                    'fecha_actualizacion': max([act.updated_at for act in actividades_bd]).strftime('%Y-%m-%d %H:%M:%S') if actividades_bd else None,
+                    'fecha_actualizacion': fecha_actualizacion.strftime('%Y-%m-%d %H:%M:%S') if fecha_actualizacion else None,
                     'proyecto_id': req_id,
                     'proyecto_nombre': requerimiento.nombre
                 }
-            })
+            }))
         
         # Si no hay actividades en BD, intentar obtener desde archivo Gantt almacenado
         gantt_archivo = GanttArchivo.query.filter_by(id_requerimiento=req_id).first()
@@ -2906,61 +2910,44 @@ def gantt_data(req_id):
         print(f"📄 Leyendo actividades desde archivo XLSX almacenado: {gantt_archivo.nombre_archivo}")
         
         try:
-            import pandas as pd
-            from io import BytesIO
+            from app.services.gantt_store import obtener_gantt_store, asegurar_en_store
+            
+            # Filas normalizadas desde el cache del almacén (parseo solo la primera vez)
+            store = obtener_gantt_store()
+            migrar_blob = gantt_archivo.archivo is not None
+            sha256 = asegurar_en_store(gantt_archivo, store)
+            if migrar_blob and sha256:
+                db.session.commit()
+            if not sha256:
+                return jsonify({
+                    'success': False,
+                    'error': 'El archivo Gantt almacenado no está disponible'
+                }), 404
             
-            # Leer el archivo desde la base de datos
-            df = pd.read_excel(BytesIO(gantt_archivo.archivo), engine='openpyxl')
+            filas = store.actividades(sha256, gantt_archivo.tipo_archivo)
             
-            if df.empty:
+            if not filas:
                 return jsonify({
                     'success': False,
                     'error': 'El archivo XLSX está vacío'
                 }), 400
             
-            print(f"📋 Archivo leído: {len(df)} filas, columnas: {list(df.columns)}")
+            print(f"📋 Archivo leído: {len(filas)} filas, columnas: {list(filas[0].keys())}")
             
-            # Convertir DataFrame a lista de diccionarios
-            actividades = []
-            for index, row in df.iterrows():
-                actividad_dict = {}
-                for col in df.columns:
-                    value = row[col]
-                    if pd.notna(value):
-                        # Formatear fechas
-                        if 'fecha' in col.lower() or 'inicio' in col.lower() or 'fin' in col.lower() or 'start' in col.lower() or 'end' in col.lower():
-                            try:
-                                if isinstance(value, str):
-                                    fecha_obj = pd.to_datetime(value, errors='coerce')
-                                else:
-                                    fecha_obj = pd.to_datetime(value)
-                                
-                                if not pd.isna(fecha_obj):
-                                    actividad_dict[col] = fecha_obj.strftime('%Y-%m-%d')
-                                else:
-                                    actividad_dict[col] = str(value)
-                            except:
-                                actividad_dict[col] = str(value)
-                        else:
-                            actividad_dict[col] = value
-                    else:
-                        actividad_dict[col] = ''
-                
-                # Solo agregar filas que tengan al menos un EDT/WBS y nombre
-                edt_cols = ['EDT', 'WBS', 'E.D.T.', 'Edt']
-                nombre_cols = ['Nombre de tarea', 'Actividad', 'Nombre', 'Task Name']
-                
-                tiene_edt = any(col in actividad_dict and actividad_dict[col] for col in edt_cols)
-                tiene_nombre = any(col in actividad_dict and actividad_dict[col] for col in nombre_cols)
-                
-                if tiene_edt and tiene_nombre:
-                    actividades.append(actividad_dict)
+            # Solo filas que tengan al menos un EDT/WBS y nombre
+            edt_cols = ['EDT', 'WBS', 'E.D.T.', 'Edt']
+            nombre_cols = ['Nombre de tarea', 'Actividad', 'Nombre', 'Task Name']
+            actividades = [
+                fila for fila in filas
+                if any(fila.get(col) for col in edt_cols) and any(fila.get(col) for col in nombre_cols)
+            ]
             
             print(f"✅ {len(actividades)} actividades válidas extraídas del archivo")
             
-            return jsonify({
+            return respuesta_con_etag(jsonify({
                 'success': True,
-                'actividades': actividades,
+                'formato': 'columnar',
+                'columnas': filas_a_columnas(actividades),
                 'info': {
                     'total_actividades': len(actividades),
                     'fuente': 'archivo_xlsx',
@@ -2969,7 +2956,7 @@ def gantt_data(req_id):
                     'proyecto_id': req_id,
                     'proyecto_nombre': requerimiento.nombre
                 }
-            })
+            }))
             
         except Exception as archivo_error:
             print(f"❌ Error al leer archivo XLSX: {str(archivo_error)}")
@@ -3043,330 +3030,40 @@ def convertir_fecha_segura(fecha_raw, nombre_campo="fecha"):
 
 def procesar_gantt_con_recursos(file_path, req_id):
     """
-    Procesa el archivo Gantt y crea registros en actividades_gantt y avance_actividad
+    Procesa el archivo Gantt y crea registros en actividad_proyecto y avance_actividad
     basándose en los recursos asignados (nombrecorto de trabajadores).
+    
+    La lectura, normalización e inserción masiva se delegan en GanttIngestor
+    (app/services/gantt_import_service.py), o en MSPDIIngestor si el archivo
+    es un XML de MS Project (app/services/mspdi_import_service.py).
     """
-    try:
-        import pandas as pd
-        from datetime import datetime
-        import re
-        
-        # Leer el archivo Excel
-        df = pd.read_excel(file_path, engine='openpyxl')
-        
-        if df.empty:
-            return {'success': False, 'error': 'El archivo está vacío'}
-        
-        print(f"📊 Procesando {len(df)} filas del archivo Gantt")
-        print(f"📋 Columnas disponibles en el archivo: {list(df.columns)}")
-        
-        # Mostrar muestra de datos para debug
-        print(f"📄 Primeras 2 filas del archivo para referencia:")
-        for i in range(min(2, len(df))):
-            print(f"   Fila {i+1}: {dict(df.iloc[i])}")
-            
-        # Verificar si hay datos vacíos
-        if df.empty or len(df) == 0:
-            return {'success': False, 'error': 'El archivo está vacío o no contiene datos'}
-            
-        # Verificar que no todas las filas estén vacías
-        filas_con_datos = df.dropna(how='all')
-        if len(filas_con_datos) == 0:
-            return {'success': False, 'error': 'Todas las filas del archivo están vacías'}
-        
-        # Limpiar registros anteriores para este requerimiento
-        from app.models import ActividadProyecto, AvanceActividad
-        
-        # Eliminar actividades anteriores
-        ActividadProyecto.query.filter_by(requerimiento_id=req_id).delete()
-        
-        # Eliminar avances anteriores
-        AvanceActividad.query.filter_by(requerimiento_id=req_id).delete()
-        
-        actividades_procesadas = 0
-        recursos_procesados = 0
-        avances_creados = 0
-        errores = []
-        
-        # Mapeo de columnas más flexible
-        columnas_mapeo = {
-            'ID': ['ID', 'id', 'Id', 'Número', 'No', '#', 'Índice'],
-            'Nivel de esquema': ['Nivel de esquema', 'Nivel', 'Level', 'Nivel esquema', 'Outline Level'],
-            'EDT': ['EDT', 'WBS', 'E.D.T.', 'Edt', 'Work Breakdown Structure'],
-            'Nombre de tarea': ['Nombre de tarea', 'Actividad', 'Tarea', 'Task Name', 'Nombre', 'Task', 'Name'],
-            'Duración': ['Duración', 'Duration', 'Dias', 'Días', 'Days', 'Duracion'],
-            'Comienzo': ['Comienzo', 'Inicio', 'Start', 'Fecha Inicio', 'Start Date', 'Fecha de inicio'],
-            'Fin': ['Fin', 'Final', 'End', 'Fecha Fin', 'Finish', 'End Date', 'Fecha de fin'],
-            'Recursos': ['Nombres de los recursos', 'Recursos', 'Resources', 'Resource Names', 'Assigned Resources'],
-            'Progreso': ['Progreso', 'Progress', '% Completado', 'Porcentaje completado', 'Complete', 'Percent Complete', '% Complete']
-        }
-        
-        # Buscar columnas existentes con coincidencia más flexible
-        columnas_encontradas = {}
-        columnas_df_lower = {col.lower().strip(): col for col in df.columns}
-        
-        for clave, variantes in columnas_mapeo.items():
-            encontrada = False
-            for variante in variantes:
-                # Buscar coincidencia exacta primero
-                if variante.lower().strip() in columnas_df_lower:
-                    columnas_encontradas[clave] = columnas_df_lower[variante.lower().strip()]
-                    encontrada = True
-                    break
-                # Buscar coincidencia parcial
-                for col_df in columnas_df_lower.keys():
-                    if variante.lower().strip() in col_df or col_df in variante.lower().strip():
-                        columnas_encontradas[clave] = columnas_df_lower[col_df]
-                        encontrada = True
-                        break
-                if encontrada:
-                    break
-        
-        print(f"📋 Columnas encontradas después del mapeo: {columnas_encontradas}")
-        
-        # Verificar que se encontraron las columnas mínimas requeridas
-        columnas_requeridas = ['EDT', 'Nombre de tarea', 'Comienzo', 'Fin']
-        columnas_faltantes = [col for col in columnas_requeridas if col not in columnas_encontradas]
-        
-        if columnas_faltantes:
-            error_msg = f"No se encontraron las columnas requeridas: {', '.join(columnas_faltantes)}"
-            print(f"❌ {error_msg}")
-            return {'success': False, 'error': error_msg}
-        
-        # Mostrar las primeras filas para debug
-        print(f"📄 Iniciando procesamiento de filas:")
-        
-        for index, row in df.iterrows():
-            try:
-                print(f"\n🔍 Procesando fila {index + 1}: {dict(row)}")
-                
-                # Extraer datos básicos de la actividad con manejo de errores mejorado
-                edt = None
-                nombre_tarea = None
-                recursos_texto = None
-                
-                # Intentar obtener EDT
-                if 'EDT' in columnas_encontradas:
-                    edt_raw = row.get(columnas_encontradas['EDT'])
-                    if pd.notna(edt_raw):
-                        edt = str(edt_raw).strip()
-                
-                # Intentar obtener nombre de tarea
-                if 'Nombre de tarea' in columnas_encontradas:
-                    nombre_raw = row.get(columnas_encontradas['Nombre de tarea'])
-                    if pd.notna(nombre_raw):
-                        nombre_tarea = str(nombre_raw).strip()
-                
-                # Intentar obtener recursos
-                if 'Recursos' in columnas_encontradas:
-                    recursos_raw = row.get(columnas_encontradas['Recursos'])
-                    if pd.notna(recursos_raw):
-                        recursos_texto = str(recursos_raw).strip()
-                
-                print(f"   EDT: '{edt}', Nombre: '{nombre_tarea}', Recursos: '{recursos_texto}'")
-                
-                # Validar datos mínimos requeridos
-                if not edt or edt == 'nan' or not nombre_tarea or nombre_tarea == 'nan':
-                    error_msg = f"Fila {index + 1}: EDT o nombre de tarea vacío (EDT: '{edt}', Nombre: '{nombre_tarea}')"
-                    errores.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    continue
-                
-                # Validar longitudes de campos
-                if len(str(edt)) > 50:
-                    error_msg = f"Fila {index + 1}: EDT muy largo (máximo 50 caracteres): '{edt}'"
-                    errores.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    continue
-                    
-                if len(str(nombre_tarea)) > 500:
-                    error_msg = f"Fila {index + 1}: Nombre de tarea muy largo (máximo 500 caracteres): '{nombre_tarea[:100]}...'"
-                    errores.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    continue
-                
-                # Procesar fechas con manejo de errores mejorado
-                fecha_inicio = None
-                fecha_fin = None
-                
-                try:
-                    if 'Comienzo' in columnas_encontradas:
-                        inicio_raw = row.get(columnas_encontradas['Comienzo'])
-                        print(f"   Fecha inicio raw: {inicio_raw} (tipo: {type(inicio_raw)})")
-                        fecha_inicio = convertir_fecha_segura(inicio_raw, "fecha_inicio")
-                        
-                    if 'Fin' in columnas_encontradas:
-                        fin_raw = row.get(columnas_encontradas['Fin'])
-                        print(f"   Fecha fin raw: {fin_raw} (tipo: {type(fin_raw)})")
-                        fecha_fin = convertir_fecha_segura(fin_raw, "fecha_fin")
-                                
-                except Exception as fecha_error:
-                    print(f"⚠️ Error procesando fechas en fila {index + 1}: {fecha_error}")
-                    fecha_inicio = None
-                    fecha_fin = None
-                
-                print(f"   Fechas procesadas - Inicio: {fecha_inicio}, Fin: {fecha_fin}")
-                
-                # Validar que las fechas no sean None (requerido por el modelo)
-                if not fecha_inicio or not fecha_fin:
-                    error_msg = f"Fila {index + 1}: Fechas requeridas son nulas o inválidas (Inicio: {fecha_inicio}, Fin: {fecha_fin})"
-                    errores.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    continue
-                
-                # Procesar duración
-                duracion = 0
-                try:
-                    if 'Duración' in columnas_encontradas:
-                        duracion_raw = row.get(columnas_encontradas['Duración'])
-                        if pd.notna(duracion_raw):
-                            # Extraer solo números de la duración
-                            duracion_str = str(duracion_raw).replace('days', '').replace('días', '').replace('d', '').strip()
-                            duracion = int(float(duracion_str)) if duracion_str.replace('.', '').isdigit() else 0
-                except Exception as duracion_error:
-                    print(f"⚠️ Error procesando duración en fila {index + 1}: {duracion_error}")
-                    duracion = 0
-                
-                # Procesar progreso
-                progreso = 0.0
-                try:
-                    if 'Progreso' in columnas_encontradas:
-                        progreso_raw = row.get(columnas_encontradas['Progreso'])
-                        if pd.notna(progreso_raw):
-                            progreso_val = float(str(progreso_raw).replace('%', ''))
-                            # Si el valor es mayor a 1, asumimos que está en porcentaje
-                            progreso = progreso_val if progreso_val <= 1 else progreso_val / 100
-                            progreso = max(0.0, min(1.0, progreso))  # Limitar entre 0 y 1
-                except Exception as progreso_error:
-                    print(f"⚠️ Error procesando progreso en fila {index + 1}: {progreso_error}")
-                    progreso = 0.0
-                
-                # Procesar nivel de esquema
-                nivel_esquema = 1
-                try:
-                    if 'Nivel de esquema' in columnas_encontradas:
-                        nivel_raw = row.get(columnas_encontradas['Nivel de esquema'])
-                        if pd.notna(nivel_raw):
-                            nivel_esquema = int(float(str(nivel_raw)))
-                except Exception as nivel_error:
-                    print(f"⚠️ Error procesando nivel en fila {index + 1}: {nivel_error}")
-                    nivel_esquema = 1
-                
-                print(f"   Datos finales - Duración: {duracion}, Progreso: {progreso}, Nivel: {nivel_esquema}")
-                
-                print(f"   Datos finales - Duración: {duracion}, Progreso: {progreso}, Nivel: {nivel_esquema}")
-                
-                # Validar que el progreso esté en el rango válido para Numeric(5,2)
-                progreso_porcentaje = progreso * 100
-                if progreso_porcentaje > 999.99 or progreso_porcentaje < 0:
-                    error_msg = f"Fila {index + 1}: Progreso fuera de rango (0-999.99): {progreso_porcentaje}"
-                    errores.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    continue
-                
-                # Crear actividad en actividad_proyecto
-                try:
-                    # Validación final de fechas antes de insertar
-                    if fecha_inicio is None or fecha_fin is None:
-                        error_msg = f"Fila {index + 1}: Fechas nulas no permitidas para inserción (Inicio: {fecha_inicio}, Fin: {fecha_fin})"
-                        errores.append(error_msg)
-                        print(f"❌ {error_msg}")
-                        continue
-                    
-                    # Validación adicional para asegurar que son objetos date válidos
-                    try:
-                        # Intentar formatear las fechas para asegurar que son válidas
-                        fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
-                        fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
-                        print(f"   ✅ Fechas validadas - Inicio: {fecha_inicio_str}, Fin: {fecha_fin_str}")
-                    except (AttributeError, ValueError) as fecha_val_error:
-                        error_msg = f"Fila {index + 1}: Fechas no son objetos date válidos - {fecha_val_error}"
-                        errores.append(error_msg)
-                        print(f"❌ {error_msg}")
-                        continue
-                    
-                    actividad = ActividadProyecto(
-                        requerimiento_id=req_id,
-                        edt=edt,
-                        nivel_esquema=nivel_esquema,
-                        nombre_tarea=nombre_tarea,
-                        fecha_inicio=fecha_inicio,
-                        fecha_fin=fecha_fin,
-                        duracion=duracion,
-                        recursos=recursos_texto or '',
-                        progreso=progreso * 100,  # Guardar como porcentaje (0-100)
-                        activo=True
-                        # Los campos created_at y updated_at se manejan automáticamente por TimestampMixin
-                    )
-                    
-                    db.session.add(actividad)
-                    db.session.flush()  # Para obtener el ID
-                    actividades_procesadas += 1
-                    print(f"✅ Actividad creada con ID: {actividad.id} - EDT: {edt} - Nombre: {nombre_tarea}")
-                    
-                    # Procesar recursos y crear registros de avance_actividad
-                    if recursos_texto and recursos_texto.lower() != 'nan':
-                        trabajadores_encontrados = procesar_recursos_trabajadores(recursos_texto, req_id, actividad.id)
-                        recursos_procesados += len(trabajadores_encontrados)
-                        avances_creados += len(trabajadores_encontrados)
-                        print(f"   👥 Recursos procesados: {len(trabajadores_encontrados)}")
-                    
-                except Exception as actividad_error:
-                    error_msg = f"Error creando actividad en fila {index + 1}: {str(actividad_error)}"
-                    errores.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    print(f"   Datos de la fila: EDT='{edt}', Nombre='{nombre_tarea}', Inicio={fecha_inicio}, Fin={fecha_fin}, Duración={duracion}")
-                    import traceback
-                    print(f"   Stack trace: {traceback.format_exc()}")
-                    continue
-                
-            except Exception as e:
-                error_msg = f"Error general en fila {index + 1}: {str(e)}"
-                errores.append(error_msg)
-                print(f"❌ {error_msg}")
-                continue
-        
-        # Guardar todos los cambios
-        try:
-            print(f"💾 Intentando guardar {actividades_procesadas} actividades en la base de datos...")
-            db.session.commit()
-            print(f"✅ Cambios guardados en la base de datos exitosamente")
-            
-            # **NUEVO: Recalcular progresos después de procesar el Gantt**
-            if actividades_procesadas > 0:
-                print(f"🔄 Recalculando progresos de todas las actividades del proyecto {req_id}")
-                recalcular_progresos_proyecto(req_id)
-                
-        except Exception as commit_error:
-            db.session.rollback()
-            print(f"❌ Error al guardar en la base de datos: {commit_error}")
-            import traceback
-            print(f"📋 Traceback del error de commit: {traceback.format_exc()}")
-            return {'success': False, 'error': f'Error al guardar en la base de datos: {commit_error}'}
-        
-        resultado = {
-            'success': True,
-            'actividades_procesadas': actividades_procesadas,
-            'recursos_procesados': recursos_procesados,
-            'avances_creados': avances_creados,
-            'errores': errores
-        }
-        
-        print(f"📊 Resultado final del procesamiento:")
-        print(f"   ✅ Actividades procesadas: {actividades_procesadas}")
-        print(f"   👥 Recursos procesados: {recursos_procesados}")
-        print(f"   📈 Avances creados: {avances_creados}")
-        print(f"   ❌ Errores encontrados: {len(errores)}")
-        print(f"   📋 Total de filas procesadas: {len(df)}")
-        
+    from app.services.gantt_import_service import importar_gantt_xlsx
+    from app.services.mspdi_import_service import es_mspdi, importar_gantt_mspdi
+    
+    if es_mspdi(file_path):
+        print(f"📊 Importando XML de MS Project para requerimiento {req_id}")
+        resultado = importar_gantt_mspdi(file_path, req_id)
+    else:
+        print(f"📊 Importando archivo Gantt para requerimiento {req_id}")
+        resultado = importar_gantt_xlsx(file_path, req_id)
+    
+    if not resultado['success']:
+        print(f"❌ Error en procesar_gantt_con_recursos: {resultado.get('error')}")
         return resultado
-        
-    except Exception as e:
-        db.session.rollback()
-        print(f"❌ Error general en procesar_gantt_con_recursos: {str(e)}")
-        import traceback
-        print(f"📋 Traceback completo: {traceback.format_exc()}")
-        return {'success': False, 'error': str(e)}
+    
+    # Recalcular progresos después de procesar el Gantt
+    if resultado['actividades_procesadas'] > 0:
+        print(f"🔄 Recalculando progresos de todas las actividades del proyecto {req_id}")
+        recalcular_progresos_proyecto(req_id)
+    
+    print(f"📊 Resultado final del procesamiento:")
+    print(f"   ✅ Actividades procesadas: {resultado['actividades_procesadas']}")
+    print(f"   👥 Recursos procesados: {resultado['recursos_procesados']}")
+    print(f"   📈 Avances creados: {resultado['avances_creados']}")
+    print(f"   ❌ Errores encontrados: {len(resultado['errores'])}")
+    print(f"   📋 Total de filas procesadas: {resultado['total_filas']}")
+    
+    return resultado
 
 def procesar_recursos_trabajadores(recursos_texto, req_id, actividad_id):
     """
@@ -3487,15 +3184,10 @@ def buscar_o_crear_trabajador_por_codigo(codigo):
     """
     try:
         from app.models import Trabajador
+        from app.services.recursos_service import buscar_trabajador_por_clave
         
-        # Buscar exacto primero
-        trabajador = Trabajador.query.filter_by(nombrecorto=codigo).first()
-        
-        if not trabajador:
-            # Buscar case-insensitive
-            trabajador = Trabajador.query.filter(
-                Trabajador.nombrecorto.ilike(codigo)
-            ).first()
+        # Una consulta sobre las columnas normalizadas (sin tildes ni mayúsculas)
+        trabajador = buscar_trabajador_por_clave(codigo)
         
         if trabajador:
             print(f"✅ Trabajador encontrado: {codigo} -> {trabajador.nombre}")
@@ -3527,14 +3219,10 @@ def buscar_trabajador_por_codigo(codigo):
     Busca un trabajador por su nombrecorto (código).
     """
     try:
-        # Buscar exacto primero
-        trabajador = Trabajador.query.filter_by(nombrecorto=codigo).first()
+        from app.services.recursos_service import buscar_trabajador_por_clave
         
-        if not trabajador:
-            # Buscar case-insensitive
-            trabajador = Trabajador.query.filter(
-                Trabajador.nombrecorto.ilike(codigo)
-            ).first()
+        # Una consulta sobre las columnas normalizadas (sin tildes ni mayúsculas)
+        trabajador = buscar_trabajador_por_clave(codigo)
         
         if trabajador:
             print(f"✅ Trabajador encontrado: {codigo} -> {trabajador.nombre}")
@@ -4017,19 +3705,29 @@ def actividades_trabajador_proyecto(trabajador_id, proyecto_id):
         
         # Leer actividades desde archivo Gantt y filtrar por trabajador asignado
         try:
-            import pandas as pd
-            from io import BytesIO
+            from app.services.gantt_store import obtener_gantt_store, asegurar_en_store
             
-            df = pd.read_excel(BytesIO(gantt.archivo), engine='openpyxl')
+            # Filas normalizadas desde el cache del almacén (parseo solo la primera vez)
+            store = obtener_gantt_store()
+            migrar_blob = gantt.archivo is not None
+            sha256 = asegurar_en_store(gantt, store)
+            if migrar_blob and sha256:
+                db.session.commit()
+            if not sha256:
+                return jsonify({
+                    'success': False,
+                    'error': 'El archivo Gantt almacenado no está disponible'
+                }), 404
+            filas = store.actividades(sha256, gantt.tipo_archivo)
             
             # Obtener todas las actividades guardadas en BD para verificar asignaciones
-            actividades_proyecto = ActividadProyecto.query.filter_by(proyecto_id=proyecto_id).all()
+            actividades_proyecto = ActividadProyecto.query.filter_by(requerimiento_id=proyecto_id).all()
             actividades_asignadas = set()
             
             # Verificar qué actividades tiene asignadas este trabajador en la BD
             for actividad_bd in actividades_proyecto:
                 avances = AvanceActividad.query.filter_by(
-                    actividad_proyecto_id=actividad_bd.id,
+                    actividad_id=actividad_bd.id,
                     trabajador_id=trabajador_id
                 ).all()
                 if avances:
@@ -4040,7 +3738,7 @@ def actividades_trabajador_proyecto(trabajador_id, proyecto_id):
                 actividades_filtradas = []
                 import re
                 
-                for _, row in df.iterrows():
+                for row in filas:
                     recursos = str(row.get('Nombres de los recursos', '') or row.get('Recursos', ''))
                     
                     # Buscar el nombrecorto del trabajador en los recursos usando regex
@@ -4075,13 +3773,13 @@ def actividades_trabajador_proyecto(trabajador_id, proyecto_id):
             
             # Si hay asignaciones en BD, mostrar solo las actividades asignadas del archivo
             actividades_filtradas = []
-            for _, row in df.iterrows():
+            for row in filas:
                 edt = str(row.get('EDT', ''))
                 # Buscar si esta actividad está en las asignadas
                 for actividad_bd in actividades_proyecto:
                     if (actividad_bd.id in actividades_asignadas and 
                         (edt == str(actividad_bd.edt) or 
-                         row.get('Nombre de tarea', '') == actividad_bd.nombre)):
+                         row.get('Nombre de tarea', '') == actividad_bd.nombre_tarea)):
                         
                         # **CORRECCIÓN**: Obtener el progreso personal del trabajador desde BD
                         avance_trabajador = AvanceActividad.query.filter_by(
@@ -4137,47 +3835,27 @@ def recalcular_progresos_proyecto(requerimiento_id):
     Recalcula el progreso de todas las actividades de un proyecto.
     Se ejecuta cuando se agregan o quitan trabajadores del equipo.
     
+    Las hojas se recalculan desde sus avances y los padres se consolidan por
+    jerarquía EDT en una sola pasada (ver ArbolProgresoEDT).
+    
     Args:
         requerimiento_id: ID del proyecto/requerimiento
     """
     try:
-        from app.models import ActividadProyecto
+        from app.services.progreso_service import ArbolProgresoEDT
         
         print(f"🔄 Recalculando progresos de todas las actividades del proyecto {requerimiento_id}")
         
-        # Obtener todas las actividades del proyecto
-        actividades = ActividadProyecto.query.filter_by(
-            requerimiento_id=requerimiento_id,
-            activo=True
-        ).all()
-        
-        actividades_actualizadas = 0
+        cambios = ArbolProgresoEDT(requerimiento_id).recalcular_todo()
         
-        for actividad in actividades:
-            try:
-                # Calcular nuevo progreso usando la función existente
-                progreso_anterior = actividad.progreso
-                progreso_nuevo = calcular_progreso_actividad(actividad.id)
-                
-                # Solo actualizar si hay cambio
-                if abs(progreso_anterior - progreso_nuevo) > 0.01:  # Tolerancia de 0.01%
-                    actividad.progreso = progreso_nuevo
-                    actividad.fecha_actualizacion = datetime.now()
-                    actividades_actualizadas += 1
-                    
-                    print(f"   📊 Actividad {actividad.edt}: {progreso_anterior:.1f}% → {progreso_nuevo:.1f}%")
-                
-            except Exception as e:
-                print(f"   ❌ Error recalculando actividad {actividad.edt}: {str(e)}")
-                continue
-        
-        if actividades_actualizadas > 0:
+        if cambios:
             db.session.commit()
-            print(f"✅ Recálculo completado: {actividades_actualizadas} actividades actualizadas")
+            print(f"✅ Recálculo completado: {len(cambios)} actividades actualizadas")
         else:
             print(f"✅ Recálculo completado: Sin cambios necesarios")
             
     except Exception as e:
+        db.session.rollback()
         print(f"❌ Error en recalcular_progresos_proyecto: {str(e)}")
         import traceback
         print(f"📋 Traceback: {traceback.format_exc()}")
@@ -4272,7 +3950,7 @@ def calcular_progreso_jerarquico(actividad_id):
     - Si la actividad tiene hijas (es un nodo padre), calcula el promedio ponderado 
       por duración de sus hijas directas.
     - Si la actividad NO tiene hijas (es una hoja), calcula el progreso basado en 
-      trabajadores asignados usando calcular_progreso_actividad().
+      trabajadores asignados.
     
     Estructura EDT: 1 → 1.1 → 1.1.1 → 1.1.4.1
     Ejemplo: EDT '1.1' tiene hijas directas '1.1.1', '1.1.2', '1.1.3', '1.1.4'
@@ -4285,51 +3963,14 @@ def calcular_progreso_jerarquico(actividad_id):
         float: Progreso calculado (0-100)
     """
     try:
-        from app.models import ActividadProyecto
+        from app.services.progreso_service import ArbolProgresoEDT
         
         actividad = ActividadProyecto.query.get(actividad_id)
         if not actividad:
             print(f"⚠️ Actividad {actividad_id} no encontrada")
             return 0.0
         
-        print(f"\n🔍 Calculando progreso jerárquico para actividad {actividad.edt} (ID: {actividad_id})")
-        
-        # Obtener hijas directas usando patrón EDT
-        # Ejemplo: Si EDT es '1.1', buscar '1.1.%' pero excluir '1.1.%.%'
-        edt_pattern = f"{actividad.edt}.%"
-        edt_pattern_excluir = f"{actividad.edt}.%.%"
-        
-        hijas = ActividadProyecto.query.filter(
-            ActividadProyecto.edt.like(edt_pattern),
-            ~ActividadProyecto.edt.like(edt_pattern_excluir),
-            ActividadProyecto.requerimiento_id == actividad.requerimiento_id
-        ).all()
-        
-        if not hijas:
-            # Es una hoja (sin hijas), calcular por trabajadores asignados
-            print(f"   📄 Es hoja (sin hijas) - calculando por trabajadores")
-            progreso = calcular_progreso_actividad(actividad_id)
-            print(f"   ✅ Progreso calculado: {progreso:.2f}%")
-            return progreso
-        
-        # Es un nodo padre, calcular promedio ponderado de hijas
-        print(f"   🌳 Es nodo padre - calculando promedio ponderado de {len(hijas)} hijas")
-        
-        total_peso = sum(float(h.duracion or 0) for h in hijas)
-        if total_peso == 0:
-            print(f"   ⚠️ Peso total es 0, retornando 0%")
-            return 0.0
-        
-        progreso_ponderado = 0.0
-        for hija in hijas:
-            peso_hija = float(hija.duracion or 0)
-            progreso_hija = float(hija.progreso or 0)
-            contribucion = progreso_hija * peso_hija / total_peso
-            progreso_ponderado += contribucion
-            print(f"      - {hija.edt}: {progreso_hija:.1f}% × {peso_hija}h = {contribucion:.2f}% contribución")
-        
-        print(f"   ✅ Progreso ponderado calculado: {progreso_ponderado:.2f}%")
-        return progreso_ponderado
+        return ArbolProgresoEDT(actividad.requerimiento_id).progreso_de(actividad_id)
         
     except Exception as e:
         print(f"❌ Error calculando progreso jerárquico de actividad {actividad_id}: {str(e)}")
@@ -4339,61 +3980,28 @@ def calcular_progreso_jerarquico(actividad_id):
 
 def recalcular_padres_recursivo(edt_hijo, requerimiento_id):
     """
-    Recalcula recursivamente el progreso de todos los padres en la jerarquía EDT.
+    Recalcula el progreso de todos los padres en la jerarquía EDT.
     Propaga los cambios desde una tarea hija hacia arriba hasta la raíz.
     
     Ejemplo: Si se actualiza '1.1.1', recalcula '1.1' y luego '1'
     
+    El árbol del proyecto se carga una sola vez y los padres modificados se
+    escriben en un único UPDATE por lotes. No hace commit: el llamador
+    confirma la transacción.
+    
     Args:
         edt_hijo: EDT de la tarea que cambió (ej: '1.1.1')
         requerimiento_id: ID del requerimiento al que pertenece
         
     Returns:
-        None
+        dict: {actividad_id: progreso_nuevo} de los padres actualizados
     """
-    try:
-        from app.models import ActividadProyecto
-        
-        print(f"\n🔄 Recalculando padres desde {edt_hijo}")
-        
-        # Obtener partes del EDT para navegar hacia arriba
-        partes = edt_hijo.split('.')
-        
-        # Recorrer desde el hijo hacia arriba (1.1.1 → 1.1 → 1)
-        while len(partes) > 1:
-            # Eliminar último nivel para obtener EDT padre
-            partes.pop()
-            edt_padre = '.'.join(partes)
-            
-            # Buscar actividad padre
-            padre = ActividadProyecto.query.filter_by(
-                edt=edt_padre,
-                requerimiento_id=requerimiento_id
-            ).first()
-            
-            if not padre:
-                print(f"   ⚠️ Padre {edt_padre} no encontrado")
-                continue
-            
-            # Recalcular progreso del padre usando lógica jerárquica
-            nuevo_progreso = calcular_progreso_jerarquico(padre.id)
-            progreso_anterior = float(padre.progreso or 0)
-            
-            # Actualizar solo si cambió
-            if abs(nuevo_progreso - progreso_anterior) > 0.01:  # Tolerancia 0.01%
-                padre.progreso = nuevo_progreso
-                db.session.commit()
-                print(f"   ✅ Actualizado {edt_padre}: {progreso_anterior:.2f}% → {nuevo_progreso:.2f}%")
-            else:
-                print(f"   ℹ️ {edt_padre} sin cambios ({progreso_anterior:.2f}%)")
-        
-        print(f"✅ Recalculación completada")
-        
-    except Exception as e:
-        print(f"❌ Error recalculando padres desde {edt_hijo}: {str(e)}")
-        import traceback
-        print(f"📋 Traceback: {traceback.format_exc()}")
-        db.session.rollback()
+    from app.services.progreso_service import ArbolProgresoEDT
+    
+    print(f"\n🔄 Recalculando padres desde {edt_hijo}")
+    cambios = ArbolProgresoEDT(requerimiento_id).recalcular_desde_edt(edt_hijo)
+    print(f"✅ Recalculación completada: {len(cambios)} padres actualizados")
+    return cambios
 
 @controllers_bp.route('/guardar_avances_trabajador', methods=['POST'])
 def guardar_avances_trabajador():
@@ -4482,8 +4090,27 @@ def guardar_avances_trabajador():
         
         # Guardar cada avance
         avances_guardados = 0
+        actividades_modificadas = set()
         print(f"🔄 Iniciando procesamiento de {len(avances)} avances...")
         
+        # Precargar actividades y registros de avance del trabajador (una consulta cada uno)
+        edts = {avance.get('edt') for avance in avances}
+        actividades_por_edt = {
+            actividad.edt: actividad
+            for actividad in ActividadProyecto.query.filter(
+                ActividadProyecto.requerimiento_id == proyecto_id,
+                ActividadProyecto.edt.in_(edts)
+            )
+        }
+        avances_por_actividad = {
+            registro.actividad_id: registro
+            for registro in AvanceActividad.query.filter(
+                AvanceActividad.requerimiento_id == proyecto_id,
+                AvanceActividad.trabajador_id == trabajador_id,
+                AvanceActividad.actividad_id.in_([a.id for a in actividades_por_edt.values()])
+            )
+        }
+        
         for i, avance in enumerate(avances):
             print(f"🔄 Procesando avance {i+1}/{len(avances)}")
             edt = avance.get('edt')
@@ -4495,18 +4122,11 @@ def guardar_avances_trabajador():
             # Solo procesar si hubo cambio en el progreso
             if progreso_anterior != progreso_nuevo:
                 # Buscar la actividad en la base de datos
-                actividad = ActividadProyecto.query.filter_by(
-                    requerimiento_id=proyecto_id,
-                    edt=edt
-                ).first()
+                actividad = actividades_por_edt.get(edt)
                 
                 if actividad:
                     # Buscar el registro de avance en la tabla avance_actividad
-                    avance_actividad = AvanceActividad.query.filter_by(
-                        requerimiento_id=proyecto_id,
-                        trabajador_id=trabajador_id,
-                        actividad_id=actividad.id
-                    ).first()
+                    avance_actividad = avances_por_actividad.get(actividad.id)
                     
                     if avance_actividad:
                         # Mover el progreso actual a progreso anterior y guardar el nuevo progreso
@@ -4531,6 +4151,7 @@ def guardar_avances_trabajador():
                             observaciones=f"Primer registro de progreso: {progreso_nuevo}%"
                         )
                         db.session.add(avance_actividad)
+                        avances_por_actividad[actividad.id] = avance_actividad
                         print(f"✅ Nuevo registro de avance creado para actividad {edt}: 0% → {progreso_nuevo}%")
                     
                     # **NUEVO: Guardar en historial solo si hubo cambio**
@@ -4549,17 +4170,7 @@ def guardar_avances_trabajador():
                         db.session.add(historial_entry)
                         print(f"📝 Historial guardado para {edt}: {progreso_real_anterior}% → {progreso_nuevo}% (Δ {progreso_nuevo - progreso_real_anterior:+.1f}%)")
                     
-                    # **Calcular y actualizar el progreso total de la actividad**
-                    print(f"🔄 Recalculando progreso total para actividad {edt}...")
-                    progreso_actividad_calculado = calcular_progreso_actividad(actividad.id)
-                    
-                    # Actualizar el progreso en la tabla de actividades
-                    actividad.progreso = progreso_actividad_calculado
-                    actividad.fecha_actualizacion = datetime.now()
-                    
-                    print(f"✅ Progreso de actividad {edt} actualizado: {progreso_actividad_calculado:.1f}%")
-                    print(f"ℹ️  Esperando validación de supervisor para recalcular jerarquía")
-                    
+                    actividades_modificadas.add(actividad.id)
                     avances_guardados += 1
                     print(f"✅ Avance procesado exitosamente para EDT {edt}")
                 else:
@@ -4567,6 +4178,16 @@ def guardar_avances_trabajador():
             else:
                 print(f"ℹ️ Sin cambios para EDT {edt} - saltando")
         
+        # **Calcular y actualizar el progreso total de las actividades modificadas**
+        # La jerarquía (padres) se recalcula al validar el supervisor, no aquí
+        if actividades_modificadas:
+            from app.services.progreso_service import ArbolProgresoEDT
+            
+            print(f"🔄 Recalculando progreso total de {len(actividades_modificadas)} actividades...")
+            cambios = ArbolProgresoEDT(proyecto_id).recalcular(actividades_modificadas, propagar=False)
+            print(f"✅ Progreso actualizado en {len(cambios)} actividades")
+            print(f"ℹ️  Esperando validación de supervisor para recalcular jerarquía")
+        
         print(f"🔄 Iniciando commit a la base de datos...")
         db.session.commit()
         print(f"✅ Commit completado exitosamente. Total avances guardados: {avances_guardados}")
@@ -4593,85 +4214,51 @@ def guardar_avances_trabajador():
         }), 500
 
 @controllers_bp.route('/exportar_avances_trabajador/<int:trabajador_id>/<int:proyecto_id>')
+@presupuesto_consultas(5)
 def exportar_avances_trabajador(trabajador_id, proyecto_id):
-    """Exportar avances de actividades de un trabajador a Excel"""
+    """Exportar avances de actividades de un trabajador a Excel (o CSV con ?formato=csv)"""
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill
-        from io import BytesIO
+        from app.services.export_service import iterar_filas, respuesta_exportacion
         
         trabajador = Trabajador.query.get_or_404(trabajador_id)
         proyecto = Requerimiento.query.get_or_404(proyecto_id)
+        formato = request.args.get('formato', 'xlsx')
+        
+        # Actividades del proyecto leídas por bloques (cursor del servidor)
+        consulta = db.select(
+            ActividadProyecto.edt, ActividadProyecto.nombre_tarea, ActividadProyecto.fecha_inicio,
+            ActividadProyecto.fecha_fin, ActividadProyecto.duracion, ActividadProyecto.progreso,
+            ActividadProyecto.recursos
+        ).where(
+            ActividadProyecto.requerimiento_id == proyecto_id,
+            ActividadProyecto.activo == True
+        ).order_by(ActividadProyecto.edt)
+        
+        filas = (
+            [
+                edt,
+                nombre_tarea,
+                fecha_inicio.strftime('%d-%m-%Y') if fecha_inicio else '',
+                fecha_fin.strftime('%d-%m-%Y') if fecha_fin else '',
+                duracion,
+                float(progreso) if progreso is not None else None,
+                recursos or ''
+            ]
+            for edt, nombre_tarea, fecha_inicio, fecha_fin, duracion, progreso, recursos in iterar_filas(consulta)
+        )
         
-        # Obtener actividades del proyecto
-        actividades = ActividadProyecto.query.filter_by(
-            requerimiento_id=proyecto_id,
-            activo=True
-        ).order_by(ActividadProyecto.edt).all()
-        
-        # Crear libro de Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Avances de Actividades"
-        
-        # Información del encabezado
-        ws.merge_cells('A1:G1')
-        header_cell = ws['A1']
-        header_cell.value = f"Avances de Actividades - {proyecto.nombre}"
-        header_cell.font = Font(size=16, bold=True)
-        header_cell.alignment = Alignment(horizontal="center")
-        
-        ws.merge_cells('A2:G2')
-        info_cell = ws['A2']
-        info_cell.value = f"Trabajador: {trabajador.nombre} - Fecha: {datetime.now().strftime('%d-%m-%Y')}"
-        info_cell.font = Font(size=12)
-        info_cell.alignment = Alignment(horizontal="center")
-        
-        # Encabezados de tabla
-        encabezados = [
-            'EDT', 'Actividad', 'Fecha Inicio', 'Fecha Fin', 
-            'Duración', 'Progreso (%)', 'Recursos'
-        ]
-        
-        for col, encabezado in enumerate(encabezados, 1):
-            cell = ws.cell(row=4, column=col, value=encabezado)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Datos de actividades
-        for row, actividad in enumerate(actividades, 5):
-            ws.cell(row=row, column=1, value=actividad.edt)
-            ws.cell(row=row, column=2, value=actividad.nombre_tarea)
-            ws.cell(row=row, column=3, value=actividad.fecha_inicio.strftime('%d-%m-%Y') if actividad.fecha_inicio else '')
-            ws.cell(row=row, column=4, value=actividad.fecha_fin.strftime('%d-%m-%Y') if actividad.fecha_fin else '')
-            ws.cell(row=row, column=5, value=actividad.duracion)
-            ws.cell(row=row, column=6, value=actividad.progreso)
-            ws.cell(row=row, column=7, value=actividad.recursos or '')
-        
-        # Ajustar ancho de columnas
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2) * 1.2
-            ws.column_dimensions[column].width = adjusted_width
-        
-        # Guardar en memoria
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'avances_{trabajador.nombre}_{proyecto.nombre}_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        return respuesta_exportacion(
+            formato,
+            f'avances_{trabajador.nombre}_{proyecto.nombre}_{datetime.now().strftime("%Y%m%d")}',
+            'Avances de Actividades',
+            ['EDT', 'Actividad', 'Fecha Inicio', 'Fecha Fin', 'Duración', 'Progreso (%)', 'Recursos'],
+            filas,
+            anchos=[12, 50, 14, 14, 11, 14, 30],
+            filas_previas=[
+                [(f"Avances de Actividades - {proyecto.nombre}", 16)],
+                [(f"Trabajador: {trabajador.nombre} - Fecha: {datetime.now().strftime('%d-%m-%Y')}", 12)],
+                []
+            ]
         )
         
     except Exception as e:
@@ -4680,6 +4267,7 @@ def exportar_avances_trabajador(trabajador_id, proyecto_id):
 
 @controllers_bp.route('/proyectos_estado_4')
 @login_required
+@presupuesto_consultas(10)
 def proyectos_estado_4():
     """Obtener proyectos en estado 4 (Desarrollo Aceptado) y 5 (Desarrollo Completado)
     para control y seguimiento de actividades.
@@ -4711,90 +4299,14 @@ def proyectos_estado_4():
                 db.joinedload(Requerimiento.grupo)
             ).all()
         
+        # Métricas de todos los proyectos con un número fijo de consultas agregadas
+        from app.services.dashboard_service import resumen_proyectos
+        resumen = resumen_proyectos([proyecto.id for proyecto in proyectos])
+        
         proyectos_data = []
         
         for proyecto in proyectos:
-            # Para relaciones lazy='dynamic', usar query directamente
-            actividades_proyecto = proyecto.actividades_proyecto.all()
-            equipos_trabajo = proyecto.equipos_trabajo.all()
-            
-            # Calcular estadísticas del proyecto
-            total_actividades = len(actividades_proyecto)
-            actividades_completadas = len([act for act in actividades_proyecto if act.progreso and act.progreso >= 100])
-            
-            # Obtener progreso del proyecto desde la actividad raíz (EDT nivel 1)
-            # En lugar de calcular el promedio, usar el valor ya calculado y propagado
-            actividad_raiz = next(
-                (act for act in actividades_proyecto if act.nivel_esquema == 1),
-                None
-            )
-            
-            if actividad_raiz and actividad_raiz.progreso is not None:
-                progreso_promedio = round(float(actividad_raiz.progreso), 1)
-            else:
-                # Fallback: si no hay actividad raíz, calcular promedio (casos legacy)
-                if total_actividades > 0:
-                    progreso_total = sum([float(act.progreso) for act in actividades_proyecto if act.progreso is not None])
-                    progreso_promedio = round(progreso_total / total_actividades, 1)
-                else:
-                    progreso_promedio = 0
-            
-            # Calcular progreso esperado y estado del cronograma
-            from datetime import date
-            fecha_actual = date.today()
-            progreso_esperado = 0
-            porcentaje_atraso_adelanto = 0
-            estado_cronograma = "En tiempo"
-            
-            if total_actividades > 0:
-                # Encontrar fecha de inicio más temprana y fecha de fin más tardía
-                fechas_inicio = [act.fecha_inicio for act in actividades_proyecto if act.fecha_inicio]
-                fechas_fin = [act.fecha_fin for act in actividades_proyecto if act.fecha_fin]
-                
-                if fechas_inicio and fechas_fin:
-                    fecha_inicio_proyecto = min(fechas_inicio)
-                    fecha_fin_proyecto = max(fechas_fin)
-                    
-                    # Calcular progreso esperado basado en la fecha actual
-                    duracion_total_proyecto = (fecha_fin_proyecto - fecha_inicio_proyecto).days
-                    
-                    if duracion_total_proyecto > 0:
-                        if fecha_actual <= fecha_inicio_proyecto:
-                            # El proyecto aún no ha comenzado
-                            progreso_esperado = 0
-                        elif fecha_actual >= fecha_fin_proyecto:
-                            # El proyecto debería estar completado
-                            progreso_esperado = 100
-                        else:
-                            # El proyecto está en curso
-                            dias_transcurridos = (fecha_actual - fecha_inicio_proyecto).days
-                            progreso_esperado = round((dias_transcurridos / duracion_total_proyecto) * 100, 1)
-                        
-                        # Calcular diferencia entre progreso real y esperado
-                        diferencia_progreso = progreso_promedio - progreso_esperado
-                        
-                        if abs(diferencia_progreso) >= 5:  # Considerar significativo si es >= 5%
-                            if diferencia_progreso > 0:
-                                estado_cronograma = "Adelantado"
-                                porcentaje_atraso_adelanto = round(diferencia_progreso, 1)
-                            else:
-                                estado_cronograma = "Atrasado"
-                                porcentaje_atraso_adelanto = round(abs(diferencia_progreso), 1)
-            
-            # Contar trabajadores únicos que han registrado avances (desde avance_actividad)
-            avances_trabajadores = db.session.query(AvanceActividad.trabajador_id)\
-                .filter(AvanceActividad.requerimiento_id == proyecto.id)\
-                .distinct()\
-                .all()
-            total_trabajadores = len(avances_trabajadores)
-            
-            # Obtener responsable (primer trabajador del equipo)
-            responsable = None
-            if equipos_trabajo:
-                primer_miembro = equipos_trabajo[0]
-                if primer_miembro and primer_miembro.trabajador:
-                    responsable = primer_miembro.trabajador.nombre
-            
+            metricas = resumen[proyecto.id]
             proyecto_info = {
                 'id': proyecto.id,
                 'nombre': proyecto.nombre,
@@ -4805,14 +4317,14 @@ def proyectos_estado_4():
                 'estado': proyecto.estado.nombre if proyecto.estado else None,
                 'grupo': proyecto.grupo.nombre if proyecto.grupo else None,
                 'grupo_id': proyecto.id_grupo,
-                'responsable': responsable,
-                'progreso': progreso_promedio,
-                'progreso_esperado': progreso_esperado,
-                'estado_cronograma': estado_cronograma,
-                'porcentaje_atraso_adelanto': porcentaje_atraso_adelanto,
-                'total_actividades': total_actividades,
-                'actividades_completadas': actividades_completadas,
-                'total_trabajadores': total_trabajadores
+                'responsable': metricas['responsable'],
+                'progreso': metricas['progreso'],
+                'progreso_esperado': metricas['progreso_esperado'],
+                'estado_cronograma': metricas['estado_cronograma'],
+                'porcentaje_atraso_adelanto': metricas['porcentaje_atraso_adelanto'],
+                'total_actividades': metricas['total_actividades'],
+                'actividades_completadas': metricas['actividades_completadas'],
+                'total_trabajadores': metricas['total_trabajadores']
             }
             
             proyectos_data.append(proyecto_info)
@@ -5075,77 +4587,22 @@ def resumen():
 
 @controllers_bp.route('/api/resumen_proyectos')
 @login_required
+@presupuesto_consultas(12)  # 2 con los resúmenes vigentes; 11 cuando hay que recalcularlos
 def api_resumen_proyectos():
-    """API para obtener resumen de proyectos con sus actividades y estado"""
+    """
+    API con el resumen de cronograma de los proyectos en Desarrollo Completado.
+    Lee la tabla materializada resumen_proyecto (una fila por proyecto); el
+    detalle de actividades se pide por proyecto a /api/resumen_proyectos/<id>/actividades.
+
+    La primera lectura tras una escritura (o del día) recalcula los resúmenes
+    no vigentes junto con su ruta crítica: 11 consultas por cada lote de 200
+    proyectos pendientes. El cron nocturno `python manage.py reconstruir-resumenes`
+    deja ese costo fuera de la primera lectura del día.
+    """
     try:
-        from datetime import date
+        from app.services.resumen_proyectos_service import resumenes_proyectos
         
-        # Obtener proyectos en estado 5 (Desarrollo Completado) con actividades
-        proyectos = db.session.query(Requerimiento).join(
-            ActividadProyecto, Requerimiento.id == ActividadProyecto.requerimiento_id
-        ).filter(
-            Requerimiento.id_estado == 5,
-            Requerimiento.activo == True,
-            ActividadProyecto.activo == True
-        ).distinct().all()
-        
-        proyectos_data = []
-        fecha_actual = date.today()
-        
-        for proyecto in proyectos:
-            # Obtener todas las actividades del proyecto
-            actividades = ActividadProyecto.query.filter_by(
-                requerimiento_id=proyecto.id,
-                activo=True
-            ).order_by(ActividadProyecto.edt).all()
-            
-            actividades_data = []
-            for actividad in actividades:
-                # Calcular progreso esperado basado en fechas
-                duracion_total = (actividad.fecha_fin - actividad.fecha_inicio).days
-                progreso_esperado = 0
-                estado_cronograma = "En Fecha"
-                
-                if duracion_total > 0:
-                    if fecha_actual < actividad.fecha_inicio:
-                        progreso_esperado = 0
-                    elif fecha_actual > actividad.fecha_fin:
-                        progreso_esperado = 100
-                        if float(actividad.progreso or 0) < 100:
-                            estado_cronograma = "Atrasado"
-                    else:
-                        dias_transcurridos = (fecha_actual - actividad.fecha_inicio).days
-                        progreso_esperado = round((dias_transcurridos / duracion_total) * 100, 1)
-                        
-                        # Comparar progreso real vs esperado
-                        progreso_real = float(actividad.progreso or 0)
-                        if progreso_real < (progreso_esperado - 5):  # 5% de tolerancia
-                            estado_cronograma = "Atrasado"
-                
-                actividades_data.append({
-                    'id': actividad.id,
-                    'edt': actividad.edt,
-                    'nombre_tarea': actividad.nombre_tarea,
-                    'nivel_esquema': actividad.nivel_esquema,
-                    'fecha_inicio': actividad.fecha_inicio.strftime('%d-%m-%Y'),
-                    'fecha_fin': actividad.fecha_fin.strftime('%d-%m-%Y'),
-                    'duracion': actividad.duracion,
-                    'progreso': float(actividad.progreso or 0),
-                    'progreso_esperado': progreso_esperado,
-                    'recursos': actividad.recursos or 'Sin asignar',
-                    'estado_cronograma': estado_cronograma
-                })
-            
-            proyectos_data.append({
-                'id': proyecto.id,
-                'nombre': proyecto.nombre,
-                'descripcion': proyecto.descripcion or '',
-                'sector': proyecto.sector.nombre if proyecto.sector else 'Sin sector',
-                'estado': proyecto.estado.nombre if proyecto.estado else 'Sin estado',
-                'actividades': actividades_data,
-                'total_actividades': len(actividades_data),
-                'actividades_atrasadas': len([a for a in actividades_data if a['estado_cronograma'] == 'Atrasado'])
-            })
+        proyectos_data = resumenes_proyectos()
         
         return jsonify({
             'success': True,
@@ -5162,6 +4619,29 @@ def api_resumen_proyectos():
             'error': str(e)
         }), 500
 
+@controllers_bp.route('/api/resumen_proyectos/<int:req_id>/actividades')
+@login_required
+@presupuesto_consultas(3)
+def api_resumen_proyecto_actividades(req_id):
+    """API con las actividades de un proyecto y su estado de cronograma (detalle de /resumen)"""
+    try:
+        from app.services.resumen_proyectos_service import actividades_con_estado
+        
+        actividades_data = actividades_con_estado(req_id)
+        
+        return jsonify({
+            'success': True,
+            'actividades': actividades_data,
+            'total_actividades': len(actividades_data)
+        })
+        
+    except Exception as e:
+        print(f"❌ Error en api_resumen_proyecto_actividades: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @controllers_bp.route('/control_actividades_tabla')
 def control_actividades_tabla():
     """Renderizar la página de control de actividades solo como tabla
@@ -5412,90 +4892,19 @@ def limpiar_trabajadores_huerfanos():
         dict: Reporte detallado de trabajadores para revisión
     """
     try:
-        from app.models import (Trabajador, RecursoTrabajador, AvanceActividad, 
-                               HistorialAvanceActividad, ActividadProyecto)
+        from app.services.trabajadores_service import analizar_trabajadores, eliminar_trabajadores_huerfanos
         
         print(f"🧹 Analizando trabajadores para revisión...")
         
-        # Trabajadores candidatos (excluyendo usuarios del sistema)
-        todos_trabajadores = Trabajador.query.filter(
-            Trabajador.email.notlike('%admin%'),
-            Trabajador.email.notlike('%superadmin%'),
-            ~Trabajador.nombrecorto.in_(['admin', 'superadmin', 'sistema'])
-        ).all()
-        
-        trabajadores_sin_asignaciones = []
-        trabajadores_con_actividades_activas = []
-        trabajadores_con_progreso_historico = []
-        
-        for trabajador in todos_trabajadores:
-            # Verificar recursos asignados actualmente
-            recursos_actuales = RecursoTrabajador.query.filter_by(id_trabajador=trabajador.id).count()
-            
-            # Verificar avances activos
-            avances_actuales = AvanceActividad.query.filter_by(trabajador_id=trabajador.id).count()
-            
-            # Verificar historial de avances (trabajo ya realizado)
-            historial_avances = HistorialAvanceActividad.query.filter_by(trabajador_id=trabajador.id).count()
-            
-            # Verificar actividades de proyecto asignadas
-            from sqlalchemy import text
-            requerimientos_count = db.session.execute(
-                text("SELECT COUNT(*) FROM requerimiento_trabajador_especialidad WHERE trabajador_id = :tid"),
-                {'tid': trabajador.id}
-            ).scalar() or 0
-            
-            # Clasificar trabajador según sus asignaciones
-            if (recursos_actuales == 0 and avances_actuales == 0 and 
-                historial_avances == 0 and requerimientos_count == 0):
-                # Trabajador completamente sin asignaciones - CANDIDATO SEGURO para eliminación
-                trabajadores_sin_asignaciones.append({
-                    'id': trabajador.id,
-                    'nombre': trabajador.nombre,
-                    'nombrecorto': trabajador.nombrecorto,
-                    'email': trabajador.email,
-                    'estado': 'SIN_ASIGNACIONES',
-                    'accion_recomendada': 'ELIMINAR_SEGURO'
-                })
-                
-            elif (recursos_actuales > 0 or avances_actuales > 0 or requerimientos_count > 0):
-                # Trabajador con asignaciones activas - REQUIERE REVISIÓN MANUAL
-                trabajadores_con_actividades_activas.append({
-                    'id': trabajador.id,
-                    'nombre': trabajador.nombre,
-                    'nombrecorto': trabajador.nombrecorto,
-                    'email': trabajador.email,
-                    'recursos_asignados': recursos_actuales,
-                    'avances_pendientes': avances_actuales,
-                    'requerimientos_asignados': requerimientos_count,
-                    'estado': 'ACTIVO_CON_ASIGNACIONES',
-                    'accion_recomendada': 'REVISAR_REASIGNACION'
-                })
-                
-            elif historial_avances > 0:
-                # Trabajador sin asignaciones actuales pero con historial - MANTENER PARA TRAZABILIDAD
-                trabajadores_con_progreso_historico.append({
-                    'id': trabajador.id,
-                    'nombre': trabajador.nombre,
-                    'nombrecorto': trabajador.nombrecorto,
-                    'email': trabajador.email,
-                    'avances_historicos': historial_avances,
-                    'estado': 'HISTORICO_SIN_ASIGNACIONES',
-                    'accion_recomendada': 'MANTENER_TRAZABILIDAD'
-                })
+        # Conteos de referencias de todos los trabajadores en una consulta
+        analisis = analizar_trabajadores()
+        trabajadores_sin_asignaciones = analisis['SIN_ASIGNACIONES']
+        trabajadores_con_actividades_activas = analisis['ACTIVO_CON_ASIGNACIONES']
+        trabajadores_con_progreso_historico = analisis['HISTORICO_SIN_ASIGNACIONES']
         
-        # SOLO eliminamos trabajadores completamente sin asignaciones (seguros)
-        eliminados_seguros = 0
-        for trabajador_data in trabajadores_sin_asignaciones:
-            try:
-                trabajador = Trabajador.query.get(trabajador_data['id'])
-                if trabajador:
-                    print(f"   🗑️ Eliminando trabajador seguro: {trabajador.nombre}")
-                    db.session.delete(trabajador)
-                    eliminados_seguros += 1
-            except Exception as e:
-                print(f"   ❌ Error eliminando trabajador {trabajador_data['id']}: {str(e)}")
-                continue
+        # SOLO eliminamos trabajadores completamente sin asignaciones (seguros), en un lote
+        eliminados_ids = eliminar_trabajadores_huerfanos([t['id'] for t in trabajadores_sin_asignaciones])
+        eliminados_seguros = len(eliminados_ids)
         
         if eliminados_seguros > 0:
             db.session.commit()
@@ -5506,22 +4915,12 @@ def limpiar_trabajadores_huerfanos():
                 descripcion=f'Eliminación automática de {eliminados_seguros} trabajadores sin asignaciones',
                 datos_nuevos={
                     'trabajadores_eliminados': eliminados_seguros,
-                    'trabajadores_eliminados_ids': [t['id'] for t in trabajadores_sin_asignaciones],
-                    'criterio': 'Sin recursos, avances, historial ni requerimientos asignados'
+                    'trabajadores_eliminados_ids': eliminados_ids,
+                    'criterio': 'Sin recursos, avances, historial, requerimientos ni recintos asignados'
                 }
             )
         
-        # Generar reporte completo
-        reporte = {
-            'eliminados_automaticamente': eliminados_seguros,
-            'trabajadores_sin_asignaciones': trabajadores_sin_asignaciones,
-            'trabajadores_requieren_revision': trabajadores_con_actividades_activas,
-            'trabajadores_historicos': trabajadores_con_progreso_historico,
-            'total_revisados': len(todos_trabajadores),
-            'mensaje': f'Limpieza segura completada. {eliminados_seguros} trabajadores eliminados. {len(trabajadores_con_actividades_activas)} requieren revisión manual.'
-        }
-        
-        print(f"✅ Análisis completado:")
+        print(f"✅ Análisis completado ({analisis['total']} trabajadores revisados):")
         print(f"   🗑️ Eliminados seguros: {eliminados_seguros}")
         print(f"   ⚠️ Requieren revisión manual: {len(trabajadores_con_actividades_activas)}")
         print(f"   📋 Con historial a mantener: {len(trabajadores_con_progreso_historico)}")
@@ -5569,18 +4968,19 @@ def extraer_y_crear_trabajadores_desde_recursos(recursos_string):
     if not recursos_list:
         recursos_list = [recursos_string]
     
+    recursos_list = [str(recurso).strip() for recurso in recursos_list if str(recurso).strip()]
+    
+    # Un solo índice normalizado para todos los recursos del texto (una consulta)
+    from app.services.recursos_service import ResolutorRecursos
+    resolutor = ResolutorRecursos().cargar(recursos_list)
+    
     for recurso in recursos_list:
-        recurso = str(recurso).strip()
-        if not recurso:
-            continue
-        
         try:
-            # Buscar por nombrecorto exacto
-            trabajador = Trabajador.query.filter_by(nombrecorto=recurso).first()
+            trabajador_id = resolutor.resolver(recurso)
             
-            if trabajador:
-                print(f"   ✅ Trabajador encontrado: {recurso} (ID: {trabajador.id})")
-                trabajadores_ids.append(trabajador.id)
+            if trabajador_id:
+                print(f"   ✅ Trabajador encontrado: {recurso} (ID: {trabajador_id})")
+                trabajadores_ids.append(trabajador_id)
             else:
                 print(f"   ⚠️ Trabajador '{recurso}' no encontrado en BD")
                 # Solo registrar en lista, no crear automáticamente
@@ -5823,22 +5223,39 @@ def obtener_detalle_proyecto(requerimiento_id):
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+def _fila_exportacion_actividad(actividad_id, nivel_esquema, edt, nombre_tarea, duracion,
+                                fecha_inicio, fecha_fin, predecesoras, recursos, progreso):
+    """Fila del archivo de control con el formato que espera la importación"""
+    # Si el valor está entre 0 y 1, multiplicar por 100 (ej: 0.85 -> 85%)
+    # Si el valor es mayor a 1, asumir que ya está en porcentaje (ej: 85 -> 85%)
+    progreso_raw = float(progreso) if progreso else 0.0
+    return [
+        actividad_id,
+        nivel_esquema or 1,
+        edt or '',
+        nombre_tarea or '',
+        duracion or 0,
+        fecha_inicio.strftime('%d/%m/%Y') if fecha_inicio else '',
+        fecha_fin.strftime('%d/%m/%Y') if fecha_fin else '',
+        predecesoras or '',
+        recursos or '',
+        progreso_raw * 100 if progreso_raw <= 1.0 else progreso_raw
+    ]
+
+
 @controllers_bp.route('/exportar_actividades_xlsx', methods=['GET'])
+@presupuesto_consultas(5)
 def exportar_actividades_xlsx():
-    """Exportar actividades de proyectos a un archivo Excel, filtrando por grupo si se especifica"""
+    """
+    Exportar actividades de proyectos a un archivo Excel, filtrando por grupo si se especifica.
+    Con ?formato=csv la respuesta es un CSV en streaming.
+    """
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment
-        from flask import make_response
-        import io
+        from app.services.export_service import iterar_filas, respuesta_exportacion
         
         # Obtener el filtro de grupo si se proporciona
         grupo_id = request.args.get('grupo_id', None)
-        
-        # Crear un nuevo workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Actividades Proyecto"
+        formato = request.args.get('formato', 'xlsx')
         
         # Definir las columnas según los requerimientos
         columnas = [
@@ -5854,106 +5271,42 @@ def exportar_actividades_xlsx():
             'Progreso (%)'
         ]
         
-        # Configurar estilos
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Agregar headers
-        for col_num, columna in enumerate(columnas, 1):
-            cell = ws.cell(row=1, column=col_num, value=columna)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Construir consulta base
-        query = ActividadProyecto.query.join(Requerimiento)
+        # Construir consulta base (solo las columnas exportadas)
+        consulta = db.select(
+            ActividadProyecto.id, ActividadProyecto.nivel_esquema, ActividadProyecto.edt,
+            ActividadProyecto.nombre_tarea, ActividadProyecto.duracion, ActividadProyecto.fecha_inicio,
+            ActividadProyecto.fecha_fin, ActividadProyecto.predecesoras, ActividadProyecto.recursos,
+            ActividadProyecto.progreso
+        ).join(Requerimiento, ActividadProyecto.requerimiento_id == Requerimiento.id) \
+         .where(ActividadProyecto.activo == True)
         
         # Aplicar filtro de grupo si se especifica
+        fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
         if grupo_id:
-            query = query.filter(Requerimiento.id_grupo == grupo_id)
+            consulta = consulta.where(Requerimiento.id_grupo == grupo_id)
             grupo = Grupo.query.get(grupo_id)
             grupo_nombre = grupo.nombre if grupo else f"Grupo {grupo_id}"
+            nombre_base = f"actividades_{grupo_nombre.replace(' ', '_')}_{fecha_actual}"
             print(f"📊 Filtrando por grupo: {grupo_nombre} (ID: {grupo_id})")
         else:
+            nombre_base = f'actividades_todos_grupos_{fecha_actual}'
             print("📊 Exportando todos los grupos")
         
-        # Obtener actividades filtradas
-        actividades = query.filter(
-            ActividadProyecto.activo == True
-        ).order_by(
-            Requerimiento.created_at.asc(),
-            ActividadProyecto.edt
-        ).all()
-        
-        print(f"📊 Exportando {len(actividades)} actividades a Excel")
-        
-        # Agregar datos
-        for row_num, actividad in enumerate(actividades, 2):
-            # Formatear fechas
-            fecha_inicio = actividad.fecha_inicio.strftime('%d/%m/%Y') if actividad.fecha_inicio else ''
-            fecha_fin = actividad.fecha_fin.strftime('%d/%m/%Y') if actividad.fecha_fin else ''
-            
-            # Obtener progreso directamente de la tabla actividad_proyecto
-            progreso_raw = float(actividad.progreso) if actividad.progreso else 0.0
-            
-            # Formatear progreso como porcentaje
-            # Si el valor está entre 0 y 1, multiplicar por 100 (ej: 0.85 -> 85%)
-            # Si el valor es mayor a 1, asumir que ya está en porcentaje (ej: 85 -> 85%)
-            if progreso_raw <= 1.0:
-                progreso = progreso_raw * 100
-            else:
-                progreso = progreso_raw
-            
-            # Datos de la fila
-            datos_fila = [
-                actividad.id,
-                actividad.nivel_esquema or 1,
-                actividad.edt or '',
-                actividad.nombre_tarea or '',
-                actividad.duracion or 0,
-                fecha_inicio,
-                fecha_fin,
-                actividad.predecesoras or '',
-                actividad.recursos or '',
-                progreso
-            ]
-            
-            # Escribir datos en las celdas
-            for col_num, valor in enumerate(datos_fila, 1):
-                cell = ws.cell(row=row_num, column=col_num, value=valor)
-                
-                # Aplicar formato de porcentaje a la columna de progreso (columna 10)
-                if col_num == 10:  # Columna "Progreso (%)"
-                    cell.number_format = '0.0"%"'
-        
-        # Ajustar ancho de columnas
-        column_widths = [8, 15, 12, 40, 12, 12, 12, 15, 30, 15]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[ws.cell(row=1, column=col_num).column_letter].width = width
-        
-        # Crear el archivo en memoria
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        # Generar nombre de archivo con fecha y grupo
-        from datetime import datetime
-        fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
-        if grupo_id:
-            grupo = Grupo.query.get(grupo_id)
-            grupo_nombre = grupo.nombre.replace(' ', '_') if grupo else f"Grupo_{grupo_id}"
-            nombre_archivo = f'actividades_{grupo_nombre}_{fecha_actual}.xlsx'
-        else:
-            nombre_archivo = f'actividades_todos_grupos_{fecha_actual}.xlsx'
-        
-        # Crear respuesta
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        response.headers['Content-Disposition'] = f'attachment; filename={nombre_archivo}'
+        consulta = consulta.order_by(Requerimiento.created_at.asc(), ActividadProyecto.edt)
+        filas = (_fila_exportacion_actividad(*fila) for fila in iterar_filas(consulta))
+        
+        respuesta = respuesta_exportacion(
+            formato,
+            nombre_base,
+            'Actividades Proyecto',
+            columnas,
+            filas,
+            anchos=[8, 15, 12, 40, 12, 12, 12, 15, 30, 15],
+            formatos={9: '0.0"%"'}  # Columna "Progreso (%)"
+        )
         
-        print(f"✅ Archivo Excel generado: {nombre_archivo} con {len(actividades)} actividades")
-        return response
+        print(f"✅ Exportación {formato} iniciada: {nombre_base}")
+        return respuesta
         
     except ImportError:
         return jsonify({
@@ -6173,7 +5526,7 @@ def reasignar_actividades_trabajador(trabajador_origen_id, trabajador_destino_id
 
 def registrar_auditoria(tipo_operacion, descripcion, datos_anteriores=None, datos_nuevos=None, 
                        trabajador_afectado_id=None, requerimiento_id=None, actividad_id=None,
-                       archivo_relacionado=None, usuario_id=None):
+                       archivo_relacionado=None, usuario_id=None, usuario_email=None):
     """
     Registra operaciones de auditoría en el sistema para trazabilidad completa
     
@@ -6187,6 +5540,7 @@ def registrar_auditoria(tipo_operacion, descripcion, datos_anteriores=None, dato
         actividad_id (int): ID de la actividad involucrada (opcional)
         archivo_relacionado (str): Nombre del archivo relacionado (opcional)
         usuario_id (int): ID del usuario que realizó la operación (opcional)
+        usuario_email (str): Email del usuario (opcional; desde el worker no hay current_user)
         
     Returns:
         str: ID de la entrada de auditoría creada
@@ -6198,6 +5552,9 @@ def registrar_auditoria(tipo_operacion, descripcion, datos_anteriores=None, dato
         # Generar ID único para la sesión de auditoría
         sesion_id = str(uuid.uuid4())[:8]
         
+        # Fuera de una request (worker de tareas) current_user es None
+        autenticado = bool(current_user) and current_user.is_authenticated
+        
         # Crear entrada en HistorialControl (reutilizamos la tabla existente de manera inteligente)
         entrada_auditoria = HistorialControl(
             sesion_subida=sesion_id,
@@ -6209,8 +5566,8 @@ def registrar_auditoria(tipo_operacion, descripcion, datos_anteriores=None, dato
             datos_anteriores=datos_anteriores,
             datos_nuevos={
                 'descripcion': descripcion,
-                'usuario_id': usuario_id or (current_user.id if current_user.is_authenticated else None),
-                'usuario_email': current_user.email if current_user.is_authenticated else 'Sistema',
+                'usuario_id': usuario_id or (current_user.id if autenticado else None),
+                'usuario_email': usuario_email or (current_user.email if autenticado else 'Sistema'),
                 'trabajador_afectado_id': trabajador_afectado_id,
                 'timestamp': datetime.now().isoformat(),
                 **( datos_nuevos or {})
@@ -6297,96 +5654,19 @@ def revisar_trabajadores():
         if not (current_user.is_superadmin() or current_user.has_page_permission('/trabajadores')):
             return jsonify({'success': False, 'error': 'No tiene permisos para esta acción'}), 403
         
-        from app.models import (Trabajador, RecursoTrabajador, AvanceActividad, 
-                               HistorialAvanceActividad, ActividadProyecto)
+        from app.services.trabajadores_service import analizar_trabajadores
         
         print(f"📋 Generando reporte de trabajadores para revisión...")
         
-        # Usar la misma lógica de análisis que limpiar_trabajadores_huerfanos
-        # pero devolver el reporte completo
-        
-        todos_trabajadores = Trabajador.query.filter(
-            Trabajador.email.notlike('%admin%'),
-            Trabajador.email.notlike('%superadmin%'),
-            ~Trabajador.nombrecorto.in_(['admin', 'superadmin', 'sistema'])
-        ).all()
-        
-        trabajadores_sin_asignaciones = []
-        trabajadores_con_actividades_activas = []
-        trabajadores_con_progreso_historico = []
-        
-        for trabajador in todos_trabajadores:
-            # Análisis detallado de asignaciones
-            recursos_actuales = RecursoTrabajador.query.filter_by(id_trabajador=trabajador.id).count()
-            avances_actuales = AvanceActividad.query.filter_by(trabajador_id=trabajador.id).count()
-            historial_avances = HistorialAvanceActividad.query.filter_by(trabajador_id=trabajador.id).count()
-            
-            from sqlalchemy import text
-            requerimientos_count = db.session.execute(
-                text("SELECT COUNT(*) FROM requerimiento_trabajador_especialidad WHERE trabajador_id = :tid"),
-                {'tid': trabajador.id}
-            ).scalar() or 0
-            
-            # Obtener detalles de actividades activas para trabajadores con asignaciones
-            actividades_detalle = []
-            if recursos_actuales > 0 or avances_actuales > 0:
-                # Obtener actividades específicas asignadas
-                actividades_query = db.session.query(
-                    ActividadProyecto.id,
-                    ActividadProyecto.nombre_tarea,
-                    ActividadProyecto.porcentaje_avance,
-                    ActividadProyecto.fecha_inicio,
-                    ActividadProyecto.fecha_fin
-                ).join(
-                    AvanceActividad, ActividadProyecto.id == AvanceActividad.actividad_proyecto_id
-                ).filter(
-                    AvanceActividad.trabajador_id == trabajador.id
-                ).all()
-                
-                for actividad in actividades_query:
-                    actividades_detalle.append({
-                        'id': actividad.id,
-                        'nombre': actividad.nombre_tarea,
-                        'progreso': actividad.porcentaje_avance,
-                        'fecha_inicio': actividad.fecha_inicio.isoformat() if actividad.fecha_inicio else None,
-                        'fecha_fin': actividad.fecha_fin.isoformat() if actividad.fecha_fin else None
-                    })
-            
-            # Clasificar trabajador
-            trabajador_info = {
-                'id': trabajador.id,
-                'nombre': trabajador.nombre,
-                'nombrecorto': trabajador.nombrecorto,
-                'email': trabajador.email,
-                'profesion': trabajador.profesion,
-                'sector': trabajador.sector.nombre if trabajador.sector else 'Sin sector',
-                'recinto': trabajador.recinto.nombre if trabajador.recinto else 'Sin recinto',
-                'recursos_asignados': recursos_actuales,
-                'avances_pendientes': avances_actuales,
-                'avances_historicos': historial_avances,
-                'requerimientos_asignados': requerimientos_count,
-                'actividades_detalle': actividades_detalle
-            }
-            
-            if (recursos_actuales == 0 and avances_actuales == 0 and 
-                historial_avances == 0 and requerimientos_count == 0):
-                trabajador_info['estado'] = 'SIN_ASIGNACIONES'
-                trabajador_info['accion_recomendada'] = 'ELIMINAR_SEGURO'
-                trabajadores_sin_asignaciones.append(trabajador_info)
-                
-            elif (recursos_actuales > 0 or avances_actuales > 0 or requerimientos_count > 0):
-                trabajador_info['estado'] = 'ACTIVO_CON_ASIGNACIONES'
-                trabajador_info['accion_recomendada'] = 'REVISAR_REASIGNACION'
-                trabajadores_con_actividades_activas.append(trabajador_info)
-                
-            elif historial_avances > 0:
-                trabajador_info['estado'] = 'HISTORICO_SIN_ASIGNACIONES'
-                trabajador_info['accion_recomendada'] = 'MANTENER_TRAZABILIDAD'
-                trabajadores_con_progreso_historico.append(trabajador_info)
+        # Misma clasificación que limpiar_trabajadores_huerfanos, con detalle de actividades
+        analisis = analizar_trabajadores(con_actividades=True)
+        trabajadores_sin_asignaciones = analisis['SIN_ASIGNACIONES']
+        trabajadores_con_actividades_activas = analisis['ACTIVO_CON_ASIGNACIONES']
+        trabajadores_con_progreso_historico = analisis['HISTORICO_SIN_ASIGNACIONES']
         
         reporte_completo = {
             'success': True,
-            'total_trabajadores': len(todos_trabajadores),
+            'total_trabajadores': analisis['total'],
             'sin_asignaciones': {
                 'count': len(trabajadores_sin_asignaciones),
                 'trabajadores': trabajadores_sin_asignaciones
@@ -6656,9 +5936,114 @@ def limpiar_trabajadores():
             'message': f'Error al limpiar trabajadores: {str(e)}'
         }), 500
 
+def _mensaje_columnas_faltantes(importador, columnas_faltantes):
+    mensaje_error = f'Faltan las siguientes columnas obligatorias: {", ".join(columnas_faltantes)}\n\n'
+    mensaje_error += 'Columnas encontradas en el archivo:\n'
+    for i, enc in enumerate(importador.encabezados):
+        if enc:
+            mensaje_error += f'  - Columna {i+1}: "{enc}"\n'
+    
+    mensaje_error += '\nAsegúrate de que tu archivo tenga columnas con nombres similares a:\n'
+    mensaje_error += '  - EDT/Código/ID\n'
+    mensaje_error += '  - Nombre/Tarea/Actividad\n'  
+    mensaje_error += '  - Fecha Inicio/Start/Comienzo\n'
+    mensaje_error += '  - Fecha Fin/End/Final'
+    return mensaje_error
+
+
+def _aplicar_importacion_control(importador, resumen, nombre_archivo, sesion_subida):
+    """
+    Aplica el diff del control de actividades, hace commit y registra la auditoría.
+    Compartido por subir_control_actividades y la tarea 'control_importar'.
+    
+    Returns:
+        dict: respuesta JSON del procesamiento
+    """
+    avances_creados = importador.aplicar()
+    db.session.commit()
+    
+    # Registrar auditoría del procesamiento completo (SOLO si hay datos procesados)
+    try:
+        if resumen['filas_validas'] > 0 or len(resumen['errores']) > 0:
+            registrar_auditoria(
+                tipo_operacion='SUBIDA_ARCHIVO_COMPLETA',
+                descripcion=f'Procesamiento completo del archivo {nombre_archivo}',
+                datos_nuevos={
+                    'actividades_procesadas': resumen['filas_validas'] - len(resumen['no_encontradas']),
+                    'actividades_actualizadas': resumen['actualizadas'],
+                    'actividades_sin_cambios': resumen['sin_cambios'],
+                    'avances_creados': avances_creados,
+                    'errores_count': len(resumen['errores']),
+                    'sesion_subida': sesion_subida,
+                    'nombre_archivo': nombre_archivo,
+                    'errores_detalle': resumen['errores'][:5]  # Máximo 5 errores para no saturar
+                },
+                archivo_relacionado=nombre_archivo,
+                usuario_id=importador.auditoria.get('usuario_id'),
+                usuario_email=importador.auditoria.get('usuario_email')
+            )
+    except Exception as e:
+        print(f"⚠️ Advertencia: No se pudo registrar auditoría, pero el procesamiento fue exitoso: {str(e)}")
+        # No fallar el procesamiento por problemas con auditoría
+    
+    print(f"✅ Procesamiento completado:")
+    print(f"   🔄 Actualizadas: {resumen['actualizadas']}")
+    print(f"   ➖ Sin cambios: {resumen['sin_cambios']}")
+    print(f"   👷 Avances creados: {avances_creados}")
+    print(f"   ❌ Errores: {len(resumen['errores'])}")
+    
+    return {
+        'success': True,
+        'message': f"Archivo procesado exitosamente. {resumen['actualizadas']} actividades actualizadas, {resumen['sin_cambios']} sin cambios.",
+        'actualizadas': resumen['actualizadas'],
+        'nuevas': 0,
+        'avances_creados': avances_creados,
+        'errores': resumen['errores'],
+        'resumen': resumen,
+        'sesion_subida': sesion_subida
+    }
+
+
+@registrar_tarea('control_importar')
+def tarea_importar_control(contexto, ruta, requerimiento_id, sesion_subida, nombre_archivo, auditoria):
+    """Lee, compara y aplica en el worker un archivo de control guardado en el almacén temporal"""
+    from app.services.control_import_service import ImportadorControl
+    from app.services.tareas_service import TareaFallida
+    
+    if not os.path.isfile(ruta):
+        raise TareaFallida('El archivo subido ya no está disponible; vuelve a subirlo')
+    
+    importador = ImportadorControl(requerimiento_id=requerimiento_id, sesion_subida=sesion_subida,
+                                   nombre_archivo=nombre_archivo, auditoria=auditoria)
+    contexto.progreso(5, 'Leyendo archivo de control', forzar=True)
+    try:
+        columnas_faltantes = importador.leer(ruta)
+    except Exception as e:
+        raise TareaFallida(f'Error al leer el archivo Excel: {str(e)}')
+    if columnas_faltantes:
+        raise TareaFallida(_mensaje_columnas_faltantes(importador, columnas_faltantes))
+    if importador.total_filas == 0:
+        raise TareaFallida('El archivo debe contener al menos los encabezados y una fila de datos')
+    
+    contexto.progreso(40, f'Comparando {importador.total_filas} filas con las actividades', forzar=True)
+    resumen = importador.calcular_diff()
+    
+    contexto.progreso(60, f"Aplicando {resumen['actualizadas']} actividades con cambios", forzar=True)
+    resultado = _aplicar_importacion_control(importador, resumen, nombre_archivo, sesion_subida)
+    
+    # Solo se elimina al terminar bien: un reintento necesita el archivo
+    # (si no, el almacén temporal lo purga al vencer)
+    os.remove(ruta)
+    return resultado
+
+
 @controllers_bp.route('/subir_control_actividades', methods=['POST'])
 def subir_control_actividades():
-    """Función para procesar archivo Excel de control de actividades"""
+    """
+    Función para procesar archivo Excel de control de actividades.
+    Con asincrono=1 el archivo se guarda en el almacén temporal y se encola la
+    tarea 'control_importar' (la respuesta trae tarea_id para consultar /tareas/<id>).
+    """
     try:
         print("🚀 Iniciando procesamiento de archivo de control...")
         
@@ -6691,392 +6076,86 @@ def subir_control_actividades():
         print(f"📄 Procesando archivo: {nombre_archivo}")
         print(f"🆔 Sesión de subida: {sesion_subida}")
         
-        # Leer el archivo Excel
+        # Proyecto destino opcional y modo simulación (solo devuelve el diff)
+        requerimiento_id = request.form.get('requerimiento_id', type=int)
+        dry_run = request.form.get('dry_run', '').lower() in ('1', 'true', 'si', 'sí')
+        asincrono = request.form.get('asincrono', '').lower() in ('1', 'true', 'si', 'sí')
+        
+        auditoria = {
+            'usuario_id': current_user.id if current_user.is_authenticated else None,
+            'usuario_email': current_user.email if current_user.is_authenticated else 'Sistema',
+            'usuario_nombre': current_user.nombre if current_user.is_authenticated else 'Sistema',
+            'timestamp_operacion': datetime.now().isoformat(),
+            'tipo_cambio': 'SUBIDA_ARCHIVO_CONTROL',
+            'sesion_navegador': request.headers.get('User-Agent', 'No disponible')[:200]
+        }
+        
+        if asincrono and not dry_run:
+            from app.services.staging_store import obtener_staging_store
+            from app.services.tareas_service import encolar
+            
+            ruta = obtener_staging_store().guardar_archivo(archivo.stream, extension='.xlsx')
+            tarea_id = encolar('control_importar', {
+                'ruta': ruta,
+                'requerimiento_id': requerimiento_id,
+                'sesion_subida': sesion_subida,
+                'nombre_archivo': nombre_archivo,
+                'auditoria': auditoria
+            }, creado_por_id=auditoria['usuario_id'])
+            return jsonify({
+                'success': True,
+                'asincrono': True,
+                'tarea_id': tarea_id,
+                'message': 'Archivo recibido; se está procesando en segundo plano',
+                'sesion_subida': sesion_subida
+            }), 202
+        
+        from app.services.control_import_service import ImportadorControl
+        importador = ImportadorControl(
+            requerimiento_id=requerimiento_id,
+            sesion_subida=sesion_subida,
+            nombre_archivo=nombre_archivo,
+            auditoria=auditoria
+        )
+        
+        # Leer el archivo Excel en modo streaming
         try:
-            workbook = openpyxl.load_workbook(archivo, data_only=True)
-            sheet = workbook.active
-            print(f"📊 Hoja de trabajo cargada: {sheet.title}")
+            columnas_faltantes = importador.leer(archivo.stream)
         except Exception as e:
             return jsonify({
                 'success': False,
                 'message': f'Error al leer el archivo Excel: {str(e)}'
             }), 400
         
-        # Obtener las filas de datos
-        filas = list(sheet.iter_rows(values_only=True))
-        
-        if len(filas) < 2:  # Al menos debe tener encabezados y una fila de datos
+        if columnas_faltantes:
             return jsonify({
                 'success': False,
-                'message': 'El archivo debe contener al menos los encabezados y una fila de datos'
+                'message': _mensaje_columnas_faltantes(importador, columnas_faltantes)
             }), 400
         
-        # Procesar encabezados
-        encabezados = filas[0]
-        print(f"📋 Encabezados encontrados: {encabezados}")
-        
-        # Mapear columnas esperadas
-        columnas_esperadas = {
-            'EDT': None,
-            'Nombre de tarea': None,
-            'Comienzo': None,
-            'Fin': None,
-            'Duración': None,
-            '% completado': None,
-            'Nombres de los recursos': None,
-            'Predecesoras': None,
-            'proyecto': None
-        }
-        
-        # Mapear encabezados - PRIMERO por coincidencia EXACTA, LUEGO por búsqueda flexible
-        encabezados_lower = [str(enc).lower().strip() if enc else '' for enc in encabezados]
-        
-        # PASO 1: Búsqueda EXACTA de encabezados conocidos
-        mapeo_exacto = {
-            'edt': 'EDT',
-            'nombre de tarea': 'Nombre de tarea',
-            'comienzo': 'Comienzo',
-            'fin': 'Fin',
-            'duración': 'Duración',
-            '% completado': '% completado',
-            'nombres de los recursos': 'Nombres de los recursos',
-            'predecesoras': 'Predecesoras',
-        }
-        
-        for i, enc_lower in enumerate(encabezados_lower):
-            if enc_lower in mapeo_exacto:
-                columnas_esperadas[mapeo_exacto[enc_lower]] = i
-                print(f"   ✅ Mapeo EXACTO encontrado: {mapeo_exacto[enc_lower]} en columna {i}")
-        
-        # PASO 2: Búsqueda FLEXIBLE solo para columnas no encontradas aún
-        for i, encabezado in enumerate(encabezados):
-            if not encabezado:
-                continue
-            
-            encabezado_lower = str(encabezado).lower().strip()
-            
-            # Solo procesar si aún no está mapeada
-            
-            # EDT - muy específico
-            if columnas_esperadas['EDT'] is None:
-                if any(term in encabezado_lower for term in ['edt', 'código', 'codigo', 'wbs']) and 'nombre' not in encabezado_lower and 'recurso' not in encabezado_lower and 'días' not in encabezado_lower:
-                    columnas_esperadas['EDT'] = i
-            
-            # Nombre de tarea - específico pero genérico
-            if columnas_esperadas['Nombre de tarea'] is None:
-                if any(term in encabezado_lower for term in ['nombre de tarea', 'nombre tarea', 'task name', 'actividad', 'tarea', 'activity']) and 'recursos' not in encabezado_lower:
-                    columnas_esperadas['Nombre de tarea'] = i
-            
-            # Comienzo
-            if columnas_esperadas['Comienzo'] is None:
-                if any(term in encabezado_lower for term in ['comienzo', 'inicio', 'start', 'fecha inicio', 'fecha_inicio', 'begin']):
-                    columnas_esperadas['Comienzo'] = i
-            
-            # Fin
-            if columnas_esperadas['Fin'] is None:
-                if any(term in encabezado_lower for term in ['fin', 'end', 'finish', 'final', 'fecha fin', 'fecha_fin', 'término', 'termino']) and 'comienzo' not in encabezado_lower:
-                    columnas_esperadas['Fin'] = i
-            
-            # Duración - EVITAR confusiones con "Días Corrido"
-            if columnas_esperadas['Duración'] is None:
-                if any(term in encabezado_lower for term in ['duración', 'duracion', 'duration']) and 'nombre' not in encabezado_lower and 'corrido' not in encabezado_lower:
-                    columnas_esperadas['Duración'] = i
-            
-            # % completado
-            if columnas_esperadas['% completado'] is None:
-                if any(term in encabezado_lower for term in ['% completado', 'completado', '% complete', 'progreso', 'progress', 'avance', 'porcentaje']) and 'nombre' not in encabezado_lower and 'programado' not in encabezado_lower:
-                    columnas_esperadas['% completado'] = i
-            
-            # Nombres de los recursos
-            if columnas_esperadas['Nombres de los recursos'] is None:
-                if any(term in encabezado_lower for term in ['nombres de', 'nombres de recursos', 'recursos', 'resource', 'assigned', 'asignado', 'responsable']) and 'tarea' not in encabezado_lower:
-                    columnas_esperadas['Nombres de los recursos'] = i
-            
-            # Predecesoras
-            if columnas_esperadas['Predecesoras'] is None:
-                if any(term in encabezado_lower for term in ['predecesoras', 'predecessors', 'dependencias', 'dependencies']):
-                    columnas_esperadas['Predecesoras'] = i
-            
-            # Proyecto
-            if columnas_esperadas['proyecto'] is None:
-                if any(term in encabezado_lower for term in ['proyecto', 'project', 'requerimiento']):
-                    columnas_esperadas['proyecto'] = i
-        
-        print(f"🗂️ Mapeo de columnas realizado:")
-        for columna, indice in columnas_esperadas.items():
-            if indice is not None:
-                print(f"   ✅ {columna}: Columna {indice} = '{encabezados[indice]}'")
-            else:
-                print(f"   ❌ {columna}: No encontrada")
-        
-        # Verificar columnas obligatorias
-        columnas_obligatorias = ['EDT', 'Nombre de tarea', 'Comienzo', 'Fin']
-        columnas_faltantes = []
-        
-        for columna in columnas_obligatorias:
-            if columnas_esperadas[columna] is None:
-                columnas_faltantes.append(columna)
-        
-        if columnas_faltantes:
-            mensaje_error = f'Faltan las siguientes columnas obligatorias: {", ".join(columnas_faltantes)}\n\n'
-            mensaje_error += 'Columnas encontradas en el archivo:\n'
-            for i, enc in enumerate(encabezados):
-                if enc:
-                    mensaje_error += f'  - Columna {i+1}: "{enc}"\n'
-            
-            mensaje_error += '\nAsegúrate de que tu archivo tenga columnas con nombres similares a:\n'
-            mensaje_error += '  - EDT/Código/ID\n'
-            mensaje_error += '  - Nombre/Tarea/Actividad\n'  
-            mensaje_error += '  - Fecha Inicio/Start/Comienzo\n'
-            mensaje_error += '  - Fecha Fin/End/Final'
-            
+        if importador.total_filas == 0:
             return jsonify({
                 'success': False,
-                'message': mensaje_error
+                'message': 'El archivo debe contener al menos los encabezados y una fila de datos'
             }), 400
         
-        # Procesar filas de datos
-        actividades_procesadas = 0
-        actividades_actualizadas = 0
-        actividades_nuevas = 0
-        errores = []
-        
-        for num_fila, fila in enumerate(filas[1:], start=2):  # Empezar desde fila 2 (primera fila de datos)
-            try:
-                print(f"📝 Procesando fila {num_fila}...")
-                
-                # Extraer datos de la fila
-                edt = fila[columnas_esperadas['EDT']] if columnas_esperadas['EDT'] is not None else None
-                nombre_tarea = fila[columnas_esperadas['Nombre de tarea']] if columnas_esperadas['Nombre de tarea'] is not None else None
-                
-                # Saltar filas vacías
-                if not edt or not nombre_tarea:
-                    print(f"⚠️ Fila {num_fila} está vacía, saltando...")
-                    continue
-                
-                # Procesar datos
-                datos_fila = {
-                    'edt': str(edt).strip(),
-                    'nombre_tarea': str(nombre_tarea).strip(),
-                    'fecha_inicio': fila[columnas_esperadas['Comienzo']] if columnas_esperadas['Comienzo'] is not None else None,
-                    'fecha_fin': fila[columnas_esperadas['Fin']] if columnas_esperadas['Fin'] is not None else None,
-                    'duracion': fila[columnas_esperadas['Duración']] if columnas_esperadas['Duración'] is not None else None,
-                    'progreso': fila[columnas_esperadas['% completado']] if columnas_esperadas['% completado'] is not None else None,
-                    'recursos': fila[columnas_esperadas['Nombres de los recursos']] if columnas_esperadas['Nombres de los recursos'] is not None else None,
-                    'predecesoras': fila[columnas_esperadas['Predecesoras']] if columnas_esperadas['Predecesoras'] is not None else None,
-                }
-                
-                # Procesar duración - extraer número de texto como "5 días", "10", etc.
-                if datos_fila['duracion'] is not None:
-                    duracion_str = str(datos_fila['duracion']).strip()
-                    # Extraer números del texto usando regex
-                    import re
-                    numeros = re.findall(r'\d+', duracion_str)
-                    if numeros:
-                        datos_fila['duracion'] = int(numeros[0])  # Usar el primer número encontrado
-                    else:
-                        datos_fila['duracion'] = None
-                
-                # MÉTODO SIMPLIFICADO: Solo buscar y actualizar actividades existentes
-                # NO crear nuevas actividades automáticamente
-                actividad_existente = ActividadProyecto.query.filter_by(edt=datos_fila['edt']).first()
-                
-                if actividad_existente:
-                    proyecto = actividad_existente.requerimiento
-                    print(f"🔍 Actividad existente encontrada: {datos_fila['edt']} - Proyecto: {proyecto.nombre} (ID: {proyecto.id})")
-                    
-                    # Actualizar actividad existente - DATOS ANTERIORES (incluyendo recursos)
-                    datos_anteriores = {
-                        'edt': actividad_existente.edt,
-                        'nombre_tarea': actividad_existente.nombre_tarea,
-                        'fecha_inicio': actividad_existente.fecha_inicio.isoformat() if actividad_existente.fecha_inicio else None,
-                        'fecha_fin': actividad_existente.fecha_fin.isoformat() if actividad_existente.fecha_fin else None,
-                        'duracion': int(actividad_existente.duracion) if actividad_existente.duracion else None,
-                        'progreso': float(actividad_existente.progreso) if actividad_existente.progreso else 0.0,
-                        'recursos': actividad_existente.recursos,
-                        'predecesoras': actividad_existente.predecesoras
-                    }
-                    
-                    # Actualizar campos
-                    if datos_fila['nombre_tarea']:
-                        actividad_existente.nombre_tarea = datos_fila['nombre_tarea']
-                    
-                    if datos_fila['fecha_inicio']:
-                        try:
-                            if isinstance(datos_fila['fecha_inicio'], datetime):
-                                actividad_existente.fecha_inicio = datos_fila['fecha_inicio'].date()
-                            elif hasattr(datos_fila['fecha_inicio'], 'date'):  # Para objetos date
-                                actividad_existente.fecha_inicio = datos_fila['fecha_inicio']
-                            else:
-                                # Usar el nuevo parser de fechas en español
-                                fecha_parseada = parsear_fecha_espanol(datos_fila['fecha_inicio'])
-                                if fecha_parseada:
-                                    actividad_existente.fecha_inicio = fecha_parseada
-                        except Exception as e:
-                            print(f"⚠️ Error al procesar fecha_inicio en fila {num_fila}: {e}")
-                    
-                    if datos_fila['fecha_fin']:
-                        try:
-                            if isinstance(datos_fila['fecha_fin'], datetime):
-                                actividad_existente.fecha_fin = datos_fila['fecha_fin'].date()
-                            elif hasattr(datos_fila['fecha_fin'], 'date'):  # Para objetos date
-                                actividad_existente.fecha_fin = datos_fila['fecha_fin']
-                            else:
-                                # Usar el nuevo parser de fechas en español
-                                fecha_parseada = parsear_fecha_espanol(datos_fila['fecha_fin'])
-                                if fecha_parseada:
-                                    actividad_existente.fecha_fin = fecha_parseada
-                        except Exception as e:
-                            print(f"⚠️ Error al procesar fecha_fin en fila {num_fila}: {e}")
-                    
-                    if datos_fila['duracion'] is not None:
-                        actividad_existente.duracion = int(datos_fila['duracion'])
-                    
-                    if datos_fila['progreso'] is not None:
-                        progreso_valor = float(datos_fila['progreso'])
-                        # Si el progreso está en formato decimal (0.5), convertir a porcentaje (50)
-                        if progreso_valor <= 1.0:
-                            progreso_valor = progreso_valor * 100
-                        actividad_existente.progreso = progreso_valor
-                    
-                    # PROCESAMIENTO DE RECURSOS: Revisar si fueron modificados y actualizar
-                    if datos_fila['recursos']:
-                        recursos_nuevos = str(datos_fila['recursos']).strip()
-                        recursos_actuales = actividad_existente.recursos.strip() if actividad_existente.recursos else ""
-                        
-                        print(f"🧑‍💼 Revisando recursos para actividad {datos_fila['edt']}")
-                        print(f"   📋 Recursos actuales: '{recursos_actuales}'")
-                        print(f"   📄 Recursos del Excel: '{recursos_nuevos}'")
-                        
-                        # Comparar si los recursos han cambiado
-                        if recursos_nuevos != recursos_actuales:
-                            print(f"   🔄 Los recursos han cambiado, actualizando...")
-                            actividad_existente.recursos = recursos_nuevos
-                        else:
-                            print(f"   ✅ Los recursos no han cambiado, mantiendo actuales")
-                        
-                        # Extraer y crear trabajadores desde los recursos asignados
-                        trabajadores_asignados = extraer_y_crear_trabajadores_desde_recursos(recursos_nuevos)
-                        
-                        # Crear avances de actividad para los trabajadores asignados
-                        if trabajadores_asignados:
-                            progreso_para_avance = actividad_existente.progreso if actividad_existente.progreso else 0.0
-                            crear_avances_actividad(
-                                proyecto.id, 
-                                actividad_existente.id, 
-                                recursos_nuevos, 
-                                progreso_para_avance
-                            )
-                            print(f"📋 Creados/actualizados avances para {len(trabajadores_asignados)} trabajadores en actividad {actividad_existente.edt}")
-                        else:
-                            print(f"⚠️ No se pudieron extraer trabajadores de: {recursos_nuevos}")
-                    elif actividad_existente.recursos:
-                        # Si no hay recursos en el Excel pero sí en la actividad, mantener los actuales
-                        print(f"📋 No hay recursos en Excel, manteniendo recursos actuales: {actividad_existente.recursos}")
-                    else:
-                        print(f"📋 No hay recursos ni en Excel ni en la actividad")
-                    
-                    if datos_fila['predecesoras']:
-                        actividad_existente.predecesoras = str(datos_fila['predecesoras'])
-                    
-                    actividad_existente.updated_at = datetime.utcnow()
-                    
-                    # Crear registro de historial con información completa de auditoría
-                    historial = HistorialControl(
-                        sesion_subida=sesion_subida,
-                        nombre_archivo=nombre_archivo,
-                        actividad_id=actividad_existente.id,
-                        requerimiento_id=proyecto.id,
-                        tipo_operacion='UPDATE',
-                        datos_anteriores=datos_anteriores,
-                        datos_nuevos={
-                            'edt': actividad_existente.edt,
-                            'nombre_tarea': actividad_existente.nombre_tarea,
-                            'fecha_inicio': actividad_existente.fecha_inicio.isoformat() if actividad_existente.fecha_inicio else None,
-                            'fecha_fin': actividad_existente.fecha_fin.isoformat() if actividad_existente.fecha_fin else None,
-                            'duracion': int(actividad_existente.duracion) if actividad_existente.duracion else None,
-                            'progreso': float(actividad_existente.progreso) if actividad_existente.progreso else 0.0,
-                            'recursos': actividad_existente.recursos,
-                            'predecesoras': actividad_existente.predecesoras,
-                            # Información de auditoría mejorada
-                            'usuario_id': current_user.id if current_user.is_authenticated else None,
-                            'usuario_email': current_user.email if current_user.is_authenticated else 'Sistema',
-                            'usuario_nombre': current_user.nombre if current_user.is_authenticated else 'Sistema',
-                            'timestamp_operacion': datetime.now().isoformat(),
-                            'tipo_cambio': 'SUBIDA_ARCHIVO_CONTROL',
-                            'sesion_navegador': request.headers.get('User-Agent', 'No disponible')[:200]
-                        },
-                        fila_excel=num_fila,
-                        comentarios=f'Actualización vía archivo Excel por {current_user.email if current_user.is_authenticated else "Sistema"} - Sesión: {sesion_subida}'
-                    )
-                    
-                    db.session.add(historial)
-                    actividades_actualizadas += 1
-                    
-                else:
-                    # Actividad NO encontrada en la base de datos
-                    print(f"⚠️ Actividad con EDT '{datos_fila['edt']}' NO encontrada en la BD - IGNORANDO")
-                    print(f"   📋 Archivo de control solo debe actualizar actividades existentes")
-                    print(f"   💡 Para crear nuevas actividades, usar el proceso de 'Llenar Proyecto'")
-                    continue  # Saltar esta actividad
-                
-                actividades_procesadas += 1
-                
-            except Exception as e:
-                error_msg = f'Error en fila {num_fila}: {str(e)}'
-                print(f"❌ {error_msg}")
-                errores.append({
-                    'fila': num_fila,
-                    'mensaje': error_msg
-                })
-                continue
+        # Diff en memoria contra el estado actual (una consulta indexada)
+        resumen = importador.calcular_diff()
+        print(f"🗂️ Diff de control: {resumen['actualizadas']} actividades con cambios, "
+              f"{resumen['sin_cambios']} sin cambios, {len(resumen['no_encontradas'])} EDT no encontrados")
         
-        # Guardar cambios
-        try:
-            db.session.commit()
-            
-            # Limpiar trabajadores huérfanos después del procesamiento exitoso
-            trabajadores_eliminados = limpiar_trabajadores_huerfanos()
-            
-            # Registrar auditoría del procesamiento completo (SOLO si hay datos procesados)
-            try:
-                if actividades_procesadas > 0 or len(errores) > 0:
-                    registrar_auditoria(
-                        tipo_operacion='SUBIDA_ARCHIVO_COMPLETA',
-                        descripcion=f'Procesamiento completo del archivo {nombre_archivo}',
-                        datos_nuevos={
-                            'actividades_procesadas': actividades_procesadas,
-                            'actividades_actualizadas': actividades_actualizadas,
-                            'actividades_nuevas': actividades_nuevas,
-                            'trabajadores_eliminados': trabajadores_eliminados,
-                            'errores_count': len(errores),
-                            'sesion_subida': sesion_subida,
-                            'nombre_archivo': nombre_archivo,
-                            'errores_detalle': errores[:5] if errores else []  # Máximo 5 errores para no saturar
-                        },
-                        archivo_relacionado=nombre_archivo
-                    )
-            except Exception as e:
-                print(f"⚠️ Advertencia: No se pudo registrar auditoría, pero el procesamiento fue exitoso: {str(e)}")
-                # No fallar el procesamiento por problemas con auditoría
-            
-            print(f"✅ Procesamiento completado:")
-            print(f"   📊 Total procesadas: {actividades_procesadas}")
-            print(f"   🔄 Actualizadas: {actividades_actualizadas}")
-            print(f"   ➕ Nuevas: {actividades_nuevas}")
-            print(f"   🧹 Trabajadores eliminados (sin asignaciones): {trabajadores_eliminados}")
-            print(f"   ❌ Errores: {len(errores)}")
-            
+        if dry_run:
             return jsonify({
                 'success': True,
-                'message': f'Archivo procesado exitosamente. {actividades_procesadas} actividades procesadas. {trabajadores_eliminados} trabajadores sin asignaciones eliminados.',
-                'actualizadas': actividades_actualizadas,
-                'nuevas': actividades_nuevas,
-                'trabajadores_eliminados': trabajadores_eliminados,
-                'errores': errores,
+                'dry_run': True,
+                'message': f"Simulación: {resumen['actualizadas']} actividades se actualizarían.",
+                'resumen': resumen,
                 'sesion_subida': sesion_subida
             })
-            
+        
+        # Guardar cambios
+        try:
+            return jsonify(_aplicar_importacion_control(importador, resumen, nombre_archivo, sesion_subida))
         except Exception as e:
             db.session.rollback()
             return jsonify({
@@ -7120,6 +6199,7 @@ def historial_avances():
 
 
 @controllers_bp.route('/api/historial-avances')
+@presupuesto_consultas(3)
 def api_historial_avances():
     """API para obtener historial de avances con filtros"""
     try:
@@ -7132,8 +6212,13 @@ def api_historial_avances():
         fecha_hasta = request.args.get('fecha_hasta')
         limit = request.args.get('limit', 100, type=int)
         
-        # Construir query base
-        query = HistorialAvanceActividad.query
+        # Construir query base (trabajador, proyecto y actividad en el mismo SELECT:
+        # antes eran 3 consultas por fila)
+        query = HistorialAvanceActividad.query.options(
+            joinedload(HistorialAvanceActividad.trabajador),
+            joinedload(HistorialAvanceActividad.requerimiento),
+            joinedload(HistorialAvanceActividad.actividad)
+        )
         
         # Aplicar filtros
         if proyecto_id:
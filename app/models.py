@@ -1,13 +1,14 @@
 from app import db
 from datetime import datetime
-from sqlalchemy import Index, UniqueConstraint, CheckConstraint
-from sqlalchemy.orm import validates
+from sqlalchemy import Index, UniqueConstraint, CheckConstraint, event, inspect
+from sqlalchemy.orm import validates, Session
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, HashingError
 import re
 import enum
+import unicodedata
 
 # Enum para roles de usuario del sistema (inmutables)
 class UserRole(enum.Enum):
@@ -260,7 +261,9 @@ class Trabajador(db.Model, TimestampMixin, UserMixin):
         Index('idx_trabajador_email', 'email'),
         Index('idx_trabajador_rol', 'rol'),
         Index('idx_trabajador_area', 'area_id'),  # Temporal
-        Index('idx_trabajador_rut', 'rut')
+        Index('idx_trabajador_rut', 'rut'),
+        Index('idx_trabajador_nombre_normalizado', 'nombre_normalizado'),
+        Index('idx_trabajador_nombrecorto_normalizado', 'nombrecorto_normalizado')
         # Index('idx_trabajador_area_principal', 'area_principal_id')  # Se activará después de migración
     )
     
@@ -269,6 +272,9 @@ class Trabajador(db.Model, TimestampMixin, UserMixin):
     rut = db.Column(db.String(12), nullable=True)  # Formato: 12.345.678-9 - Opcional para facilitar seeds
     profesion = db.Column(db.String(255), nullable=True)
     nombrecorto = db.Column(db.String(50), nullable=True)
+    # Claves de búsqueda de recursos Gantt: sin tildes, en minúsculas y con espacios colapsados
+    nombre_normalizado = db.Column(db.String(255), nullable=True)
+    nombrecorto_normalizado = db.Column(db.String(100), nullable=True)
     password_hash = db.Column(db.String(255), nullable=True)
     email = db.Column(db.String(255), nullable=True, unique=True)
     telefono = db.Column(db.String(20), nullable=True)
@@ -468,32 +474,20 @@ class Trabajador(db.Model, TimestampMixin, UserMixin):
         """Verificar si es super administrador"""
         return self.rol == UserRole.SUPERADMIN
     
+    def permisos_snapshot(self):
+        """Snapshot inmutable de permisos del rol personalizado (cacheado por request)"""
+        if not self.custom_role_id:
+            return None
+        from app.services.permisos_service import obtener_snapshot
+        return obtener_snapshot(self.custom_role_id)
+    
     def has_page_permission(self, page_route):
         """Verificar si el usuario tiene permiso para acceder a una página específica"""
         if self.rol == UserRole.SUPERADMIN:
             return True
         
-        if not self.custom_role:
-            return False
-        
-        # Buscar la página por ruta usando una query directa
-        from sqlalchemy import and_
-        page_query = db.session.query(Page).filter(
-            and_(Page.route == page_route, Page.active == True)
-        ).first()
-        
-        if not page_query:
-            return False
-        
-        # Verificar si el rol tiene permiso para esta página
-        permission_query = db.session.query(PagePermission).filter(
-            and_(
-                PagePermission.page_id == page_query.id,
-                PagePermission.custom_role_id == self.custom_role.id
-            )
-        ).first()
-        
-        return permission_query is not None
+        snapshot = self.permisos_snapshot()
+        return snapshot is not None and snapshot.tiene_ruta(page_route)
     
     def get_accessible_pages(self):
         """Obtener todas las páginas a las que el usuario tiene acceso"""
@@ -501,20 +495,12 @@ class Trabajador(db.Model, TimestampMixin, UserMixin):
             # SUPERADMIN tiene acceso a todas las páginas
             return db.session.query(Page).filter(Page.active == True).all()
         
-        if not self.custom_role:
-            return []
-        
-        # Obtener páginas específicas del rol personalizado
-        permissions = db.session.query(PagePermission).filter(
-            PagePermission.custom_role_id == self.custom_role.id
-        ).all()
-        
-        page_ids = [perm.page_id for perm in permissions]
-        if not page_ids:
+        snapshot = self.permisos_snapshot()
+        if snapshot is None or not snapshot.page_ids:
             return []
         
         return db.session.query(Page).filter(
-            Page.id.in_(page_ids), Page.active == True
+            Page.id.in_(snapshot.page_ids), Page.active == True
         ).all()
     
     def can_access_category(self, category_name):
@@ -522,24 +508,8 @@ class Trabajador(db.Model, TimestampMixin, UserMixin):
         if self.rol == UserRole.SUPERADMIN:
             return True
         
-        if not self.custom_role:
-            return False
-        
-        # Buscar la categoría
-        category_query = db.session.query(Category).filter(
-            Category.name == category_name
-        ).first()
-        
-        if not category_query:
-            return False
-        
-        # Verificar si tiene acceso a alguna página de esta categoría
-        accessible_pages = self.get_accessible_pages()
-        for page in accessible_pages:
-            if page.category_id == category_query.id:
-                return True
-        
-        return False
+        snapshot = self.permisos_snapshot()
+        return snapshot is not None and snapshot.tiene_categoria(category_name)
     
     # Métodos de compatibilidad (obsoletos pero mantenidos por compatibilidad)
     def is_admin(self):
@@ -690,6 +660,21 @@ class Trabajador(db.Model, TimestampMixin, UserMixin):
             raise ValueError('Email inválido')
         return email
     
+    @validates('nombre', 'nombrecorto')
+    def validate_nombres(self, key, valor):
+        """Mantiene al día las columnas normalizadas de búsqueda"""
+        setattr(self, f'{key}_normalizado', self.normalizar_clave(valor))
+        return valor
+    
+    @staticmethod
+    def normalizar_clave(texto):
+        """'  Ana   PÉREZ ' -> 'ana perez' (None si queda vacío)"""
+        if texto is None:
+            return None
+        descompuesto = unicodedata.normalize('NFKD', str(texto))
+        sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+        return ' '.join(sin_tildes.casefold().split()) or None
+    
     def __repr__(self):
         return f'<Trabajador {self.nombre}>'
 
@@ -858,7 +843,10 @@ class GanttArchivo(db.Model, TimestampMixin):
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     id_requerimiento = db.Column(db.Integer, db.ForeignKey('requerimiento.id', ondelete='CASCADE'), nullable=False)
-    archivo = db.Column(db.LargeBinary, nullable=False)
+    # Contenido en GanttFileStore (app/services/gantt_store.py) indexado por sha256;
+    # archivo solo conserva blobs legacy hasta que se migran
+    sha256 = db.Column(db.String(64), nullable=True, index=True)
+    archivo = db.Column(db.LargeBinary, nullable=True)
     nombre_archivo = db.Column(db.String(255), nullable=False)
     tipo_archivo = db.Column(db.String(50), nullable=False)
     tamano_archivo = db.Column(db.Integer, nullable=False)
@@ -938,9 +926,18 @@ class ActividadProyecto(db.Model, TimestampMixin):
     dias_corridos = db.Column(db.Integer, nullable=True)  # Días corridos
     
     # Dependencias y recursos
+    id_gantt = db.Column(db.Integer, nullable=True)  # Id de la fila en el archivo Gantt (el que citan las predecesoras)
     predecesoras = db.Column(db.Text, nullable=True)  # Actividades predecesoras
     recursos = db.Column(db.Text, nullable=True)  # Recursos asignados
     
+    # Ruta crítica (ruta_critica_service, a partir de fechas y predecesoras)
+    inicio_temprano = db.Column(db.Date, nullable=True)
+    fin_temprano = db.Column(db.Date, nullable=True)
+    inicio_tardio = db.Column(db.Date, nullable=True)
+    fin_tardio = db.Column(db.Date, nullable=True)
+    holgura_total = db.Column(db.Integer, nullable=True)  # Días que puede atrasarse sin mover el fin del proyecto
+    es_critica = db.Column(db.Boolean, default=False, nullable=False)
+    
     # Progreso
     progreso = db.Column(db.Numeric(5,2), default=0.00, nullable=False)  # Progreso en % (registrado)
     porcentaje_avance_validado = db.Column(db.Numeric(5,2), default=0.00, nullable=False)  # Progreso validado por supervisor
@@ -973,6 +970,8 @@ class ActividadProyecto(db.Model, TimestampMixin):
             'predecesoras': self.predecesoras,
             'recursos': self.recursos,
             'progreso': float(self.progreso) if self.progreso else 0.0,
+            'holgura_total': self.holgura_total,
+            'es_critica': self.es_critica,
             'datos_adicionales': self.datos_adicionales
         }
 
@@ -1053,9 +1052,24 @@ class Grupo(db.Model, TimestampMixin):
         return f'<Grupo {self.nombre}>'
 
 
+# Estados de validación de HistorialAvanceActividad
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_VALIDADO = 'validado'
+ESTADO_RECHAZADO = 'rechazado'
+ESTADOS_VALIDACION = (ESTADO_PENDIENTE, ESTADO_VALIDADO, ESTADO_RECHAZADO)
+
+
 class HistorialAvanceActividad(db.Model):
     """Modelo para guardar historial de cambios en avances de actividades"""
     __tablename__ = 'historial_avance_actividad'
+    __table_args__ = (
+        # Paginación por cursor de /validar-avances: ORDER BY fecha_cambio DESC, id DESC
+        Index('idx_historial_avance_fecha', 'fecha_cambio', 'id'),
+        Index('idx_historial_avance_req_fecha', 'requerimiento_id', 'fecha_cambio', 'id'),
+        Index('idx_historial_avance_trab_fecha', 'trabajador_id', 'fecha_cambio', 'id'),
+        # Estadísticas (GROUP BY estado_validacion) y listado filtrado por estado
+        Index('idx_historial_avance_estado_fecha', 'estado_validacion', 'fecha_cambio', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     requerimiento_id = db.Column(db.Integer, db.ForeignKey('requerimiento.id'), nullable=False)
@@ -1079,6 +1093,10 @@ class HistorialAvanceActividad(db.Model):
     validado_por_id = db.Column(db.Integer, db.ForeignKey('trabajador.id'), nullable=True)  # Supervisor que validó
     fecha_validacion = db.Column(db.DateTime, nullable=True)  # Fecha de validación
     comentario_validacion = db.Column(db.Text)  # Comentarios del supervisor al validar
+    estado_validacion = db.Column(
+        db.Enum(*ESTADOS_VALIDACION, name='estado_validacion'),
+        default=ESTADO_PENDIENTE, nullable=False
+    )  # pendiente / validado / rechazado (validado=True cubre validado y rechazado)
     
     # Relaciones
     requerimiento = db.relationship('Requerimiento')
@@ -1106,7 +1124,8 @@ class HistorialAvanceActividad(db.Model):
             'validado_por_id': self.validado_por_id,
             'validado_por_nombre': self.validado_por.nombre if self.validado_por else None,
             'fecha_validacion': self.fecha_validacion.isoformat() if self.fecha_validacion else None,
-            'comentario_validacion': self.comentario_validacion
+            'comentario_validacion': self.comentario_validacion,
+            'estado_validacion': self.estado_validacion
         }
     
     def __repr__(self):
@@ -1422,6 +1441,256 @@ class MenuConfiguration(db.Model, TimestampMixin):
         return config
 
 
+class CacheVersion(db.Model):
+    """
+    Contadores de versión compartidos entre procesos para invalidar caches locales.
+    Cada worker compara la versión guardada aquí con la de su cache y reconstruye
+    si cambió (p. ej. 'permisos' para el menú).
+    """
+    __tablename__ = 'cache_version'
+    
+    nombre = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<CacheVersion {self.nombre}={self.version}>'
+    
+    @classmethod
+    def obtener(cls, nombre):
+        """Versión actual del contador (0 si aún no existe)"""
+        version = db.session.execute(
+            db.select(cls.version).where(cls.nombre == nombre)
+        ).scalar()
+        return version or 0
+    
+    @classmethod
+    def incrementar(cls, nombre, connection=None):
+        """
+        Incrementar el contador dentro de la transacción en curso (sin commit).
+        Acepta una conexión explícita para usarse desde eventos de flush.
+        """
+        ejecutar = connection.execute if connection is not None else db.session.execute
+        tabla = cls.__table__
+        resultado = ejecutar(
+            tabla.update().where(tabla.c.nombre == nombre).values(version=tabla.c.version + 1)
+        )
+        if resultado.rowcount == 0:
+            ejecutar(tabla.insert().values(nombre=nombre, version=1))
+
+
+# Modelos cuya escritura invalida el menú y los permisos cacheados
+MODELOS_PERMISOS = (Category, Page, PagePermission, CustomRole, MenuConfiguration)
+VERSION_PERMISOS = 'permisos'
+# Escrituras de historial de avances invalidan las estadísticas de validación
+VERSION_VALIDACION = 'validacion'
+
+
+@event.listens_for(Session, 'after_flush')
+def _incrementar_version_permisos(session, flush_context):
+    """Cualquier flush que toque permisos o menú incrementa la versión en la misma transacción"""
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instancia, MODELOS_PERMISOS):
+            CacheVersion.incrementar(VERSION_PERMISOS, connection=session.connection())
+            return
+
+
+@event.listens_for(Session, 'after_flush')
+def _incrementar_version_validacion(session, flush_context):
+    """Reportar, validar, corregir o rechazar avances invalida las estadísticas cacheadas"""
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instancia, HistorialAvanceActividad):
+            CacheVersion.incrementar(VERSION_VALIDACION, connection=session.connection())
+            return
+
+
+class ResumenProyecto(db.Model):
+    """
+    Resumen materializado del cronograma de cada proyecto (api_resumen_proyectos).
+    Lo calcula resumen_proyectos_service; las escrituras de actividades o avances
+    lo marcan como no vigente y se recalcula en la siguiente lectura. El progreso
+    esperado depende del día: fecha_calculo distinta de hoy también lo invalida.
+    """
+    __tablename__ = 'resumen_proyecto'
+    __table_args__ = (
+        Index('idx_resumen_proyecto_vigente', 'vigente', 'fecha_calculo'),
+    )
+
+    requerimiento_id = db.Column(db.Integer, db.ForeignKey('requerimiento.id', ondelete='CASCADE'), primary_key=True)
+    total_actividades = db.Column(db.Integer, default=0, nullable=False)
+    actividades_en_fecha = db.Column(db.Integer, default=0, nullable=False)
+    actividades_atrasadas = db.Column(db.Integer, default=0, nullable=False)
+    actividades_terminadas = db.Column(db.Integer, default=0, nullable=False)
+    actividades_no_iniciadas = db.Column(db.Integer, default=0, nullable=False)
+    progreso_ponderado = db.Column(db.Float, default=0.0, nullable=False)  # Hojas ponderadas por duración
+    progreso_esperado = db.Column(db.Float, default=0.0, nullable=False)  # Ídem, según fechas a fecha_calculo
+    actividades_criticas = db.Column(db.Integer, default=0, nullable=False)
+    criticas_atrasadas = db.Column(db.Integer, default=0, nullable=False)
+    fecha_calculo = db.Column(db.Date, nullable=False)  # Día usado para el progreso esperado
+    vigente = db.Column(db.Boolean, default=True, nullable=False)
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ResumenProyecto {self.requerimiento_id}>'
+
+    @classmethod
+    def marcar_desactualizados(cls, requerimiento_ids, connection=None):
+        """
+        Marcar como no vigente el resumen de los proyectos (sin commit).
+        Acepta una conexión explícita para usarse desde eventos de flush.
+        """
+        requerimiento_ids = [rid for rid in set(requerimiento_ids) if rid is not None]
+        if not requerimiento_ids:
+            return
+        ejecutar = connection.execute if connection is not None else db.session.execute
+        tabla = cls.__table__
+        ejecutar(
+            tabla.update().where(tabla.c.requerimiento_id.in_(requerimiento_ids)).values(vigente=False)
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_resumen_proyectos(session, flush_context):
+    """Escrituras ORM de actividades o avances dejan desactualizado el resumen de su proyecto"""
+    requerimiento_ids = {
+        instancia.requerimiento_id for instancia in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instancia, (ActividadProyecto, AvanceActividad))
+    }
+    if requerimiento_ids:
+        ResumenProyecto.marcar_desactualizados(requerimiento_ids, connection=session.connection())
+
+
+class CronogramaProyecto(db.Model):
+    """
+    Estado del cálculo de ruta crítica de cada proyecto. Los resultados por
+    actividad (fechas tempranas/tardías, holgura, es_critica) viven en
+    actividad_proyecto; esta fila dice si siguen vigentes. Solo los cambios de
+    fechas o vínculos (CAMPOS) la invalidan; el progreso no mueve la red.
+    """
+    __tablename__ = 'cronograma_proyecto'
+
+    # Columnas de actividad_proyecto que alimentan la red de precedencias
+    CAMPOS = ('edt', 'fecha_inicio', 'fecha_fin', 'duracion', 'predecesoras', 'id_gantt', 'activo')
+
+    requerimiento_id = db.Column(db.Integer, db.ForeignKey('requerimiento.id', ondelete='CASCADE'), primary_key=True)
+    inicio = db.Column(db.Date, nullable=True)  # Inicio temprano del proyecto
+    fin = db.Column(db.Date, nullable=True)  # Fin temprano del proyecto
+    actividades_criticas = db.Column(db.Integer, default=0, nullable=False)
+    enlaces = db.Column(db.Integer, default=0, nullable=False)  # Vínculos usados en la red
+    enlaces_invalidos = db.Column(db.Integer, default=0, nullable=False)  # Referencias ilegibles o inexistentes
+    enlaces_en_ciclo = db.Column(db.Integer, default=0, nullable=False)  # Ignorados para romper ciclos
+    vigente = db.Column(db.Boolean, default=True, nullable=False)
+    calculado_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<CronogramaProyecto {self.requerimiento_id}>'
+
+    @classmethod
+    def marcar_desactualizados(cls, requerimiento_ids, connection=None):
+        """
+        Marcar como no vigente la ruta crítica de los proyectos (sin commit).
+        Acepta una conexión explícita para usarse desde eventos de flush.
+        """
+        requerimiento_ids = [rid for rid in set(requerimiento_ids) if rid is not None]
+        if not requerimiento_ids:
+            return
+        ejecutar = connection.execute if connection is not None else db.session.execute
+        tabla = cls.__table__
+        ejecutar(
+            tabla.update().where(tabla.c.requerimiento_id.in_(requerimiento_ids)).values(vigente=False)
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_cronograma_proyectos(session, flush_context):
+    """Altas, bajas o cambios de fechas/vínculos de actividades invalidan la ruta crítica del proyecto"""
+    requerimiento_ids = {
+        instancia.requerimiento_id for instancia in (*session.new, *session.deleted)
+        if isinstance(instancia, ActividadProyecto)
+    }
+    for instancia in session.dirty:
+        if isinstance(instancia, ActividadProyecto) and instancia.requerimiento_id not in requerimiento_ids:
+            atributos = inspect(instancia).attrs
+            if any(atributos[campo].history.has_changes() for campo in CronogramaProyecto.CAMPOS):
+                requerimiento_ids.add(instancia.requerimiento_id)
+    if requerimiento_ids:
+        CronogramaProyecto.marcar_desactualizados(requerimiento_ids, connection=session.connection())
+
+
+# Estados de las tareas en segundo plano
+TAREA_PENDIENTE = 'pendiente'
+TAREA_EN_CURSO = 'en_curso'
+TAREA_COMPLETADA = 'completada'
+TAREA_FALLIDA = 'fallida'
+TAREA_CANCELADA = 'cancelada'
+ESTADOS_TAREA = (TAREA_PENDIENTE, TAREA_EN_CURSO, TAREA_COMPLETADA, TAREA_FALLIDA, TAREA_CANCELADA)
+ESTADOS_TAREA_FINALES = (TAREA_COMPLETADA, TAREA_FALLIDA, TAREA_CANCELADA)
+
+
+class TareaSegundoPlano(db.Model):
+    """
+    Cola persistente de operaciones largas (Carta Gantt, importación de control,
+    backups y restauraciones). La ejecuta el worker (``python manage.py worker``); el
+    progreso vive en la fila, así se consulta desde cualquier proceso.
+    Ver app/services/tareas_service.py.
+    """
+    __tablename__ = 'tarea_segundo_plano'
+    __table_args__ = (
+        # Reclamo del worker: pendientes disponibles en orden de llegada
+        Index('idx_tarea_estado_disponible', 'estado', 'disponible_desde', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    estado = db.Column(db.Enum(*ESTADOS_TAREA, name='estado_tarea'), default=TAREA_PENDIENTE, nullable=False)
+    parametros = db.Column(db.JSON, nullable=True)
+    resultado = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # Progreso informado por el handler
+    progreso = db.Column(db.Integer, default=0, nullable=False)
+    mensaje = db.Column(db.String(255), nullable=True)
+    detalles = db.Column(db.JSON, nullable=True)
+
+    # Reintentos, cancelación y reclamo
+    intentos = db.Column(db.Integer, default=0, nullable=False)
+    max_intentos = db.Column(db.Integer, default=3, nullable=False)
+    cancelacion_solicitada = db.Column(db.Boolean, default=False, nullable=False)
+    disponible_desde = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    worker = db.Column(db.String(100), nullable=True)
+    latido = db.Column(db.DateTime, nullable=True)  # Última señal del worker que la ejecuta
+
+    creado_por_id = db.Column(db.Integer, db.ForeignKey('trabajador.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    iniciado_en = db.Column(db.DateTime, nullable=True)
+    finalizado_en = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<TareaSegundoPlano {self.id} {self.tipo} {self.estado}>'
+
+    @property
+    def finalizada(self):
+        return self.estado in ESTADOS_TAREA_FINALES
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'finalizada': self.finalizada,
+            'progreso': self.progreso,
+            'mensaje': self.mensaje,
+            'detalles': self.detalles or {},
+            'resultado': self.resultado,
+            'error': self.error,
+            'intentos': self.intentos,
+            'max_intentos': self.max_intentos,
+            'cancelacion_solicitada': self.cancelacion_solicitada,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'iniciado_en': self.iniciado_en.isoformat() if self.iniciado_en else None,
+            'finalizado_en': self.finalizado_en.isoformat() if self.finalizado_en else None
+        }
+
+
 # Modelo para gestión de asignaciones de administradores a recintos específicos
 class AdministradorRecinto(db.Model):
     """
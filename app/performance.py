@@ -1,17 +1,24 @@
 """
 Sistema de Caching y Optimización de Performance
-Redis + Memory Cache + Database Query Optimization
+Redis + Memory Cache + Database Query Optimization + Perfil SQL por request
 """
-import redis
 import json
 import pickle
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
 from datetime import datetime, timedelta
 import time
 import hashlib
 from flask import current_app, request, g
+from sqlalchemy import event
 import logging
 
+try:
+    import redis
+except ImportError:  # Redis es opcional: CacheManager usa el cache en memoria
+    redis = None
+
 logger = logging.getLogger(__name__)
 
 class CacheManager:
@@ -36,6 +43,9 @@ class CacheManager:
         self.app = app
         
         # Configurar Redis si está disponible
+        if redis is None:
+            logger.info("Paquete redis no instalado, usando cache en memoria")
+            return
         redis_url = app.config.get('REDIS_URL', 'redis://localhost:6379/0')
         try:
             self.redis_client = redis.from_url(redis_url, decode_responses=True)
@@ -298,13 +308,120 @@ def monitor_query_performance(func):
         return result
     return wrapper
 
+# ---------------------------------------------------------------------------
+# Perfil SQL por request: cantidad de consultas, tiempo en BD y sentencias
+# repetidas (firma típica de un N+1)
+# ---------------------------------------------------------------------------
+
+UMBRAL_REPETICIONES = 5  # Misma sentencia N veces en un request = sospecha de N+1
+
+_perfil_actual = ContextVar('perfil_sql', default=None)
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Un endpoint ejecutó más consultas que su presupuesto (modo estricto/tests)"""
+
+
+class PerfilSQL:
+    """Acumula las consultas ejecutadas mientras está activo"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.firmas = {}  # sentencia -> [veces, segundos]
+
+    def registrar(self, sentencia, duracion):
+        self.consultas += 1
+        self.tiempo_db += duracion
+        firma = self.firmas.setdefault(sentencia, [0, 0.0])
+        firma[0] += 1
+        firma[1] += duracion
+
+    def repetidas(self, umbral=UMBRAL_REPETICIONES):
+        """Sentencias idénticas ejecutadas al menos `umbral` veces, de más a menos"""
+        return [
+            {'sentencia': ' '.join(sentencia.split())[:200], 'veces': veces, 'ms': round(segundos * 1000, 2)}
+            for sentencia, (veces, segundos) in sorted(self.firmas.items(), key=lambda item: -item[1][0])
+            if veces >= umbral
+        ]
+
+    def server_timing(self, total=None):
+        """Valor del header Server-Timing (visible en las DevTools del navegador)"""
+        partes = [f'db;dur={self.tiempo_db * 1000:.1f};desc="{self.consultas} consultas"']
+        if total is not None:
+            partes.append(f'app;dur={total * 1000:.1f}')
+        return ', '.join(partes)
+
+
+@contextmanager
+def perfilar_consultas():
+    """Perfila las consultas del bloque (fuera de un request, p. ej. en tests o scripts)
+
+        with perfilar_consultas() as perfil:
+            ...
+        assert perfil.consultas <= 3
+    """
+    perfil = PerfilSQL()
+    token = _perfil_actual.set(perfil)
+    try:
+        yield perfil
+    finally:
+        _perfil_actual.reset(token)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _perfil_actual.get() is not None:
+        conn.info.setdefault('perfil_sql_inicio', []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    perfil = _perfil_actual.get()
+    inicios = conn.info.get('perfil_sql_inicio')
+    if perfil is None or not inicios:
+        return
+    perfil.registrar(statement, time.perf_counter() - inicios.pop())
+
+
+def instrumentar_engine(engine):
+    """Registra los listeners de perfil SQL en el engine (idempotente)"""
+    if not event.contains(engine, 'before_cursor_execute', _antes_de_ejecutar):
+        event.listen(engine, 'before_cursor_execute', _antes_de_ejecutar)
+        event.listen(engine, 'after_cursor_execute', _despues_de_ejecutar)
+
+
+def presupuesto_consultas(maximo):
+    """Declara el máximo de consultas SQL que puede ejecutar un endpoint
+
+    Se aplica bajo @route. Al excederse se registra un warning; con
+    PRESUPUESTO_CONSULTAS_ESTRICTO (por defecto en modo testing) el request
+    falla con PresupuestoConsultasExcedido, así un N+1 nuevo rompe los tests.
+    """
+    def decorator(func):
+        func.presupuesto_consultas = maximo
+        return func
+    return decorator
+
+
+def _presupuesto_del_endpoint(app):
+    vista = app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(vista, 'presupuesto_consultas', None)
+
+
 def setup_performance_monitoring(app):
     """Configurar monitoreo de performance"""
-    
+    from app import db
+
+    with app.app_context():
+        instrumentar_engine(db.engine)
+
+    performance_logger = logging.getLogger('performance')
+
     @app.before_request
     def before_request():
         g.request_start_time = time.time()
         g.current_user_id = getattr(request, 'current_user_id', 'anonymous')
+        g.perfil_sql = PerfilSQL()
+        _perfil_actual.set(g.perfil_sql)
     
     @app.after_request
     def after_request(response):
@@ -318,8 +435,46 @@ def setup_performance_monitoring(app):
             
             # Agregar header de tiempo
             response.headers['X-Response-Time'] = f"{total_time:.3f}s"
+
+            perfil = g.get('perfil_sql')
+            if perfil is not None:
+                response.headers['Server-Timing'] = perfil.server_timing(total_time)
+                repetidas = perfil.repetidas()
+                presupuesto = _presupuesto_del_endpoint(app)
+                excedido = presupuesto is not None and perfil.consultas > presupuesto
+
+                datos = {
+                    'endpoint': request.endpoint,
+                    'method': request.method,
+                    'status': response.status_code,
+                    'duracion_ms': round(total_time * 1000, 1),
+                    'consultas': perfil.consultas,
+                    'tiempo_db_ms': round(perfil.tiempo_db * 1000, 1),
+                    'presupuesto_consultas': presupuesto,
+                    'repetidas': repetidas[:3],
+                }
+                nivel = logging.WARNING if (repetidas or excedido) else logging.INFO
+                performance_logger.log(
+                    nivel,
+                    f"REQUEST_SQL: {request.endpoint} {perfil.consultas} consultas "
+                    f"{datos['tiempo_db_ms']}ms en BD",
+                    extra={'extra_data': datos}
+                )
+
+                if excedido:
+                    mensaje = (f"{request.endpoint} ejecutó {perfil.consultas} consultas "
+                               f"(presupuesto {presupuesto})")
+                    if repetidas:
+                        mensaje += f"; repetida {repetidas[0]['veces']} veces: {repetidas[0]['sentencia']}"
+                    if app.config.get('PRESUPUESTO_CONSULTAS_ESTRICTO', app.testing):
+                        raise PresupuestoConsultasExcedido(mensaje)
+                    logger.warning(mensaje)
         
         return response
+
+    @app.teardown_request
+    def teardown_request(exception=None):
+        _perfil_actual.set(None)
     
     # Endpoint para estadísticas de cache
     @app.route('/admin/cache-stats')
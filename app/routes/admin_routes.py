@@ -7,15 +7,18 @@ import json
 import gzip
 import zipfile
 import tempfile
+import threading
 import shutil
 import traceback
 import io
 import time
+import hashlib
 import pymysql
 import psutil
 from functools import wraps
 from app import db
-from app.models import UserRole
+from app.models import UserRole, TAREA_PENDIENTE, TAREA_FALLIDA, TAREA_CANCELADA
+from app.services.tareas_service import registrar_tarea, encolar, ultima_tarea, TareaFallida
 import logging
 
 # Configurar logging específico para backups
@@ -57,6 +60,11 @@ class BackupManager:
     
     def __init__(self):
         self.backup_dir = os.path.join(os.getcwd(), 'backups')
+        self.mysqldump_bin = os.environ.get('MYSQLDUMP_BIN', 'mysqldump')
+        self.chunk_size = 1024 * 1024        # Bytes leídos de mysqldump por iteración
+        self.compresslevel = 6               # Nivel gzip: 9 casi no reduce más y es mucho más lento
+        self.intervalo_progreso = 1.0        # Segundos entre actualizaciones del tracker
+        self.timeout_segundos = 3600
         self.ensure_backup_directory()
     
     def ensure_backup_directory(self):
@@ -97,8 +105,21 @@ class BackupManager:
         backup_logger.info(f"Nombre final del archivo: '{final_filename}'")
         return final_filename
     
-    def create_backup(self, backup_name=None, description=None, include_data=True, compress=True):
-        """Crear backup de la base de datos"""
+    def create_backup(self, backup_name=None, description=None, include_data=True, compress=True,
+                      tracker=None, usuario=None):
+        """
+        Crear backup de la base de datos (mysqldump en streaming hacia el archivo).
+        
+        Args:
+            tracker: tracker de progreso (p. ej. el contexto de la tarea en segundo plano)
+            usuario: {'id', 'nombre'} del autor; por defecto current_user
+        """
+        from app.services.backup_service import enhanced_backup_service, BackupProgressTracker
+        
+        tracker = tracker or BackupProgressTracker()
+        enhanced_backup_service.progress_tracker = tracker
+        tracker.update("Iniciando backup", 0)
+        
         try:
             db_config = self.get_db_config()
             filename = self.generate_backup_filename(backup_name, compress)
@@ -108,7 +129,7 @@ class BackupManager:
             
             # Preparar comando mysqldump
             cmd = [
-                'mysqldump',
+                self.mysqldump_bin,
                 f'--host={db_config["host"]}',
                 f'--port={db_config["port"]}',
                 f'--user={db_config["user"]}',
@@ -118,7 +139,9 @@ class BackupManager:
                 '--routines',
                 '--triggers',
                 '--lock-tables=false',   # Evitar bloqueos, sin timeout personalizado
-                '--no-tablespaces'       # Evitar error de privilegios de tablespaces
+                '--no-tablespaces',      # Evitar error de privilegios de tablespaces
+                # La cola de tareas es estado operativo: restaurar no debe pisarla
+                f'--ignore-table={db_config["database"]}.tarea_segundo_plano'
             ]
             
             if not include_data:
@@ -129,38 +152,10 @@ class BackupManager:
             backup_logger.info(f"Comando mysqldump: {' '.join(cmd).replace(db_config['password'], '***')}")
             backup_logger.info(f"Iniciando backup: {filename}")
             
-            # Ejecutar mysqldump con timeout
-            backup_logger.info("Ejecutando mysqldump...")
-            
-            # Ejecutar mysqldump y capturar la salida
-            process = subprocess.run(
-                cmd, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True,
-                timeout=300  # 5 minutos de timeout
-            )
-            
-            backup_logger.info(f"Proceso mysqldump terminado con código: {process.returncode}")
-            
-            if process.returncode != 0:
-                error_msg = process.stderr
-                backup_logger.error(f"Error en mysqldump: {error_msg}")
-                raise Exception(f"Error en mysqldump: {error_msg}")
-            
-            # Verificar que tenemos datos
-            if not process.stdout or len(process.stdout.strip()) == 0:
-                raise Exception("El mysqldump no produjo datos")
-                
-            backup_logger.info(f"Datos capturados: {len(process.stdout)} caracteres")
+            tamano_estimado = self._estimar_tamano_dump(db_config) if include_data else None
+            tracker.update("Ejecutando mysqldump", 1, archivo=filename, bytes_estimados=tamano_estimado)
             
-            # Escribir los datos al archivo
-            if compress:
-                with gzip.open(filepath, 'wt', encoding='utf-8') as f:
-                    f.write(process.stdout)
-            else:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(process.stdout)
+            estadisticas = self._volcar_dump_streaming(cmd, filepath, compress, tracker, tamano_estimado)
             
             # Verificar que el archivo se creó correctamente
             if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
@@ -173,15 +168,21 @@ class BackupManager:
                 'original_name': backup_name or filename,
                 'description': description,
                 'created_at': datetime.now().isoformat(),
-                'created_by': getattr(current_user, 'nombre', 'Sistema') if hasattr(current_user, 'nombre') else 'Sistema',
-                'user_id': getattr(current_user, 'id', None) if hasattr(current_user, 'id') else None,
+                'created_by': usuario['nombre'] if usuario else (getattr(current_user, 'nombre', 'Sistema') if hasattr(current_user, 'nombre') else 'Sistema'),
+                'user_id': usuario['id'] if usuario else (getattr(current_user, 'id', None) if hasattr(current_user, 'id') else None),
                 'size': os.path.getsize(filepath),
+                'uncompressed_size': estadisticas['bytes'],
+                'checksum_sha256': estadisticas['sha256'],
+                'tables': estadisticas['tablas'],
+                'insert_statements': estadisticas['inserts'],
+                'estimated_rows': estadisticas['filas_estimadas'],
                 'compressed': compress,
                 'include_data': include_data,
                 'status': 'success'
             }
             
             self.save_metadata(filename, metadata)
+            tracker.update("Backup completado exitosamente", 100, tamano_final=metadata['size'])
             
             backup_logger.info(f"Backup creado exitosamente: {filename} ({metadata['size']} bytes)")
             
@@ -189,11 +190,13 @@ class BackupManager:
                 'success': True,
                 'filename': filename,
                 'size': metadata['size'],
+                'checksum_sha256': metadata['checksum_sha256'],
                 'message': 'Backup creado exitosamente'
             }
             
         except Exception as e:
             backup_logger.error(f"Error creando backup: {str(e)}")
+            tracker.update(f"Error: {str(e)[:50]}", -1)
             
             # Limpiar archivo parcial si existe
             if 'filepath' in locals() and os.path.exists(filepath):
@@ -207,6 +210,142 @@ class BackupManager:
                 'message': f'Error al crear backup: {str(e)}'
             }
     
+    def _volcar_dump_streaming(self, cmd, filepath, compress, tracker, tamano_estimado=None):
+        """
+        Leer stdout de mysqldump por bloques y escribirlo (comprimido o no) a disco.
+        
+        La memoria usada es constante (un bloque + una cola de pocos bytes para
+        contar sentencias que quedan partidas entre bloques). El archivo se escribe
+        primero como .part y se renombra solo si mysqldump terminó bien.
+        
+        Un temporizador mata a mysqldump al cumplirse timeout_segundos aunque no
+        escriba nada (por ejemplo esperando un metadata lock), porque la lectura
+        de stdout queda bloqueada mientras no lleguen bytes.
+        
+        Returns:
+            dict: bytes, sha256, tablas, inserts y filas_estimadas del dump sin comprimir
+        """
+        archivo_parcial = filepath + '.part'
+        sha256 = hashlib.sha256()
+        total_bytes = 0
+        tablas = inserts = separadores_filas = 0
+        cola = b''
+        ultimo_reporte = time.time()
+        
+        # stderr a un archivo temporal: si se usara PIPE podría llenarse y bloquear a mysqldump
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+            vencido = threading.Event()
+            
+            def vencer():
+                vencido.set()
+                process.kill()
+            
+            watchdog = threading.Timer(self.timeout_segundos, vencer)
+            watchdog.daemon = True
+            watchdog.start()
+            try:
+                abrir = (lambda p: gzip.open(p, 'wb', compresslevel=self.compresslevel)) if compress else (lambda p: open(p, 'wb'))
+                with abrir(archivo_parcial) as destino:
+                    while True:
+                        bloque = process.stdout.read(self.chunk_size)
+                        if not bloque:
+                            break
+                        
+                        destino.write(bloque)
+                        sha256.update(bloque)
+                        total_bytes += len(bloque)
+                        
+                        # Contadores sobre cola + bloque para no perder marcadores partidos;
+                        # lo que cabe entero en la cola ya se contó en la vuelta anterior
+                        ventana = cola + bloque
+                        tablas += ventana.count(b'\nCREATE TABLE ') - cola.count(b'\nCREATE TABLE ')
+                        inserts += ventana.count(b'\nINSERT INTO ') - cola.count(b'\nINSERT INTO ')
+                        separadores_filas += ventana.count(b'),(') - cola.count(b'),(')
+                        cola = ventana[-(len(b'\nCREATE TABLE ') - 1):]
+                        
+                        ahora = time.time()
+                        if ahora - ultimo_reporte >= self.intervalo_progreso:
+                            ultimo_reporte = ahora
+                            tracker.update(
+                                "Volcando base de datos",
+                                self._porcentaje_dump(total_bytes, tamano_estimado),
+                                bytes_leidos=total_bytes,
+                                tablas=tablas,
+                                inserts=inserts
+                            )
+                
+                if vencido.is_set():
+                    raise Exception(f"mysqldump excedió el tiempo máximo ({self.timeout_segundos}s)")
+                returncode = process.wait(timeout=60)
+            except BaseException:
+                process.kill()
+                process.wait()
+                if os.path.exists(archivo_parcial):
+                    os.remove(archivo_parcial)
+                raise
+            finally:
+                watchdog.cancel()
+                process.stdout.close()
+            
+            backup_logger.info(f"Proceso mysqldump terminado con código: {returncode}")
+            
+            if returncode != 0:
+                stderr_file.seek(0)
+                error_msg = stderr_file.read().decode('utf-8', errors='replace')
+                os.remove(archivo_parcial)
+                backup_logger.error(f"Error en mysqldump: {error_msg}")
+                raise Exception(f"Error en mysqldump: {error_msg}")
+        
+        # Verificar que tenemos datos
+        if total_bytes == 0:
+            os.remove(archivo_parcial)
+            raise Exception("El mysqldump no produjo datos")
+        
+        os.replace(archivo_parcial, filepath)
+        backup_logger.info(f"Datos volcados: {total_bytes} bytes, {tablas} tablas, {inserts} INSERT")
+        
+        return {
+            'bytes': total_bytes,
+            'sha256': sha256.hexdigest(),
+            'tablas': tablas,
+            'inserts': inserts,
+            'filas_estimadas': inserts + separadores_filas
+        }
+    
+    @staticmethod
+    def _porcentaje_dump(bytes_leidos, tamano_estimado):
+        """Progreso del volcado: 1-95% según el tamaño estimado (el resto es cierre y metadata)"""
+        if not tamano_estimado:
+            return 50
+        return max(1, min(95, int(bytes_leidos * 95 / tamano_estimado)))
+    
+    def _estimar_tamano_dump(self, db_config):
+        """Estimar bytes del dump desde information_schema (None si no se puede consultar)"""
+        try:
+            connection = pymysql.connect(
+                host=db_config['host'],
+                port=db_config['port'],
+                user=db_config['user'],
+                password=db_config['password'],
+                database=db_config['database'],
+                connect_timeout=5
+            )
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COALESCE(SUM(data_length), 0) FROM information_schema.tables "
+                        "WHERE table_schema = %s",
+                        (db_config['database'],)
+                    )
+                    tamano = int(cursor.fetchone()[0] or 0)
+            finally:
+                connection.close()
+            return tamano or None
+        except Exception as e:
+            backup_logger.warning(f"No se pudo estimar el tamaño del dump: {str(e)}")
+            return None
+    
     def restore_backup(self, file_source, is_upload=False, db_config=None):
         """Restaurar backup desde archivo"""
         try:
@@ -800,6 +939,45 @@ class BackupManager:
 backup_manager = BackupManager()
 
 
+# Tareas en segundo plano (las ejecuta el worker; ver app/services/tareas_service.py).
+# Un backup o una restauración a medias no se reintenta: max_intentos=1.
+TAREAS_BACKUP = ('backup_crear', 'backup_restaurar')
+
+
+@registrar_tarea('backup_crear', max_intentos=1)
+def tarea_crear_backup(contexto, backup_name=None, description=None, include_data=True, compress=True,
+                       usuario=None):
+    """Crea el backup en el worker; el contexto hace de tracker de progreso"""
+    resultado = backup_manager.create_backup(
+        backup_name=backup_name, description=description, include_data=include_data,
+        compress=compress, tracker=contexto, usuario=usuario
+    )
+    contexto.comprobar_cancelacion()
+    if not resultado['success']:
+        raise TareaFallida(resultado['message'])
+    return resultado
+
+
+@registrar_tarea('backup_restaurar', max_intentos=1)
+def tarea_restaurar_backup(contexto, filename, clean_database=False):
+    """Restaura un backup del servidor en el worker"""
+    from app.services.backup_service import enhanced_backup_service
+    
+    contexto.progreso(0, 'Restauración en curso', forzar=True)
+    # Desde aquí la base ya se modifica: cancelar dejaría una restauración parcial
+    contexto.cancelable = False
+    resultado = enhanced_backup_service.restore_backup_enhanced(
+        filename,
+        is_upload=False,
+        db_config=backup_manager.get_db_config(),
+        clean_database=clean_database,
+        progress_tracker=contexto
+    )
+    if not resultado.get('success'):
+        raise TareaFallida(resultado.get('message', 'Error en restauración'))
+    return resultado
+
+
 @admin_bp.route('/backup')
 @admin_bp.route('/gestion_backup')  # Ruta alternativa para compatibilidad
 @login_required
@@ -875,15 +1053,21 @@ def create_backup():
         db_config = backup_manager.get_db_config()
         backup_logger.info(f"Configuración DB: {db_config}")
         
-        result = backup_manager.create_backup(
-            backup_name=backup_name if backup_name else None,
-            description=description if description else None,
-            include_data=include_data,
-            compress=compress
-        )
+        # El backup lo crea el worker; el frontend sigue la tarea en /tareas/<id>
+        tarea_id = encolar('backup_crear', {
+            'backup_name': backup_name if backup_name else None,
+            'description': description if description else None,
+            'include_data': include_data,
+            'compress': compress,
+            'usuario': {'id': current_user.id, 'nombre': current_user.nombre}
+        }, creado_por_id=current_user.id)
         
-        backup_logger.info(f"Resultado backup: {result}")
-        return jsonify(result)
+        backup_logger.info(f"Backup encolado como tarea {tarea_id}")
+        return jsonify({
+            'success': True,
+            'tarea_id': tarea_id,
+            'message': 'Backup en cola'
+        }), 202
         
     except Exception as e:
         backup_logger.error(f"Error en create_backup endpoint: {str(e)}")
@@ -948,54 +1132,18 @@ def restore_backup_file():
         backup_logger.info(f"📁 Iniciando restauración de archivo: {filename}")
         backup_logger.info(f"🧹 Limpieza de base de datos: {'SÍ' if clean_database else 'NO'}")
         
-        # Importar el servicio mejorado
-        from app.services.backup_service import enhanced_backup_service
-        
-        # Configurar timeout en la respuesta
-        from threading import Thread
-        import queue
-        import time
-        
-        # Crear cola para resultado
-        result_queue = queue.Queue()
+        # La restauración la ejecuta el worker; el frontend consulta /admin/backup/progress
+        tarea_id = encolar('backup_restaurar', {
+            'filename': filename,
+            'clean_database': clean_database
+        }, creado_por_id=current_user.id)
         
-        # Obtener configuración ANTES del hilo para evitar problemas de contexto
-        db_config = backup_manager.get_db_config()
+        backup_logger.info(f"🧵 Restauración encolada como tarea {tarea_id}")
         
-        def enhanced_restore_task():
-            """Tarea de restauración con servicio mejorado"""
-            try:
-                backup_logger.info(f"🔧 Iniciando tarea de restauración MEJORADA para: {filename}")
-                
-                # Usar el servicio mejorado con opción de limpieza
-                result = enhanced_backup_service.restore_backup_enhanced(
-                    filename, 
-                    is_upload=False, 
-                    db_config=db_config,
-                    clean_database=clean_database
-                )
-                
-                backup_logger.info(f"✅ Tarea de restauración MEJORADA completada: {result}")
-                result_queue.put(('success', result))
-                
-            except Exception as e:
-                backup_logger.error(f"💥 Error en tarea de restauración MEJORADA: {str(e)}")
-                backup_logger.error(f"📍 Traceback: {traceback.format_exc()}")
-                result_queue.put(('error', str(e)))
-        
-        # Ejecutar en hilo separado con servicio mejorado
-        thread = Thread(target=enhanced_restore_task, name=f"BackupRestore-{filename}")
-        thread.daemon = True
-        thread.start()
-        
-        backup_logger.info(f"🧵 Hilo de restauración iniciado: {thread.name}")
-        
-        # FIX #10: Devolver respuesta INMEDIATAMENTE para que el frontend inicie polling
-        # El frontend consultará el progreso con /admin/backup/progress
         return jsonify({
             'success': True,
             'message': 'Restauración iniciada en segundo plano',
-            'thread_name': thread.name,
+            'tarea_id': tarea_id,
             'filename': filename
         })
         
@@ -1012,13 +1160,15 @@ def restore_backup_file():
 @login_required
 @admin_required
 def get_backup_progress():
-    """Endpoint para obtener progreso en tiempo real de operaciones de backup"""
+    """
+    Endpoint para obtener progreso en tiempo real de operaciones de backup.
+    Lee la última tarea de backup/restauración, así refleja el progreso del
+    worker aunque corra en otro proceso.
+    """
     try:
-        from app.services.backup_service import enhanced_backup_service
-        
-        tracker = enhanced_backup_service.progress_tracker
+        tarea = ultima_tarea(TAREAS_BACKUP)
         
-        if tracker is None:
+        if tarea is None:
             return jsonify({
                 'success': True,
                 'progress': {
@@ -1031,20 +1181,28 @@ def get_backup_progress():
                 }
             })
         
-        # Calcular tiempo transcurrido
-        elapsed_time = time.time() - tracker.start_time
-        last_update_ago = time.time() - tracker.last_update
+        # Tiempos desde que el worker la tomó (o desde que se encoló, si sigue en cola)
+        ahora = datetime.utcnow()
+        inicio = tarea.iniciado_en or tarea.created_at
+        fin = tarea.finalizado_en or ahora
+        ultima = tarea.latido or tarea.finalizado_en or tarea.created_at
         
-        # Determinar si hay operación activa
-        is_active = last_update_ago < 30  # Activo si última actualización fue hace menos de 30s
+        if tarea.estado == TAREA_PENDIENTE:
+            operacion = 'En cola, esperando al worker'
+        elif tarea.estado in (TAREA_FALLIDA, TAREA_CANCELADA):
+            operacion = tarea.mensaje or f'Error: {tarea.error}'
+        else:
+            operacion = tarea.mensaje or 'Procesando'
         
         progress_data = {
-            'current_operation': tracker.current_operation,
-            'progress_percent': tracker.progress_percent,
-            'elapsed_time': f"{elapsed_time:.1f}s",
-            'last_update_ago': f"{last_update_ago:.1f}s",
-            'details': tracker.details,
-            'is_active': is_active
+            'current_operation': operacion,
+            'progress_percent': tarea.progreso,
+            'elapsed_time': f"{(fin - inicio).total_seconds():.1f}s",
+            'last_update_ago': f"{(ahora - ultima).total_seconds():.1f}s",
+            'details': tarea.detalles or {},
+            'is_active': not tarea.finalizada,
+            'tarea_id': tarea.id,
+            'estado': tarea.estado
         }
         
         # Debug log
@@ -15,7 +15,6 @@ Características implementadas:
 
 import os
 import time
-import gzip
 import shutil
 import tempfile
 import zipfile
@@ -23,10 +22,12 @@ import traceback
 import logging
 import threading
 import queue
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
 import pymysql
 from flask_login import current_user
+from app.utils.sql_stream import LectorDumpSQL
 # import psutil  # Para monitoreo de sistema - comentado temporalmente
 
 # Configurar logger específico para backup
@@ -428,22 +429,15 @@ class EnhancedBackupManager:
             progress_start = 25 if clean_mode else 20
             self.progress_tracker.update("Leyendo archivo de backup", progress_start)
             
-            sql_content = self._read_backup_file(backup_file_path)
-            if not sql_content:
-                raise Exception("No se pudo leer el contenido del backup")
+            statements = self._abrir_lector_backup(backup_file_path)
             
-            self.progress_tracker.update("Analizando sentencias SQL", progress_start + 10)
+            self.progress_tracker.update("Ejecutando sentencias SQL", progress_start + 15)
             
-            # Procesar y ejecutar SQL
-            statements = self._parse_sql_statements(sql_content)
-            
-            self.progress_tracker.update(
-                "Ejecutando sentencias SQL", progress_start + 15,
-                total_statements=len(statements)
-            )
-            
-            # Ejecutar en batches
-            success = self._execute_sql_batches(connection, statements, batch_config)
+            # Ejecutar en batches a medida que se leen las sentencias
+            try:
+                success = self._execute_sql_batches(connection, statements, batch_config)
+            finally:
+                statements.cerrar()
             
             # Finalizar
             elapsed_time = time.time() - start_time
@@ -456,7 +450,7 @@ class EnhancedBackupManager:
                     'success': True,
                     'mode': 'complete_clean' if clean_mode else 'incremental',
                     'elapsed_time': f"{elapsed_time:.1f}s",
-                    'statements_executed': len(statements)
+                    'statements_executed': success['executed']
                 }
             else:
                 raise Exception("Error durante la ejecución de sentencias SQL")
@@ -564,7 +558,8 @@ class EnhancedBackupManager:
                 # 'trabajador' se maneja con limpieza selectiva más abajo
                 'custom_roles',         # Roles necesarios para autenticación
                 'pages',                # Páginas del sistema
-                'page_permissions'      # Permisos críticos
+                'page_permissions',     # Permisos críticos
+                'tarea_segundo_plano'   # Cola de tareas (incluye la restauración en curso)
             ]
             
             # TABLAS PROBLEMÁTICAS: Generan metadata locks persistentes que bloquean DROP TABLE
@@ -770,7 +765,8 @@ class EnhancedBackupManager:
             
             raise Exception(f"Error durante la limpieza de la base de datos: {e}")
 
-    def restore_backup_enhanced(self, file_source, is_upload=False, db_config=None, clean_database=False):
+    def restore_backup_enhanced(self, file_source, is_upload=False, db_config=None, clean_database=False,
+                                progress_tracker=None):
         """
         Restauración de backup mejorada con opción de limpieza completa
         ===============================================================
@@ -779,6 +775,7 @@ class EnhancedBackupManager:
             is_upload: Si es un archivo subido
             db_config: Configuración de DB
             clean_database: Si True, limpia toda la BD antes de restaurar
+            progress_tracker: Tracker a usar (p. ej. el contexto de la tarea en segundo plano)
         """
         start_time = time.time()
         temp_dir = None
@@ -786,7 +783,7 @@ class EnhancedBackupManager:
         
         try:
             # Inicializar tracker de progreso
-            self.progress_tracker = BackupProgressTracker()
+            self.progress_tracker = progress_tracker or BackupProgressTracker()
             self.progress_tracker.update("Iniciando restauración de backup", 0)
             
             # Configuración de DB
@@ -812,19 +809,15 @@ class EnhancedBackupManager:
             
             self.progress_tracker.update("Archivo procesado correctamente", 15)
             
-            # === FASE 2: LECTURA Y ANÁLISIS DEL CONTENIDO ===
-            logger.info("🔄 === FASE 2: ANÁLISIS DE CONTENIDO SQL ===")
-            backup_content = self._read_backup_content(sql_file_path)
+            # === FASE 2: LECTOR DE SENTENCIAS EN STREAMING ===
+            # Las sentencias se generan a medida que se ejecutan: el dump nunca
+            # se carga completo en memoria
+            logger.info("🔄 === FASE 2: PREPARANDO LECTURA EN STREAMING ===")
+            statements = self._abrir_lector_backup(sql_file_path)
             
-            self.progress_tracker.update("Contenido SQL leído", 25,
-                characters=len(backup_content))
-            
-            # === FASE 3: PARSING DE STATEMENTS SQL ===
-            logger.info("🔄 === FASE 3: PARSING DE STATEMENTS ===")
-            statements = self._parse_sql_statements(backup_content)
-            
-            self.progress_tracker.update("Statements SQL procesados", 35,
-                total_statements=len(statements))
+            self.progress_tracker.update("Lector SQL preparado", 25,
+                file_size=statements.tamano,
+                encoding=statements.encoding)
             
             # === FASE 4: CONEXIÓN Y CONFIGURACIÓN DE BD ===
             logger.info("🔄 === FASE 4: CONEXIÓN A BASE DE DATOS ===")
@@ -848,9 +841,12 @@ class EnhancedBackupManager:
             
             # === FASE 5: EJECUCIÓN OPTIMIZADA DE STATEMENTS ===
             logger.info("🔄 === FASE 5: EJECUCIÓN DE STATEMENTS ===")
-            execution_stats = self._execute_statements_optimized(
-                connection, statements, batch_config
-            )
+            try:
+                execution_stats = self._execute_statements_optimized(
+                    connection, statements, batch_config
+                )
+            finally:
+                statements.cerrar()
             
             progress_after_exec = 85 if clean_database else 90
             self.progress_tracker.update("Statements ejecutados", progress_after_exec,
@@ -969,10 +965,10 @@ class EnhancedBackupManager:
             file_source.seek(0)
             
             if header[:2] == b'\x1f\x8b':  # GZIP magic bytes (corregido)
-                logger.info("🗜️ Archivo GZIP detectado, descomprimiendo...")
-                with gzip.open(file_source, 'rt', encoding='utf-8') as gz_file:
-                    with open(temp_file, 'w', encoding='utf-8') as out_file:
-                        shutil.copyfileobj(gz_file, out_file)
+                # Se guarda comprimido: LectorDumpSQL descomprime en streaming
+                logger.info("🗜️ Archivo GZIP detectado")
+                temp_file += '.gz'
+                file_source.save(temp_file)
             elif file_source.filename.endswith('.zip'):
                 logger.info("📦 Archivo ZIP detectado, extrayendo...")
                 with zipfile.ZipFile(file_source, 'r') as zip_file:
@@ -998,148 +994,28 @@ class EnhancedBackupManager:
             with open(filepath, 'rb') as f:
                 header = f.read(2)
             
+            # El .gz se lee directamente (LectorDumpSQL descomprime en streaming)
             if header == b'\x1f\x8b':  # Corregido
                 logger.info("🗜️ Archivo comprimido detectado en servidor")
-                temp_dir = tempfile.mkdtemp(prefix='backup_restore_')
-                temp_file = os.path.join(temp_dir, 'restore_backup.sql')
-                
-                with gzip.open(filepath, 'rt', encoding='utf-8') as gz_file:
-                    with open(temp_file, 'w', encoding='utf-8') as out_file:
-                        shutil.copyfileobj(gz_file, out_file)
-                
-                return temp_file
             else:
                 logger.info("📄 Archivo SQL plano en servidor")
-                return filepath
+            return filepath
     
-    def _read_backup_file(self, backup_file_path):
+    def _abrir_lector_backup(self, sql_file_path):
         """
-        Alias para _read_backup_content para compatibilidad
+        Lector en streaming de las sentencias del backup (.sql o .sql.gz).
+        Envuelve el contenido con la configuración de Foreign Keys.
         """
-        return self._read_backup_content(backup_file_path)
-    
-    def _read_backup_content(self, sql_file_path):
-        """Leer contenido del backup con detección automática de encoding"""
-        logger.info(f"📖 Leyendo contenido del archivo: {sql_file_path}")
-        
-        # Detectar encoding
-        with open(sql_file_path, 'rb') as f:
-            raw_start = f.read(4)
-        
-        encoding = 'utf-8'
-        if raw_start[:2] == b'\xff\xfe':
-            encoding = 'utf-16-le'
-            logger.info("🔤 Encoding UTF-16 LE detectado")
-        elif raw_start[:2] == b'\xfe\xff':
-            encoding = 'utf-16-be' 
-            logger.info("🔤 Encoding UTF-16 BE detectado")
-        elif raw_start[:3] == b'\xef\xbb\xbf':
-            encoding = 'utf-8-sig'
-            logger.info("🔤 Encoding UTF-8 con BOM detectado")
-        
-        # Leer contenido
-        with open(sql_file_path, 'r', encoding=encoding) as f:
-            content = f.read()
+        logger.info(f"📖 Abriendo backup en streaming: {sql_file_path}")
         
-        # Remover BOM si está presente
-        if content.startswith('\ufeff'):
-            content = content[1:]
-            logger.info("🧹 BOM Unicode removido")
+        lector = LectorDumpSQL(
+            sql_file_path,
+            prefijo=["SET FOREIGN_KEY_CHECKS=0", "SET autocommit=0"],
+            sufijo=["COMMIT", "SET FOREIGN_KEY_CHECKS=1"]
+        ).abrir()
         
-        # Envolver con configuración de Foreign Keys
-        wrapped_content = (
-            "SET FOREIGN_KEY_CHECKS=0;\n"
-            "SET autocommit=0;\n" +
-            content +
-            "\nCOMMIT;\n"
-            "SET FOREIGN_KEY_CHECKS=1;\n"
-        )
-        
-        logger.info(f"📊 Contenido leído: {len(content):,} caracteres | Encoding: {encoding}")
-        return wrapped_content
-    
-    def _parse_sql_statements(self, sql_content):
-        """Parser avanzado de statements SQL con manejo de comentarios y strings"""
-        logger.info("🔍 Iniciando parsing de statements SQL...")
-        
-        statements = []
-        current_statement = ''
-        in_string = False
-        string_char = ''
-        in_single_comment = False
-        in_multi_comment = False
-        
-        lines = sql_content.split('\n')  # Usar salto de línea real, no literal
-        total_lines = len(lines)
-        
-        for line_num, line in enumerate(lines, 1):
-            # Log progreso cada 1000 líneas
-            if line_num % 1000 == 0:
-                logger.info(f"📋 Procesando línea {line_num:,}/{total_lines:,} ({line_num/total_lines*100:.1f}%)")
-            
-            i = 0
-            while i < len(line):
-                char = line[i]
-                next_char = line[i+1] if i+1 < len(line) else ''
-                
-                # Manejo de comentarios de línea
-                if not in_string and char == '-' and next_char == '-':
-                    in_single_comment = True
-                    break
-                
-                # Manejo de comentarios multilínea
-                if not in_string and char == '/' and next_char == '*':
-                    in_multi_comment = True
-                    i += 2
-                    continue
-                    
-                if in_multi_comment and char == '*' and next_char == '/':
-                    in_multi_comment = False
-                    i += 2
-                    continue
-                
-                if in_multi_comment:
-                    i += 1
-                    continue
-                
-                # Manejo de strings
-                if not in_string and char in ('"', "'"):
-                    in_string = True
-                    string_char = char
-                elif in_string and char == string_char and (i == 0 or line[i-1] != '\\'):
-                    in_string = False
-                
-                # Detectar final de statement
-                if not in_string and not in_multi_comment and char == ';':
-                    stmt = current_statement.strip()
-                    if stmt and not stmt.upper().startswith('--'):
-                        statements.append(stmt)
-                    current_statement = ''
-                    i += 1
-                    continue
-                
-                current_statement += char
-                i += 1
-            
-            # Resetear comentario de línea al final de la línea
-            if in_single_comment:
-                in_single_comment = False
-            else:
-                current_statement += '\n'
-        
-        # Agregar último statement si existe
-        if current_statement.strip():
-            statements.append(current_statement.strip())
-        
-        # Filtrar statements vacíos y comentarios
-        filtered_statements = []
-        for stmt in statements:
-            stmt = stmt.strip()
-            if stmt and not stmt.startswith('--') and not stmt.startswith('/*'):
-                filtered_statements.append(stmt)
-        
-        logger.info(f"✅ Parsing completado: {len(filtered_statements):,} statements válidos de {len(statements):,} totales")
-        return filtered_statements
+        logger.info(f"📊 Archivo: {lector.tamano:,} bytes | Encoding: {lector.encoding}")
+        return lector
     
     def _recreate_db_connection(self):
         """Recrear conexión a la base de datos (helper para timeouts)"""
@@ -1206,23 +1082,29 @@ class EnhancedBackupManager:
         """
         import threading
         import time
-        total = len(statements)
+        # statements puede ser una lista o un LectorDumpSQL (generador en streaming)
+        total = len(statements) if hasattr(statements, '__len__') else None
+        iterador = iter(statements)
         batch_size = batch_config.get('batch_size', 5)
         executed = 0
         skipped = 0
         timeouts = 0
         retries_total = 0
         batch_count = 0
-        for i in range(0, total, batch_size):
+        connection_valid = True
+        i = 0
+        while True:
+            batch = list(islice(iterador, batch_size))
+            if not batch:
+                break
             batch_count += 1
-            batch = statements[i:i+batch_size]
             batch_executed = 0
             batch_skipped = 0
             for idx, stmt in enumerate(batch, start=i+1):
                 stmt_upper = stmt.strip().upper()
                 # Logging granular antes de ejecutar
                 stmt_preview = stmt[:120].replace('\n', ' ')
-                self.logger.info(f"🔧 BACKUP: 📝 Ejecutando statement {idx}/{total}: {stmt_preview}...")
+                self.logger.info(f"🔧 BACKUP: 📝 Ejecutando statement {idx}/{total or '?'}: {stmt_preview}...")
                 # Detectar LOCK/UNLOCK y DROP/CREATE TABLE
                 is_lock = stmt_upper.startswith('LOCK TABLES') or stmt_upper.startswith('UNLOCK TABLES')
                 is_drop_create = stmt_upper.startswith('DROP TABLE') or stmt_upper.startswith('CREATE TABLE')
@@ -1417,34 +1299,22 @@ class EnhancedBackupManager:
                         self.logger.info("🔄 Rollback aplicado")
                 except Exception as rb_error:
                     self.logger.error(f"💥 Error en rollback: {str(rb_error)}")
+            i += len(batch)
+            if total:
+                operation = f"Restaurando lote {batch_count}/{(total+batch_size-1)//batch_size}"
+                progress = int(100*i/total)
+            else:
+                operation = f"Restaurando lote {batch_count} ({i:,} statements)"
+                progress = int(100*getattr(statements, 'fraccion_leida', 0))
             self.progress_tracker.update(
-                operation=f"Restaurando lote {batch_count}/{(total+batch_size-1)//batch_size}",
-                progress=int(100*(i+batch_size)/total),
+                operation=operation,
+                progress=progress,
                 executed=executed,
                 skipped=skipped,
                 timeouts=timeouts,
                 retries=retries_total
             )
             time.sleep(1.0)
-            def _split_insert_statement(self, statement, max_rows=1000):
-                """
-                Divide un INSERT masivo en sub-statements con máximo max_rows por statement.
-                """
-                import re
-                match = re.search(r"VALUES", statement, re.IGNORECASE)
-                if not match:
-                    return [statement]
-                start = match.end()
-                prefix = statement[:start]
-                values = statement[start:]
-                rows = re.split(r"\),\s*\(", values[1:-1])  # Quita el primer '(' y el último ')'
-                sub_statements = []
-                for i in range(0, len(rows), max_rows):
-                    chunk = rows[i:i+max_rows]
-                    sub_values = "),(\n".join(chunk)
-                    sub_stmt = f"{prefix} ({sub_values})"
-                    sub_statements.append(sub_stmt)
-                return sub_statements
         self.progress_tracker.update(
             operation="Restauración completada",
             progress=100,
@@ -1458,10 +1328,30 @@ class EnhancedBackupManager:
             'executed': executed,
             'skipped': skipped,
             'batches': batch_count,
-            'success_rate': (executed / total * 100) if total > 0 else 0,
+            'success_rate': (executed / (executed + skipped) * 100) if executed + skipped > 0 else 0,
             'timeouts': timeouts,
             'retries': retries_total
         }
+    
+    def _split_insert_statement(self, statement, max_rows=1000):
+        """
+        Divide un INSERT masivo en sub-statements con máximo max_rows por statement.
+        """
+        import re
+        match = re.search(r"VALUES", statement, re.IGNORECASE)
+        if not match:
+            return [statement]
+        start = match.end()
+        prefix = statement[:start]
+        values = statement[start:].strip()
+        rows = re.split(r"\),\s*\(", values[1:-1])  # Quita el primer '(' y el último ')'
+        sub_statements = []
+        for i in range(0, len(rows), max_rows):
+            chunk = rows[i:i+max_rows]
+            sub_values = "),(\n".join(chunk)
+            sub_stmt = f"{prefix} ({sub_values})"
+            sub_statements.append(sub_stmt)
+        return sub_statements
 
 
 # Instancia global del servicio mejorado
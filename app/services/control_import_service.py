@@ -0,0 +1,467 @@
+"""
+Importación de archivos de control de actividades
+=================================================
+
+Procesa el XLSX de control (el mismo formato que exporta
+/exportar_actividades_xlsx) con un número fijo de consultas:
+
+1. Lee las filas en modo streaming (openpyxl ``read_only``) y las normaliza;
+   las fechas se convierten por columna con NormalizadorFechas.
+2. Resuelve todas las actividades del archivo con una consulta indexada
+   (por Id de actividad, o por EDT dentro del proyecto indicado).
+3. Calcula en memoria el diff campo a campo contra el estado actual.
+4. Aplica UPDATE, historial_control y avances nuevos con sentencias masivas
+   en una sola transacción (o solo devuelve el diff en modo simulación).
+"""
+
+import re
+import logging
+from datetime import datetime, date
+
+import openpyxl
+from sqlalchemy import select, bindparam, or_, and_
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, CronogramaProyecto, HistorialControl, ResumenProyecto, Trabajador
+from app.services.fechas_service import NormalizadorFechas
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_OBLIGATORIAS = ['EDT', 'Nombre de tarea', 'Comienzo', 'Fin']
+
+# Campos de actividad_proyecto que puede modificar el archivo de control
+CAMPOS_CONTROL = ('nombre_tarea', 'fecha_inicio', 'fecha_fin', 'duracion', 'progreso', 'recursos', 'predecesoras')
+
+# Cambios detallados incluidos en la respuesta (el total siempre se informa)
+MAX_CAMBIOS_RESPUESTA = 200
+
+_MAPEO_EXACTO = {
+    'id': 'Id',
+    'edt': 'EDT',
+    'nombre de tarea': 'Nombre de tarea',
+    'comienzo': 'Comienzo',
+    'fin': 'Fin',
+    'duración': 'Duración',
+    '% completado': '% completado',
+    'nombres de los recursos': 'Nombres de los recursos',
+    'predecesoras': 'Predecesoras',
+}
+
+
+def mapear_columnas_control(encabezados):
+    """
+    Índice de cada columna esperada: primero por coincidencia EXACTA del
+    encabezado y luego por búsqueda flexible de términos.
+
+    Returns:
+        dict: {columna: indice o None}
+    """
+    columnas = {
+        'Id': None,
+        'EDT': None,
+        'Nombre de tarea': None,
+        'Comienzo': None,
+        'Fin': None,
+        'Duración': None,
+        '% completado': None,
+        'Nombres de los recursos': None,
+        'Predecesoras': None,
+        'proyecto': None
+    }
+
+    for i, encabezado in enumerate(encabezados):
+        enc_lower = str(encabezado).lower().strip() if encabezado else ''
+        if enc_lower in _MAPEO_EXACTO:
+            columnas[_MAPEO_EXACTO[enc_lower]] = i
+
+    for i, encabezado in enumerate(encabezados):
+        if not encabezado:
+            continue
+        enc = str(encabezado).lower().strip()
+
+        if columnas['EDT'] is None:
+            if any(t in enc for t in ['edt', 'código', 'codigo', 'wbs']) and 'nombre' not in enc and 'recurso' not in enc and 'días' not in enc:
+                columnas['EDT'] = i
+
+        if columnas['Nombre de tarea'] is None:
+            if any(t in enc for t in ['nombre de tarea', 'nombre tarea', 'task name', 'actividad', 'tarea', 'activity']) and 'recursos' not in enc:
+                columnas['Nombre de tarea'] = i
+
+        if columnas['Comienzo'] is None:
+            if any(t in enc for t in ['comienzo', 'inicio', 'start', 'fecha inicio', 'fecha_inicio', 'begin']):
+                columnas['Comienzo'] = i
+
+        if columnas['Fin'] is None:
+            if any(t in enc for t in ['fin', 'end', 'finish', 'final', 'fecha fin', 'fecha_fin', 'término', 'termino']) and 'comienzo' not in enc:
+                columnas['Fin'] = i
+
+        # Evitar confusiones con "Días Corrido"
+        if columnas['Duración'] is None:
+            if any(t in enc for t in ['duración', 'duracion', 'duration']) and 'nombre' not in enc and 'corrido' not in enc:
+                columnas['Duración'] = i
+
+        if columnas['% completado'] is None:
+            if any(t in enc for t in ['% completado', 'completado', '% complete', 'progreso', 'progress', 'avance', 'porcentaje']) and 'nombre' not in enc and 'programado' not in enc:
+                columnas['% completado'] = i
+
+        if columnas['Nombres de los recursos'] is None:
+            if any(t in enc for t in ['nombres de', 'nombres de recursos', 'recursos', 'resource', 'assigned', 'asignado', 'responsable']) and 'tarea' not in enc:
+                columnas['Nombres de los recursos'] = i
+
+        if columnas['Predecesoras'] is None:
+            if any(t in enc for t in ['predecesoras', 'predecessors', 'dependencias', 'dependencies']):
+                columnas['Predecesoras'] = i
+
+        if columnas['proyecto'] is None:
+            if any(t in enc for t in ['proyecto', 'project', 'requerimiento']):
+                columnas['proyecto'] = i
+
+    return columnas
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    from app.controllers_main import parsear_fecha_espanol
+    return parsear_fecha_espanol(valor)
+
+
+def separar_recursos(recursos):
+    """Códigos de trabajador de un texto de recursos ('A; B' o 'A, B')"""
+    texto = str(recursos)
+    for separador in (';', ','):
+        if separador in texto:
+            partes = texto.split(separador)
+            break
+    else:
+        partes = [texto]
+    return [parte.strip() for parte in partes if parte.strip()]
+
+
+def _snapshot(estado):
+    """Estado de una actividad en el formato JSON del historial"""
+    return {
+        'edt': estado['edt'],
+        'nombre_tarea': estado['nombre_tarea'],
+        'fecha_inicio': estado['fecha_inicio'].isoformat() if estado['fecha_inicio'] else None,
+        'fecha_fin': estado['fecha_fin'].isoformat() if estado['fecha_fin'] else None,
+        'duracion': int(estado['duracion']) if estado['duracion'] else None,
+        'progreso': float(estado['progreso']) if estado['progreso'] else 0.0,
+        'recursos': estado['recursos'],
+        'predecesoras': estado['predecesoras']
+    }
+
+
+class ImportadorControl:
+    """
+    Importa un archivo de control sobre las actividades existentes (no crea
+    actividades nuevas ni trabajadores).
+
+    Args:
+        requerimiento_id: proyecto destino. Sin él, las filas se resuelven por
+            Id de actividad o, en su defecto, por la primera actividad con ese EDT.
+        sesion_subida, nombre_archivo: identifican la subida en historial_control.
+        auditoria: datos del usuario y la request que se agregan a datos_nuevos.
+    """
+
+    def __init__(self, requerimiento_id=None, sesion_subida='', nombre_archivo='', auditoria=None):
+        self.requerimiento_id = requerimiento_id
+        self.sesion_subida = sesion_subida
+        self.nombre_archivo = nombre_archivo
+        self.auditoria = auditoria or {}
+        self.filas = []
+        self.errores = []
+        self.total_filas = 0
+        self.no_encontradas = []
+        self.cambios = []
+        self.avances_nuevos = []
+        # Estado final de cada actividad modificada {id: estado}
+        self._modificadas = {}
+
+    # ------------------------------------------------------------------ lectura
+
+    def leer(self, archivo):
+        """
+        Lee y normaliza las filas del archivo (ruta o stream).
+
+        Returns:
+            list: columnas obligatorias faltantes (vacía si el archivo es válido)
+        """
+        workbook = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = workbook.active.iter_rows(values_only=True)
+            encabezados = next(filas, None) or ()
+            self.encabezados = encabezados
+            self.columnas = mapear_columnas_control(encabezados)
+            faltantes = [c for c in COLUMNAS_OBLIGATORIAS if self.columnas[c] is None]
+            if faltantes:
+                return faltantes
+
+            for num_fila, valores in enumerate(filas, start=2):
+                self.total_filas += 1
+                try:
+                    fila = self._normalizar(num_fila, valores)
+                except Exception as e:
+                    self.errores.append({'fila': num_fila, 'mensaje': f'Error en fila {num_fila}: {str(e)}'})
+                    continue
+                if fila is not None:
+                    self.filas.append(fila)
+        finally:
+            workbook.close()
+
+        self._convertir_fechas()
+        return []
+
+    def _convertir_fechas(self):
+        """Convierte las fechas de todas las filas, una columna a la vez (NormalizadorFechas)"""
+        fechas = NormalizadorFechas(respaldo=_fecha)
+        for campo in ('fecha_inicio', 'fecha_fin'):
+            convertidas = fechas.convertir_a_date([fila[campo] for fila in self.filas], campo)
+            for fila, fecha in zip(self.filas, convertidas):
+                fila[campo] = fecha
+
+    def _normalizar(self, num_fila, valores):
+        def celda(columna):
+            indice = self.columnas[columna]
+            return valores[indice] if indice is not None and indice < len(valores) else None
+
+        edt = celda('EDT')
+        nombre_tarea = celda('Nombre de tarea')
+        if not edt or not nombre_tarea:
+            return None
+
+        fila = {
+            'fila': num_fila,
+            'id': None,
+            'edt': str(edt).strip(),
+            'nombre_tarea': str(nombre_tarea).strip(),
+            'fecha_inicio': None,
+            'fecha_fin': None,
+            'duracion': None,
+            'progreso': None,
+            'recursos': None,
+            'predecesoras': None
+        }
+
+        id_actividad = celda('Id')
+        if id_actividad not in (None, ''):
+            try:
+                fila['id'] = int(id_actividad)
+            except (TypeError, ValueError):
+                pass
+
+        # Valor crudo: las fechas se convierten por columna al terminar de leer
+        for campo, columna in (('fecha_inicio', 'Comienzo'), ('fecha_fin', 'Fin')):
+            fila[campo] = celda(columna) or None
+
+        duracion = celda('Duración')
+        if duracion is not None:
+            numeros = re.findall(r'\d+', str(duracion).strip())
+            fila['duracion'] = int(numeros[0]) if numeros else None
+
+        progreso = celda('% completado')
+        if progreso is not None:
+            progreso = float(progreso)
+            # Progreso en formato decimal (0.5) -> porcentaje (50)
+            fila['progreso'] = progreso * 100 if progreso <= 1.0 else progreso
+
+        recursos = celda('Nombres de los recursos')
+        if recursos:
+            fila['recursos'] = str(recursos).strip()
+
+        predecesoras = celda('Predecesoras')
+        if predecesoras:
+            fila['predecesoras'] = str(predecesoras)
+
+        return fila
+
+    # -------------------------------------------------------------------- diff
+
+    def _cargar_actividades(self):
+        """Estado actual de todas las actividades referenciadas, en una consulta"""
+        ids = {fila['id'] for fila in self.filas if fila['id'] is not None}
+        edts = {fila['edt'] for fila in self.filas}
+
+        por_edt = ActividadProyecto.edt.in_(edts)
+        if self.requerimiento_id is not None:
+            condicion = and_(ActividadProyecto.requerimiento_id == self.requerimiento_id,
+                             or_(ActividadProyecto.id.in_(ids), por_edt) if ids else por_edt)
+        else:
+            condicion = or_(ActividadProyecto.id.in_(ids), por_edt) if ids else por_edt
+
+        columnas = (ActividadProyecto.id, ActividadProyecto.requerimiento_id, ActividadProyecto.edt) + \
+            tuple(getattr(ActividadProyecto, campo) for campo in CAMPOS_CONTROL)
+        resultado = db.session.execute(
+            select(*columnas).where(condicion).order_by(ActividadProyecto.id)
+        ).mappings().all()
+
+        por_id = {}
+        primera_por_edt = {}
+        for fila in resultado:
+            estado = dict(fila)
+            por_id[estado['id']] = estado
+            primera_por_edt.setdefault(estado['edt'], estado)
+        return por_id, primera_por_edt
+
+    def calcular_diff(self):
+        """Resuelve cada fila contra su actividad y acumula los cambios en memoria"""
+        por_id, primera_por_edt = self._cargar_actividades()
+
+        for fila in self.filas:
+            estado = por_id.get(fila['id']) if fila['id'] is not None else None
+            if estado is None or estado['edt'] != fila['edt']:
+                estado = primera_por_edt.get(fila['edt'])
+            if estado is None:
+                self.no_encontradas.append({'fila': fila['fila'], 'edt': fila['edt']})
+                continue
+
+            anterior = _snapshot(estado)
+            campos = {}
+            for campo in CAMPOS_CONTROL:
+                nuevo = fila[campo]
+                if nuevo is None or nuevo == '':
+                    continue
+                actual = estado[campo]
+                if campo == 'progreso' and actual is not None:
+                    actual = float(actual)
+                if nuevo != actual:
+                    campos[campo] = (actual, nuevo)
+                    estado[campo] = nuevo
+
+            if fila['recursos']:
+                self.avances_nuevos.append((estado, fila['recursos']))
+
+            if campos:
+                self._modificadas[estado['id']] = estado
+                self.cambios.append({
+                    'fila': fila['fila'],
+                    'actividad_id': estado['id'],
+                    'requerimiento_id': estado['requerimiento_id'],
+                    'edt': estado['edt'],
+                    'campos': campos,
+                    'datos_anteriores': anterior,
+                    'datos_nuevos': _snapshot(estado)
+                })
+
+        return self.resumen()
+
+    def resumen(self):
+        """Resumen JSON del diff (lo que se aplicó o se aplicaría)"""
+        def valor(v):
+            return v.isoformat() if isinstance(v, date) else v
+
+        return {
+            'total_filas': self.total_filas,
+            'filas_validas': len(self.filas),
+            'actualizadas': len(self._modificadas),
+            'sin_cambios': len(self.filas) - len(self.no_encontradas) - len(self.cambios),
+            'no_encontradas': self.no_encontradas,
+            'total_cambios': len(self.cambios),
+            'cambios': [
+                {
+                    'fila': cambio['fila'],
+                    'actividad_id': cambio['actividad_id'],
+                    'requerimiento_id': cambio['requerimiento_id'],
+                    'edt': cambio['edt'],
+                    'campos': {campo: [valor(a), valor(b)] for campo, (a, b) in cambio['campos'].items()}
+                }
+                for cambio in self.cambios[:MAX_CAMBIOS_RESPUESTA]
+            ],
+            'errores': self.errores
+        }
+
+    # ---------------------------------------------------------------- escritura
+
+    def aplicar(self):
+        """
+        Escribe actividades modificadas, historial y avances nuevos con
+        sentencias masivas. No hace commit.
+
+        Returns:
+            int: avances creados
+        """
+        ahora = datetime.utcnow()
+
+        if self._modificadas:
+            tabla = ActividadProyecto.__table__
+            valores = {campo: bindparam(f'b_{campo}') for campo in CAMPOS_CONTROL}
+            db.session.execute(
+                tabla.update().where(tabla.c.id == bindparam('b_id')).values(updated_at=ahora, **valores),
+                [
+                    {'b_id': actividad_id, **{f'b_{campo}': estado[campo] for campo in CAMPOS_CONTROL}}
+                    for actividad_id, estado in self._modificadas.items()
+                ]
+            )
+            ResumenProyecto.marcar_desactualizados(
+                {estado['requerimiento_id'] for estado in self._modificadas.values()}
+            )
+            CronogramaProyecto.marcar_desactualizados(
+                {cambio['requerimiento_id'] for cambio in self.cambios
+                 if any(campo in CronogramaProyecto.CAMPOS for campo in cambio['campos'])}
+            )
+
+            comentario = f"Actualización vía archivo Excel por {self.auditoria.get('usuario_email', 'Sistema')} - Sesión: {self.sesion_subida}"
+            db.session.execute(HistorialControl.__table__.insert(), [
+                {
+                    'sesion_subida': self.sesion_subida,
+                    'fecha_operacion': ahora,
+                    'nombre_archivo': self.nombre_archivo,
+                    'actividad_id': cambio['actividad_id'],
+                    'requerimiento_id': cambio['requerimiento_id'],
+                    'tipo_operacion': 'UPDATE',
+                    'datos_anteriores': cambio['datos_anteriores'],
+                    'datos_nuevos': {**cambio['datos_nuevos'], **self.auditoria},
+                    'fila_excel': cambio['fila'],
+                    'comentarios': comentario
+                }
+                for cambio in self.cambios
+            ])
+
+        avances_creados = self._crear_avances()
+        logger.info(f"Control {self.sesion_subida}: {len(self._modificadas)} actividades actualizadas, {avances_creados} avances nuevos")
+        return avances_creados
+
+    def _crear_avances(self):
+        """Un avance por (actividad, trabajador existente) que aún no lo tenga"""
+        if not self.avances_nuevos:
+            return 0
+
+        codigos = {codigo for _, recursos in self.avances_nuevos for codigo in separar_recursos(recursos)}
+        trabajadores = {}
+        for trabajador_id, nombrecorto in db.session.execute(
+            select(Trabajador.id, Trabajador.nombrecorto).where(Trabajador.nombrecorto.in_(codigos))
+        ).all():
+            trabajadores.setdefault(nombrecorto, trabajador_id)
+
+        actividad_ids = {estado['id'] for estado, _ in self.avances_nuevos}
+        existentes = set(db.session.execute(
+            select(AvanceActividad.actividad_id, AvanceActividad.trabajador_id)
+            .where(AvanceActividad.actividad_id.in_(actividad_ids))
+        ).all())
+
+        hoy = datetime.now()
+        filas = {}
+        for estado, recursos in self.avances_nuevos:
+            for codigo in separar_recursos(recursos):
+                trabajador_id = trabajadores.get(codigo)
+                clave = (estado['id'], trabajador_id)
+                if trabajador_id is None or clave in existentes or clave in filas:
+                    continue
+                filas[clave] = {
+                    'requerimiento_id': estado['requerimiento_id'],
+                    'actividad_id': estado['id'],
+                    'trabajador_id': trabajador_id,
+                    'porcentaje_asignacion': 100.0,
+                    'progreso_actual': float(estado['progreso']) if estado['progreso'] else 0.0,
+                    'progreso_anterior': 0.0,
+                    'fecha_registro': hoy.date(),
+                    'fecha_creacion': hoy,
+                    'fecha_actualizacion': hoy,
+                    'observaciones': f'Recurso asignado desde Excel: {codigo}'
+                }
+
+        if filas:
+            db.session.execute(AvanceActividad.__table__.insert(), list(filas.values()))
+        return len(filas)
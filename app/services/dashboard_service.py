@@ -0,0 +1,158 @@
+"""
+Agregaciones del dashboard de control de proyectos
+==================================================
+
+Calcula para un conjunto de proyectos, con un número fijo de consultas
+GROUP BY (independiente de cuántos proyectos o actividades haya):
+
+- Conteo de actividades y actividades completadas.
+- Progreso real: el de la actividad raíz (nivel 1), que ya es el promedio
+  ponderado por duración propagado por ArbolProgresoEDT; si no hay raíz,
+  el promedio simple de las actividades (proyectos legacy).
+- Progreso esperado a hoy según el rango de fechas del proyecto.
+- Trabajadores distintos con avances registrados y responsable del equipo.
+"""
+
+from datetime import date
+
+from sqlalchemy import select, func, case
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, EquipoTrabajo, Trabajador
+
+# Diferencia mínima (puntos porcentuales) entre progreso real y esperado para
+# considerar un proyecto adelantado o atrasado
+UMBRAL_CRONOGRAMA = 5
+
+
+def calcular_progreso_esperado(fecha_inicio, fecha_fin, hoy):
+    """Porcentaje del plazo transcurrido a la fecha (None si el rango no es válido)"""
+    if not fecha_inicio or not fecha_fin:
+        return None
+    duracion_total = (fecha_fin - fecha_inicio).days
+    if duracion_total <= 0:
+        return None
+    if hoy <= fecha_inicio:
+        return 0
+    if hoy >= fecha_fin:
+        return 100
+    return round((hoy - fecha_inicio).days / duracion_total * 100, 1)
+
+
+def evaluar_cronograma(progreso, progreso_esperado):
+    """('En tiempo' | 'Adelantado' | 'Atrasado', diferencia en puntos)"""
+    diferencia = progreso - progreso_esperado
+    if abs(diferencia) < UMBRAL_CRONOGRAMA:
+        return 'En tiempo', 0
+    if diferencia > 0:
+        return 'Adelantado', round(diferencia, 1)
+    return 'Atrasado', round(abs(diferencia), 1)
+
+
+def _estadisticas_actividades(proyecto_ids):
+    """Conteos, suma de progreso y rango de fechas por proyecto (1 consulta)"""
+    filas = db.session.execute(
+        select(
+            ActividadProyecto.requerimiento_id,
+            func.count(ActividadProyecto.id),
+            func.sum(case((ActividadProyecto.progreso >= 100, 1), else_=0)),
+            func.sum(ActividadProyecto.progreso),
+            func.min(ActividadProyecto.fecha_inicio),
+            func.max(ActividadProyecto.fecha_fin)
+        )
+        .where(ActividadProyecto.requerimiento_id.in_(proyecto_ids))
+        .group_by(ActividadProyecto.requerimiento_id)
+    ).all()
+    return {fila[0]: fila[1:] for fila in filas}
+
+
+def _progreso_raices(proyecto_ids):
+    """Progreso de la primera actividad de nivel 1 de cada proyecto (1 consulta)"""
+    filas = db.session.execute(
+        select(ActividadProyecto.requerimiento_id, ActividadProyecto.progreso)
+        .where(
+            ActividadProyecto.requerimiento_id.in_(proyecto_ids),
+            ActividadProyecto.nivel_esquema == 1
+        )
+        .order_by(ActividadProyecto.requerimiento_id, ActividadProyecto.id)
+    ).all()
+    raices = {}
+    for proyecto_id, progreso in filas:
+        raices.setdefault(proyecto_id, progreso)
+    return raices
+
+
+def _trabajadores_con_avances(proyecto_ids):
+    """Trabajadores distintos con avances por proyecto (1 consulta)"""
+    filas = db.session.execute(
+        select(AvanceActividad.requerimiento_id, func.count(func.distinct(AvanceActividad.trabajador_id)))
+        .where(AvanceActividad.requerimiento_id.in_(proyecto_ids))
+        .group_by(AvanceActividad.requerimiento_id)
+    ).all()
+    return dict(filas)
+
+
+def _responsables(proyecto_ids):
+    """Nombre del primer miembro del equipo de cada proyecto (1 consulta)"""
+    filas = db.session.execute(
+        select(EquipoTrabajo.id_requerimiento, Trabajador.nombre)
+        .join(Trabajador, Trabajador.id == EquipoTrabajo.id_trabajador)
+        .where(EquipoTrabajo.id_requerimiento.in_(proyecto_ids))
+        .order_by(EquipoTrabajo.id_requerimiento, EquipoTrabajo.id)
+    ).all()
+    responsables = {}
+    for proyecto_id, nombre in filas:
+        responsables.setdefault(proyecto_id, nombre)
+    return responsables
+
+
+def resumen_proyectos(proyecto_ids, hoy=None):
+    """
+    Métricas de seguimiento de varios proyectos con 4 consultas en total.
+
+    Returns:
+        dict: {proyecto_id: {'total_actividades', 'actividades_completadas', 'progreso',
+               'progreso_esperado', 'estado_cronograma', 'porcentaje_atraso_adelanto',
+               'total_trabajadores', 'responsable'}}
+    """
+    proyecto_ids = list(proyecto_ids)
+    if not proyecto_ids:
+        return {}
+    hoy = hoy or date.today()
+
+    estadisticas = _estadisticas_actividades(proyecto_ids)
+    raices = _progreso_raices(proyecto_ids)
+    trabajadores = _trabajadores_con_avances(proyecto_ids)
+    responsables = _responsables(proyecto_ids)
+
+    resumen = {}
+    for proyecto_id in proyecto_ids:
+        total, completadas, suma_progreso, inicio, fin = estadisticas.get(proyecto_id, (0, 0, None, None, None))
+
+        progreso_raiz = raices.get(proyecto_id)
+        if progreso_raiz is not None:
+            progreso = round(float(progreso_raiz), 1)
+        elif total:
+            progreso = round(float(suma_progreso or 0) / total, 1)
+        else:
+            progreso = 0
+
+        progreso_esperado = 0
+        estado_cronograma, porcentaje = 'En tiempo', 0
+        if total:
+            esperado = calcular_progreso_esperado(inicio, fin, hoy)
+            if esperado is not None:
+                progreso_esperado = esperado
+                estado_cronograma, porcentaje = evaluar_cronograma(progreso, esperado)
+
+        resumen[proyecto_id] = {
+            'total_actividades': total,
+            'actividades_completadas': int(completadas or 0),
+            'progreso': progreso,
+            'progreso_esperado': progreso_esperado,
+            'estado_cronograma': estado_cronograma,
+            'porcentaje_atraso_adelanto': porcentaje,
+            'total_trabajadores': trabajadores.get(proyecto_id, 0),
+            'responsable': responsables.get(proyecto_id)
+        }
+    return resumen
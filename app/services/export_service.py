@@ -0,0 +1,195 @@
+"""
+Exportaciones en streaming (XLSX y CSV)
+=======================================
+
+Las filas se leen con un cursor del lado del servidor (``yield_per``) y se
+escriben a medida que llegan, así la memoria no depende del tamaño de la
+exportación:
+
+- CSV: generador que entrega bloques de CHUNK_FILAS filas; el primer byte sale
+  apenas llega el primer bloque de la consulta.
+- XLSX: openpyxl en modo ``write_only`` sobre un archivo temporal (las filas
+  no se guardan como celdas en memoria) que luego se envía por bloques. El
+  formato zip del XLSX obliga a terminar el archivo antes del primer byte;
+  para exportaciones muy grandes conviene ``formato=csv``.
+"""
+
+import csv
+import io
+import os
+import tempfile
+
+CHUNK_FILAS = 1000
+CHUNK_BYTES = 64 * 1024
+
+MIMETYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+MIMETYPE_CSV = 'text/csv; charset=utf-8'
+
+FORMATOS_EXPORTACION = ('xlsx', 'csv')
+
+
+def iterar_filas(consulta, tamano=CHUNK_FILAS):
+    """Filas de una consulta Core/ORM leídas por bloques con cursor del servidor"""
+    from app import db
+
+    resultado = db.session.execute(consulta.execution_options(yield_per=tamano))
+    try:
+        for bloque in resultado.partitions():
+            yield from bloque
+    finally:
+        resultado.close()
+
+
+def _content_disposition(nombre_archivo):
+    from urllib.parse import quote
+    return f"attachment; filename*=UTF-8''{quote(nombre_archivo)}"
+
+
+def generar_csv(columnas, filas, filas_previas=(), delimitador=';'):
+    """
+    Genera el CSV por bloques de texto (con BOM para que Excel detecte UTF-8).
+
+    Args:
+        columnas: encabezados
+        filas: iterable de secuencias (p. ej. iterar_filas(...) mapeado)
+        filas_previas: filas informativas antes de los encabezados
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=delimitador)
+
+    buffer.write('\ufeff')
+    escritor.writerows(filas_previas)
+    escritor.writerow(columnas)
+    pendientes = 0
+    for fila in filas:
+        escritor.writerow(fila)
+        pendientes += 1
+        if pendientes >= CHUNK_FILAS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    yield buffer.getvalue()
+
+
+def respuesta_csv(nombre_archivo, columnas, filas, filas_previas=()):
+    """Response en streaming; las filas se consumen dentro del contexto de la request"""
+    from flask import Response, stream_with_context
+
+    return Response(
+        stream_with_context(generar_csv(columnas, filas, filas_previas)),
+        mimetype=MIMETYPE_CSV,
+        headers={'Content-Disposition': _content_disposition(nombre_archivo)}
+    )
+
+
+def escribir_xlsx(destino, hoja, columnas, filas, anchos=None, formatos=None, filas_previas=()):
+    """
+    Escribe un XLSX en modo write_only.
+
+    Args:
+        destino: ruta o archivo binario
+        hoja: título de la hoja
+        columnas: encabezados (con el estilo de encabezado de las exportaciones)
+        filas: iterable de secuencias
+        anchos: anchos de columna, en orden
+        formatos: {indice_columna: number_format}
+        filas_previas: filas [(valor, tamano_fuente), ...] antes de los encabezados
+
+    Returns:
+        int: filas de datos escritas
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    for indice, ancho in enumerate(anchos or (), 1):
+        ws.column_dimensions[get_column_letter(indice)].width = ancho
+
+    for fila_previa in filas_previas:
+        celdas = []
+        for valor, tamano in fila_previa:
+            celda = WriteOnlyCell(ws, value=valor)
+            celda.font = Font(size=tamano, bold=tamano > 12)
+            celdas.append(celda)
+        ws.append(celdas)
+
+    fuente = Font(bold=True, color="FFFFFF")
+    relleno = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    alineacion = Alignment(horizontal="center", vertical="center")
+    encabezados = []
+    for columna in columnas:
+        celda = WriteOnlyCell(ws, value=columna)
+        celda.font, celda.fill, celda.alignment = fuente, relleno, alineacion
+        encabezados.append(celda)
+    ws.append(encabezados)
+
+    formatos = formatos or {}
+    total = 0
+    for fila in filas:
+        if formatos:
+            fila = list(fila)
+            for indice, formato in formatos.items():
+                celda = WriteOnlyCell(ws, value=fila[indice])
+                celda.number_format = formato
+                fila[indice] = celda
+        ws.append(fila)
+        total += 1
+
+    wb.save(destino)
+    return total
+
+
+def _leer_por_bloques(ruta):
+    with open(ruta, 'rb') as archivo:
+        while True:
+            bloque = archivo.read(CHUNK_BYTES)
+            if not bloque:
+                break
+            yield bloque
+
+
+def _eliminar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def respuesta_xlsx(nombre_archivo, hoja, columnas, filas, **opciones):
+    """
+    Escribe el XLSX en un temporal (memoria acotada) y lo envía por bloques;
+    el temporal se elimina al cerrar la respuesta. Acepta las mismas opciones
+    que escribir_xlsx.
+    """
+    from flask import Response
+
+    temporal = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+    temporal.close()
+    try:
+        escribir_xlsx(temporal.name, hoja, columnas, filas, **opciones)
+    except Exception:
+        _eliminar(temporal.name)
+        raise
+
+    respuesta = Response(
+        _leer_por_bloques(temporal.name),
+        mimetype=MIMETYPE_XLSX,
+        headers={
+            'Content-Disposition': _content_disposition(nombre_archivo),
+            'Content-Length': str(os.path.getsize(temporal.name))
+        }
+    )
+    respuesta.call_on_close(lambda: _eliminar(temporal.name))
+    return respuesta
+
+
+def respuesta_exportacion(formato, nombre_base, hoja, columnas, filas, **opciones):
+    """Respuesta XLSX o CSV según formato ('xlsx' por defecto)"""
+    if formato == 'csv':
+        filas_previas = [[valor for valor, _ in fila] for fila in opciones.get('filas_previas', ())]
+        return respuesta_csv(f'{nombre_base}.csv', columnas, filas, filas_previas)
+    return respuesta_xlsx(f'{nombre_base}.xlsx', hoja, columnas, filas, **opciones)
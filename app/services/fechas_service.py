@@ -0,0 +1,233 @@
+"""
+Normalización de fechas por columna
+===================================
+
+convertir_fecha_segura y parsear_fecha_espanol prueban una lista de formatos
+celda por celda. En una carta Gantt eso se repite miles de veces sobre las
+mismas pocas fechas. NormalizadorFechas convierte columnas completas:
+
+1. La columna se reduce a sus valores distintos (pd.factorize) y al final el
+   resultado se reparte a todas las filas con un take de numpy. Las celdas
+   que ya son fecha (openpyxl entrega datetime) se toman tal cual.
+2. Con una muestra de los textos distintos detecta el formato dominante de la
+   columna (ISO, día/mes/año, mes/día/año, año/mes/día o con nombre de mes,
+   con o sin día de la semana delante como "vie 29-01-10 9:00") y lo recuerda
+   para los lotes siguientes.
+3. Aplica ese formato a todos los textos distintos de una vez: una pasada de
+   la expresión regular por texto y el armado de año, mes y día con
+   aritmética vectorizada de numpy.
+4. Solo los textos que no calzan con el formato pasan por la función lenta de
+   respaldo, una vez por valor distinto.
+
+Cada texto ya convertido queda memorizado por columna, así los lotes
+siguientes solo procesan fechas nuevas.
+"""
+
+import logging
+import re
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Textos distintos que se miran para detectar el formato de una columna
+TAMANO_MUESTRA = 50
+
+VALORES_VACIOS = {'', 'nan', 'nat', 'none', 'null'}
+
+NAT = np.datetime64('NaT', 'ns')
+
+# Años representables en datetime64[ns] (límites excluidos); fuera de este
+# rango el cast a nanosegundos da la vuelta y produce fechas basura
+ANIO_MINIMO = 1677
+ANIO_MAXIMO = 2262
+
+# Día de la semana opcional, abreviado o completo ("vie", "Wed.", "miércoles,")
+_DIA_SEMANA = r'(?:[^\W\d_]{2,}\.?,?\s+)?'
+_HORA = r'(?:[\sT]+.*)?'
+_ANIO = r'(?P<anio>\d{4}|\d{2})'
+
+# Formato -> expresión con los grupos dia, mes y anio. En caso de empate en la
+# muestra gana el primero (día/mes antes que mes/día, como convertir_fecha_segura)
+FORMATOS_FECHA = {
+    'iso': rf'^(?P<anio>\d{{4}})-(?P<mes>\d{{1,2}})-(?P<dia>\d{{1,2}}){_HORA}$',
+    'dia_mes_anio': rf'^{_DIA_SEMANA}(?P<dia>\d{{1,2}})[/\-.](?P<mes>\d{{1,2}})[/\-.]{_ANIO}{_HORA}$',
+    'anio_mes_dia': rf'^(?P<anio>\d{{4}})[/.](?P<mes>\d{{1,2}})[/.](?P<dia>\d{{1,2}}){_HORA}$',
+    'mes_dia_anio': rf'^{_DIA_SEMANA}(?P<mes>\d{{1,2}})/(?P<dia>\d{{1,2}})/{_ANIO}{_HORA}$',
+    'nombre_mes': (rf'^{_DIA_SEMANA}(?P<dia>\d{{1,2}})(?:\s+de)?[\s\-/]+(?P<mes>[^\W\d_]{{3,}})\.?'
+                   rf'(?:\s+de)?[\s\-/]+{_ANIO}{_HORA}$'),
+}
+
+# Tres primeras letras del mes (español e inglés) -> número
+MESES = {
+    'ene': 1, 'jan': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'aug': 8, 'sep': 9, 'set': 9, 'oct': 10, 'nov': 11, 'dic': 12, 'dec': 12
+}
+
+
+_PATRONES = {formato: re.compile(expresion) for formato, expresion in FORMATOS_FECHA.items()}
+
+
+def _componentes(coincidencia, formato):
+    """(año, mes, día) de una coincidencia; mes 0 si el nombre de mes no existe"""
+    mes = coincidencia['mes']
+    mes = MESES.get(mes[:3].lower(), 0) if formato == 'nombre_mes' else int(mes)
+    return int(coincidencia['anio']), mes, int(coincidencia['dia'])
+
+
+def _calza(texto, formato):
+    """True si el texto tiene el formato y un día y mes posibles"""
+    coincidencia = _PATRONES[formato].match(texto)
+    if not coincidencia:
+        return False
+    _, mes, dia = _componentes(coincidencia, formato)
+    return 1 <= mes <= 12 and 1 <= dia <= 31
+
+
+def aplicar_formato(textos, formato):
+    """
+    Convierte textos con un formato de FORMATOS_FECHA: una pasada de la
+    expresión regular por texto y el armado de las fechas con aritmética de
+    numpy sobre los arreglos de año, mes y día.
+
+    Returns:
+        ndarray datetime64[ns] con NaT donde el texto no calza o la fecha no existe
+    """
+    patron = _PATRONES[formato]
+    componentes = []
+    for texto in textos:
+        coincidencia = patron.match(texto)
+        componentes.append(_componentes(coincidencia, formato) if coincidencia else (0, 0, 0))
+    if not componentes:
+        return np.array([], dtype='datetime64[ns]')
+    anio, mes, dia = np.array(componentes, dtype=np.int64).T
+
+    # Años de 2 dígitos igual que parsear_fecha_espanol: 00-49 -> 2000, 50-99 -> 1900
+    anio = np.where(anio < 100, anio + np.where(anio < 50, 2000, 1900), anio)
+    # Rango representable en datetime64[ns]; lo demás queda para el respaldo
+    validas = (mes >= 1) & (mes <= 12) & (dia >= 1) & (anio > ANIO_MINIMO) & (anio < ANIO_MAXIMO)
+
+    inicio_mes = np.where(validas, (anio - 1970) * 12 + mes - 1, 0).astype('datetime64[M]')
+    fechas = inicio_mes.astype('datetime64[D]') + np.where(validas, dia - 1, 0)
+    # El día tiene que existir en el mes (31/02 no es una fecha)
+    validas &= fechas < (inicio_mes + 1).astype('datetime64[D]')
+    return np.where(validas, fechas.astype('datetime64[ns]'), NAT)
+
+
+def detectar_formato(textos):
+    """Formato que calza con más textos de la muestra (None si ninguno sirve)"""
+    muestra = list(textos)[:TAMANO_MUESTRA]
+    aciertos = {formato: sum(_calza(texto, formato) for texto in muestra) for formato in FORMATOS_FECHA}
+    mejor = max(aciertos, key=aciertos.get)
+    return mejor if aciertos[mejor] else None
+
+
+def _a_datetime64(valor):
+    """date/datetime -> datetime64[ns]; NaT si el año no cabe en nanosegundos"""
+    if not ANIO_MINIMO < valor.year < ANIO_MAXIMO:
+        return NAT
+    return pd.Timestamp(valor).to_datetime64()
+
+
+def _convertir_fecha_segura(valor):
+    from app.controllers_main import convertir_fecha_segura
+    return convertir_fecha_segura(valor)
+
+
+class NormalizadorFechas:
+    """
+    Convierte columnas de fechas con el formato dominante de cada columna,
+    memorizando los textos ya vistos. Una instancia por importación.
+
+    Args:
+        respaldo: conversión lenta valor a valor para lo que no calza con el
+            formato dominante (por defecto convertir_fecha_segura)
+    """
+
+    def __init__(self, respaldo=None):
+        self.respaldo = respaldo or _convertir_fecha_segura
+        self._formatos = {}  # columna -> formato dominante
+        self._memo = {}  # columna -> {valor crudo: datetime64 | NaT}
+        self.conversiones_lentas = 0
+
+    def formato(self, columna):
+        return self._formatos.get(columna)
+
+    def convertir(self, valores, columna=None):
+        """
+        Convierte una columna (Series o lista de valores crudos).
+
+        Returns:
+            Series datetime64[ns] con NaT para vacíos y valores no convertibles
+        """
+        if isinstance(valores, pd.Series):
+            indice, crudos = valores.index, valores.to_numpy(dtype=object)
+        else:
+            valores = list(valores)
+            indice, crudos = None, np.fromiter(valores, dtype=object, count=len(valores))
+
+        # Se trabaja sobre los valores distintos y el resultado se reparte con take
+        codigos, distintos = pd.factorize(crudos)
+        memo = self._memo.setdefault(columna, {})
+        claves = [valor.strip() if isinstance(valor, str) else valor for valor in distintos]
+        nuevos = [clave for clave in dict.fromkeys(claves) if clave not in memo]
+        if nuevos:
+            self._convertir_nuevos(nuevos, columna, memo)
+
+        # Última posición NaT: factorize marca los nulos con -1
+        por_distinto = np.array([memo[clave] for clave in claves] + [NAT], dtype='datetime64[ns]')
+        return pd.Series(por_distinto[codigos], index=indice)
+
+    def convertir_a_date(self, valores, columna=None):
+        """Igual que convertir() pero como lista de date / None"""
+        return [None if pd.isna(valor) else valor for valor in self.convertir(valores, columna).dt.date]
+
+    def _convertir_nuevos(self, valores, columna, memo):
+        """Completa el memo de la columna con valores que todavía no había visto"""
+        textos = []
+        lentos = []
+        for valor in valores:
+            if isinstance(valor, (date, datetime)):
+                memo[valor] = _a_datetime64(valor)
+            elif not isinstance(valor, str):
+                lentos.append(valor)
+            elif valor.lower() in VALORES_VACIOS:
+                memo[valor] = NAT
+            else:
+                textos.append(valor)
+
+        if textos:
+            formato = self._formatos.get(columna) or detectar_formato(textos)
+            if formato and columna is not None:
+                self._formatos.setdefault(columna, formato)
+            pendientes = np.array(textos, dtype=object)
+            if formato:
+                # Primero el formato de la columna; las filas que no calzan
+                # prueban los demás antes de caer al respaldo (columnas mixtas)
+                candidatos = [formato] + [otro for otro in FORMATOS_FECHA if otro != formato]
+                for candidato in candidatos:
+                    convertidas = aplicar_formato(pendientes, candidato)
+                    fallidas = np.isnat(convertidas)
+                    memo.update(zip(pendientes[~fallidas], convertidas[~fallidas]))
+                    pendientes = pendientes[fallidas]
+                    if not len(pendientes):
+                        break
+            lentos.extend(pendientes)
+
+        for valor in lentos:
+            memo[valor] = self._respaldo(valor)
+        self.conversiones_lentas += len(lentos)
+
+    def _respaldo(self, valor):
+        try:
+            resultado = self.respaldo(valor)
+        except Exception as e:
+            logger.warning(f"No se pudo convertir la fecha {valor!r}: {e}")
+            return NAT
+        if resultado is None or pd.isna(resultado):
+            return NAT
+        if isinstance(resultado, (date, datetime)):
+            return _a_datetime64(resultado)
+        return pd.Timestamp(resultado).to_datetime64()
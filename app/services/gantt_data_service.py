@@ -0,0 +1,97 @@
+"""
+Datos de la carta Gantt en formato columnar
+===========================================
+
+Respuesta de /gantt_data: un arreglo por campo (sin alias duplicados) y un
+ETag derivado del estado del proyecto, para que el navegador revalide con
+If-None-Match y reciba 304 sin que el servidor lea las actividades.
+"""
+
+import hashlib
+
+from sqlalchemy import select, func
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, GanttArchivo, Requerimiento
+
+# Subir al cambiar la forma de la respuesta: invalida los ETag emitidos
+VERSION_FORMATO = 2
+
+# Campo de la respuesta -> columna de actividad_proyecto. Los nombres son los
+# canónicos que ya reconoce el frontend (obtenerValorActividad).
+COLUMNAS_GANTT_DATA = (
+    ('ID', ActividadProyecto.id),
+    ('EDT', ActividadProyecto.edt),
+    ('Nivel de esquema', ActividadProyecto.nivel_esquema),
+    ('Nombre de tarea', ActividadProyecto.nombre_tarea),
+    ('Comienzo', ActividadProyecto.fecha_inicio),
+    ('Fin', ActividadProyecto.fecha_fin),
+    ('Duración', ActividadProyecto.duracion),
+    ('Recursos', ActividadProyecto.recursos),
+    ('Progreso', ActividadProyecto.progreso),
+    ('Crítica', ActividadProyecto.es_critica),  # Ruta crítica (ruta_critica_service)
+    ('Holgura', ActividadProyecto.holgura_total),
+)
+
+
+def version_gantt(req_id):
+    """
+    Estado del Gantt del proyecto en una sola consulta: última modificación y
+    cantidad de actividades activas, último avance, hash del XLSX y última
+    modificación del requerimiento.
+
+    Returns:
+        tuple: (etag, fecha_ultima_actividad)
+    """
+    actividades = select(
+        func.max(ActividadProyecto.updated_at), func.count(ActividadProyecto.id)
+    ).where(ActividadProyecto.requerimiento_id == req_id, ActividadProyecto.activo == True).subquery()
+
+    fila = db.session.execute(
+        select(
+            actividades.c[0],
+            actividades.c[1],
+            select(func.max(AvanceActividad.fecha_actualizacion))
+            .where(AvanceActividad.requerimiento_id == req_id).scalar_subquery(),
+            select(GanttArchivo.sha256)
+            .where(GanttArchivo.id_requerimiento == req_id).limit(1).scalar_subquery(),
+            select(Requerimiento.updated_at)
+            .where(Requerimiento.id == req_id).scalar_subquery()
+        )
+    ).one()
+
+    firma = ':'.join(str(valor) for valor in (VERSION_FORMATO, req_id, *fila))
+    return hashlib.sha1(firma.encode('utf-8')).hexdigest(), fila[0]
+
+
+def _valor(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'strftime'):
+        return valor.strftime('%Y-%m-%d')
+    if hasattr(valor, 'is_finite'):  # Decimal
+        return float(valor)
+    return valor
+
+
+def columnas_actividades(req_id):
+    """Actividades activas del proyecto como {campo: [valores]} ordenadas por EDT"""
+    filas = db.session.execute(
+        select(*(columna for _, columna in COLUMNAS_GANTT_DATA))
+        .where(ActividadProyecto.requerimiento_id == req_id, ActividadProyecto.activo == True)
+        .order_by(ActividadProyecto.edt)
+    ).all()
+
+    campos = [campo for campo, _ in COLUMNAS_GANTT_DATA]
+    if not filas:
+        return {campo: [] for campo in campos}
+    return {
+        campo: [_valor(valor) for valor in valores]
+        for campo, valores in zip(campos, zip(*filas))
+    }
+
+
+def filas_a_columnas(filas):
+    """Lista de dicts (filas del XLSX normalizadas) a {columna: [valores]}"""
+    campos = list(dict.fromkeys(campo for fila in filas for campo in fila))
+    return {campo: [fila.get(campo, '') for fila in filas] for campo in campos}
@@ -0,0 +1,459 @@
+"""
+Servicio de importación de cartas Gantt (XLSX)
+==============================================
+
+Motor de ingesta para los archivos Gantt exportados desde MS Project:
+
+- Lee la hoja con openpyxl en modo ``read_only`` (streaming), sin cargar el
+  libro completo en memoria.
+- Normaliza las columnas por lotes con operaciones vectorizadas de pandas
+  (las fechas con el formato dominante de cada columna, NormalizadorFechas).
+- Inserta actividades y avances con INSERT masivos dentro de una única
+  transacción.
+- Resuelve los recursos con ResolutorRecursos (índice de trabajadores por
+  clave normalizada, precargado una sola vez) y crea los trabajadores
+  desconocidos en un único INSERT al final de la importación.
+"""
+
+import re
+import logging
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from sqlalchemy import select
+
+from app.models import db, ActividadProyecto, AvanceActividad, CronogramaProyecto, ResumenProyecto
+from app.services.fechas_service import NormalizadorFechas
+from app.services.recursos_service import ResolutorRecursos
+
+logger = logging.getLogger(__name__)
+
+# Mapeo flexible de columnas del archivo Gantt (clave canónica -> variantes)
+COLUMNAS_GANTT = {
+    'ID': ['ID', 'id', 'Id', 'Número', 'No', '#', 'Índice'],
+    'Nivel de esquema': ['Nivel de esquema', 'Nivel', 'Level', 'Nivel esquema', 'Outline Level'],
+    'EDT': ['EDT', 'WBS', 'E.D.T.', 'Edt', 'Work Breakdown Structure'],
+    'Nombre de tarea': ['Nombre de tarea', 'Actividad', 'Tarea', 'Task Name', 'Nombre', 'Task', 'Name'],
+    'Duración': ['Duración', 'Duration', 'Dias', 'Días', 'Days', 'Duracion'],
+    'Comienzo': ['Comienzo', 'Inicio', 'Start', 'Fecha Inicio', 'Start Date', 'Fecha de inicio'],
+    'Fin': ['Fin', 'Final', 'End', 'Fecha Fin', 'Finish', 'End Date', 'Fecha de fin'],
+    'Recursos': ['Nombres de los recursos', 'Recursos', 'Resources', 'Resource Names', 'Assigned Resources'],
+    'Progreso': ['Progreso', 'Progress', '% Completado', 'Porcentaje completado', 'Complete', 'Percent Complete', '% Complete'],
+    'Predecesoras': ['Predecesoras', 'Predecessors', 'Dependencias', 'Dependencies']
+}
+
+COLUMNAS_REQUERIDAS = ['EDT', 'Nombre de tarea', 'Comienzo', 'Fin']
+
+TAMANO_LOTE_DEFECTO = 500
+
+_PATRON_RECURSO_PORCENTAJE = re.compile(r'^([A-Za-z0-9]+)\[(\d+)%\]$')
+
+
+def mapear_columnas(encabezados):
+    """
+    Asocia cada clave canónica de COLUMNAS_GANTT con la posición de la columna
+    en el archivo. Primero busca coincidencia exacta y luego parcial, igual que
+    el procesador original.
+
+    Returns:
+        dict: {clave_canonica: indice_columna}
+    """
+    columnas_lower = {}
+    for indice, encabezado in enumerate(encabezados):
+        if encabezado is None:
+            continue
+        nombre = str(encabezado).lower().strip()
+        if nombre and nombre not in columnas_lower:
+            columnas_lower[nombre] = indice
+
+    columnas_encontradas = {}
+    for clave, variantes in COLUMNAS_GANTT.items():
+        for variante in variantes:
+            variante_lower = variante.lower().strip()
+            if variante_lower in columnas_lower:
+                columnas_encontradas[clave] = columnas_lower[variante_lower]
+                break
+            parcial = next(
+                (col for col in columnas_lower if variante_lower in col or col in variante_lower),
+                None
+            )
+            if parcial is not None:
+                columnas_encontradas[clave] = columnas_lower[parcial]
+                break
+
+    return columnas_encontradas
+
+
+def iterar_lotes_xlsx(file_path, tamano_lote=TAMANO_LOTE_DEFECTO):
+    """
+    Recorre la primera hoja del archivo en modo streaming.
+
+    Yields:
+        tuple: (encabezados, lote) donde lote es una lista de
+        (numero_fila, valores) con numero_fila basado en 1 (sin contar encabezado).
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        hoja = workbook.worksheets[0]
+        filas = hoja.iter_rows(values_only=True)
+
+        encabezados = next(filas, None)
+        if encabezados is None:
+            return
+
+        lote = []
+        for numero_fila, valores in enumerate(filas, start=1):
+            # Las hojas en modo read_only suelen arrastrar filas vacías con formato
+            if valores is None or all(v is None or (isinstance(v, str) and not v.strip()) for v in valores):
+                continue
+            lote.append((numero_fila, valores))
+            if len(lote) >= tamano_lote:
+                yield encabezados, lote
+                lote = []
+
+        if lote:
+            yield encabezados, lote
+    finally:
+        workbook.close()
+
+
+def _columna(filas, indice):
+    """Extrae una columna del lote como Series de pandas (dtype object)"""
+    if indice is None:
+        return pd.Series([None] * len(filas), dtype=object)
+    # fromiter evita que pandas inspeccione cada datetime al construir la Series
+    return pd.Series(np.fromiter(
+        (valores[indice] if indice < len(valores) else None for _, valores in filas),
+        dtype=object, count=len(filas)
+    ))
+
+
+def _normalizar_texto(serie):
+    """Convierte a texto recortado; nulos y 'nan' quedan como cadena vacía"""
+    texto = serie.where(serie.notna(), '').astype(str).str.strip()
+    return texto.mask(texto.str.lower() == 'nan', '')
+
+
+def _normalizar_duracion(serie):
+    """'5 días', '5d', 5.0 -> 5; cualquier otro valor -> 0"""
+    texto = (serie.where(serie.notna(), '').astype(str)
+             .str.replace('days', '', regex=False)
+             .str.replace('días', '', regex=False)
+             .str.replace('d', '', regex=False)
+             .str.strip())
+    valores = pd.to_numeric(texto, errors='coerce')
+    return valores.where(valores >= 0, 0).fillna(0).astype(int)
+
+
+def _normalizar_progreso(serie):
+    """Devuelve el progreso como fracción 0-1 (acepta 0.5, 50 o '50%')"""
+    texto = serie.where(serie.notna(), '').astype(str).str.replace('%', '', regex=False).str.strip()
+    valores = pd.to_numeric(texto, errors='coerce').fillna(0.0)
+    valores = valores.where(valores <= 1, valores / 100)
+    return valores.clip(0.0, 1.0)
+
+
+def _normalizar_predecesoras(serie):
+    """Las celdas numéricas de Excel (3.0) quedan como '3'; el resto como texto"""
+    return _normalizar_texto(serie.map(lambda v: int(v) if isinstance(v, float) and v.is_integer() else v))
+
+
+def _normalizar_nivel(serie):
+    texto = serie.where(serie.notna(), '').astype(str).str.strip()
+    valores = pd.to_numeric(texto, errors='coerce')
+    return valores.fillna(1).astype(int)
+
+
+def normalizar_lote(filas, columnas, fechas=None):
+    """
+    Normaliza un lote de filas crudas del XLSX.
+
+    Args:
+        filas: lista de (numero_fila, valores)
+        columnas: resultado de mapear_columnas()
+        fechas: NormalizadorFechas compartido entre lotes (formato detectado
+            y fechas ya convertidas); si se omite se usa uno nuevo
+
+    Returns:
+        tuple: (DataFrame con filas válidas, lista de mensajes de error)
+    """
+    fechas = fechas or NormalizadorFechas()
+    df = pd.DataFrame({
+        'fila': [numero for numero, _ in filas],
+        'edt': _normalizar_texto(_columna(filas, columnas.get('EDT'))),
+        'nombre_tarea': _normalizar_texto(_columna(filas, columnas.get('Nombre de tarea'))),
+        'recursos': _normalizar_texto(_columna(filas, columnas.get('Recursos'))),
+        'fecha_inicio': fechas.convertir(_columna(filas, columnas.get('Comienzo')), 'Comienzo'),
+        'fecha_fin': fechas.convertir(_columna(filas, columnas.get('Fin')), 'Fin'),
+        'duracion': _normalizar_duracion(_columna(filas, columnas.get('Duración'))),
+        'progreso': _normalizar_progreso(_columna(filas, columnas.get('Progreso'))),
+        'nivel_esquema': _normalizar_nivel(_columna(filas, columnas.get('Nivel de esquema'))),
+        'id_gantt': pd.to_numeric(_columna(filas, columnas.get('ID')), errors='coerce'),
+        'predecesoras': _normalizar_predecesoras(_columna(filas, columnas.get('Predecesoras'))),
+    })
+
+    errores = []
+
+    sin_datos = (df['edt'] == '') | (df['nombre_tarea'] == '')
+    for fila in df.loc[sin_datos].itertuples():
+        errores.append(f"Fila {fila.fila}: EDT o nombre de tarea vacío (EDT: '{fila.edt}', Nombre: '{fila.nombre_tarea}')")
+
+    edt_largo = ~sin_datos & (df['edt'].str.len() > 50)
+    for fila in df.loc[edt_largo].itertuples():
+        errores.append(f"Fila {fila.fila}: EDT muy largo (máximo 50 caracteres): '{fila.edt}'")
+
+    nombre_largo = ~sin_datos & ~edt_largo & (df['nombre_tarea'].str.len() > 500)
+    for fila in df.loc[nombre_largo].itertuples():
+        errores.append(f"Fila {fila.fila}: Nombre de tarea muy largo (máximo 500 caracteres): '{fila.nombre_tarea[:100]}...'")
+
+    invalidas = sin_datos | edt_largo | nombre_largo
+    sin_fechas = ~invalidas & (df['fecha_inicio'].isna() | df['fecha_fin'].isna())
+    for fila in df.loc[sin_fechas].itertuples():
+        errores.append(f"Fila {fila.fila}: Fechas requeridas son nulas o inválidas (Inicio: {fila.fecha_inicio}, Fin: {fila.fecha_fin})")
+
+    validas = df.loc[~(invalidas | sin_fechas)].copy()
+    validas['fecha_inicio'] = validas['fecha_inicio'].dt.date
+    validas['fecha_fin'] = validas['fecha_fin'].dt.date
+
+    return validas, errores
+
+
+def parsear_recursos(recursos_texto):
+    """
+    Parsea el texto de recursos del Gantt.
+
+    Formatos soportados:
+    - "PM1[100%]"
+    - "PM1[100%];ARQ1[50%]"
+    - "PM1, ARQ1" (sin porcentaje, se asigna 100% por defecto)
+
+    Returns:
+        list: [(codigo, porcentaje), ...] con el código en mayúsculas
+    """
+    if not recursos_texto or recursos_texto.lower() == 'nan':
+        return []
+
+    asignaciones = []
+    texto = recursos_texto.replace('\n', ';').strip()
+
+    for recurso_individual in (r.strip() for r in texto.split(';')):
+        if not recurso_individual:
+            continue
+
+        match = _PATRON_RECURSO_PORCENTAJE.match(recurso_individual)
+        if match:
+            asignaciones.append((match.group(1).upper().strip(), int(match.group(2))))
+            continue
+
+        for codigo_raw in recurso_individual.split(','):
+            codigo = re.sub(r'[^A-Za-z0-9]', '', codigo_raw.upper())
+            if codigo:
+                asignaciones.append((codigo, 100))
+
+    return asignaciones
+
+
+class GanttIngestor:
+    """
+    Importa un archivo Gantt XLSX para un requerimiento reemplazando sus
+    actividades y avances en una sola transacción.
+    """
+
+    def __init__(self, requerimiento_id, tamano_lote=TAMANO_LOTE_DEFECTO):
+        self.requerimiento_id = requerimiento_id
+        self.tamano_lote = tamano_lote
+        self._recursos = None
+        self._fechas = NormalizadorFechas()
+        self._pendientes = {}  # (actividad_id, código) -> porcentaje de trabajadores por crear
+
+    def importar(self, file_path):
+        """
+        Ejecuta la importación completa.
+
+        Returns:
+            dict: mismo formato que procesar_gantt_con_recursos()
+        """
+        actividades_procesadas = 0
+        recursos_procesados = 0
+        avances_creados = 0
+        total_filas = 0
+        errores = []
+        edts_vistos = set()
+        columnas = None
+
+        try:
+            self._eliminar_datos_anteriores()
+            self._cargar_indice_trabajadores()
+
+            for encabezados, lote in iterar_lotes_xlsx(file_path, self.tamano_lote):
+                if columnas is None:
+                    columnas = mapear_columnas(encabezados)
+                    logger.info(f"Columnas encontradas después del mapeo: {columnas}")
+                    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in columnas]
+                    if faltantes:
+                        db.session.rollback()
+                        return {'success': False, 'error': f"No se encontraron las columnas requeridas: {', '.join(faltantes)}"}
+
+                total_filas += len(lote)
+                validas, errores_lote = normalizar_lote(lote, columnas, self._fechas)
+                errores.extend(errores_lote)
+
+                duplicadas = validas['edt'].duplicated(keep='first') | validas['edt'].isin(edts_vistos)
+                for fila in validas.loc[duplicadas].itertuples():
+                    errores.append(f"Fila {fila.fila}: EDT duplicado '{fila.edt}'")
+                validas = validas.loc[~duplicadas]
+                if validas.empty:
+                    continue
+                edts_vistos.update(validas['edt'])
+
+                ids_por_edt = self._insertar_actividades(validas)
+                actividades_procesadas += len(ids_por_edt)
+
+                asignaciones = self._insertar_avances(validas, ids_por_edt)
+                recursos_procesados += asignaciones
+                avances_creados += asignaciones
+
+            if total_filas == 0:
+                db.session.rollback()
+                return {'success': False, 'error': 'El archivo está vacío o no contiene datos'}
+
+            asignaciones = self._insertar_asignaciones_pendientes()
+            recursos_procesados += asignaciones
+            avances_creados += asignaciones
+
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Error importando Gantt del requerimiento {self.requerimiento_id}")
+            return {'success': False, 'error': f'Error al guardar en la base de datos: {e}'}
+
+        logger.info(
+            f"Gantt importado para requerimiento {self.requerimiento_id}: "
+            f"{actividades_procesadas} actividades, {avances_creados} avances, "
+            f"{len(errores)} errores en {total_filas} filas"
+        )
+
+        return {
+            'success': True,
+            'actividades_procesadas': actividades_procesadas,
+            'recursos_procesados': recursos_procesados,
+            'avances_creados': avances_creados,
+            'errores': errores,
+            'total_filas': total_filas
+        }
+
+    def _eliminar_datos_anteriores(self):
+        """Elimina avances y actividades previas del requerimiento (en ese orden por FK)"""
+        db.session.execute(
+            AvanceActividad.__table__.delete().where(AvanceActividad.requerimiento_id == self.requerimiento_id)
+        )
+        db.session.execute(
+            ActividadProyecto.__table__.delete().where(ActividadProyecto.requerimiento_id == self.requerimiento_id)
+        )
+        ResumenProyecto.marcar_desactualizados([self.requerimiento_id])
+        CronogramaProyecto.marcar_desactualizados([self.requerimiento_id])
+
+    def _cargar_indice_trabajadores(self):
+        """Precarga el índice de trabajadores por clave normalizada con una sola consulta"""
+        self._recursos = ResolutorRecursos().cargar()
+
+    def _insertar_actividades(self, validas):
+        """INSERT masivo de actividades; devuelve {edt: id} con una consulta por lote"""
+        filas = [
+            {
+                'requerimiento_id': self.requerimiento_id,
+                'edt': fila.edt,
+                'nombre_tarea': fila.nombre_tarea,
+                'nivel_esquema': int(fila.nivel_esquema),
+                'fecha_inicio': fila.fecha_inicio,
+                'fecha_fin': fila.fecha_fin,
+                'duracion': int(fila.duracion),
+                'id_gantt': int(fila.id_gantt) if pd.notna(fila.id_gantt) else None,
+                'predecesoras': fila.predecesoras or None,
+                'recursos': fila.recursos,
+                'progreso': round(float(fila.progreso) * 100, 2),  # Guardar como porcentaje (0-100)
+                'activo': True
+            }
+            for fila in validas.itertuples()
+        ]
+        db.session.execute(ActividadProyecto.__table__.insert(), filas)
+
+        edts = [fila['edt'] for fila in filas]
+        return dict(db.session.execute(
+            select(ActividadProyecto.edt, ActividadProyecto.id).where(
+                ActividadProyecto.requerimiento_id == self.requerimiento_id,
+                ActividadProyecto.edt.in_(edts)
+            )
+        ).all())
+
+    def _insertar_avances(self, validas, ids_por_edt):
+        """Crea los registros de avance_actividad del lote con un INSERT masivo"""
+        asignaciones = {}
+        for fila in validas.itertuples():
+            actividad_id = ids_por_edt.get(fila.edt)
+            if actividad_id is None:
+                continue
+            for codigo, porcentaje in parsear_recursos(fila.recursos):
+                # Un mismo trabajador repetido en la actividad conserva la última asignación
+                asignaciones[(actividad_id, codigo)] = porcentaje
+        return self._insertar_asignaciones(asignaciones)
+
+    def _insertar_asignaciones(self, asignaciones):
+        """
+        INSERT masivo de avance_actividad para {(actividad_id, codigo): porcentaje}.
+        Las asignaciones de trabajadores que no existen quedan pendientes hasta
+        el final de la importación.
+        """
+        conocidas = {}
+        for (actividad_id, codigo), porcentaje in asignaciones.items():
+            trabajador_id = self._recursos.resolver(codigo)
+            if trabajador_id is None:
+                codigo = self._recursos.registrar(codigo)
+                if codigo:
+                    self._pendientes[(actividad_id, codigo)] = porcentaje
+            else:
+                conocidas[(actividad_id, trabajador_id)] = porcentaje
+        return self._insertar_filas_avance(conocidas)
+
+    def _insertar_asignaciones_pendientes(self):
+        """Crea todos los trabajadores desconocidos en un INSERT y luego sus avances"""
+        if not self._pendientes:
+            return 0
+        self._recursos.crear_pendientes()
+        filas = {
+            (actividad_id, self._recursos.resolver(codigo)): porcentaje
+            for (actividad_id, codigo), porcentaje in self._pendientes.items()
+        }
+        self._pendientes = {}
+        return self._insertar_filas_avance(filas)
+
+    def _insertar_filas_avance(self, asignaciones):
+        """INSERT masivo de avance_actividad para {(actividad_id, trabajador_id): porcentaje}"""
+        if not asignaciones:
+            return 0
+
+        ahora = datetime.now()
+        db.session.execute(AvanceActividad.__table__.insert(), [
+            {
+                'requerimiento_id': self.requerimiento_id,
+                'trabajador_id': trabajador_id,
+                'actividad_id': actividad_id,
+                'porcentaje_asignacion': porcentaje,
+                'progreso_actual': 0.0,
+                'progreso_anterior': 0.0,
+                'fecha_registro': ahora.date(),
+                'fecha_creacion': ahora,
+                'fecha_actualizacion': ahora,
+                'observaciones': f"Asignación automática desde Gantt ({porcentaje}% asignado)"
+            }
+            for (actividad_id, trabajador_id), porcentaje in asignaciones.items()
+        ])
+        return len(asignaciones)
+
+
+def importar_gantt_xlsx(file_path, requerimiento_id, tamano_lote=TAMANO_LOTE_DEFECTO):
+    """Atajo para importar un archivo Gantt con GanttIngestor"""
+    return GanttIngestor(requerimiento_id, tamano_lote=tamano_lote).importar(file_path)
@@ -0,0 +1,215 @@
+"""
+Almacén de archivos Gantt direccionado por contenido
+====================================================
+
+Los XLSX subidos se guardan en disco con su SHA-256 como nombre
+(``<raiz>/ab/cd/<sha256>.xlsx``); la tabla gantt_archivo solo guarda el hash y
+los metadatos. Consecuencias:
+
+- Subir de nuevo un archivo idéntico no escribe nada (mismo hash, mismo archivo).
+- Los blobs salen del buffer pool de MySQL y de los respaldos mysqldump.
+- La lista de actividades normalizada de cada archivo se cachea junto a él
+  (``<sha256>.actividades.v<N>.json``, compartida por todos los workers) y en
+  un LRU del proceso, así que los mismos bytes se parsean una sola vez.
+
+Los XML de MS Project se guardan igual (el nombre en disco no cambia con el
+tipo); quien lee las actividades indica el tipo_archivo de GanttArchivo y el
+XML se recorre con iterar_mspdi en lugar de pandas.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+
+# Subir al cambiar normalizar_actividades: invalida los JSON cacheados
+VERSION_NORMALIZACION = 1
+
+CHUNK_LECTURA = 1024 * 1024
+
+CACHE_ACTIVIDADES_MAX_ENTRADAS = 32
+
+# Columnas cuyo contenido se interpreta como fecha al normalizar
+_PALABRAS_FECHA = ('fecha', 'inicio', 'fin', 'start', 'end')
+
+
+def _valor_json(columna, valor):
+    """Convertir una celda de pandas a un valor JSON (fechas como YYYY-MM-DD)"""
+    import pandas as pd
+
+    if valor is None or (not isinstance(valor, (list, dict)) and pd.isna(valor)):
+        return ''
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime('%Y-%m-%d')
+    if any(palabra in columna.lower() for palabra in _PALABRAS_FECHA):
+        try:
+            fecha = pd.to_datetime(valor, errors='coerce') if isinstance(valor, str) else pd.to_datetime(valor)
+            return fecha.strftime('%Y-%m-%d') if not pd.isna(fecha) else str(valor)
+        except Exception:
+            return str(valor)
+    if hasattr(valor, 'item'):  # escalares numpy
+        return valor.item()
+    return valor
+
+
+def normalizar_actividades(df):
+    """Filas del DataFrame como dicts {columna: valor JSON}, vacíos como ''"""
+    columnas = [str(columna) for columna in df.columns]
+    return [
+        {columna: _valor_json(columna, valor) for columna, valor in zip(columnas, fila)}
+        for fila in df.itertuples(index=False, name=None)
+    ]
+
+
+def _leer_planilla(ruta, tipo_archivo):
+    """DataFrame de la planilla: el XLSX con pandas o el XML de MS Project con sus mismas columnas"""
+    if tipo_archivo == 'xml':
+        from app.services.mspdi_import_service import planilla_mspdi
+        return planilla_mspdi(ruta)
+
+    import pandas as pd
+    return pd.read_excel(ruta, engine='openpyxl')
+
+
+class GanttFileStore:
+    """Archivos Gantt en disco indexados por SHA-256, con cache de actividades parseadas"""
+
+    def __init__(self, raiz, max_entradas_cache=CACHE_ACTIVIDADES_MAX_ENTRADAS):
+        self.raiz = raiz
+        self.max_entradas_cache = max_entradas_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _directorio(self, sha256):
+        return os.path.join(self.raiz, sha256[:2], sha256[2:4])
+
+    def ruta(self, sha256):
+        return os.path.join(self._directorio(sha256), f'{sha256}.xlsx')
+
+    def _ruta_actividades(self, sha256):
+        return os.path.join(self._directorio(sha256), f'{sha256}.actividades.v{VERSION_NORMALIZACION}.json')
+
+    def existe(self, sha256):
+        return bool(sha256) and os.path.exists(self.ruta(sha256))
+
+    def _temporal(self):
+        directorio = os.path.join(self.raiz, 'tmp')
+        os.makedirs(directorio, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directorio, suffix='.part', delete=False)
+
+    def _publicar(self, ruta_temporal, destino):
+        """Mover el temporal a su destino definitivo (o descartarlo si ya existe)"""
+        if os.path.exists(destino):
+            os.remove(ruta_temporal)
+            return False
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(ruta_temporal, destino)
+        return True
+
+    def guardar_stream(self, stream):
+        """
+        Guardar el contenido de un stream binario calculando su hash al vuelo.
+
+        Returns:
+            tuple: (sha256, tamano_bytes, nuevo) — nuevo es False si el
+            contenido ya estaba en el almacén.
+        """
+        digest = hashlib.sha256()
+        tamano = 0
+        temporal = self._temporal()
+        try:
+            with temporal:
+                while True:
+                    bloque = stream.read(CHUNK_LECTURA)
+                    if not bloque:
+                        break
+                    digest.update(bloque)
+                    temporal.write(bloque)
+                    tamano += len(bloque)
+            sha256 = digest.hexdigest()
+            nuevo = self._publicar(temporal.name, self.ruta(sha256))
+        except Exception:
+            if os.path.exists(temporal.name):
+                os.remove(temporal.name)
+            raise
+        return sha256, tamano, nuevo
+
+    def guardar_bytes(self, contenido):
+        """Guardar contenido ya en memoria (p. ej. blobs legacy de gantt_archivo)"""
+        from io import BytesIO
+        return self.guardar_stream(BytesIO(contenido))
+
+    def abrir(self, sha256):
+        return open(self.ruta(sha256), 'rb')
+
+    def actividades(self, sha256, tipo_archivo='xlsx'):
+        """
+        Lista normalizada de actividades del archivo.
+
+        Orden de búsqueda: LRU del proceso -> JSON junto al archivo -> parseo
+        con pandas, o iterar_mspdi si tipo_archivo es 'xml' (que deja escrito
+        el JSON para los demás workers).
+        """
+        with self._lock:
+            actividades = self._cache.get(sha256)
+            if actividades is not None:
+                self._cache.move_to_end(sha256)
+                return actividades
+
+        ruta_json = self._ruta_actividades(sha256)
+        try:
+            with open(ruta_json, 'r', encoding='utf-8') as f:
+                actividades = json.load(f)
+        except (FileNotFoundError, ValueError):
+            actividades = normalizar_actividades(_leer_planilla(self.ruta(sha256), tipo_archivo))
+            temporal = self._temporal()
+            with temporal:
+                temporal.write(json.dumps(actividades, ensure_ascii=False).encode('utf-8'))
+            self._publicar(temporal.name, ruta_json)
+            print(f"📄 Gantt {sha256[:12]} parseado: {len(actividades)} filas cacheadas")
+
+        with self._lock:
+            self._cache[sha256] = actividades
+            while len(self._cache) > self.max_entradas_cache:
+                self._cache.popitem(last=False)
+        return actividades
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def obtener_gantt_store():
+    """Almacén configurado para la app actual (GANTT_STORE_FOLDER o <UPLOAD_FOLDER>/gantt_store)"""
+    from flask import current_app
+
+    raiz = current_app.config.get('GANTT_STORE_FOLDER') or os.path.join(
+        current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'gantt_store'
+    )
+    with _stores_lock:
+        store = _stores.get(raiz)
+        if store is None:
+            store = _stores[raiz] = GanttFileStore(raiz)
+    return store
+
+
+def asegurar_en_store(gantt_archivo, store=None):
+    """
+    Hash del archivo de un GanttArchivo, migrando al almacén el blob legacy si
+    aún lo tiene (una vez por registro). No hace commit.
+    """
+    store = store or obtener_gantt_store()
+    if gantt_archivo.sha256 and store.existe(gantt_archivo.sha256):
+        return gantt_archivo.sha256
+    if gantt_archivo.archivo is None:
+        return None
+
+    sha256, tamano, _ = store.guardar_bytes(gantt_archivo.archivo)
+    gantt_archivo.sha256 = sha256
+    gantt_archivo.tamano_archivo = tamano
+    gantt_archivo.archivo = None
+    print(f"📦 GanttArchivo {gantt_archivo.id} migrado al almacén de archivos ({sha256[:12]})")
+    return sha256
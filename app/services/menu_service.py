@@ -2,15 +2,29 @@
 Servicio para generar menús dinámicos basados en permisos de usuario
 """
 
+import threading
+from collections import defaultdict, OrderedDict
+
 from flask_login import current_user
-from app.models import Page, Category, PagePermission, UserRole, CustomRole, MenuConfiguration
-from collections import defaultdict
+from app import db
+from app.models import (
+    Page, Category, PagePermission, UserRole, CustomRole, MenuConfiguration,
+    CacheVersion, VERSION_PERMISOS
+)
+from app.services.permisos_service import version_permisos, invalidar_snapshots
+
+# Entradas máximas del cache de menús por proceso (una por combinación de roles)
+MENU_CACHE_MAX_ENTRADAS = 128
+
 
 class MenuService:
     """Servicio para generar menús dinámicos según permisos del usuario"""
     
-    def __init__(self):
-        self.menu_cache = {}
+    def __init__(self, max_entradas=MENU_CACHE_MAX_ENTRADAS):
+        # LRU: (rol, custom_role, versión de permisos) -> menú
+        self.menu_cache = OrderedDict()
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
     
     def get_user_menu(self, user=None):
         """Obtener menú personalizado para el usuario actual"""
@@ -20,19 +34,32 @@ class MenuService:
         if not user or not user.is_authenticated:
             return self._get_public_menu()
         
-        # Cache key basado en usuario, rol del sistema y custom role
+        # El menú depende solo de los roles; la versión global de permisos hace que
+        # todos los procesos reconstruyan tras cualquier cambio de permisos o menú
         role_part = user.rol.value if hasattr(user, 'rol') and user.rol else 'none'
         custom_role_part = str(user.custom_role_id) if hasattr(user, 'custom_role_id') and user.custom_role_id else 'none'
-        cache_key = f"{user.id}_{role_part}_{custom_role_part}"
+        cache_key = (role_part, custom_role_part, self.get_permissions_version())
         
-        if cache_key in self.menu_cache:
-            return self.menu_cache[cache_key]
+        with self._lock:
+            menu = self.menu_cache.get(cache_key)
+            if menu is not None:
+                self.menu_cache.move_to_end(cache_key)
+                return menu
         
         menu = self._build_user_menu(user)
-        self.menu_cache[cache_key] = menu
+        
+        with self._lock:
+            self.menu_cache[cache_key] = menu
+            self.menu_cache.move_to_end(cache_key)
+            while len(self.menu_cache) > self.max_entradas:
+                self.menu_cache.popitem(last=False)
         
         return menu
     
+    def get_permissions_version(self):
+        """Versión global de permisos, leída una vez por request"""
+        return version_permisos()
+    
     def _build_user_menu(self, user):
         """Construir menú basado en permisos del usuario"""
         
@@ -114,33 +141,33 @@ class MenuService:
                 
                 permissions.extend(custom_permissions)
             
-            # Procesar permisos encontrados
+            # Procesar permisos encontrados; un usuario con ambos tipos de permisos
+            # puede traer la misma página dos veces
+            vistas = set()
             for permission in permissions:
                 page = permission.page
-                if page and page.active and page.is_visible:
-                    page_data = {
-                        'id': page.id,
-                        'route': page.route,
-                        'name': page.name,
-                        'description': page.description,
-                        'icon': page.icon,
-                        'display_order': page.display_order,
-                        'parent_page_id': page.parent_page_id,
-                        'menu_group': page.menu_group,
-                        'external_url': page.external_url,
-                        'target_blank': page.target_blank,
-                        'category': {
-                            'id': page.category_obj.id,
-                            'name': page.category_obj.name,
-                            'icon': page.category_obj.icon,
-                            'color': page.category_obj.color,
-                            'display_order': page.category_obj.display_order
-                        }
+                if not page or page.id in vistas or not (page.active and page.is_visible):
+                    continue
+                vistas.add(page.id)
+                allowed_pages.append({
+                    'id': page.id,
+                    'route': page.route,
+                    'name': page.name,
+                    'description': page.description,
+                    'icon': page.icon,
+                    'display_order': page.display_order,
+                    'parent_page_id': page.parent_page_id,
+                    'menu_group': page.menu_group,
+                    'external_url': page.external_url,
+                    'target_blank': page.target_blank,
+                    'category': {
+                        'id': page.category_obj.id,
+                        'name': page.category_obj.name,
+                        'icon': page.category_obj.icon,
+                        'color': page.category_obj.color,
+                        'display_order': page.category_obj.display_order
                     }
-                    
-                    # Evitar duplicados (si un usuario tiene ambos tipos de permisos)
-                    if not any(p['id'] == page.id for p in allowed_pages):
-                        allowed_pages.append(page_data)
+                })
             
         except Exception as e:
             print(f"Error obteniendo páginas permitidas: {e}")
@@ -213,8 +240,23 @@ class MenuService:
         return MenuConfiguration.get_default_config()
     
     def clear_cache(self):
-        """Limpiar cache del menú (útil cuando cambian permisos)"""
-        self.menu_cache.clear()
+        """
+        Invalidar el menú en todos los procesos.
+        
+        Los flush de modelos de permisos ya incrementan la versión (ver
+        CacheVersion en models); esto cubre además escrituras masivas
+        (query.delete/update) que no pasan por el flush de objetos.
+        """
+        try:
+            CacheVersion.incrementar(VERSION_PERMISOS)
+            db.session.commit()
+        except Exception as e:
+            print(f"Error incrementando versión de permisos: {e}")
+            db.session.rollback()
+        
+        invalidar_snapshots()
+        with self._lock:
+            self.menu_cache.clear()
     
     def get_breadcrumbs(self, current_route):
         """Generar breadcrumbs para la ruta actual"""
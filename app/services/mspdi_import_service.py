@@ -0,0 +1,379 @@
+"""
+Importación nativa de MS Project XML (MSPDI)
+============================================
+
+Lee el XML que exporta MS Project ("Guardar como > XML") sin pasar por una
+planilla: tareas, recursos, asignaciones y vínculos de predecesoras van
+directo a actividad_proyecto, trabajador y avance_actividad.
+
+El archivo se recorre con iterparse y cada Task/Resource/Assignment se
+descarta (clear + remove) apenas se procesa, así la memoria no depende del
+tamaño del cronograma: solo se conservan los mapas de UID a id y las
+asignaciones pendientes. Las escrituras reutilizan GanttIngestor (mismo
+reemplazo transaccional, INSERT masivos y creación de trabajadores):
+
+- Task -> ActividadProyecto (EDT = WBS, Id de MS Project en id_gantt).
+- PredecessorLink -> columna predecesoras con el formato de MS Project en
+  español ("3", "5CC+2 días"), que lee ruta_critica_service.
+- Resource (de trabajo) -> Trabajador existente por nombre, iniciales o
+  código (ResolutorRecursos); si no hay, uno nuevo con el nombre sin tildes,
+  espacios ni símbolos, en mayúsculas, como código.
+- Assignment -> AvanceActividad y el texto "CODIGO[100%]" de recursos.
+"""
+
+import logging
+import re
+import xml.etree.ElementTree as ET
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import bindparam
+
+from app.models import db, ActividadProyecto
+from app.services.gantt_import_service import GanttIngestor, TAMANO_LOTE_DEFECTO
+from app.services.recursos_service import codigo_trabajador
+
+logger = logging.getLogger(__name__)
+
+ESPACIO_NOMBRES = 'http://schemas.microsoft.com/project'
+
+# Elemento contenedor -> (elemento, tipo entregado por iterar_mspdi)
+SECCIONES = {'Tasks': ('Task', 'tarea'), 'Resources': ('Resource', 'recurso'), 'Assignments': ('Assignment', 'asignacion')}
+
+# PredecessorLink/Type -> tipo de vínculo en la columna predecesoras
+TIPOS_VINCULO_MSPDI = {'0': 'FF', '1': 'FC', '2': 'CF', '3': 'CC'}
+
+# LagFormat de los desfases en porcentaje de la duración (no se convierten a días)
+FORMATOS_DESFASE_PORCENTAJE = {'19', '20', '51', '52'}
+
+MINUTOS_POR_DIA_DEFECTO = 480
+
+# Resource/Type de los recursos de trabajo (los de material y costo no son trabajadores)
+TIPO_RECURSO_TRABAJO = '1'
+
+_PATRON_DURACION = re.compile(r'^-?PT(?:([\d.]+)H)?(?:([\d.]+)M)?(?:([\d.]+)S)?$')
+
+
+def es_mspdi(file_path):
+    """True si el archivo es un XML de MS Project (se mira solo el comienzo)"""
+    with open(file_path, 'rb') as archivo:
+        inicio = archivo.read(2048)
+    return inicio.lstrip().startswith(b'<') and ESPACIO_NOMBRES.encode('ascii') in inicio
+
+
+def _nombre_local(etiqueta):
+    return etiqueta.rsplit('}', 1)[-1]
+
+
+def _campos(elemento):
+    """Hijos simples como {nombre: texto} y los PredecessorLink como lista de dicts"""
+    campos = {'PredecessorLink': []}
+    for hijo in elemento:
+        nombre = _nombre_local(hijo.tag)
+        if nombre == 'PredecessorLink':
+            campos['PredecessorLink'].append({_nombre_local(c.tag): c.text for c in hijo})
+        elif len(hijo) == 0:
+            campos[nombre] = hijo.text
+    return campos
+
+
+def iterar_mspdi(file_path):
+    """
+    Recorre el XML en streaming.
+
+    Yields:
+        tuple: ('minutos_por_dia', texto) de la cabecera del proyecto y
+        ('tarea' | 'recurso' | 'asignacion', {campo: texto}) en orden de archivo
+    """
+    pila = []
+    for evento, elemento in ET.iterparse(file_path, events=('start', 'end')):
+        if evento == 'start':
+            pila.append(elemento)
+            continue
+
+        pila.pop()
+        nombre = _nombre_local(elemento.tag)
+        if len(pila) == 1 and nombre == 'MinutesPerDay':
+            yield 'minutos_por_dia', elemento.text
+        elif len(pila) == 2:
+            seccion = SECCIONES.get(_nombre_local(pila[-1].tag))
+            if seccion and seccion[0] == nombre:
+                yield seccion[1], _campos(elemento)
+        elif len(pila) != 1:
+            # Hijos de un elemento que todavía no termina: se descartan con él
+            continue
+
+        elemento.clear()
+        if pila:
+            pila[-1].remove(elemento)
+
+
+def _dias(duracion, minutos_por_dia):
+    """'PT126H0M0S' -> días de trabajo según MinutesPerDay del proyecto"""
+    coincidencia = _PATRON_DURACION.match(duracion or '')
+    if not coincidencia:
+        return 0
+    horas, minutos, segundos = (float(valor or 0) for valor in coincidencia.groups())
+    return round((horas * 60 + minutos + segundos / 60) / minutos_por_dia)
+
+
+def _fecha(texto):
+    try:
+        return date.fromisoformat(texto[:10]) if texto else None
+    except ValueError:
+        return None
+
+
+def texto_predecesoras(vinculos, id_por_uid, minutos_por_dia):
+    """PredecessorLink -> "3;5CC+2 días" con los Id de MS Project (None si no queda ninguno)"""
+    partes = []
+    for vinculo in vinculos:
+        id_predecesora = id_por_uid.get(vinculo.get('PredecessorUID'))
+        if id_predecesora is None or vinculo.get('CrossProject') == '1':
+            continue
+        tipo = TIPOS_VINCULO_MSPDI.get(vinculo.get('Type'), 'FC')
+        texto = str(id_predecesora) if tipo == 'FC' else f"{id_predecesora}{tipo}"
+        if vinculo.get('LagFormat') not in FORMATOS_DESFASE_PORCENTAJE:
+            # LinkLag viene en décimas de minuto de trabajo
+            desfase = round(int(vinculo.get('LinkLag') or 0) / 10 / minutos_por_dia)
+            if desfase:
+                texto += f"{desfase:+d} días"
+        partes.append(texto)
+    return ';'.join(partes) or None
+
+
+def planilla_mspdi(file_path):
+    """
+    Tareas del XML con las columnas de la planilla que exporta MS Project
+    (Id, EDT, Nombre de tarea, Duración, Comienzo, Fin, Predecesoras, Nombres
+    de los recursos, % completado, Nivel de esquema), para leer un XML
+    almacenado como si fuera el XLSX (gantt_store) sin importarlo.
+
+    Returns:
+        DataFrame con una fila por tarea, en orden de archivo
+    """
+    minutos_por_dia = MINUTOS_POR_DIA_DEFECTO
+    filas = {}  # UID de tarea -> fila
+    vinculos = {}
+    id_por_uid = {}
+    recursos = {}  # UID de recurso -> nombre
+    asignados = {}  # UID de tarea -> nombres de recursos
+
+    for tipo, datos in iterar_mspdi(file_path):
+        if tipo == 'minutos_por_dia' and datos:
+            minutos_por_dia = int(datos) or MINUTOS_POR_DIA_DEFECTO
+        elif tipo == 'tarea':
+            if datos.get('UID') in (None, '0') or datos.get('IsNull') == '1' or datos.get('OutlineLevel') == '0':
+                continue
+            id_gantt = int(datos['ID']) if (datos.get('ID') or '').isdigit() else None
+            id_por_uid[datos['UID']] = id_gantt
+            vinculos[datos['UID']] = datos['PredecessorLink']
+            filas[datos['UID']] = {
+                'Id': id_gantt,
+                'EDT': (datos.get('WBS') or datos.get('OutlineNumber') or '').strip(),
+                'Nombre de tarea': (datos.get('Name') or '').strip(),
+                'Duración': _dias(datos.get('Duration'), minutos_por_dia),
+                'Comienzo': _fecha(datos.get('Start')),
+                'Fin': _fecha(datos.get('Finish')),
+                'Predecesoras': None,
+                'Nombres de los recursos': None,
+                '% completado': float(datos.get('PercentComplete') or 0) / 100,
+                'Nivel de esquema': int(datos.get('OutlineLevel') or 1),
+            }
+        elif tipo == 'recurso':
+            if datos.get('UID') not in (None, '0') and datos.get('Name'):
+                recursos[datos['UID']] = datos['Name'].strip()
+        elif tipo == 'asignacion':
+            nombre = recursos.get(datos.get('ResourceUID'))
+            if nombre and datos.get('TaskUID') in filas:
+                asignados.setdefault(datos['TaskUID'], []).append(nombre)
+
+    for uid, fila in filas.items():
+        fila['Predecesoras'] = texto_predecesoras(vinculos[uid], id_por_uid, minutos_por_dia)
+        fila['Nombres de los recursos'] = ';'.join(asignados.get(uid, [])) or None
+    return pd.DataFrame(list(filas.values()))
+
+
+class MSPDIIngestor(GanttIngestor):
+    """
+    Importa un XML de MS Project para un requerimiento reemplazando sus
+    actividades y avances en una sola transacción.
+    """
+
+    def __init__(self, requerimiento_id, tamano_lote=TAMANO_LOTE_DEFECTO):
+        super().__init__(requerimiento_id, tamano_lote=tamano_lote)
+        self._minutos_por_dia = MINUTOS_POR_DIA_DEFECTO
+        self._lote = []
+        self._edts_vistos = set()
+        self._errores = []
+        self._id_por_uid = {}  # UID de tarea -> Id de MS Project
+        self._actividad_por_uid = {}  # UID de tarea -> actividad_proyecto.id
+        self._vinculos = {}  # UID de tarea -> PredecessorLink
+        self._codigos = {}  # UID de recurso -> código de trabajador
+        self._asignaciones = {}  # (actividad_id, código) -> porcentaje
+
+    def importar(self, file_path):
+        """
+        Ejecuta la importación completa.
+
+        Returns:
+            dict: mismo formato que GanttIngestor.importar()
+        """
+        total_filas = 0
+        try:
+            self._eliminar_datos_anteriores()
+            self._cargar_indice_trabajadores()
+
+            for tipo, datos in iterar_mspdi(file_path):
+                if tipo == 'tarea':
+                    total_filas += self._agregar_tarea(datos)
+                    if len(self._lote) >= self.tamano_lote:
+                        self._guardar_lote()
+                elif tipo == 'recurso':
+                    self._agregar_recurso(datos)
+                elif tipo == 'asignacion':
+                    self._guardar_lote()  # Las asignaciones necesitan el id de sus tareas
+                    self._agregar_asignacion(datos)
+                elif tipo == 'minutos_por_dia' and datos:
+                    self._minutos_por_dia = int(datos) or MINUTOS_POR_DIA_DEFECTO
+            self._guardar_lote()
+
+            if total_filas == 0:
+                db.session.rollback()
+                return {'success': False, 'error': 'El archivo no contiene tareas de MS Project'}
+
+            self._actualizar_predecesoras_y_recursos()
+            avances_creados = self._insertar_asignaciones(self._asignaciones)
+            avances_creados += self._insertar_asignaciones_pendientes()
+            db.session.commit()
+
+        except ET.ParseError as e:
+            db.session.rollback()
+            return {'success': False, 'error': f'El XML de MS Project no es válido: {e}'}
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Error importando MSPDI del requerimiento {self.requerimiento_id}")
+            return {'success': False, 'error': f'Error al guardar en la base de datos: {e}'}
+
+        actividades_procesadas = len(self._actividad_por_uid)
+        logger.info(
+            f"MSPDI importado para requerimiento {self.requerimiento_id}: "
+            f"{actividades_procesadas} actividades, {avances_creados} avances, "
+            f"{len(self._errores)} errores en {total_filas} tareas"
+        )
+
+        return {
+            'success': True,
+            'actividades_procesadas': actividades_procesadas,
+            'recursos_procesados': avances_creados,
+            'avances_creados': avances_creados,
+            'errores': self._errores,
+            'total_filas': total_filas
+        }
+
+    def _agregar_tarea(self, datos):
+        """Valida una Task y la deja en el lote; devuelve 1 si cuenta como fila del cronograma"""
+        # La tarea 0 es el resumen del proyecto y las IsNull son filas en blanco
+        if datos.get('UID') in (None, '0') or datos.get('IsNull') == '1' or datos.get('OutlineLevel') == '0':
+            return 0
+
+        id_gantt = int(datos['ID']) if (datos.get('ID') or '').isdigit() else None
+        edt = (datos.get('WBS') or datos.get('OutlineNumber') or '').strip()
+        nombre = (datos.get('Name') or '').strip()
+        inicio, fin = _fecha(datos.get('Start')), _fecha(datos.get('Finish'))
+
+        if not edt or not nombre:
+            self._errores.append(f"Tarea {id_gantt}: EDT o nombre de tarea vacío (EDT: '{edt}', Nombre: '{nombre}')")
+        elif len(edt) > 50:
+            self._errores.append(f"Tarea {id_gantt}: EDT muy largo (máximo 50 caracteres): '{edt}'")
+        elif len(nombre) > 500:
+            self._errores.append(f"Tarea {id_gantt}: Nombre de tarea muy largo (máximo 500 caracteres): '{nombre[:100]}...'")
+        elif datos.get('Active') == '0':
+            self._errores.append(f"Tarea {id_gantt}: inactiva en MS Project, no se importa")
+        elif inicio is None or fin is None:
+            self._errores.append(f"Tarea {id_gantt}: Fechas requeridas son nulas o inválidas (Inicio: {inicio}, Fin: {fin})")
+        elif edt in self._edts_vistos:
+            self._errores.append(f"Tarea {id_gantt}: EDT duplicado '{edt}'")
+        else:
+            self._edts_vistos.add(edt)
+            self._id_por_uid[datos['UID']] = id_gantt
+            if datos['PredecessorLink']:
+                self._vinculos[datos['UID']] = datos['PredecessorLink']
+            self._lote.append({
+                'uid': datos['UID'],
+                'edt': edt,
+                'nombre_tarea': nombre,
+                'nivel_esquema': int(datos.get('OutlineLevel') or 1),
+                'fecha_inicio': inicio,
+                'fecha_fin': fin,
+                'duracion': _dias(datos.get('Duration'), self._minutos_por_dia),
+                'id_gantt': id_gantt,
+                'predecesoras': None,  # Se resuelven al final (pueden apuntar a tareas posteriores)
+                'recursos': None,  # Llegan con las asignaciones, después de las tareas
+                'progreso': float(datos.get('PercentComplete') or 0) / 100,
+            })
+        return 1
+
+    def _guardar_lote(self):
+        if not self._lote:
+            return
+        ids_por_edt = self._insertar_actividades(pd.DataFrame(self._lote))
+        for fila in self._lote:
+            self._actividad_por_uid[fila['uid']] = ids_por_edt[fila['edt']]
+        self._lote = []
+
+    def _agregar_recurso(self, datos):
+        if datos.get('UID') in (None, '0') or datos.get('IsNull') == '1':
+            return
+        if datos.get('Type', TIPO_RECURSO_TRABAJO) != TIPO_RECURSO_TRABAJO:
+            return
+        nombres = (datos.get('Name'), datos.get('Initials'))
+        # Un trabajador existente por nombre o iniciales conserva su nombrecorto
+        conocido = next((nombre for nombre in nombres if self._recursos.resolver(nombre) is not None), None)
+        codigo = self._recursos.codigo(conocido) if conocido else (
+            codigo_trabajador(nombres[0]) or codigo_trabajador(nombres[1])
+        )
+        if codigo:
+            self._codigos[datos['UID']] = codigo
+
+    def _agregar_asignacion(self, datos):
+        actividad_id = self._actividad_por_uid.get(datos.get('TaskUID'))
+        codigo = self._codigos.get(datos.get('ResourceUID'))
+        if actividad_id is None or codigo is None:
+            return
+        porcentaje = round(float(datos.get('Units') or 1) * 100)
+        # Un mismo trabajador repetido en la tarea conserva la última asignación
+        self._asignaciones[(actividad_id, codigo)] = porcentaje
+
+    def _actualizar_predecesoras_y_recursos(self):
+        """UPDATE masivo de predecesoras y texto de recursos, conocidos al terminar el archivo"""
+        recursos = {}
+        for (actividad_id, codigo), porcentaje in self._asignaciones.items():
+            recursos.setdefault(actividad_id, []).append(f"{codigo}[{porcentaje}%]")
+        predecesoras = {
+            self._actividad_por_uid[uid]: texto_predecesoras(vinculos, self._id_por_uid, self._minutos_por_dia)
+            for uid, vinculos in self._vinculos.items() if uid in self._actividad_por_uid
+        }
+
+        actividades = set(recursos) | {actividad_id for actividad_id, texto in predecesoras.items() if texto}
+        if not actividades:
+            return
+        tabla = ActividadProyecto.__table__
+        db.session.execute(
+            tabla.update().where(tabla.c.id == bindparam('b_id')).values(
+                predecesoras=bindparam('b_predecesoras'), recursos=bindparam('b_recursos')
+            ),
+            [
+                {
+                    'b_id': actividad_id,
+                    'b_predecesoras': predecesoras.get(actividad_id),
+                    'b_recursos': ';'.join(recursos[actividad_id]) if actividad_id in recursos else None
+                }
+                for actividad_id in actividades
+            ]
+        )
+
+
+def importar_gantt_mspdi(file_path, requerimiento_id, tamano_lote=TAMANO_LOTE_DEFECTO):
+    """Atajo para importar un XML de MS Project con MSPDIIngestor"""
+    return MSPDIIngestor(requerimiento_id, tamano_lote=tamano_lote).importar(file_path)
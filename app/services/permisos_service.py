@@ -0,0 +1,128 @@
+"""
+Snapshot de permisos por rol
+============================
+
+Las verificaciones de Trabajador (has_page_permission, can_access_category,
+is_admin, can_manage_*...) consultan este snapshot en lugar de la base de datos:
+
+- Primera verificación de la request: se obtiene el snapshot del rol
+  personalizado (una consulta si no está en el cache del proceso).
+- Verificaciones siguientes: pertenencia en frozensets guardados en flask.g.
+
+El cache entre requests se indexa por (custom_role_id, versión de permisos),
+la misma versión que invalida el menú (CacheVersion 'permisos'), así que una
+escritura de permisos en cualquier proceso invalida todos los snapshots.
+"""
+
+import threading
+from collections import OrderedDict
+
+from flask import g, has_app_context
+from sqlalchemy import select
+
+from app import db
+
+# Entradas máximas del cache de snapshots por proceso (una por rol personalizado)
+SNAPSHOT_CACHE_MAX_ENTRADAS = 256
+
+_cache_snapshots = OrderedDict()
+_lock = threading.Lock()
+
+
+class PermisosSnapshot:
+    """Permisos efectivos de un rol personalizado (inmutable)"""
+
+    __slots__ = ('custom_role_id', 'page_ids', 'rutas', 'categorias')
+
+    def __init__(self, custom_role_id, page_ids=(), rutas=(), categorias=()):
+        object.__setattr__(self, 'custom_role_id', custom_role_id)
+        object.__setattr__(self, 'page_ids', frozenset(page_ids))
+        object.__setattr__(self, 'rutas', frozenset(rutas))
+        object.__setattr__(self, 'categorias', frozenset(categorias))
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError('PermisosSnapshot es inmutable')
+
+    def tiene_ruta(self, ruta):
+        return ruta in self.rutas
+
+    def tiene_categoria(self, nombre_categoria):
+        return nombre_categoria in self.categorias
+
+
+def version_permisos():
+    """Versión global de permisos, leída una vez por request y guardada en g"""
+    from app.models import CacheVersion, VERSION_PERMISOS
+
+    if has_app_context() and 'permisos_version' in g:
+        return g.permisos_version
+
+    try:
+        version = CacheVersion.obtener(VERSION_PERMISOS)
+    except Exception as e:
+        print(f"Error leyendo versión de permisos: {e}")
+        db.session.rollback()
+        version = -1
+
+    if has_app_context():
+        g.permisos_version = version
+    return version
+
+
+def cargar_snapshot(custom_role_id):
+    """Todas las páginas activas permitidas al rol, con su categoría, en una consulta"""
+    from app.models import Page, Category, PagePermission
+
+    filas = db.session.execute(
+        select(Page.id, Page.route, Category.name)
+        .join(PagePermission, PagePermission.page_id == Page.id)
+        .join(Category, Category.id == Page.category_id)
+        .where(PagePermission.custom_role_id == custom_role_id, Page.active == True)
+    ).all()
+
+    return PermisosSnapshot(
+        custom_role_id,
+        page_ids=(f[0] for f in filas),
+        rutas=(f[1] for f in filas),
+        categorias=(f[2] for f in filas)
+    )
+
+
+def obtener_snapshot(custom_role_id):
+    """
+    Snapshot de permisos del rol para la request en curso.
+
+    Orden de búsqueda: flask.g -> cache del proceso (misma versión) -> base de datos.
+    """
+    snapshots_request = None
+    if has_app_context():
+        snapshots_request = g.setdefault('permisos_snapshots', {})
+        snapshot = snapshots_request.get(custom_role_id)
+        if snapshot is not None:
+            return snapshot
+
+    clave = (custom_role_id, version_permisos())
+    with _lock:
+        snapshot = _cache_snapshots.get(clave)
+        if snapshot is not None:
+            _cache_snapshots.move_to_end(clave)
+
+    if snapshot is None:
+        snapshot = cargar_snapshot(custom_role_id)
+        with _lock:
+            _cache_snapshots[clave] = snapshot
+            while len(_cache_snapshots) > SNAPSHOT_CACHE_MAX_ENTRADAS:
+                _cache_snapshots.popitem(last=False)
+
+    if snapshots_request is not None:
+        snapshots_request[custom_role_id] = snapshot
+    return snapshot
+
+
+def invalidar_snapshots():
+    """Descartar los snapshots del proceso y de la request en curso"""
+    with _lock:
+        _cache_snapshots.clear()
+    if has_app_context():
+        g.pop('permisos_snapshots', None)
+        g.pop('permisos_version', None)
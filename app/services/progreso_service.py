@@ -0,0 +1,251 @@
+"""
+Servicio de cálculo de progreso jerárquico (EDT)
+================================================
+
+Carga una sola vez las actividades de un proyecto, arma el árbol EDT en
+memoria y recalcula en una pasada de abajo hacia arriba:
+
+- Hojas: progreso ponderado por horas asignadas a cada trabajador
+  (misma fórmula que calcular_progreso_actividad).
+- Padres: promedio de sus hijas directas ponderado por duración
+  (misma regla que calcular_progreso_jerarquico).
+
+Solo se escriben las actividades cuyo progreso cambió, con un único UPDATE
+por lotes dentro de la transacción en curso (no hace commit).
+"""
+
+import logging
+from collections import defaultdict
+
+from sqlalchemy import select, bindparam
+
+from app.models import db, ActividadProyecto, AvanceActividad, ResumenProyecto
+
+logger = logging.getLogger(__name__)
+
+# Diferencia mínima (en puntos porcentuales) para considerar que un progreso cambió
+TOLERANCIA_PROGRESO = 0.01
+
+HORAS_POR_DIA = 8
+
+
+def calcular_progreso_hoja(duracion, avances):
+    """
+    Progreso de una actividad a partir de sus asignaciones.
+
+    progreso = Σ horas_completadas / Σ horas_asignadas, con
+    horas_asignadas = porcentaje_asignacion * 8 * duracion / 100 y
+    horas_completadas = horas_asignadas * progreso_actual / 100
+
+    Args:
+        duracion: duración de la actividad en días
+        avances: iterable de (porcentaje_asignacion, progreso_actual)
+
+    Returns:
+        float: progreso 0-100
+    """
+    total_asignadas = 0.0
+    total_completadas = 0.0
+    for porcentaje_asignacion, progreso_actual in avances:
+        horas = (float(porcentaje_asignacion or 0) * HORAS_POR_DIA / 100) * float(duracion or 0)
+        total_asignadas += horas
+        total_completadas += horas * float(progreso_actual or 0) / 100
+
+    if total_asignadas <= 0:
+        return 0.0
+    return max(0.0, min(100.0, total_completadas / total_asignadas * 100))
+
+
+def edt_padre(edt):
+    """'1.2.3' -> '1.2'; un EDT raíz no tiene padre"""
+    if not edt or '.' not in edt:
+        return None
+    return edt.rsplit('.', 1)[0]
+
+
+class NodoEDT:
+    """Actividad dentro del árbol EDT en memoria"""
+
+    __slots__ = ('id', 'edt', 'duracion', 'progreso_original', 'progreso', 'hijos')
+
+    def __init__(self, actividad_id, edt, duracion, progreso):
+        self.id = actividad_id
+        self.edt = edt
+        self.duracion = float(duracion or 0)
+        self.progreso_original = float(progreso or 0)
+        self.progreso = self.progreso_original
+        self.hijos = []
+
+    @property
+    def profundidad(self):
+        return self.edt.count('.')
+
+    @property
+    def cambio(self):
+        return abs(self.progreso - self.progreso_original) > TOLERANCIA_PROGRESO
+
+
+class ArbolProgresoEDT:
+    """
+    Árbol EDT de un proyecto con recálculo de progreso en memoria.
+
+    Uso típico:
+        arbol = ArbolProgresoEDT(requerimiento_id)
+        cambios = arbol.recalcular([actividad.id])   # hojas + ancestros
+        db.session.commit()
+    """
+
+    def __init__(self, requerimiento_id):
+        self.requerimiento_id = requerimiento_id
+        self.por_edt = {}
+        self.por_id = {}
+        self._cargado = False
+
+    def cargar(self):
+        """
+        Carga las actividades activas del proyecto con una sola consulta; las
+        inactivas no entran en el promedio ponderado de sus padres
+        """
+        filas = db.session.execute(
+            select(
+                ActividadProyecto.id,
+                ActividadProyecto.edt,
+                ActividadProyecto.duracion,
+                ActividadProyecto.progreso
+            ).where(ActividadProyecto.requerimiento_id == self.requerimiento_id, ActividadProyecto.activo == True)
+        ).all()
+
+        self.por_edt = {}
+        self.por_id = {}
+        for actividad_id, edt, duracion, progreso in filas:
+            nodo = NodoEDT(actividad_id, edt, duracion, progreso)
+            self.por_edt[edt] = nodo
+            self.por_id[actividad_id] = nodo
+
+        for nodo in self.por_edt.values():
+            padre = self.por_edt.get(edt_padre(nodo.edt))
+            if padre is not None:
+                padre.hijos.append(nodo)
+
+        self._cargado = True
+        return self
+
+    def _asegurar_cargado(self):
+        if not self._cargado:
+            self.cargar()
+
+    def _cargar_avances(self, actividad_ids=None):
+        """{actividad_id: [(porcentaje_asignacion, progreso_actual), ...]} en una consulta"""
+        consulta = select(
+            AvanceActividad.actividad_id,
+            AvanceActividad.porcentaje_asignacion,
+            AvanceActividad.progreso_actual
+        )
+        if actividad_ids is None:
+            consulta = consulta.where(AvanceActividad.requerimiento_id == self.requerimiento_id)
+        else:
+            consulta = consulta.where(AvanceActividad.actividad_id.in_(list(actividad_ids)))
+
+        avances = defaultdict(list)
+        for actividad_id, porcentaje, progreso in db.session.execute(consulta):
+            avances[actividad_id].append((porcentaje, progreso))
+        return avances
+
+    def recalcular_hojas(self, actividad_ids):
+        """Recalcula desde avance_actividad el progreso de las actividades indicadas"""
+        self._asegurar_cargado()
+        nodos = [self.por_id[i] for i in set(actividad_ids) if i in self.por_id]
+        if not nodos:
+            return []
+
+        avances = self._cargar_avances(n.id for n in nodos)
+        for nodo in nodos:
+            nodo.progreso = calcular_progreso_hoja(nodo.duracion, avances.get(nodo.id, ()))
+        return nodos
+
+    def propagar(self, nodos):
+        """Recalcula los ancestros de los nodos dados, del más profundo al más alto"""
+        ancestros = {}
+        for nodo in nodos:
+            edt = edt_padre(nodo.edt)
+            while edt:
+                padre = self.por_edt.get(edt)
+                if padre is not None:
+                    ancestros[padre.edt] = padre
+                edt = edt_padre(edt)
+
+        for padre in sorted(ancestros.values(), key=lambda n: n.profundidad, reverse=True):
+            padre.progreso = self._progreso_ponderado(padre)
+
+    @staticmethod
+    def _progreso_ponderado(nodo):
+        """Promedio del progreso de las hijas directas ponderado por duración"""
+        total_peso = sum(h.duracion for h in nodo.hijos)
+        if total_peso == 0:
+            return 0.0
+        return sum(h.progreso * h.duracion for h in nodo.hijos) / total_peso
+
+    def progreso_de(self, actividad_id):
+        """Progreso jerárquico de una actividad: ponderado si tiene hijas, por avances si es hoja"""
+        self._asegurar_cargado()
+        nodo = self.por_id.get(actividad_id)
+        if nodo is None:
+            return 0.0
+        if nodo.hijos:
+            return self._progreso_ponderado(nodo)
+        return self.recalcular_hojas([actividad_id])[0].progreso
+
+    def recalcular(self, actividad_ids, propagar=True):
+        """
+        Recalcula las actividades indicadas y, opcionalmente, todos sus ancestros.
+        Escribe los cambios con un UPDATE por lotes.
+
+        Returns:
+            dict: {actividad_id: progreso_nuevo} solo de las actividades modificadas
+        """
+        nodos = self.recalcular_hojas(actividad_ids)
+        if propagar:
+            self.propagar(nodos)
+        return self.guardar()
+
+    def recalcular_desde_edt(self, edt_hijo):
+        """Recalcula solo los ancestros de un EDT (equivalente a recalcular_padres_recursivo)"""
+        self._asegurar_cargado()
+        nodo = self.por_edt.get(edt_hijo) or NodoEDT(None, edt_hijo, 0, 0)
+        self.propagar([nodo])
+        return self.guardar()
+
+    def recalcular_todo(self):
+        """Recalcula todas las hojas desde sus avances y luego todos los padres"""
+        self._asegurar_cargado()
+        avances = self._cargar_avances()
+        hojas = [n for n in self.por_edt.values() if not n.hijos]
+        for nodo in hojas:
+            nodo.progreso = calcular_progreso_hoja(nodo.duracion, avances.get(nodo.id, ()))
+
+        padres = sorted((n for n in self.por_edt.values() if n.hijos), key=lambda n: n.profundidad, reverse=True)
+        for padre in padres:
+            padre.progreso = self._progreso_ponderado(padre)
+        return self.guardar()
+
+    def guardar(self):
+        """UPDATE por lotes de las actividades cuyo progreso cambió (sin commit)"""
+        cambios = {n.id: n.progreso for n in self.por_id.values() if n.cambio}
+        if not cambios:
+            return {}
+
+        tabla = ActividadProyecto.__table__
+        db.session.execute(
+            tabla.update()
+            .where(tabla.c.id == bindparam('b_id'))
+            .values(progreso=bindparam('b_progreso')),
+            [{'b_id': actividad_id, 'b_progreso': round(progreso, 2)} for actividad_id, progreso in cambios.items()]
+        )
+        ResumenProyecto.marcar_desactualizados([self.requerimiento_id])
+
+        for actividad_id in cambios:
+            nodo = self.por_id[actividad_id]
+            nodo.progreso_original = nodo.progreso
+
+        logger.info(f"Progreso EDT proyecto {self.requerimiento_id}: {len(cambios)} actividades actualizadas")
+        return cambios
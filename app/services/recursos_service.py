@@ -0,0 +1,205 @@
+"""
+Resolución de recursos Gantt a trabajadores
+===========================================
+
+Las importaciones de cartas Gantt nombran a los trabajadores por código
+("PM1", "arq-1") o por nombre ("Ana Pérez"). En lugar de una consulta por
+recurso, ResolutorRecursos precarga una sola vez a todos los trabajadores en
+un índice de claves normalizadas (sin tildes, en minúsculas y con espacios
+colapsados) y resuelve cada recurso en memoria:
+
+1. nombrecorto normalizado ("pm1"),
+2. nombrecorto compacto, solo letras y números ("arq-1" -> "arq1"),
+3. nombre normalizado ("ana perez").
+
+Las claves se guardan en trabajador.nombre_normalizado y
+trabajador.nombrecorto_normalizado (con índice), así la precarga no normaliza
+en Python y las búsquedas puntuales (buscar_trabajador_por_clave) son una
+consulta indexada. Los recursos desconocidos quedan pendientes y se crean
+todos juntos con un único INSERT al final de la importación.
+"""
+
+import logging
+import re
+from datetime import datetime
+
+from sqlalchemy import or_, select
+
+from app.models import db, Trabajador
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_TRABAJADOR_AUTOMATICO = '123456'
+
+DOMINIO_EMAIL_AUTOMATICO = 'empresa.com'
+
+
+def normalizar_clave(texto):
+    """'  Ana   PÉREZ ' -> 'ana perez' (None si queda vacío)"""
+    return Trabajador.normalizar_clave(texto)
+
+
+def compactar_clave(texto):
+    """'ARQ-1' -> 'arq1': la clave normalizada sin espacios ni símbolos"""
+    return re.sub(r'[^0-9a-z]', '', normalizar_clave(texto) or '') or None
+
+
+def codigo_trabajador(nombre):
+    """Código (nombrecorto) con que se crea un trabajador para un recurso desconocido"""
+    return (compactar_clave(nombre) or '').upper() or None
+
+
+def buscar_trabajador_por_clave(nombre):
+    """
+    Busca un trabajador por código o nombre con una consulta sobre las columnas
+    normalizadas; prefiere la coincidencia por nombrecorto.
+    """
+    clave = normalizar_clave(nombre)
+    if clave is None:
+        return None
+    candidatos = Trabajador.query.filter(or_(
+        Trabajador.nombrecorto_normalizado == clave,
+        Trabajador.nombre_normalizado == clave
+    )).order_by(Trabajador.id).all()
+    return next((t for t in candidatos if t.nombrecorto_normalizado == clave), None) or \
+        next(iter(candidatos), None)
+
+
+class ResolutorRecursos:
+    """
+    Índice en memoria {clave normalizada: trabajador_id} para una importación.
+
+    Uso:
+        resolutor = ResolutorRecursos().cargar()
+        trabajador_id = resolutor.resolver('Ana Pérez')   # None si no existe
+        codigo = resolutor.registrar('Ana Pérez')         # pendiente de crear
+        ids = resolutor.crear_pendientes()                # {codigo: id}, un INSERT
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._codigos = {}  # trabajador_id -> nombrecorto en mayúsculas
+        self._pendientes = set()
+        self._password_hash = None
+
+    def cargar(self, nombres=None):
+        """
+        Precarga el índice con una sola consulta.
+
+        Args:
+            nombres: si se indica, solo se cargan los trabajadores cuyas claves
+                guardadas coinciden con estos recursos (útil para resolver un
+                único texto de recursos sin leer la tabla completa)
+        """
+        consulta = select(Trabajador.id, Trabajador.nombrecorto, Trabajador.nombrecorto_normalizado,
+                          Trabajador.nombre, Trabajador.nombre_normalizado).order_by(Trabajador.id)
+        if nombres is not None:
+            claves = {normalizar_clave(nombre) for nombre in nombres} | {compactar_clave(nombre) for nombre in nombres}
+            claves.discard(None)
+            if not claves:
+                return self
+            consulta = consulta.where(or_(Trabajador.nombrecorto_normalizado.in_(claves),
+                                          Trabajador.nombre_normalizado.in_(claves)))
+        filas = db.session.execute(consulta).all()
+
+        # Filas anteriores a la migración pueden no tener las claves guardadas
+        cortos = [(fila.id, fila.nombrecorto_normalizado or normalizar_clave(fila.nombrecorto)) for fila in filas]
+        completos = [(fila.id, fila.nombre_normalizado or normalizar_clave(fila.nombre)) for fila in filas]
+
+        # setdefault respeta la prioridad: código, código compacto y después nombre
+        for trabajador_id, clave in cortos:
+            if clave:
+                self._ids.setdefault(clave, trabajador_id)
+        for trabajador_id, clave in cortos:
+            if clave:
+                self._ids.setdefault(compactar_clave(clave), trabajador_id)
+        for trabajador_id, clave in completos:
+            if clave:
+                self._ids.setdefault(clave, trabajador_id)
+
+        for fila in filas:
+            if fila.nombrecorto:
+                self._codigos[fila.id] = fila.nombrecorto.strip().upper()
+        return self
+
+    def resolver(self, nombre):
+        """trabajador_id del recurso, o None si no hay trabajador que coincida"""
+        clave = normalizar_clave(nombre)
+        if clave is None:
+            return None
+        trabajador_id = self._ids.get(clave)
+        if trabajador_id is None:
+            trabajador_id = self._ids.get(compactar_clave(clave))
+        return trabajador_id
+
+    def codigo(self, nombre):
+        """
+        Código con que el recurso aparece en el texto de recursos: el nombrecorto
+        del trabajador que coincide o el código con que se creará
+        """
+        trabajador_id = self.resolver(nombre)
+        if trabajador_id is not None and trabajador_id in self._codigos:
+            return self._codigos[trabajador_id]
+        return codigo_trabajador(nombre)
+
+    def registrar(self, nombre):
+        """Deja el recurso pendiente de creación; devuelve su código (None si no tiene letras ni números)"""
+        codigo = codigo_trabajador(nombre)
+        if codigo and self.resolver(codigo) is None:
+            self._pendientes.add(codigo)
+        return codigo
+
+    @property
+    def pendientes(self):
+        return sorted(self._pendientes)
+
+    def crear_pendientes(self):
+        """
+        Crea en un único INSERT los trabajadores pendientes y los agrega al índice.
+
+        Returns:
+            dict: {codigo: trabajador_id} de los trabajadores creados
+        """
+        codigos = self.pendientes
+        if not codigos:
+            return {}
+
+        if self._password_hash is None:
+            # Un solo hash Argon2 para todos los trabajadores creados automáticamente
+            self._password_hash = Trabajador._ph.hash(PASSWORD_TRABAJADOR_AUTOMATICO)
+
+        emails = {codigo: f"{codigo.lower()}@{DOMINIO_EMAIL_AUTOMATICO}" for codigo in codigos}
+        ocupados = set(db.session.execute(
+            select(Trabajador.email).where(Trabajador.email.in_(list(emails.values())))
+        ).scalars())
+        sufijo = datetime.now().strftime('%Y%m%d')
+
+        filas = []
+        for codigo in codigos:
+            email = emails[codigo]
+            if email in ocupados:
+                # Mismo criterio que el procesador original ante un email repetido
+                email = f"{codigo.lower()}{sufijo}@{DOMINIO_EMAIL_AUTOMATICO}"
+            nombre = f"Trabajador {codigo}"
+            filas.append({
+                'nombre': nombre,
+                'nombre_normalizado': normalizar_clave(nombre),
+                'nombrecorto': codigo,
+                'nombrecorto_normalizado': normalizar_clave(codigo),
+                'email': email,
+                'password_hash': self._password_hash,
+                'profesion': 'Por definir',
+                'activo': True
+            })
+        db.session.execute(Trabajador.__table__.insert(), filas)
+
+        creados = dict(db.session.execute(
+            select(Trabajador.nombrecorto, Trabajador.id).where(Trabajador.nombrecorto.in_(codigos))
+        ).all())
+        for codigo, trabajador_id in creados.items():
+            self._ids.setdefault(normalizar_clave(codigo), trabajador_id)
+            self._codigos[trabajador_id] = codigo
+        self._pendientes.clear()
+
+        logger.info(f"Trabajadores creados automáticamente: {len(creados)}")
+        return creados
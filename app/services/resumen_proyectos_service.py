@@ -0,0 +1,256 @@
+"""
+Resumen materializado de proyectos (tabla resumen_proyecto)
+===========================================================
+
+api_resumen_proyectos recalculaba en cada llamada el estado de cronograma de
+todas las actividades de todos los proyectos. Ahora lee una fila por proyecto
+de resumen_proyecto con los conteos por estado (en fecha, atrasada, terminada,
+no iniciada) y el progreso real y esperado ponderados por duración.
+
+Refresco incremental:
+- Las escrituras ORM de ActividadProyecto/AvanceActividad (evento after_flush
+  en models) y las masivas (importación Gantt, archivo de control, progreso
+  EDT) marcan el resumen del proyecto como no vigente.
+- Al leer, solo los proyectos no vigentes, sin resumen o calculados otro día
+  se recalculan, con una consulta por lote de proyectos.
+- La ruta crítica (ruta_critica_service) se asegura vigente antes de contar
+  las actividades críticas y las críticas atrasadas.
+- `python manage.py reconstruir-resumenes` recalcula todo; pensado para un cron
+  nocturno que deja los resúmenes del día listos antes de la primera lectura.
+"""
+
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from app import db
+from app.models import ActividadProyecto, Estado, Requerimiento, ResumenProyecto, Sector
+from app.services.ruta_critica_service import asegurar_cronogramas
+
+logger = logging.getLogger(__name__)
+
+ESTADO_EN_FECHA = 'En Fecha'
+ESTADO_ATRASADO = 'Atrasado'
+
+# Puntos porcentuales bajo el progreso esperado antes de considerar atraso
+TOLERANCIA_ATRASO = 5
+
+# Proyectos recalculados por consulta
+TAMANO_LOTE = 200
+
+# Proyectos que muestra /resumen: Desarrollo Completado
+ESTADO_REQUERIMIENTO_RESUMEN = 5
+
+
+def estado_cronograma(fecha_inicio, fecha_fin, progreso, hoy):
+    """
+    Progreso esperado a la fecha y estado de cronograma de una actividad.
+
+    Returns:
+        tuple: (progreso_esperado, ESTADO_EN_FECHA | ESTADO_ATRASADO)
+    """
+    duracion_total = (fecha_fin - fecha_inicio).days
+    if duracion_total <= 0 or hoy < fecha_inicio:
+        return 0, ESTADO_EN_FECHA
+    if hoy > fecha_fin:
+        return 100, ESTADO_ATRASADO if progreso < 100 else ESTADO_EN_FECHA
+
+    esperado = round((hoy - fecha_inicio).days / duracion_total * 100, 1)
+    return esperado, ESTADO_ATRASADO if progreso < esperado - TOLERANCIA_ATRASO else ESTADO_EN_FECHA
+
+
+def calcular_resumen(actividades, hoy):
+    """
+    Resumen de un proyecto a partir de sus actividades activas.
+
+    Cada actividad cae en una sola categoría: terminada (100%), atrasada, no
+    iniciada (sin progreso) o en fecha. El progreso ponderado usa solo las
+    hojas del EDT (los resúmenes ya agregan a sus hijas), con la duración en
+    días como peso (mínimo 1 para los hitos).
+
+    Las críticas (es_critica, de la ruta crítica) se cuentan aparte; una
+    crítica atrasada es la que además cae en la categoría de atrasada.
+
+    Args:
+        actividades: filas con edt, fecha_inicio, fecha_fin, duracion, progreso y es_critica
+    """
+    padres = {a.edt.rsplit('.', 1)[0] for a in actividades if '.' in a.edt}
+    conteos = {'terminadas': 0, 'atrasadas': 0, 'no_iniciadas': 0, 'en_fecha': 0,
+               'criticas': 0, 'criticas_atrasadas': 0}
+    peso_total = progreso_total = esperado_total = 0.0
+
+    for actividad in actividades:
+        progreso = float(actividad.progreso or 0)
+        esperado, estado = estado_cronograma(actividad.fecha_inicio, actividad.fecha_fin, progreso, hoy)
+        if progreso >= 100:
+            conteos['terminadas'] += 1
+        elif estado == ESTADO_ATRASADO:
+            conteos['atrasadas'] += 1
+            conteos['criticas_atrasadas'] += bool(actividad.es_critica)
+        elif progreso == 0:
+            conteos['no_iniciadas'] += 1
+        else:
+            conteos['en_fecha'] += 1
+        conteos['criticas'] += bool(actividad.es_critica)
+
+        if actividad.edt not in padres:
+            peso = max(actividad.duracion or 0, 1)
+            peso_total += peso
+            progreso_total += progreso * peso
+            esperado_total += esperado * peso
+
+    return {
+        'total_actividades': len(actividades),
+        'actividades_en_fecha': conteos['en_fecha'],
+        'actividades_atrasadas': conteos['atrasadas'],
+        'actividades_terminadas': conteos['terminadas'],
+        'actividades_no_iniciadas': conteos['no_iniciadas'],
+        'progreso_ponderado': round(progreso_total / peso_total, 2) if peso_total else 0.0,
+        'progreso_esperado': round(esperado_total / peso_total, 2) if peso_total else 0.0,
+        'actividades_criticas': conteos['criticas'],
+        'criticas_atrasadas': conteos['criticas_atrasadas'],
+    }
+
+
+def refrescar_resumenes(requerimiento_ids=None, hoy=None):
+    """
+    Recalcular y reemplazar el resumen de los proyectos indicados (todos con
+    None), en la transacción en curso (no hace commit). La ruta crítica
+    desactualizada de esos proyectos se recalcula antes.
+
+    Returns:
+        int: resúmenes escritos
+    """
+    hoy = hoy or date.today()
+    if requerimiento_ids is None:
+        requerimiento_ids = db.session.execute(select(Requerimiento.id)).scalars().all()
+    requerimiento_ids = sorted(set(requerimiento_ids))
+
+    tabla = ResumenProyecto.__table__
+    escritos = 0
+    for inicio in range(0, len(requerimiento_ids), TAMANO_LOTE):
+        lote = requerimiento_ids[inicio:inicio + TAMANO_LOTE]
+        por_proyecto = {requerimiento_id: [] for requerimiento_id in lote}
+        asegurar_cronogramas(lote)
+        filas = db.session.execute(
+            select(
+                ActividadProyecto.requerimiento_id, ActividadProyecto.edt, ActividadProyecto.fecha_inicio,
+                ActividadProyecto.fecha_fin, ActividadProyecto.duracion, ActividadProyecto.progreso,
+                ActividadProyecto.es_critica
+            ).where(ActividadProyecto.requerimiento_id.in_(lote), ActividadProyecto.activo == True)
+        )
+        for fila in filas:
+            por_proyecto[fila.requerimiento_id].append(fila)
+
+        ahora = datetime.utcnow()
+        db.session.execute(tabla.delete().where(tabla.c.requerimiento_id.in_(lote)))
+        db.session.execute(tabla.insert(), [
+            {
+                'requerimiento_id': requerimiento_id, 'fecha_calculo': hoy, 'vigente': True,
+                'actualizado_en': ahora, **calcular_resumen(actividades, hoy)
+            }
+            for requerimiento_id, actividades in por_proyecto.items()
+        ])
+        escritos += len(lote)
+
+    if escritos:
+        logger.info(f"Resumen de proyectos recalculado para {escritos} proyectos")
+    return escritos
+
+
+def _consulta_resumenes():
+    return (
+        select(
+            Requerimiento.id, Requerimiento.nombre, Requerimiento.descripcion,
+            Sector.nombre.label('sector'), Estado.nombre.label('estado'), ResumenProyecto
+        )
+        .outerjoin(Sector, Requerimiento.id_sector == Sector.id)
+        .outerjoin(Estado, Requerimiento.id_estado == Estado.id)
+        .outerjoin(ResumenProyecto, ResumenProyecto.requerimiento_id == Requerimiento.id)
+        .where(Requerimiento.id_estado == ESTADO_REQUERIMIENTO_RESUMEN, Requerimiento.activo == True)
+        .order_by(Requerimiento.id)
+    )
+
+
+def resumenes_proyectos(hoy=None):
+    """
+    Resumen de los proyectos en Desarrollo Completado con actividades.
+
+    Una sola lectura cuando todos los resúmenes están vigentes; si alguno falta
+    o quedó desactualizado se recalculan solo esos y se confirma la transacción.
+
+    Returns:
+        list[dict]: un dict por proyecto, en orden de id
+    """
+    hoy = hoy or date.today()
+    filas = db.session.execute(_consulta_resumenes()).all()
+
+    pendientes = [
+        fila.id for fila in filas
+        if fila.ResumenProyecto is None or not fila.ResumenProyecto.vigente
+        or fila.ResumenProyecto.fecha_calculo != hoy
+    ]
+    if pendientes:
+        refrescar_resumenes(pendientes, hoy)
+        db.session.commit()
+        filas = db.session.execute(_consulta_resumenes()).all()
+
+    proyectos = []
+    for fila in filas:
+        resumen = fila.ResumenProyecto
+        if not resumen.total_actividades:
+            continue
+        proyectos.append({
+            'id': fila.id,
+            'nombre': fila.nombre,
+            'descripcion': fila.descripcion or '',
+            'sector': fila.sector or 'Sin sector',
+            'estado': fila.estado or 'Sin estado',
+            'total_actividades': resumen.total_actividades,
+            'actividades_en_fecha': resumen.actividades_en_fecha,
+            'actividades_atrasadas': resumen.actividades_atrasadas,
+            'actividades_terminadas': resumen.actividades_terminadas,
+            'actividades_no_iniciadas': resumen.actividades_no_iniciadas,
+            'progreso': resumen.progreso_ponderado,
+            'progreso_esperado': resumen.progreso_esperado,
+            'actividades_criticas': resumen.actividades_criticas,
+            'criticas_atrasadas': resumen.criticas_atrasadas,
+            'actualizado_en': resumen.actualizado_en.isoformat() if resumen.actualizado_en else None,
+        })
+    return proyectos
+
+
+def actividades_con_estado(requerimiento_id, hoy=None):
+    """Detalle de las actividades activas de un proyecto con su estado de cronograma (orden EDT)"""
+    hoy = hoy or date.today()
+    filas = db.session.execute(
+        select(
+            ActividadProyecto.id, ActividadProyecto.edt, ActividadProyecto.nombre_tarea,
+            ActividadProyecto.nivel_esquema, ActividadProyecto.fecha_inicio, ActividadProyecto.fecha_fin,
+            ActividadProyecto.duracion, ActividadProyecto.progreso, ActividadProyecto.recursos,
+            ActividadProyecto.holgura_total, ActividadProyecto.es_critica
+        )
+        .where(ActividadProyecto.requerimiento_id == requerimiento_id, ActividadProyecto.activo == True)
+        .order_by(ActividadProyecto.edt)
+    )
+    actividades = []
+    for fila in filas:
+        progreso = float(fila.progreso or 0)
+        esperado, estado = estado_cronograma(fila.fecha_inicio, fila.fecha_fin, progreso, hoy)
+        actividades.append({
+            'id': fila.id,
+            'edt': fila.edt,
+            'nombre_tarea': fila.nombre_tarea,
+            'nivel_esquema': fila.nivel_esquema,
+            'fecha_inicio': fila.fecha_inicio.strftime('%d-%m-%Y'),
+            'fecha_fin': fila.fecha_fin.strftime('%d-%m-%Y'),
+            'duracion': fila.duracion,
+            'progreso': progreso,
+            'progreso_esperado': esperado,
+            'recursos': fila.recursos or 'Sin asignar',
+            'estado_cronograma': estado,
+            'holgura_total': fila.holgura_total,
+            'es_critica': fila.es_critica
+        })
+    return actividades
@@ -0,0 +1,369 @@
+"""
+Ruta crítica y holguras a partir de las predecesoras
+====================================================
+
+Arma en memoria la red de precedencias de un proyecto (las hojas del EDT; un
+vínculo hacia o desde una tarea resumen se aplica a todas sus hojas, como en
+MS Project) y recorre el grafo dos veces en orden topológico (Kahn), en tiempo
+lineal sobre actividades + vínculos:
+
+- Pasada hacia adelante: inicio/fin tempranos. Una hoja sin predecesoras
+  comienza en su fecha planificada.
+- Pasada hacia atrás: inicio/fin tardíos contra el fin temprano del proyecto.
+- Holgura total = inicio tardío - inicio temprano; crítica si es <= 0.
+
+Las tareas resumen toman el rango de sus hojas, la menor holgura y son
+críticas si alguna hoja lo es. Se trabaja en días corridos (las fechas de la
+carta Gantt), sin calendario laboral.
+
+Los resultados se guardan en actividad_proyecto y cronograma_proyecto indica
+si siguen vigentes: solo los cambios de fechas o vínculos los invalidan
+(evento after_flush en models, importaciones Gantt y de control), y se
+recalculan en la siguiente lectura (gantt_data, resumen de proyectos) o con
+`python manage.py recalcular-cronogramas`.
+"""
+
+import logging
+import re
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, select
+
+from app import db
+from app.models import ActividadProyecto, CronogramaProyecto, Requerimiento
+
+logger = logging.getLogger(__name__)
+
+# Tipos de vínculo de MS Project (español e inglés) -> tipo canónico
+TIPOS_VINCULO = {'FC': 'FC', 'CC': 'CC', 'FF': 'FF', 'CF': 'CF', 'FS': 'FC', 'SS': 'CC', 'SF': 'CF'}
+
+# Proyectos recalculados por consulta
+TAMANO_LOTE = 200
+
+# Columnas de resultado en actividad_proyecto
+CAMPOS_RESULTADO = ('inicio_temprano', 'fin_temprano', 'inicio_tardio', 'fin_tardio', 'holgura_total', 'es_critica')
+
+# "3", "3FC", "5CC+2 días", "7 FF-1d", "4SS+1 wk"
+_PATRON_VINCULO = re.compile(
+    r'^(\d+)\s*(FC|CC|FF|CF|FS|SS|SF)?\s*(?:([+-])\s*(\d+(?:[.,]\d+)?)\s*([^\d\s]*)\s*)?$',
+    re.IGNORECASE
+)
+
+# Coma decimal dentro de un desfase ("3FC+1,5 días"): no separa referencias
+_COMA_DECIMAL_DESFASE = re.compile(r'([+-]\s*\d+),(\d)')
+
+
+def _dias_desfase(signo, cantidad, unidad):
+    """
+    Desfase en días corridos; los desfases en % de duración no se consideran.
+
+    Unidades de MS Project en español e inglés: min/m (minutos), h (horas de
+    una jornada de 8 h), d/días, sem/s/w (semanas) y ms/mes/mo (meses de 30 días).
+    """
+    unidad = unidad.lower()
+    if unidad.startswith('%'):
+        return 0
+    # Meses y minutos antes que la "s" de semanas y la "m" suelta
+    if unidad.startswith(('ms', 'mes', 'mo')):
+        factor = 30
+    elif unidad.startswith('m'):
+        factor = 1 / 480
+    elif unidad.startswith('h'):
+        factor = 1 / 8
+    elif unidad.startswith(('sem', 'w', 's')):
+        factor = 7
+    else:
+        factor = 1
+    dias = round(float(cantidad.replace(',', '.')) * factor)
+    return -dias if signo == '-' else dias
+
+
+def parsear_predecesoras(texto):
+    """
+    Parsea la columna Predecesoras.
+
+    Formatos soportados: "3", "2;3", "2,3", "3FC+2 días", "5CC", "7FF-1d",
+    "4SS+1 wk", "3FC+1,5 días" (tipo FC por defecto, desfase en días).
+
+    Returns:
+        tuple: ([(id_gantt, tipo, desfase_dias), ...], cantidad de referencias ilegibles)
+    """
+    if not texto:
+        return [], 0
+
+    vinculos = []
+    invalidos = 0
+    for parte in re.split(r'[;,\n]', _COMA_DECIMAL_DESFASE.sub(r'\1.\2', str(texto))):
+        parte = parte.strip()
+        if not parte:
+            continue
+        coincidencia = _PATRON_VINCULO.match(parte)
+        if not coincidencia:
+            invalidos += 1
+            continue
+        referencia, tipo, signo, cantidad, unidad = coincidencia.groups()
+        desfase = _dias_desfase(signo, cantidad, unidad) if cantidad else 0
+        vinculos.append((int(referencia), TIPOS_VINCULO[(tipo or 'FC').upper()], desfase))
+    return vinculos, invalidos
+
+
+def _duracion_corrida(actividad):
+    """Días corridos entre comienzo y fin, ambos incluidos; 0 para hitos"""
+    if actividad.fecha_inicio == actividad.fecha_fin and not actividad.duracion:
+        return 0
+    return max((actividad.fecha_fin - actividad.fecha_inicio).days + 1, 0)
+
+
+def calcular_ruta_critica(actividades):
+    """
+    Fechas tempranas/tardías, holgura total y ruta crítica de un proyecto.
+
+    Args:
+        actividades: filas activas con id, edt, id_gantt, fecha_inicio,
+            fecha_fin, duracion y predecesoras, en orden de id (el orden de
+            las filas del Gantt: sin id_gantt, la posición hace de Id)
+
+    Returns:
+        tuple: ({actividad_id: {campo: valor}} con CAMPOS_RESULTADO,
+                dict con inicio, fin, actividades_criticas, enlaces,
+                enlaces_invalidos y enlaces_en_ciclo)
+    """
+    estadisticas = {'inicio': None, 'fin': None, 'actividades_criticas': 0,
+                    'enlaces': 0, 'enlaces_invalidos': 0, 'enlaces_en_ciclo': 0}
+    if not actividades:
+        return {}, estadisticas
+
+    referencias = {}
+    for posicion, actividad in enumerate(actividades, start=1):
+        referencias.setdefault(actividad.id_gantt if actividad.id_gantt is not None else posicion, actividad)
+
+    padres = {a.edt.rsplit('.', 1)[0] for a in actividades if '.' in a.edt}
+    resumenes = {a.edt for a in actividades if a.edt in padres}
+    hojas = [a for a in actividades if a.edt not in resumenes]
+    indice = {a.id: i for i, a in enumerate(hojas)}
+
+    # Hojas de cada resumen (recorriendo los prefijos del EDT de cada hoja)
+    hojas_de = {edt: [] for edt in resumenes}
+    for i, hoja in enumerate(hojas):
+        partes = hoja.edt.split('.')
+        for nivel in range(1, len(partes)):
+            prefijo = '.'.join(partes[:nivel])
+            if prefijo in hojas_de:
+                hojas_de[prefijo].append(i)
+
+    def hojas_de_actividad(actividad):
+        return hojas_de[actividad.edt] if actividad.edt in resumenes else [indice[actividad.id]]
+
+    cantidad = len(hojas)
+    duracion = [_duracion_corrida(hoja) for hoja in hojas]
+    origen = min(hoja.fecha_inicio for hoja in hojas)
+    # Los hitos ocurren al final de su día (como el fin de su predecesora)
+    inicio_plan = [(hoja.fecha_inicio - origen).days + (0 if duracion[i] else 1) for i, hoja in enumerate(hojas)]
+
+    predecesores = [[] for _ in range(cantidad)]
+    sucesores = [[] for _ in range(cantidad)]
+    for actividad in actividades:
+        vinculos, invalidos = parsear_predecesoras(actividad.predecesoras)
+        estadisticas['enlaces_invalidos'] += invalidos
+        for referencia, tipo, desfase in vinculos:
+            predecesora = referencias.get(referencia)
+            if predecesora is None or predecesora is actividad:
+                estadisticas['enlaces_invalidos'] += 1
+                continue
+            estadisticas['enlaces'] += 1
+            destinos = hojas_de_actividad(actividad)
+            for origen_hoja in hojas_de_actividad(predecesora):
+                for destino in destinos:
+                    if origen_hoja != destino:
+                        predecesores[destino].append((origen_hoja, tipo, desfase))
+                        sucesores[origen_hoja].append((destino, tipo, desfase))
+
+    # Orden topológico (Kahn). Si un ciclo lo detiene se libera la primera hoja
+    # pendiente (orden de id); sus vínculos hacia atrás se ignoran en las pasadas
+    pendientes = [len(lista) for lista in predecesores]
+    encolada = [not cantidad_pendiente for cantidad_pendiente in pendientes]
+    cola = deque(i for i in range(cantidad) if encolada[i])
+    orden = []
+    libre = 0
+    while len(orden) < cantidad:
+        if not cola:
+            while encolada[libre]:
+                libre += 1
+            encolada[libre] = True
+            cola.append(libre)
+        i = cola.popleft()
+        orden.append(i)
+        for j, _, _ in sucesores[i]:
+            pendientes[j] -= 1
+            if not pendientes[j] and not encolada[j]:
+                encolada[j] = True
+                cola.append(j)
+    posicion = [0] * cantidad
+    for lugar, i in enumerate(orden):
+        posicion[i] = lugar
+
+    # Pasada hacia adelante (offsets en días desde el comienzo más temprano)
+    inicio_temprano = [0] * cantidad
+    for j in orden:
+        restricciones = []
+        for i, tipo, desfase in predecesores[j]:
+            if posicion[i] > posicion[j]:
+                estadisticas['enlaces_en_ciclo'] += 1
+                continue
+            fin_i = inicio_temprano[i] + duracion[i]
+            if tipo == 'FC':
+                restricciones.append(fin_i + desfase)
+            elif tipo == 'CC':
+                restricciones.append(inicio_temprano[i] + desfase)
+            elif tipo == 'FF':
+                restricciones.append(fin_i + desfase - duracion[j])
+            else:  # CF
+                restricciones.append(inicio_temprano[i] + desfase - duracion[j])
+        inicio_temprano[j] = max(restricciones) if restricciones else inicio_plan[j]
+    fin_temprano = [inicio_temprano[i] + duracion[i] for i in range(cantidad)]
+    fin_proyecto = max(fin_temprano)
+
+    # Pasada hacia atrás
+    fin_tardio = [fin_proyecto] * cantidad
+    for i in reversed(orden):
+        limite = fin_proyecto
+        for j, tipo, desfase in sucesores[i]:
+            if posicion[j] < posicion[i]:
+                continue
+            inicio_j = fin_tardio[j] - duracion[j]
+            if tipo == 'FC':
+                limite = min(limite, inicio_j - desfase)
+            elif tipo == 'CC':
+                limite = min(limite, inicio_j - desfase + duracion[i])
+            elif tipo == 'FF':
+                limite = min(limite, fin_tardio[j] - desfase)
+            else:  # CF
+                limite = min(limite, fin_tardio[j] - desfase + duracion[i])
+        fin_tardio[i] = limite
+
+    def fechas(inicio, dias):
+        # Fin inclusivo: una tarea de un día empieza y termina el mismo día
+        if not dias:
+            hito = origen + timedelta(days=inicio - 1)
+            return hito, hito
+        return origen + timedelta(days=inicio), origen + timedelta(days=inicio + dias - 1)
+
+    resultados = {}
+    for i, hoja in enumerate(hojas):
+        inicio_tardio = fin_tardio[i] - duracion[i]
+        holgura = inicio_tardio - inicio_temprano[i]
+        temprano = fechas(inicio_temprano[i], duracion[i])
+        tardio = fechas(inicio_tardio, duracion[i])
+        resultados[hoja.id] = {
+            'inicio_temprano': temprano[0],
+            'fin_temprano': temprano[1],
+            'inicio_tardio': tardio[0],
+            'fin_tardio': tardio[1],
+            'holgura_total': holgura,
+            'es_critica': holgura <= 0,
+        }
+
+    for actividad in actividades:
+        if actividad.edt not in resumenes:
+            continue
+        propias = [resultados[hojas[i].id] for i in hojas_de[actividad.edt]]
+        resultados[actividad.id] = {
+            'inicio_temprano': min(r['inicio_temprano'] for r in propias),
+            'fin_temprano': max(r['fin_temprano'] for r in propias),
+            'inicio_tardio': min(r['inicio_tardio'] for r in propias),
+            'fin_tardio': max(r['fin_tardio'] for r in propias),
+            'holgura_total': min(r['holgura_total'] for r in propias),
+            'es_critica': any(r['es_critica'] for r in propias),
+        }
+
+    estadisticas['inicio'] = min(resultados[hoja.id]['inicio_temprano'] for hoja in hojas)
+    estadisticas['fin'] = max(resultados[hoja.id]['fin_temprano'] for hoja in hojas)
+    estadisticas['actividades_criticas'] = sum(1 for r in resultados.values() if r['es_critica'])
+    return resultados, estadisticas
+
+
+def recalcular_cronogramas(requerimiento_ids=None):
+    """
+    Recalcular la ruta crítica de los proyectos indicados (todos con None) y
+    dejarla vigente, en la transacción en curso (no hace commit). Solo se
+    actualizan las actividades cuyo resultado cambió.
+
+    Returns:
+        int: proyectos recalculados
+    """
+    if requerimiento_ids is None:
+        requerimiento_ids = db.session.execute(select(Requerimiento.id)).scalars().all()
+    requerimiento_ids = sorted(set(requerimiento_ids))
+
+    actividades = ActividadProyecto.__table__
+    cronogramas = CronogramaProyecto.__table__
+    for inicio in range(0, len(requerimiento_ids), TAMANO_LOTE):
+        lote = requerimiento_ids[inicio:inicio + TAMANO_LOTE]
+        por_proyecto = {requerimiento_id: [] for requerimiento_id in lote}
+        filas = db.session.execute(
+            select(
+                ActividadProyecto.id, ActividadProyecto.requerimiento_id, ActividadProyecto.edt,
+                ActividadProyecto.id_gantt, ActividadProyecto.fecha_inicio, ActividadProyecto.fecha_fin,
+                ActividadProyecto.duracion, ActividadProyecto.predecesoras,
+                *(getattr(ActividadProyecto, campo) for campo in CAMPOS_RESULTADO)
+            )
+            .where(ActividadProyecto.requerimiento_id.in_(lote), ActividadProyecto.activo == True)
+            .order_by(ActividadProyecto.requerimiento_id, ActividadProyecto.id)
+        )
+        for fila in filas:
+            por_proyecto[fila.requerimiento_id].append(fila)
+
+        ahora = datetime.utcnow()
+        cambios = []
+        filas_cronograma = []
+        for requerimiento_id, filas_proyecto in por_proyecto.items():
+            resultados, estadisticas = calcular_ruta_critica(filas_proyecto)
+            for fila in filas_proyecto:
+                nuevo = resultados[fila.id]
+                if any(getattr(fila, campo) != nuevo[campo] for campo in CAMPOS_RESULTADO):
+                    cambios.append({'b_id': fila.id, **{f'b_{campo}': nuevo[campo] for campo in CAMPOS_RESULTADO}})
+            if estadisticas['enlaces_en_ciclo']:
+                logger.warning(f"Proyecto {requerimiento_id}: {estadisticas['enlaces_en_ciclo']} "
+                               f"vínculos ignorados por dependencias circulares")
+            filas_cronograma.append({
+                'requerimiento_id': requerimiento_id, 'vigente': True, 'calculado_en': ahora, **estadisticas
+            })
+
+        if cambios:
+            # updated_at se conserva: el recálculo no es una edición y no debe cambiar el ETag de gantt_data
+            db.session.execute(
+                actividades.update().where(actividades.c.id == bindparam('b_id')).values(
+                    updated_at=actividades.c.updated_at,
+                    **{campo: bindparam(f'b_{campo}') for campo in CAMPOS_RESULTADO}
+                ),
+                cambios
+            )
+        db.session.execute(cronogramas.delete().where(cronogramas.c.requerimiento_id.in_(lote)))
+        db.session.execute(cronogramas.insert(), filas_cronograma)
+
+    if requerimiento_ids:
+        logger.info(f"Ruta crítica recalculada para {len(requerimiento_ids)} proyectos")
+    return len(requerimiento_ids)
+
+
+def asegurar_cronogramas(requerimiento_ids):
+    """
+    Recalcular (sin commit) la ruta crítica de los proyectos sin cálculo o con
+    el cálculo invalidado. Una sola consulta cuando todos están vigentes.
+
+    Returns:
+        int: proyectos recalculados
+    """
+    requerimiento_ids = set(requerimiento_ids)
+    if not requerimiento_ids:
+        return 0
+    vigentes = db.session.execute(
+        select(CronogramaProyecto.requerimiento_id).where(
+            CronogramaProyecto.requerimiento_id.in_(requerimiento_ids), CronogramaProyecto.vigente == True
+        )
+    ).scalars().all()
+    pendientes = requerimiento_ids - set(vigentes)
+    if not pendientes:
+        return 0
+    return recalcular_cronogramas(pendientes)
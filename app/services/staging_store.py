@@ -0,0 +1,163 @@
+"""
+Almacén temporal de datos entre requests
+========================================
+
+Guarda en disco (``<raiz>/<token>.json``) datos que deben sobrevivir entre dos
+requests de un mismo flujo, p. ej. las actividades parseadas por
+procesar_proyecto_xlsx hasta que guardar_asignaciones_proyecto las usa.
+En la sesión solo viaja el token opaco, así la cookie no crece con el tamaño
+del proyecto ni choca con el límite de 4 KB.
+
+- Cada entrada expira tras STAGING_TTL_SEGUNDOS (por mtime); las vencidas se
+  purgan al guardar.
+- Las fechas (date/datetime) se conservan con su tipo al volver a cargar.
+- La escritura es atómica (archivo temporal + os.replace).
+- guardar_archivo() copia archivos subidos que procesa después una tarea en
+  segundo plano; expiran igual que los datos.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import secrets
+import tempfile
+import threading
+from datetime import datetime, date
+
+STAGING_TTL_SEGUNDOS = 2 * 3600
+
+_TOKEN_VALIDO = re.compile(r'^[A-Za-z0-9_-]{20,100}$')
+
+
+def _codificar(valor):
+    if isinstance(valor, datetime):
+        return {'__datetime__': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'__date__': valor.isoformat()}
+    raise TypeError(f'Tipo no serializable: {type(valor).__name__}')
+
+
+def _decodificar(objeto):
+    if len(objeto) == 1:
+        if '__datetime__' in objeto:
+            return datetime.fromisoformat(objeto['__datetime__'])
+        if '__date__' in objeto:
+            return date.fromisoformat(objeto['__date__'])
+    return objeto
+
+
+class StagingStore:
+    """Datos JSON temporales en disco indexados por token aleatorio"""
+
+    def __init__(self, raiz, ttl=STAGING_TTL_SEGUNDOS):
+        self.raiz = raiz
+        self.ttl = ttl
+
+    def _ruta(self, token):
+        if not token or not _TOKEN_VALIDO.match(token):
+            raise ValueError('Token de staging inválido')
+        return os.path.join(self.raiz, f'{token}.json')
+
+    def guardar(self, datos, token=None):
+        """
+        Guardar datos (nuevo token o reemplazando los de un token existente).
+
+        Returns:
+            str: token para recuperar los datos
+        """
+        token = token or secrets.token_urlsafe(32)
+        destino = self._ruta(token)
+        os.makedirs(self.raiz, exist_ok=True)
+        self.purgar_expirados()
+
+        temporal = tempfile.NamedTemporaryFile('w', dir=self.raiz, suffix='.part', delete=False, encoding='utf-8')
+        try:
+            with temporal:
+                json.dump(datos, temporal, default=_codificar, ensure_ascii=False)
+            os.replace(temporal.name, destino)
+        except Exception:
+            if os.path.exists(temporal.name):
+                os.remove(temporal.name)
+            raise
+        return token
+
+    def guardar_archivo(self, stream, extension=''):
+        """
+        Copiar un archivo (stream binario) al almacén por bloques.
+
+        Returns:
+            str: ruta del archivo guardado
+        """
+        os.makedirs(self.raiz, exist_ok=True)
+        self.purgar_expirados()
+        ruta = os.path.join(self.raiz, f'{secrets.token_urlsafe(32)}{extension}')
+        with open(ruta, 'wb') as destino:
+            shutil.copyfileobj(stream, destino, 1024 * 1024)
+        return ruta
+
+    def cargar(self, token, defecto=None):
+        """Datos del token, o defecto si no existe, expiró o el token no es válido"""
+        try:
+            ruta = self._ruta(token)
+        except ValueError:
+            return defecto
+        try:
+            if time.time() - os.path.getmtime(ruta) > self.ttl:
+                self._eliminar_ruta(ruta)
+                return defecto
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo, object_hook=_decodificar)
+        except (OSError, ValueError):
+            return defecto
+
+    def eliminar(self, token):
+        try:
+            self._eliminar_ruta(self._ruta(token))
+        except ValueError:
+            pass
+
+    @staticmethod
+    def _eliminar_ruta(ruta):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+    def purgar_expirados(self):
+        """Eliminar entradas vencidas (y temporales huérfanos). Returns: cantidad eliminada"""
+        limite = time.time() - self.ttl
+        eliminados = 0
+        try:
+            nombres = os.listdir(self.raiz)
+        except FileNotFoundError:
+            return 0
+        for nombre in nombres:
+            ruta = os.path.join(self.raiz, nombre)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    eliminados += 1
+            except OSError:
+                continue
+        return eliminados
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def obtener_staging_store():
+    """Almacén configurado para la app actual (STAGING_FOLDER o <UPLOAD_FOLDER>/staging)"""
+    from flask import current_app
+
+    raiz = current_app.config.get('STAGING_FOLDER') or os.path.join(
+        current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'staging'
+    )
+    ttl = current_app.config.get('STAGING_TTL_SEGUNDOS', STAGING_TTL_SEGUNDOS)
+    with _stores_lock:
+        store = _stores.get((raiz, ttl))
+        if store is None:
+            store = _stores[(raiz, ttl)] = StagingStore(raiz, ttl)
+    return store
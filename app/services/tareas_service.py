@@ -0,0 +1,397 @@
+"""
+Cola de tareas en segundo plano
+===============================
+
+Las operaciones largas (procesar una Carta Gantt, importar el control de
+actividades, crear o restaurar backups) se encolan como filas de
+``tarea_segundo_plano`` y las ejecuta un proceso worker aparte
+(``python manage.py worker``), así no ocupan hilos web y sobreviven a
+reinicios del servidor o del propio worker:
+
+- Reclamo atómico: ``UPDATE ... WHERE estado='pendiente'``; si varios workers
+  compiten por la misma fila solo uno obtiene rowcount 1.
+- Latido: mientras ejecuta, el worker renueva ``latido``; una tarea en curso sin
+  latido por más de LATIDO_VENCIDO_SEGUNDOS vuelve a la cola (worker caído).
+- Reintentos con espera exponencial hasta ``max_intentos``; TareaFallida marca
+  un error definitivo (p. ej. archivo inválido) sin reintentar.
+- Cancelación cooperativa: cancelar() marca la fila y el handler se detiene en
+  su siguiente llamada a ``contexto.progreso()``.
+- Modo en proceso (config TAREAS_EN_PROCESO): encolar() ejecuta la tarea en el
+  acto dentro de la request; lo usan los tests y las instalaciones sin worker.
+
+Los handlers se registran con ``@registrar_tarea('tipo')`` junto al código que
+usan y reciben ``(contexto, **parametros)``; su retorno (JSON) queda en
+``resultado``.
+"""
+
+import os
+import time
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+MAX_INTENTOS = 3
+ESPERA_REINTENTO_SEGUNDOS = 30          # Base del backoff exponencial
+INTERVALO_PROGRESO_SEGUNDOS = 1.0       # Escrituras de progreso como máximo cada segundo
+LATIDO_SEGUNDOS = 30
+LATIDO_VENCIDO_SEGUNDOS = 300
+ESPERA_WORKER_SEGUNDOS = 2.0
+CANDIDATOS_RECLAMO = 5
+
+_HANDLERS = {}
+
+
+class TareaCancelada(Exception):
+    """La tarea se canceló mientras se ejecutaba"""
+
+
+class TareaFallida(Exception):
+    """Error definitivo: la tarea falla sin reintentos"""
+
+
+def registrar_tarea(tipo, max_intentos=MAX_INTENTOS):
+    """Decorador que registra el handler de un tipo de tarea"""
+    def registrar(funcion):
+        _HANDLERS[tipo] = (funcion, max_intentos)
+        return funcion
+    return registrar
+
+
+def _tabla():
+    from app.models import TareaSegundoPlano
+    return TareaSegundoPlano.__table__
+
+
+def _serializable(valor):
+    if isinstance(valor, (str, int, float, bool)) or valor is None:
+        return valor
+    return str(valor)
+
+
+class ContextoTarea:
+    """
+    Lo recibe el handler para informar progreso y detectar cancelaciones.
+    Las escrituras usan una conexión propia (commit inmediato), así el progreso
+    es visible desde otros procesos aunque la sesión del handler siga abierta.
+    Expone también ``update(operacion, progreso, **detalles)``, la interfaz de
+    BackupProgressTracker, para pasarlo tal cual a los servicios de backup.
+    """
+
+    def __init__(self, tarea_id, intervalo=INTERVALO_PROGRESO_SEGUNDOS):
+        self.tarea_id = tarea_id
+        self.intervalo = intervalo
+        self.porcentaje = 0
+        self.mensaje = None
+        self.detalles = {}
+        self.cancelada = False
+        self.cancelable = True  # El handler lo apaga al entrar en una fase irreversible
+        self._ultima_escritura = 0.0
+
+    def progreso(self, porcentaje=None, mensaje=None, forzar=False, **detalles):
+        """Registrar avance (0-100) y lanzar TareaCancelada si se pidió cancelar"""
+        if porcentaje is not None and porcentaje >= 0:
+            self.porcentaje = int(min(100, porcentaje))
+        if mensaje:
+            self.mensaje = str(mensaje)[:255]
+        self.detalles.update({clave: _serializable(valor) for clave, valor in detalles.items()})
+
+        ahora = time.monotonic()
+        if forzar or ahora - self._ultima_escritura >= self.intervalo:
+            self._ultima_escritura = ahora
+            self._escribir()
+        if self.porcentaje < 100:  # Al 100% el trabajo ya está hecho
+            self.comprobar_cancelacion()
+
+    def update(self, operation, progress=None, **details):
+        self.progreso(progress, operation, **details)
+
+    def comprobar_cancelacion(self):
+        if self.cancelada and self.cancelable:
+            raise TareaCancelada()
+
+    def _escribir(self):
+        from app import db
+
+        tabla = _tabla()
+        try:
+            with db.engine.begin() as conexion:
+                conexion.execute(tabla.update().where(tabla.c.id == self.tarea_id).values(
+                    progreso=self.porcentaje, mensaje=self.mensaje, detalles=dict(self.detalles),
+                    latido=datetime.utcnow()
+                ))
+                cancelar = conexion.execute(
+                    db.select(tabla.c.cancelacion_solicitada).where(tabla.c.id == self.tarea_id)
+                ).scalar()
+        except Exception as e:
+            # El progreso es informativo: un corte de conexión no debe tumbar la tarea
+            print(f"⚠️ No se pudo registrar el progreso de la tarea {self.tarea_id}: {e}")
+            return
+        self.cancelada = bool(cancelar)
+
+
+class _Latido(threading.Thread):
+    """Renueva el latido (y lee la cancelación) mientras el handler no informa progreso"""
+
+    def __init__(self, app, contexto, intervalo=LATIDO_SEGUNDOS):
+        super().__init__(name=f'LatidoTarea-{contexto.tarea_id}', daemon=True)
+        self.app = app
+        self.contexto = contexto
+        self.intervalo = intervalo
+        self.detenido = threading.Event()
+
+    def run(self):
+        while not self.detenido.wait(self.intervalo):
+            with self.app.app_context():
+                self.contexto._escribir()
+
+    def detener(self):
+        self.detenido.set()
+
+
+def encolar(tipo, parametros=None, creado_por_id=None, max_intentos=None):
+    """
+    Crear una tarea pendiente (con commit) y devolver su id.
+    Con TAREAS_EN_PROCESO se ejecuta de inmediato en este proceso.
+    """
+    from flask import current_app
+    from app import db
+    from app.models import TareaSegundoPlano
+
+    if tipo not in _HANDLERS:
+        raise ValueError(f'Tipo de tarea desconocido: {tipo}')
+    _, intentos_handler = _HANDLERS[tipo]
+
+    tarea = TareaSegundoPlano(
+        tipo=tipo,
+        parametros=parametros or {},
+        creado_por_id=creado_por_id,
+        max_intentos=max_intentos or intentos_handler,
+        disponible_desde=datetime.utcnow()
+    )
+    db.session.add(tarea)
+    db.session.commit()
+    print(f"📥 Tarea {tarea.id} ({tipo}) encolada")
+
+    if current_app.config.get('TAREAS_EN_PROCESO'):
+        if reclamar(nombre_worker(), tarea_id=tarea.id):
+            ejecutar(tarea.id)
+    return tarea.id
+
+
+def obtener(tarea_id):
+    from app import db
+    from app.models import TareaSegundoPlano
+    return db.session.get(TareaSegundoPlano, tarea_id)
+
+
+def ultima_tarea(tipos):
+    """Tarea más reciente de alguno de los tipos dados (o None)"""
+    from app.models import TareaSegundoPlano
+    return TareaSegundoPlano.query.filter(
+        TareaSegundoPlano.tipo.in_(tipos)
+    ).order_by(TareaSegundoPlano.id.desc()).first()
+
+
+def cancelar(tarea_id):
+    """
+    Cancelar una tarea: si está pendiente se cancela en el acto; si está en
+    curso se marca y el handler se detiene en su siguiente informe de progreso.
+
+    Returns:
+        bool: False si la tarea no existe o ya terminó
+    """
+    from app import db
+    from app.models import TAREA_PENDIENTE, TAREA_EN_CURSO, TAREA_CANCELADA
+
+    tabla = _tabla()
+    ahora = datetime.utcnow()
+    pendiente = db.session.execute(tabla.update().where(
+        tabla.c.id == tarea_id, tabla.c.estado == TAREA_PENDIENTE
+    ).values(estado=TAREA_CANCELADA, cancelacion_solicitada=True, finalizado_en=ahora, mensaje='Cancelada')).rowcount
+    en_curso = 0
+    if not pendiente:
+        en_curso = db.session.execute(tabla.update().where(
+            tabla.c.id == tarea_id, tabla.c.estado == TAREA_EN_CURSO
+        ).values(cancelacion_solicitada=True)).rowcount
+    db.session.commit()
+    return bool(pendiente or en_curso)
+
+
+def nombre_worker():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def reclamar(worker, tarea_id=None):
+    """
+    Reclamar la siguiente tarea disponible (o una concreta) para este worker.
+
+    Returns:
+        int | None: id de la tarea reclamada
+    """
+    from app import db
+    from app.models import TAREA_PENDIENTE, TAREA_EN_CURSO
+
+    tabla = _tabla()
+    ahora = datetime.utcnow()
+    consulta = db.select(tabla.c.id).where(tabla.c.estado == TAREA_PENDIENTE)
+    if tarea_id is not None:
+        consulta = consulta.where(tabla.c.id == tarea_id)
+    else:
+        consulta = consulta.where(tabla.c.disponible_desde <= ahora)
+    candidatos = db.session.execute(consulta.order_by(tabla.c.id).limit(CANDIDATOS_RECLAMO)).scalars().all()
+
+    for candidato in candidatos:
+        reclamada = db.session.execute(tabla.update().where(
+            tabla.c.id == candidato, tabla.c.estado == TAREA_PENDIENTE
+        ).values(
+            estado=TAREA_EN_CURSO, worker=worker, latido=ahora, iniciado_en=ahora,
+            intentos=tabla.c.intentos + 1, error=None
+        )).rowcount
+        db.session.commit()
+        if reclamada:
+            return candidato
+    return None
+
+
+def _actualizar(tarea_id, **valores):
+    from app import db
+
+    tabla = _tabla()
+    db.session.execute(tabla.update().where(tabla.c.id == tarea_id).values(**valores))
+    db.session.commit()
+
+
+def ejecutar(tarea_id, app=None):
+    """
+    Ejecutar una tarea ya reclamada y dejar su estado final (o reprogramarla).
+    Con app se mantiene un latido en un hilo aparte (modo worker).
+    """
+    from app import db
+    from app.models import TAREA_PENDIENTE, TAREA_COMPLETADA, TAREA_FALLIDA, TAREA_CANCELADA
+
+    tarea = obtener(tarea_id)
+    tipo, parametros = tarea.tipo, dict(tarea.parametros or {})
+    intentos, max_intentos = tarea.intentos, tarea.max_intentos
+    db.session.commit()
+
+    contexto = ContextoTarea(tarea_id)
+    latido = _Latido(app, contexto) if app is not None else None
+    inicio = time.time()
+    print(f"⚙️ Ejecutando tarea {tarea_id} ({tipo}), intento {intentos}/{max_intentos}")
+
+    try:
+        if latido:
+            latido.start()
+        if tipo not in _HANDLERS:
+            raise TareaFallida(f'Sin handler registrado para la tarea {tipo}')
+        handler, _ = _HANDLERS[tipo]
+        resultado = handler(contexto, **parametros)
+    except TareaCancelada:
+        db.session.rollback()
+        _actualizar(tarea_id, estado=TAREA_CANCELADA, mensaje='Cancelada', finalizado_en=datetime.utcnow())
+        print(f"🛑 Tarea {tarea_id} cancelada")
+    except Exception as e:
+        db.session.rollback()
+        error = str(e) or type(e).__name__
+        print(f"❌ Error en tarea {tarea_id} ({tipo}): {traceback.format_exc()}")
+        if isinstance(e, TareaFallida) or intentos >= max_intentos:
+            _actualizar(tarea_id, estado=TAREA_FALLIDA, error=error, mensaje=f'Error: {error}'[:255],
+                        finalizado_en=datetime.utcnow())
+        else:
+            espera = ESPERA_REINTENTO_SEGUNDOS * 2 ** (intentos - 1)
+            _actualizar(tarea_id, estado=TAREA_PENDIENTE, error=error, worker=None,
+                        mensaje=f'Reintento {intentos + 1}/{max_intentos} en {espera}s',
+                        disponible_desde=datetime.utcnow() + timedelta(seconds=espera))
+    else:
+        _actualizar(tarea_id, estado=TAREA_COMPLETADA, progreso=100, resultado=resultado,
+                    mensaje=contexto.mensaje, detalles=dict(contexto.detalles),
+                    finalizado_en=datetime.utcnow())
+        print(f"✅ Tarea {tarea_id} ({tipo}) completada en {time.time() - inicio:.1f}s")
+    finally:
+        if latido:
+            latido.detener()
+
+
+def recuperar_abandonadas(vencimiento=LATIDO_VENCIDO_SEGUNDOS):
+    """
+    Devolver a la cola las tareas en curso cuyo worker dejó de latir (o
+    marcarlas fallidas si agotaron los intentos).
+
+    Returns:
+        int: tareas recuperadas
+    """
+    from app import db
+    from app.models import TAREA_PENDIENTE, TAREA_EN_CURSO, TAREA_FALLIDA
+
+    tabla = _tabla()
+    ahora = datetime.utcnow()
+    abandonada = (tabla.c.estado == TAREA_EN_CURSO) & (tabla.c.latido < ahora - timedelta(seconds=vencimiento))
+
+    db.session.execute(tabla.update().where(abandonada, tabla.c.intentos >= tabla.c.max_intentos).values(
+        estado=TAREA_FALLIDA, error='El worker se detuvo durante la ejecución', finalizado_en=ahora
+    ))
+    recuperadas = db.session.execute(tabla.update().where(abandonada).values(
+        estado=TAREA_PENDIENTE, worker=None, disponible_desde=ahora,
+        mensaje='Reencolada: el worker se detuvo durante la ejecución'
+    )).rowcount
+    db.session.commit()
+    if recuperadas:
+        print(f"♻️ {recuperadas} tareas abandonadas devueltas a la cola")
+    return recuperadas
+
+
+def procesar_pendientes(worker=None, maximo=None):
+    """Ejecutar en este proceso las tareas disponibles. Returns: cantidad ejecutada"""
+    worker = worker or nombre_worker()
+    ejecutadas = 0
+    while maximo is None or ejecutadas < maximo:
+        tarea_id = reclamar(worker)
+        if tarea_id is None:
+            break
+        ejecutar(tarea_id)
+        ejecutadas += 1
+    return ejecutadas
+
+
+class Worker:
+    """Bucle del proceso worker: recupera abandonadas, reclama y ejecuta"""
+
+    def __init__(self, app, nombre=None, espera=ESPERA_WORKER_SEGUNDOS):
+        self.app = app
+        self.nombre = nombre or nombre_worker()
+        self.espera = espera
+        self.detenido = threading.Event()
+
+    def detener(self, *args):
+        """Terminar tras la tarea en curso (se usa como manejador de SIGTERM/SIGINT)"""
+        print(f"🛑 Worker {self.nombre}: deteniendo tras la tarea en curso")
+        self.detenido.set()
+
+    def ejecutar_una(self):
+        """Returns: True si ejecutó una tarea"""
+        from app import db
+
+        with self.app.app_context():
+            try:
+                recuperar_abandonadas()
+                tarea_id = reclamar(self.nombre)
+                if tarea_id is None:
+                    return False
+                ejecutar(tarea_id, app=self.app)
+                return True
+            finally:
+                db.session.remove()
+
+    def run(self):
+        print(f"👷 Worker {self.nombre} esperando tareas")
+        while not self.detenido.is_set():
+            try:
+                hubo_tarea = self.ejecutar_una()
+            except Exception as e:
+                # Base de datos caída o similar: reintentar tras la espera
+                print(f"⚠️ Worker {self.nombre}: {e}")
+                hubo_tarea = False
+            if not hubo_tarea:
+                self.detenido.wait(self.espera)
+        print(f"👋 Worker {self.nombre} detenido")
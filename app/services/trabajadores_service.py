@@ -0,0 +1,169 @@
+"""
+Análisis de trabajadores huérfanos
+==================================
+
+Clasifica a todos los trabajadores según sus referencias (recursos Gantt,
+avances, historial de avances, requerimientos y recintos adicionales) con una
+sola consulta: cada conteo es una tabla derivada GROUP BY unida con LEFT JOIN,
+así el costo en consultas no depende de la cantidad de trabajadores.
+
+Los trabajadores sin ninguna referencia se eliminan con un DELETE por lote que
+vuelve a verificar la ausencia de referencias en la misma sentencia.
+"""
+
+from sqlalchemy import select, func, exists, delete
+
+from app import db
+from app.models import (Trabajador, RecursoTrabajador, AvanceActividad, HistorialAvanceActividad,
+                        ActividadProyecto, TrabajadorRecinto, Sector, Recinto,
+                        requerimiento_trabajador_especialidad, trabajador_areas)
+
+# Usuarios del sistema que nunca se consideran huérfanos
+NOMBRES_CORTOS_SISTEMA = ('admin', 'superadmin', 'sistema')
+
+# Conteo -> columna trabajador_id de la tabla que referencia al trabajador
+REFERENCIAS_TRABAJADOR = {
+    'recursos_asignados': RecursoTrabajador.id_trabajador,
+    'avances_pendientes': AvanceActividad.trabajador_id,
+    'avances_historicos': HistorialAvanceActividad.trabajador_id,
+    'requerimientos_asignados': requerimiento_trabajador_especialidad.c.trabajador_id,
+    'recintos_adicionales': TrabajadorRecinto.trabajador_id,
+}
+
+ESTADOS = {
+    'SIN_ASIGNACIONES': 'ELIMINAR_SEGURO',
+    'ACTIVO_CON_ASIGNACIONES': 'REVISAR_REASIGNACION',
+    'HISTORICO_SIN_ASIGNACIONES': 'MANTENER_TRAZABILIDAD',
+}
+
+
+def _filtro_candidatos():
+    return (
+        Trabajador.email.notlike('%admin%'),
+        Trabajador.email.notlike('%superadmin%'),
+        ~Trabajador.nombrecorto.in_(NOMBRES_CORTOS_SISTEMA)
+    )
+
+
+def clasificar(conteos):
+    """Estado del trabajador a partir de sus conteos de referencias"""
+    if not any(conteos.values()):
+        return 'SIN_ASIGNACIONES'
+    if conteos['avances_historicos'] and not any(
+        valor for clave, valor in conteos.items() if clave != 'avances_historicos'
+    ):
+        return 'HISTORICO_SIN_ASIGNACIONES'
+    return 'ACTIVO_CON_ASIGNACIONES'
+
+
+def conteos_trabajadores():
+    """
+    Datos y conteos de referencias de todos los trabajadores candidatos.
+
+    Returns:
+        list: dicts con id, nombre, nombrecorto, email, profesion, sector,
+        recinto y un entero por cada clave de REFERENCIAS_TRABAJADOR
+    """
+    conteos = {
+        clave: select(columna.label('trabajador_id'), func.count().label('total'))
+        .group_by(columna).subquery(clave)
+        for clave, columna in REFERENCIAS_TRABAJADOR.items()
+    }
+
+    consulta = select(
+        Trabajador.id, Trabajador.nombre, Trabajador.nombrecorto, Trabajador.email, Trabajador.profesion,
+        Sector.nombre.label('sector'), Recinto.nombre.label('recinto'),
+        *(func.coalesce(sub.c.total, 0).label(clave) for clave, sub in conteos.items())
+    ).outerjoin(Sector, Sector.id == Trabajador.sector_id) \
+     .outerjoin(Recinto, Recinto.id == Trabajador.recinto_id)
+    for sub in conteos.values():
+        consulta = consulta.outerjoin(sub, sub.c.trabajador_id == Trabajador.id)
+
+    filas = db.session.execute(consulta.where(*_filtro_candidatos()).order_by(Trabajador.id)).mappings().all()
+    return [dict(fila) for fila in filas]
+
+
+def actividades_por_trabajador(trabajador_ids):
+    """Actividades con avance asignado de cada trabajador (una consulta)"""
+    if not trabajador_ids:
+        return {}
+    filas = db.session.execute(
+        select(AvanceActividad.trabajador_id, ActividadProyecto.id, ActividadProyecto.nombre_tarea,
+               ActividadProyecto.progreso, ActividadProyecto.fecha_inicio, ActividadProyecto.fecha_fin)
+        .join(ActividadProyecto, ActividadProyecto.id == AvanceActividad.actividad_id)
+        .where(AvanceActividad.trabajador_id.in_(trabajador_ids))
+        .order_by(AvanceActividad.trabajador_id, ActividadProyecto.id)
+    ).all()
+
+    actividades = {}
+    for trabajador_id, actividad_id, nombre, progreso, inicio, fin in filas:
+        actividades.setdefault(trabajador_id, []).append({
+            'id': actividad_id,
+            'nombre': nombre,
+            'progreso': float(progreso) if progreso is not None else None,
+            'fecha_inicio': inicio.isoformat() if inicio else None,
+            'fecha_fin': fin.isoformat() if fin else None
+        })
+    return actividades
+
+
+def analizar_trabajadores(con_actividades=False):
+    """
+    Reporte de trabajadores agrupados por estado.
+
+    Args:
+        con_actividades: incluir el detalle de actividades de los trabajadores
+            con asignaciones (una consulta adicional)
+
+    Returns:
+        dict: {'total', 'SIN_ASIGNACIONES': [...], 'ACTIVO_CON_ASIGNACIONES': [...],
+               'HISTORICO_SIN_ASIGNACIONES': [...]}
+    """
+    trabajadores = conteos_trabajadores()
+    reporte = {'total': len(trabajadores), **{estado: [] for estado in ESTADOS}}
+
+    for trabajador in trabajadores:
+        estado = clasificar({clave: trabajador[clave] for clave in REFERENCIAS_TRABAJADOR})
+        trabajador['sector'] = trabajador['sector'] or 'Sin sector'
+        trabajador['recinto'] = trabajador['recinto'] or 'Sin recinto'
+        trabajador['estado'] = estado
+        trabajador['accion_recomendada'] = ESTADOS[estado]
+        reporte[estado].append(trabajador)
+
+    if con_actividades:
+        con_avances = [t['id'] for t in reporte['ACTIVO_CON_ASIGNACIONES'] if t['avances_pendientes']]
+        actividades = actividades_por_trabajador(con_avances)
+        for trabajador in trabajadores:
+            trabajador['actividades_detalle'] = actividades.get(trabajador['id'], [])
+
+    return reporte
+
+
+def eliminar_trabajadores_huerfanos(trabajador_ids):
+    """
+    Elimina en lote los trabajadores indicados que sigan sin referencias.
+    No hace commit.
+
+    Returns:
+        list: ids efectivamente eliminados
+    """
+    if not trabajador_ids:
+        return []
+
+    sin_referencias = [
+        ~exists().where(columna == Trabajador.id) for columna in REFERENCIAS_TRABAJADOR.values()
+    ]
+    eliminables = [
+        fila[0] for fila in db.session.execute(
+            select(Trabajador.id).where(Trabajador.id.in_(trabajador_ids), *_filtro_candidatos(), *sin_referencias)
+        ).all()
+    ]
+    if not eliminables:
+        return []
+
+    db.session.execute(delete(trabajador_areas).where(trabajador_areas.c.trabajador_id.in_(eliminables)))
+    db.session.execute(
+        delete(Trabajador).where(Trabajador.id.in_(eliminables), *sin_referencias)
+        .execution_options(synchronize_session=False)
+    )
+    return eliminables
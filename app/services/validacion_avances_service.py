@@ -0,0 +1,434 @@
+"""
+Validación de avances: listado paginado, estadísticas y lotes
+=============================================================
+
+El listado de /validar-avances se pagina por cursor (keyset) sobre
+(fecha_cambio, id) en orden descendente: cada página es una consulta con
+LIMIT que parte justo después de la última fila entregada, así el costo no
+crece con la cantidad de avances acumulados ni con la profundidad de la página.
+
+El cursor es opaco para el cliente (base64 de "fecha|id").
+
+Los filtros y las estadísticas usan la columna indexada estado_validacion en
+lugar de buscar 'RECHAZADO' dentro de comentario_validacion. Las estadísticas
+se calculan con un solo GROUP BY y se cachean por proceso, indexadas por la
+versión 'validacion' de CacheVersion (cualquier flush de historial de avances
+la incrementa) y con un TTL corto como respaldo.
+
+ValidacionLote aplica muchas validaciones en una transacción y recalcula la
+jerarquía EDT una sola vez por proyecto.
+"""
+
+import base64
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, func, and_, or_, tuple_
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.services.progreso_service import ArbolProgresoEDT
+from app.models import (HistorialAvanceActividad, ActividadProyecto, AvanceActividad, Requerimiento, Trabajador,
+                        CacheVersion, VERSION_VALIDACION, ESTADO_PENDIENTE, ESTADO_VALIDADO,
+                        ESTADO_RECHAZADO, ESTADOS_VALIDACION)
+
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 200
+# Tope del conteo: sobre esta cantidad el total se informa como estimación
+TOPE_CONTEO = 5000
+
+FILTROS_ESTADO = ESTADOS_VALIDACION + ('todos',)
+
+ESTADISTICAS_TTL_SEGUNDOS = 30
+ESTADISTICAS_CACHE_MAX_ENTRADAS = 256
+
+ETIQUETAS_ESTADO = {
+    ESTADO_PENDIENTE: 'Pendiente',
+    ESTADO_VALIDADO: 'Validado',
+    ESTADO_RECHAZADO: 'Rechazado',
+}
+
+_cache_estadisticas = {}
+_lock = threading.Lock()
+
+
+def codificar_cursor(fecha_cambio, historial_id):
+    """Cursor opaco que apunta a la fila (fecha_cambio, id)"""
+    crudo = f"{fecha_cambio.isoformat()}|{historial_id}"
+    return base64.urlsafe_b64encode(crudo.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """
+    Returns:
+        tuple: (fecha_cambio, id)
+
+    Raises:
+        ValueError: si el cursor no es válido
+    """
+    try:
+        fecha, historial_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(fecha), int(historial_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def filtros_avances(proyecto_id=None, trabajador_id=None, estado='pendiente', recinto_id=None):
+    """
+    Condiciones WHERE del listado.
+
+    Args:
+        recinto_id: restringe a proyectos del recinto (usuarios no superadmin)
+    """
+    condiciones = []
+    if recinto_id is not None:
+        condiciones.append(Requerimiento.id_recinto == recinto_id)
+    if proyecto_id:
+        condiciones.append(HistorialAvanceActividad.requerimiento_id == proyecto_id)
+    if trabajador_id:
+        condiciones.append(HistorialAvanceActividad.trabajador_id == trabajador_id)
+    if estado in ESTADOS_VALIDACION:
+        condiciones.append(HistorialAvanceActividad.estado_validacion == estado)
+    # 'todos' no filtra por estado
+    return condiciones
+
+
+def contar_avances(condiciones, tope=TOPE_CONTEO):
+    """
+    Total de avances que cumplen los filtros, contando a lo más tope + 1 filas.
+
+    Returns:
+        tuple: (total, exacto) - si exacto es False el total es una cota inferior
+    """
+    limitada = select(HistorialAvanceActividad.id) \
+        .join(Requerimiento, HistorialAvanceActividad.requerimiento_id == Requerimiento.id) \
+        .where(*condiciones).limit(tope + 1).subquery()
+    total = db.session.execute(select(func.count()).select_from(limitada)).scalar() or 0
+    return min(total, tope), total <= tope
+
+
+def pagina_avances(condiciones, cursor=None, limite=TAMANO_PAGINA):
+    """
+    Una página del listado ordenado por (fecha_cambio, id) descendente.
+
+    Args:
+        condiciones: resultado de filtros_avances()
+        cursor: siguiente_cursor de la página anterior (None para la primera)
+        limite: filas por página, acotado a TAMANO_PAGINA_MAXIMO
+
+    Returns:
+        dict: {'avances': [...], 'siguiente_cursor': str | None}
+
+    Raises:
+        ValueError: si el cursor no es válido
+    """
+    limite = max(1, min(limite or TAMANO_PAGINA, TAMANO_PAGINA_MAXIMO))
+    validador = aliased(Trabajador)
+    historial = HistorialAvanceActividad
+
+    consulta = select(
+        historial.id, historial.requerimiento_id, Requerimiento.nombre.label('proyecto_nombre'),
+        historial.actividad_id, ActividadProyecto.nombre_tarea, ActividadProyecto.edt,
+        ActividadProyecto.porcentaje_avance_validado,
+        historial.trabajador_id, Trabajador.nombre.label('trabajador_nombre'), Trabajador.email,
+        historial.progreso_anterior, historial.progreso_nuevo, historial.diferencia, historial.comentarios,
+        historial.fecha_cambio, historial.validado, historial.validado_por_id,
+        validador.nombre.label('validado_por_nombre'), historial.fecha_validacion, historial.comentario_validacion,
+        historial.estado_validacion
+    ).join(ActividadProyecto, historial.actividad_id == ActividadProyecto.id) \
+     .join(Requerimiento, historial.requerimiento_id == Requerimiento.id) \
+     .join(Trabajador, historial.trabajador_id == Trabajador.id) \
+     .outerjoin(validador, historial.validado_por_id == validador.id) \
+     .where(*condiciones)
+
+    if cursor:
+        fecha, historial_id = decodificar_cursor(cursor)
+        consulta = consulta.where(or_(
+            historial.fecha_cambio < fecha,
+            and_(historial.fecha_cambio == fecha, historial.id < historial_id)
+        ))
+
+    filas = db.session.execute(
+        consulta.order_by(historial.fecha_cambio.desc(), historial.id.desc()).limit(limite + 1)
+    ).all()
+
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    avances = [{
+        'id': fila.id,
+        'proyecto_id': fila.requerimiento_id,
+        'proyecto_nombre': fila.proyecto_nombre,
+        'proyecto_edt': fila.requerimiento_id,
+        'actividad_id': fila.actividad_id,
+        'actividad_nombre': fila.nombre_tarea,
+        'actividad_edt': fila.edt,
+        'trabajador_id': fila.trabajador_id,
+        'trabajador_nombre': fila.trabajador_nombre,
+        'trabajador_email': fila.email,
+        'progreso_anterior': float(fila.progreso_anterior),
+        'progreso_nuevo': float(fila.progreso_nuevo),
+        'diferencia': float(fila.diferencia),
+        'comentarios': fila.comentarios,
+        'fecha_cambio': fila.fecha_cambio.strftime('%Y-%m-%d %H:%M:%S'),
+        'validado': fila.validado,
+        'validado_por_id': fila.validado_por_id,
+        'validado_por_nombre': fila.validado_por_nombre,
+        'fecha_validacion': fila.fecha_validacion.strftime('%Y-%m-%d %H:%M:%S') if fila.fecha_validacion else None,
+        'comentario_validacion': fila.comentario_validacion,
+        'porcentaje_validado_actual': float(fila.porcentaje_avance_validado or 0),
+        'estado_visual': ETIQUETAS_ESTADO[fila.estado_validacion]
+    } for fila in filas]
+
+    ultima = filas[-1] if hay_mas else None
+    return {
+        'avances': avances,
+        'siguiente_cursor': codificar_cursor(ultima.fecha_cambio, ultima.id) if ultima else None
+    }
+
+
+def calcular_estadisticas(recinto_id=None):
+    """Totales por estado de validación en un solo GROUP BY"""
+    consulta = select(HistorialAvanceActividad.estado_validacion, func.count())
+    if recinto_id is not None:
+        consulta = consulta.join(Requerimiento, HistorialAvanceActividad.requerimiento_id == Requerimiento.id) \
+            .where(Requerimiento.id_recinto == recinto_id)
+    conteos = dict(db.session.execute(consulta.group_by(HistorialAvanceActividad.estado_validacion)).all())
+
+    return {
+        'total': sum(conteos.values()),
+        'pendientes': conteos.get(ESTADO_PENDIENTE, 0),
+        'validados': conteos.get(ESTADO_VALIDADO, 0),
+        'rechazados': conteos.get(ESTADO_RECHAZADO, 0)
+    }
+
+
+def estadisticas_validacion(recinto_id=None):
+    """
+    Estadísticas de validación cacheadas por (recinto, versión 'validacion').
+
+    Args:
+        recinto_id: restringe a proyectos del recinto (None = todos)
+    """
+    clave = (recinto_id, CacheVersion.obtener(VERSION_VALIDACION))
+    ahora = time.monotonic()
+    with _lock:
+        entrada = _cache_estadisticas.get(clave)
+    if entrada is not None and ahora - entrada[0] < ESTADISTICAS_TTL_SEGUNDOS:
+        return dict(entrada[1])
+
+    estadisticas = calcular_estadisticas(recinto_id)
+    with _lock:
+        if len(_cache_estadisticas) >= ESTADISTICAS_CACHE_MAX_ENTRADAS:
+            _cache_estadisticas.clear()
+        _cache_estadisticas[clave] = (ahora, estadisticas)
+    return dict(estadisticas)
+
+
+def invalidar_estadisticas():
+    """Descarta las estadísticas cacheadas de este proceso"""
+    with _lock:
+        _cache_estadisticas.clear()
+
+
+# ---------------------------------------------------------------------------
+# Validación por lotes
+# ---------------------------------------------------------------------------
+
+ACCIONES_LOTE = ('validar', 'corregir', 'rechazar')
+TAMANO_LOTE_MAXIMO = 1000
+
+
+class ValidacionLote:
+    """
+    Aplica validar / corregir / rechazar sobre muchos avances en una transacción.
+
+    Las filas se cargan con una consulta por tabla, los cambios se escriben en un
+    solo flush y la jerarquía EDT se recalcula una vez por proyecto afectado
+    (ArbolProgresoEDT), en lugar de una vez por avance. No hace commit.
+
+    Uso:
+        lote = ValidacionLote(operaciones, supervisor, recinto_id)
+        errores = lote.validar_operaciones()
+        if not errores:
+            resumen = lote.aplicar()
+            db.session.commit()
+    """
+
+    def __init__(self, operaciones, supervisor, recinto_id=None):
+        """
+        Args:
+            operaciones: [{'historial_id', 'accion', 'porcentaje_corregido'?, 'comentario'?, 'motivo'?}]
+            supervisor: Trabajador que valida
+            recinto_id: restringe a proyectos del recinto (usuarios no superadmin)
+        """
+        self.operaciones = operaciones or []
+        self.supervisor = supervisor
+        self.recinto_id = recinto_id
+        self._historiales = {}
+        self._omitidos = []
+
+    def validar_operaciones(self):
+        """
+        Verifica todas las operaciones antes de escribir nada (una consulta).
+
+        Returns:
+            list: errores [{'historial_id', 'error'}]; vacía si el lote es aplicable
+        """
+        errores = []
+        if not self.operaciones:
+            return [{'historial_id': None, 'error': 'Lote vacío'}]
+        if len(self.operaciones) > TAMANO_LOTE_MAXIMO:
+            return [{'historial_id': None, 'error': f'Máximo {TAMANO_LOTE_MAXIMO} avances por lote'}]
+
+        vistos = set()
+        for operacion in self.operaciones:
+            try:
+                historial_id = operacion['historial_id'] = int(operacion.get('historial_id'))
+            except (TypeError, ValueError):
+                errores.append({'historial_id': operacion.get('historial_id'), 'error': 'ID de historial requerido'})
+                continue
+            if operacion.get('accion') not in ACCIONES_LOTE:
+                errores.append({'historial_id': historial_id, 'error': f"Acción inválida: {operacion.get('accion')}"})
+            elif operacion['accion'] == 'corregir':
+                try:
+                    porcentaje = float(operacion.get('porcentaje_corregido'))
+                except (TypeError, ValueError):
+                    porcentaje = None
+                if porcentaje is None or not 0 <= porcentaje <= 100:
+                    errores.append({'historial_id': historial_id, 'error': 'Porcentaje debe estar entre 0 y 100'})
+                else:
+                    operacion['porcentaje_corregido'] = porcentaje
+            if historial_id in vistos:
+                errores.append({'historial_id': historial_id, 'error': 'Avance repetido en el lote'})
+            vistos.add(historial_id)
+
+        filas = db.session.execute(
+            select(HistorialAvanceActividad, Requerimiento.id_recinto)
+            .join(Requerimiento, HistorialAvanceActividad.requerimiento_id == Requerimiento.id)
+            .where(HistorialAvanceActividad.id.in_(vistos))
+        ).all()
+        self._historiales = {historial.id: (historial, id_recinto) for historial, id_recinto in filas}
+
+        for historial_id in vistos:
+            if historial_id not in self._historiales:
+                errores.append({'historial_id': historial_id, 'error': 'Registro no encontrado'})
+            elif self.recinto_id is not None and self._historiales[historial_id][1] != self.recinto_id:
+                errores.append({'historial_id': historial_id, 'error': 'Sin permisos para este proyecto'})
+        return errores
+
+    def aplicar(self):
+        """
+        Aplica el lote ya validado. Los avances que ya no están pendientes se omiten
+        (p. ej. revisados por otro supervisor mientras tanto).
+
+        Returns:
+            dict: {'validados', 'corregidos', 'rechazados', 'omitidos', 'proyectos', 'actividades_recalculadas'}
+        """
+        ahora = datetime.utcnow()
+        pendientes = []
+        for operacion in self.operaciones:
+            historial = self._historiales[operacion['historial_id']][0]
+            if historial.estado_validacion != ESTADO_PENDIENTE:
+                self._omitidos.append(historial.id)
+                continue
+            pendientes.append((historial, operacion))
+        # El reporte más reciente de cada actividad define su porcentaje validado
+        pendientes.sort(key=lambda par: (par[0].fecha_cambio, par[0].id))
+
+        actividades = self._cargar_actividades(h.actividad_id for h, _ in pendientes)
+        avances = self._cargar_avances([h for h, op in pendientes if op['accion'] == 'corregir'])
+
+        resumen = {'validados': 0, 'corregidos': 0, 'rechazados': 0}
+        afectadas = {}
+        for historial, operacion in pendientes:
+            accion = operacion['accion']
+            historial.validado = True
+            historial.validado_por_id = self.supervisor.id
+            historial.fecha_validacion = ahora
+
+            if accion == 'rechazar':
+                historial.comentario_validacion = f"RECHAZADO - Motivo: {operacion.get('motivo') or 'Sin especificar'}"
+                historial.estado_validacion = ESTADO_RECHAZADO
+                resumen['rechazados'] += 1
+                continue
+
+            historial.estado_validacion = ESTADO_VALIDADO
+            if accion == 'validar':
+                historial.comentario_validacion = operacion.get('comentario') or 'Aprobado'
+                porcentaje = historial.progreso_nuevo
+                resumen['validados'] += 1
+            else:
+                porcentaje = operacion['porcentaje_corregido']
+                self._corregir(historial, porcentaje, operacion.get('comentario', ''), avances, ahora)
+                resumen['corregidos'] += 1
+
+            actividad = actividades.get(historial.actividad_id)
+            if actividad is not None:
+                actividad.porcentaje_avance_validado = porcentaje
+                afectadas.setdefault(historial.requerimiento_id, set()).add(actividad.id)
+
+        db.session.flush()
+
+        # Una pasada del árbol EDT por proyecto, con todas sus actividades afectadas
+        recalculadas = 0
+        for requerimiento_id, actividad_ids in afectadas.items():
+            recalculadas += len(ArbolProgresoEDT(requerimiento_id).recalcular(actividad_ids))
+
+        resumen.update({
+            'omitidos': self._omitidos,
+            'proyectos': sorted(afectadas),
+            'actividades_recalculadas': recalculadas
+        })
+        return resumen
+
+    def _corregir(self, historial, porcentaje, comentario, avances, ahora):
+        """Marca el original como corregido y crea el registro con el valor del supervisor"""
+        historial.comentario_validacion = f"CORREGIDO por supervisor de {historial.progreso_nuevo}% a {porcentaje}%"
+        db.session.add(HistorialAvanceActividad(
+            requerimiento_id=historial.requerimiento_id,
+            trabajador_id=historial.trabajador_id,
+            actividad_id=historial.actividad_id,
+            progreso_anterior=historial.progreso_nuevo,
+            progreso_nuevo=porcentaje,
+            diferencia=porcentaje - historial.progreso_nuevo,
+            comentarios=f"Corrección supervisada: {comentario}" if comentario else "Corrección supervisada",
+            fecha_cambio=ahora,
+            sesion_guardado=f"CORRECCION_{uuid.uuid4().hex[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            validado=True,
+            validado_por_id=self.supervisor.id,
+            fecha_validacion=ahora,
+            comentario_validacion=f"Corregido de {historial.progreso_nuevo}% a {porcentaje}%. {comentario}",
+            estado_validacion=ESTADO_VALIDADO
+        ))
+
+        avance = avances.get((historial.requerimiento_id, historial.trabajador_id, historial.actividad_id))
+        if avance is not None:
+            avance.progreso_anterior = avance.progreso_actual
+            avance.progreso_actual = porcentaje
+            avance.fecha_actualizacion = ahora
+            avance.observaciones = (f"Corregido por supervisor {self.supervisor.nombre}: "
+                                    f"{historial.progreso_nuevo}% → {porcentaje}%")
+
+    @staticmethod
+    def _cargar_actividades(actividad_ids):
+        ids = set(actividad_ids)
+        if not ids:
+            return {}
+        return {a.id: a for a in ActividadProyecto.query.filter(ActividadProyecto.id.in_(ids))}
+
+    @staticmethod
+    def _cargar_avances(historiales):
+        """AvanceActividad de cada (proyecto, trabajador, actividad) corregido, en una consulta"""
+        claves = {(h.requerimiento_id, h.trabajador_id, h.actividad_id) for h in historiales}
+        if not claves:
+            return {}
+        filas = AvanceActividad.query.filter(
+            tuple_(AvanceActividad.requerimiento_id, AvanceActividad.trabajador_id, AvanceActividad.actividad_id)
+            .in_(list(claves))
+        ).order_by(AvanceActividad.id)
+        avances = {}
+        for avance in filas:
+            avances.setdefault((avance.requerimiento_id, avance.trabajador_id, avance.actividad_id), avance)
+        return avances
@@ -458,7 +458,20 @@ class BackupManagerV2 {
                 }
             });
             
-            const data = await response.json();
+            let data = await response.json();
+            
+            // El backup se crea en segundo plano: esperar a que termine la tarea
+            if (data.success && data.tarea_id) {
+                const tarea = await esperarTarea(data.tarea_id, t => {
+                    const texto = document.querySelector('#loadingOverlay p');
+                    if (texto) {
+                        texto.textContent = `${t.mensaje || 'Backup en cola'} (${t.progreso}%)`;
+                    }
+                });
+                data = tarea.estado === 'completada'
+                    ? tarea.resultado
+                    : { success: false, message: tarea.error || 'Backup cancelado' };
+            }
             
             this.hideLoading();
             
@@ -490,8 +490,16 @@ class BackupManager {
                 throw new Error(errorData.message || `HTTP ${response.status}: ${response.statusText}`);
             }
             
-            const result = await response.json();
+            let result = await response.json();
             console.log('📋 [createBackupFromForm] Respuesta recibida:', result);
+            
+            // El backup se crea en segundo plano: esperar a que termine la tarea
+            if (result.success && result.tarea_id) {
+                const tarea = await esperarTarea(result.tarea_id);
+                result = tarea.estado === 'completada'
+                    ? tarea.resultado
+                    : { success: false, message: tarea.error || 'Backup cancelado' };
+            }
 
             if (result.success) {
                 // Mostrar mensaje de éxito
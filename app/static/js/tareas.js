@@ -0,0 +1,44 @@
+/**
+ * Seguimiento de tareas en segundo plano
+ *
+ * Las operaciones largas (Carta Gantt, control de actividades, backups) se
+ * encolan en el servidor y devuelven un tarea_id; estas funciones consultan
+ * /tareas/<id> hasta que la tarea termina.
+ */
+
+/**
+ * Esperar a que una tarea termine.
+ * @param {number} tareaId
+ * @param {function} alProgresar - recibe la tarea en cada consulta (opcional)
+ * @param {number} intervaloMs
+ * @returns {Promise<object>} la tarea finalizada (estado completada, fallida o cancelada)
+ */
+async function esperarTarea(tareaId, alProgresar = null, intervaloMs = 1500) {
+    while (true) {
+        const response = await fetch(`/tareas/${tareaId}`, { headers: { 'Accept': 'application/json' } });
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            throw new Error(data.message || `No se pudo consultar la tarea ${tareaId}`);
+        }
+        if (alProgresar) {
+            alProgresar(data.tarea);
+        }
+        if (data.tarea.finalizada) {
+            return data.tarea;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervaloMs));
+    }
+}
+
+/**
+ * Pedir la cancelación de una tarea.
+ * @returns {Promise<object>} respuesta del servidor
+ */
+async function cancelarTarea(tareaId) {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    const response = await fetch(`/tareas/${tareaId}/cancelar`, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': meta ? meta.getAttribute('content') : '' }
+    });
+    return response.json();
+}
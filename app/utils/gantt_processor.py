@@ -1,7 +1,7 @@
 import re
 import pandas as pd
 from datetime import datetime, date
-from app.models import db, ActividadGantt, RecursoTrabajador, Trabajador
+from app.models import db, ActividadGantt, RecursoTrabajador
 from sqlalchemy.exc import IntegrityError
 
 class GanttProcessor:
@@ -25,6 +25,11 @@ class GanttProcessor:
             recursos_procesados = 0
             errores = []
             
+            # Índice de trabajadores precargado una vez; los desconocidos se crean al final
+            from app.services.recursos_service import ResolutorRecursos
+            resolutor = ResolutorRecursos().cargar()
+            pendientes = []
+            
             for index, row in df.iterrows():
                 try:
                     # Procesar actividad
@@ -35,7 +40,7 @@ class GanttProcessor:
                         
                         # Procesar recursos de la actividad
                         recursos_count = GanttProcessor._procesar_recursos_actividad(
-                            actividad, row, requerimiento_id
+                            actividad, row, requerimiento_id, resolutor, pendientes
                         )
                         
                         actividades_procesadas += 1
@@ -46,6 +51,8 @@ class GanttProcessor:
                     errores.append(error_msg)
                     print(f"❌ {error_msg}")
             
+            GanttProcessor._asignar_recursos_pendientes(pendientes, resolutor, requerimiento_id)
+            
             # Confirmar cambios
             db.session.commit()
             
@@ -195,8 +202,11 @@ class GanttProcessor:
             return 0.0
     
     @staticmethod
-    def _procesar_recursos_actividad(actividad, row, requerimiento_id):
-        """Procesa los recursos de una actividad y los divide por trabajadores"""
+    def _procesar_recursos_actividad(actividad, row, requerimiento_id, resolutor, pendientes):
+        """
+        Procesa los recursos de una actividad y los divide por trabajadores.
+        Los recursos sin trabajador se agregan a `pendientes` para crearlos al final.
+        """
         recursos_count = 0
         
         try:
@@ -209,22 +219,14 @@ class GanttProcessor:
             
             for recurso_info in recursos_parseados:
                 # Usar el nombre_corto en lugar del nombre completo
-                trabajador = GanttProcessor._obtener_o_crear_trabajador(recurso_info['nombre_corto'])
+                trabajador_id = GanttProcessor._resolver_trabajador(recurso_info['nombre_corto'], resolutor)
                 
-                if trabajador:
-                    # Crear registro en recursos_trabajador
-                    recurso_trabajador = RecursoTrabajador(
-                        requerimiento_id=requerimiento_id,
-                        actividad_gantt_id=actividad.id,
-                        edt=actividad.edt,
-                        recurso=recurso_info['nombre_corto'],  # Usar nombre_corto
-                        id_trabajador=trabajador.id,
-                        porcentaje_asignacion=recurso_info['porcentaje']
-                    )
-                    
-                    db.session.add(recurso_trabajador)
+                if trabajador_id:
+                    GanttProcessor._agregar_recurso_trabajador(actividad, recurso_info, trabajador_id, requerimiento_id)
+                    recursos_count += 1
+                elif resolutor.registrar(recurso_info['nombre_corto']):
+                    pendientes.append((actividad, recurso_info))
                     recursos_count += 1
-                    print(f"  💼 Recurso asignado: {recurso_info['nombre_corto']} -> {recurso_info['porcentaje']}% en actividad {actividad.edt}")
                     
         except Exception as e:
             print(f"❌ Error procesando recursos para actividad {actividad.edt}: {str(e)}")
@@ -317,76 +319,46 @@ class GanttProcessor:
         return recursos
     
     @staticmethod
-    def _obtener_o_crear_trabajador(nombre_corto_recurso):
+    def _agregar_recurso_trabajador(actividad, recurso_info, trabajador_id, requerimiento_id):
+        """Crea el registro en recursos_trabajador de un recurso ya resuelto"""
+        db.session.add(RecursoTrabajador(
+            requerimiento_id=requerimiento_id,
+            actividad_gantt_id=actividad.id,
+            edt=actividad.edt,
+            recurso=recurso_info['nombre_corto'],  # Usar nombre_corto
+            id_trabajador=trabajador_id,
+            porcentaje_asignacion=recurso_info['porcentaje']
+        ))
+        print(f"  💼 Recurso asignado: {recurso_info['nombre_corto']} -> {recurso_info['porcentaje']}% en actividad {actividad.edt}")
+    
+    @staticmethod
+    def _asignar_recursos_pendientes(pendientes, resolutor, requerimiento_id):
+        """Crea en un solo INSERT los trabajadores desconocidos y asigna sus recursos"""
+        if not pendientes:
+            return
+        creados = resolutor.crear_pendientes()
+        print(f"🆕 Trabajadores creados automáticamente: {len(creados)}")
+        for actividad, recurso_info in pendientes:
+            trabajador_id = resolutor.resolver(recurso_info['nombre_corto'])
+            if trabajador_id:
+                GanttProcessor._agregar_recurso_trabajador(actividad, recurso_info, trabajador_id, requerimiento_id)
+    
+    @staticmethod
+    def _resolver_trabajador(nombre_corto_recurso, resolutor):
         """
-        Obtiene un trabajador existente por nombrecorto o crea uno nuevo
-        Busca primero por nombrecorto exacto, luego por nombre parcial
+        Obtiene el id del trabajador de un recurso desde el índice precargado
+        (nombrecorto o nombre normalizados). Devuelve None si no existe: la
+        creación queda para el final del archivo, en bloque.
         """
-        try:
-            # Limpiar y normalizar el nombre corto
-            nombre_corto_limpio = nombre_corto_recurso.strip().upper()
-            
-            if not nombre_corto_limpio or len(nombre_corto_limpio) < 2:
-                print(f"⚠️ Nombre corto muy corto o vacío: '{nombre_corto_recurso}'")
-                return None
-            
-            print(f"🔍 Buscando trabajador con nombrecorto: '{nombre_corto_limpio}'")
-            
-            # Buscar trabajador por nombrecorto exacto (case-insensitive)
-            trabajador = Trabajador.query.filter(
-                Trabajador.nombrecorto.ilike(nombre_corto_limpio)
-            ).first()
-            
-            if trabajador:
-                print(f"✅ Trabajador encontrado por nombrecorto: {trabajador.nombre} ({trabajador.nombrecorto})")
-                return trabajador
-            
-            # Si no encuentra por nombrecorto, buscar en el nombre completo
-            trabajador = Trabajador.query.filter(
-                Trabajador.nombre.ilike(f'%{nombre_corto_limpio}%')
-            ).first()
-            
-            if trabajador:
-                print(f"✅ Trabajador encontrado por nombre parcial: {trabajador.nombre} ({trabajador.nombrecorto})")
-                return trabajador
-            
-            # Si no existe, crear un nuevo trabajador
-            print(f"🆕 Creando nuevo trabajador con nombrecorto: '{nombre_corto_limpio}'")
-            
-            # Generar nombre completo basado en el nombrecorto
-            nombre_completo = f"Trabajador {nombre_corto_limpio}"
-            
-            # Generar email automático basado en nombrecorto
-            email_usuario = nombre_corto_limpio.lower()
-            email_completo = f"{email_usuario}@empresa.com"
-            
-            # Verificar que el email no exista
-            email_existente = Trabajador.query.filter_by(email=email_completo).first()
-            if email_existente:
-                # Agregar timestamp al email para evitar duplicados
-                from datetime import datetime
-                timestamp = datetime.now().strftime('%Y%m%d')
-                email_completo = f"{email_usuario}{timestamp}@empresa.com"
-            
-            # Crear nuevo trabajador
-            nuevo_trabajador = Trabajador(
-                nombre=nombre_completo,
-                nombrecorto=nombre_corto_limpio,
-                profesion='Por definir',
-                email=email_completo,
-                telefono='',
-                activo=True
-            )
-            
-            db.session.add(nuevo_trabajador)
-            db.session.flush()  # Para obtener el ID sin hacer commit completo
-            
-            print(f"✅ Nuevo trabajador creado: {nuevo_trabajador.nombre} ({nuevo_trabajador.nombrecorto})")
-            return nuevo_trabajador
-            
-        except Exception as e:
-            print(f"❌ Error obteniendo/creando trabajador '{nombre_corto_recurso}': {str(e)}")
+        nombre_corto_limpio = (nombre_corto_recurso or '').strip()
+        if len(nombre_corto_limpio) < 2:
+            print(f"⚠️ Nombre corto muy corto o vacío: '{nombre_corto_recurso}'")
             return None
+        
+        trabajador_id = resolutor.resolver(nombre_corto_limpio)
+        if trabajador_id is None:
+            print(f"🆕 Trabajador pendiente de creación para recurso: '{nombre_corto_limpio}'")
+        return trabajador_id
     
     @staticmethod
     def _obtener_valor(row, posibles_nombres):
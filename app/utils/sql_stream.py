@@ -0,0 +1,233 @@
+"""
+Lectura de dumps SQL en streaming
+=================================
+
+Divide un dump (plano o .gz) en sentencias sin cargarlo completo en memoria.
+Se lee línea a línea sobre el stream descomprimido, así que la memoria queda
+acotada por la línea más larga (en mysqldump, un INSERT extendido de
+~net_buffer_length) y no por el tamaño del archivo.
+
+Reglas, iguales a las del cliente mysql:
+- Strings '...', "..." y `...` con escapes por backslash y comillas dobladas.
+- Comentarios "-- ", "#" y /* ... */ se descartan; los comentarios
+  ejecutables /*! ... */ de mysqldump se conservan dentro de la sentencia.
+- DELIMITER al inicio de una línea cambia el terminador (rutinas y triggers).
+"""
+
+import gzip
+import io
+import os
+import re
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+_COMILLAS = ("'", '"', '`')
+
+# Continuación de un string abierto en una línea anterior: consume su contenido
+# (con escapes por backslash) y, si aparece, la comilla de cierre.
+# En identificadores `...` el backslash no escapa nada.
+_FIN_STRING = {
+    "'": re.compile(r"(?>(?:[^'\\]+|\\.)*)(')?", re.DOTALL),
+    '"': re.compile(r'(?>(?:[^"\\]+|\\.)*)(")?', re.DOTALL),
+    '`': re.compile(r'[^`]*(`)?'),
+}
+
+
+def _patron_cuerpo(delimitador):
+    """
+    Regex que avanza, en un solo match, sobre todo lo que no corta la sentencia:
+    texto común y strings que abren y cierran en la misma línea. Se detiene en
+    una comilla sin cierre, un comentario o el delimitador.
+    """
+    primero, resto = delimitador[0], delimitador[1:]
+    especiales = set('\'"`/#-') | {primero}
+    seguros = []
+    for c in ('/', '-'):
+        continuacion = r'\*' if c == '/' else r'-(?:\s|$)'
+        if c == primero and resto:
+            continuacion += '|' + re.escape(resto)
+        elif c == primero:
+            continue
+        seguros.append(re.escape(c) + '(?!' + continuacion + ')')
+    if primero not in '/-' and resto:
+        seguros.append(re.escape(primero) + '(?!' + re.escape(resto) + ')')
+
+    clase = '[^' + ''.join(re.escape(c) for c in sorted(especiales)) + ']+'
+    # Grupos atómicos / cuantificador posesivo (Python 3.11+): un string sin
+    # cierre en la línea falla en tiempo lineal en lugar de hacer backtracking
+    alternativas = [
+        clase,
+        r"'(?>(?:[^'\\]+|\\.)*)'",
+        r'"(?>(?:[^"\\]+|\\.)*)"',
+        r'`[^`]*`',
+    ] + seguros
+    return re.compile('(?:' + '|'.join(alternativas) + ')*+', re.DOTALL)
+
+
+def detectar_encoding(inicio):
+    """Encoding del dump según su BOM (utf-8 si no tiene)"""
+    if inicio[:3] == b'\xef\xbb\xbf':
+        return 'utf-8-sig'
+    if inicio[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return 'utf-16'
+    return 'utf-8'
+
+
+def iterar_sentencias(lineas, delimitador=';'):
+    """
+    Generador de sentencias SQL a partir de un iterable de líneas.
+
+    Args:
+        lineas: iterable de str (p. ej. un archivo de texto abierto)
+        delimitador: terminador inicial de sentencia
+
+    Yields:
+        str: cada sentencia sin el delimitador ni comentarios, con strip()
+    """
+    cuerpo = _patron_cuerpo(delimitador)
+    partes = []
+    comilla = None          # Comilla del string abierto, si lo hay
+    en_comentario = False   # Dentro de /* ... */
+    conservar = False       # El comentario abierto es ejecutable (/*! ... */)
+
+    for linea in lineas:
+        # DELIMITER solo se reconoce al inicio de una sentencia
+        if comilla is None and not en_comentario and linea[:10].upper() == 'DELIMITER ' \
+                and not ''.join(partes).strip():
+            nuevo = linea[10:].strip()
+            if nuevo:
+                delimitador = nuevo
+                cuerpo = _patron_cuerpo(delimitador)
+            partes = []
+            continue
+
+        pos = 0
+        fin = len(linea)
+        while pos < fin:
+            if comilla is not None:
+                m = _FIN_STRING[comilla].match(linea, pos)
+                if m.group(1) is None:
+                    partes.append(linea[pos:])
+                    break
+                partes.append(linea[pos:m.end()])
+                pos = m.end()
+                comilla = None
+                continue
+
+            if en_comentario:
+                cierre = linea.find('*/', pos)
+                if cierre == -1:
+                    if conservar:
+                        partes.append(linea[pos:])
+                    break
+                if conservar:
+                    partes.append(linea[pos:cierre + 2])
+                else:
+                    partes.append(' ')
+                pos = cierre + 2
+                en_comentario = False
+                continue
+
+            corte = cuerpo.match(linea, pos).end()
+            if corte >= fin:
+                partes.append(linea[pos:])
+                break
+
+            if linea[corte] in _COMILLAS:
+                # String que continúa en la línea siguiente
+                comilla = linea[corte]
+                partes.append(linea[pos:corte + 1])
+                pos = corte + 1
+            elif linea.startswith('/*', corte):
+                conservar = linea.startswith('/*!', corte)
+                partes.append(linea[pos:corte + 2] if conservar else linea[pos:corte])
+                en_comentario = True
+                pos = corte + 2
+            elif linea.startswith(delimitador, corte):
+                partes.append(linea[pos:corte])
+                sentencia = ''.join(partes).strip()
+                partes = []
+                if sentencia:
+                    yield sentencia
+                pos = corte + len(delimitador)
+            else:
+                # "#" o "-- ": comentario hasta fin de línea
+                partes.append(linea[pos:corte])
+                partes.append('\n')
+                break
+
+    sentencia = ''.join(partes).strip()
+    if sentencia:
+        yield sentencia
+
+
+class LectorDumpSQL:
+    """
+    Iterable de sentencias de un archivo de backup (.sql o .sql.gz).
+
+    Expone `bytes_leidos` / `fraccion_leida` sobre el archivo en disco
+    (comprimido si aplica) para reportar progreso sin conocer el total
+    de sentencias de antemano.
+
+    Uso:
+        with LectorDumpSQL(ruta) as lector:
+            for sentencia in lector:
+                ...
+    """
+
+    def __init__(self, ruta, prefijo=(), sufijo=()):
+        self.ruta = ruta
+        self.tamano = os.path.getsize(ruta)
+        self.prefijo = list(prefijo)
+        self.sufijo = list(sufijo)
+        self.sentencias_leidas = 0
+        self._archivo = None
+        self._texto = None
+        self.encoding = None
+
+    def abrir(self):
+        """Abrir el archivo detectando gzip (magic bytes) y encoding (BOM)"""
+        self._archivo = open(self.ruta, 'rb')
+        comprimido = self._archivo.peek(2)[:2] == GZIP_MAGIC
+        binario = io.BufferedReader(gzip.GzipFile(fileobj=self._archivo)) if comprimido else self._archivo
+        self.encoding = detectar_encoding(binario.peek(4)[:4])
+        self._texto = io.TextIOWrapper(binario, encoding=self.encoding)
+        return self
+
+    def cerrar(self):
+        if self._texto is not None:
+            self._texto.close()
+            self._texto = None
+        if self._archivo is not None:
+            self._archivo.close()
+
+    def __enter__(self):
+        return self.abrir()
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    @property
+    def bytes_leidos(self):
+        if self._archivo is None:
+            return 0
+        if self._archivo.closed:
+            return self.tamano
+        return self._archivo.tell()
+
+    @property
+    def fraccion_leida(self):
+        return self.bytes_leidos / self.tamano if self.tamano else 1.0
+
+    def __iter__(self):
+        if self._texto is None:
+            self.abrir()
+        for sentencia in self.prefijo:
+            self.sentencias_leidas += 1
+            yield sentencia
+        for sentencia in iterar_sentencias(self._texto):
+            self.sentencias_leidas += 1
+            yield sentencia
+        for sentencia in self.sufijo:
+            self.sentencias_leidas += 1
+            yield sentencia
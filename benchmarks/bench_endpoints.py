@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end de los endpoints principales
+=================================================
+
+Puebla una base de datos con datos sintéticos (datos_sinteticos.py) y mide,
+a través del test client de Flask (sin red ni servidor WSGI), los endpoints
+que más pesan con datos reales:
+
+- gantt_data, proyectos_estado_4, api_resumen_proyectos, validar_avances.listar
+- subir_gantt_xlsx (procesamiento en la misma request) y subir_control_actividades
+
+Por endpoint informa latencia p50/p95, consultas SQL por request y memoria
+Python pico (tracemalloc, medida en una pasada aparte para no distorsionar
+los tiempos). El resultado es un JSON con el commit actual; con --comparar
+se muestra la diferencia contra un resultado anterior:
+
+    python benchmarks/bench_endpoints.py --salida base.json
+    git checkout otra-rama
+    python benchmarks/bench_endpoints.py --salida nuevo.json --comparar base.json
+
+Por defecto usa SQLite en un directorio temporal. Con --url se puede apuntar a
+un MySQL, que debe ser una base DESECHABLE: se crean tablas y se insertan datos.
+
+Uso:
+    python benchmarks/bench_endpoints.py --proyectos 20 --actividades 300 --trabajadores 60
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.datos_sinteticos import generar_control_xlsx, generar_dataset, generar_gantt_xlsx
+
+VERSION_FORMATO = 1
+
+
+def crear_app(url, directorio):
+    """Aplicación con los blueprints medidos, sin create_app (no exige MySQL ni .env)"""
+    from flask import Flask
+    from flask_login import LoginManager
+
+    from app import db
+    from app.controllers.validar_avances_controller import validar_avances_bp
+    from app.controllers_main import controllers_bp
+    from app.models import Trabajador
+    from app.performance import instrumentar_engine
+
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=url,
+        SECRET_KEY='benchmark',
+        UPLOAD_FOLDER=directorio,
+        TAREAS_EN_PROCESO=True,
+        PRESUPUESTO_CONSULTAS_ESTRICTO=False,
+    )
+    db.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(Trabajador, int(user_id)))
+    app.register_blueprint(controllers_bp)
+    app.register_blueprint(validar_avances_bp)
+    with app.app_context():
+        instrumentar_engine(db.engine)
+    return app
+
+
+def percentil(valores, porcentaje):
+    """Percentil por rango más cercano (valores no vacíos)"""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(porcentaje / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def medir_endpoint(cliente, peticion, repeticiones):
+    """
+    Ejecuta `peticion(cliente, i)` una vez de calentamiento, `repeticiones`
+    veces cronometradas y una vez más bajo tracemalloc.
+
+    Se llama fuera de app.app_context(): en Flask 3 un request reutiliza el
+    contexto ya abierto, y con él la sesión ORM (identity map) y flask.g, así
+    que la carga del usuario y lo cacheado en g solo se contarían una vez.
+    """
+    from app.performance import perfilar_consultas
+
+    peticion(cliente, -1)
+    tiempos, consultas, estados = [], [], set()
+    for i in range(repeticiones):
+        with perfilar_consultas() as perfil:
+            inicio = time.perf_counter()
+            respuesta = peticion(cliente, i)
+            respuesta.get_data()  # Consume también las respuestas en streaming
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(perfil.consultas)
+        estados.add(respuesta.status_code)
+
+    tracemalloc.start()
+    peticion(cliente, repeticiones).get_data()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'repeticiones': repeticiones,
+        'status': sorted(estados),
+        'p50_ms': round(percentil(tiempos, 50), 2),
+        'p95_ms': round(percentil(tiempos, 95), 2),
+        'media_ms': round(sum(tiempos) / len(tiempos), 2),
+        'consultas': max(consultas),
+        'memoria_pico_kb': round(pico / 1024, 1),
+    }
+
+
+def definir_peticiones(app, datos, directorio, args):
+    """Peticiones a medir: {nombre: funcion(cliente, i) -> respuesta}"""
+    from app import db
+    from app.models import Requerimiento
+
+    proyecto_gantt = datos['proyectos'][0]
+    proyecto_control = datos['proyectos'][-1]
+    estado_4 = next(
+        pid for pid in datos['proyectos'] if db.session.get(Requerimiento, pid).id_estado == 4
+    )
+
+    # Dos Gantt distintos alternados: el mismo archivo dos veces no se reprocesa
+    gantts = []
+    for variante in range(2):
+        ruta = os.path.join(directorio, f'gantt_{variante}.xlsx')
+        generar_gantt_xlsx(ruta, actividades=args.actividades, trabajadores=args.trabajadores,
+                           profundidad=args.profundidad, semilla=args.semilla + 1000 + variante)
+        with open(ruta, 'rb') as archivo:
+            gantts.append(archivo.read())
+
+    controles = []
+    for variante in range(2):
+        ruta = os.path.join(directorio, f'control_{variante}.xlsx')
+        generar_control_xlsx(ruta, proyecto_control, semilla=args.semilla + variante)
+        with open(ruta, 'rb') as archivo:
+            controles.append(archivo.read())
+
+    def subir(url, campo, contenidos):
+        from io import BytesIO
+
+        def peticion(cliente, i):
+            contenido = contenidos[i % len(contenidos)]
+            return cliente.post(url, data={campo: (BytesIO(contenido), 'archivo.xlsx')},
+                                content_type='multipart/form-data')
+        return peticion
+
+    return {
+        'gantt_data': lambda cliente, i: cliente.get(f'/gantt_data/{estado_4}'),
+        'proyectos_estado_4': lambda cliente, i: cliente.get('/proyectos_estado_4'),
+        'api_resumen_proyectos': lambda cliente, i: cliente.get('/api/resumen_proyectos'),
+        'listar_avances': lambda cliente, i: cliente.get('/validar-avances/listar?estado=todos'),
+        'subir_gantt_xlsx': subir(f'/subir_gantt_xlsx/{proyecto_gantt}', 'archivo_gantt', gantts),
+        'subir_control_actividades': subir('/subir_control_actividades', 'archivo', controles),
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultado, ruta_base):
+    """Tabla de diferencias contra un resultado anterior"""
+    with open(ruta_base, encoding='utf-8') as archivo:
+        base = json.load(archivo)
+
+    print(f"\n📊 Comparación contra {base.get('commit')} ({ruta_base})")
+    print(f"{'endpoint':<28}{'p50 ms':>18}{'p95 ms':>18}{'consultas':>14}{'memoria KB':>20}")
+    for nombre, actual in resultado['endpoints'].items():
+        anterior = base.get('endpoints', {}).get(nombre)
+        if not anterior:
+            print(f"{nombre:<28}{'(nuevo)':>18}")
+            continue
+
+        def delta(campo):
+            antes, ahora = anterior[campo], actual[campo]
+            cambio = f"{(ahora - antes) / antes * 100:+.0f}%" if antes else ''
+            return f"{antes}→{ahora} {cambio}"
+
+        print(f"{nombre:<28}{delta('p50_ms'):>18}{delta('p95_ms'):>18}"
+              f"{delta('consultas'):>14}{delta('memoria_pico_kb'):>20}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--proyectos', type=int, default=20)
+    parser.add_argument('--actividades', type=int, default=300, help='Actividades por proyecto')
+    parser.add_argument('--trabajadores', type=int, default=60)
+    parser.add_argument('--avances', type=int, default=3, help='Registros de historial por tarea con avance')
+    parser.add_argument('--profundidad', type=int, default=4, help='Niveles de EDT')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--solo', nargs='*', help='Medir solo estos endpoints')
+    parser.add_argument('--url', help='Base de datos DESECHABLE (por defecto SQLite temporal)')
+    parser.add_argument('--salida', help='Archivo JSON de resultados')
+    parser.add_argument('--comparar', help='JSON de una ejecución anterior')
+    args = parser.parse_args()
+
+    from app import db
+
+    with tempfile.TemporaryDirectory(prefix='bench_endpoints_') as directorio:
+        url = args.url or f"sqlite:///{os.path.join(directorio, 'benchmark.db')}"
+        app = crear_app(url, directorio)
+
+        with app.app_context():
+            db.create_all()
+            print(f"📝 Generando {args.proyectos} proyectos × {args.actividades} actividades "
+                  f"× {args.trabajadores} trabajadores...")
+            inicio = time.perf_counter()
+            datos = generar_dataset(proyectos=args.proyectos, actividades=args.actividades,
+                                    trabajadores=args.trabajadores, avances=args.avances,
+                                    profundidad=args.profundidad, semilla=args.semilla)
+            print(f"   {datos['actividades']:,} actividades, {datos['avances']:,} avances, "
+                  f"{datos['historial']:,} historial en {time.perf_counter() - inicio:.1f} s")
+            peticiones = definir_peticiones(app, datos, directorio, args)
+            db.session.remove()
+
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion['_user_id'] = str(datos['admin_id'])
+            sesion['_fresh'] = True
+
+        resultado = {
+            'version': VERSION_FORMATO,
+            'commit': commit_actual(),
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'motor': url.split(':', 1)[0],
+            'parametros': {
+                'proyectos': args.proyectos, 'actividades': args.actividades, 'trabajadores': args.trabajadores,
+                'avances': args.avances, 'profundidad': args.profundidad, 'semilla': args.semilla,
+            },
+            'endpoints': {},
+        }
+
+        for nombre, peticion in peticiones.items():
+            if args.solo and nombre not in args.solo:
+                continue
+            # Sin un contexto de aplicación abierto: cada request del test client
+            # empuja el suyo (sesión ORM y flask.g nuevos), como en producción
+            metricas = medir_endpoint(cliente, peticion, args.repeticiones)
+            resultado['endpoints'][nombre] = metricas
+            print(f"{nombre:>28}: p50 {metricas['p50_ms']:.1f} ms | p95 {metricas['p95_ms']:.1f} ms | "
+                  f"{metricas['consultas']} consultas | {metricas['memoria_pico_kb']:.0f} KB | "
+                  f"status {metricas['status']}")
+
+        with app.app_context():
+            db.session.remove()
+            if args.url:
+                db.drop_all()
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados en {args.salida}")
+    if args.comparar:
+        comparar(resultado, args.comparar)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lectura de dumps para restauración (archivo completo vs. streaming)
+=============================================================================
+
+Genera un dump sintético .sql.gz con el formato de mysqldump (INSERT extendidos,
+strings con escapes, comentarios ejecutables, un trigger con DELIMITER) y mide
+tiempo y RSS pico de cada parser, cada uno en su propio proceso:
+
+- anterior: lee el archivo completo a un str y lo recorre carácter a carácter
+  (implementación previa de _read_backup_content + _parse_sql_statements,
+  copiada aquí para poder comparar).
+- streaming: LectorDumpSQL, que genera sentencias a medida que se consumen.
+
+La ejecución contra MySQL no se incluye: las sentencias solo se consumen, así
+que el resultado aísla el costo de lectura y parsing.
+
+Uso:
+    python benchmarks/bench_restore_sql.py --tamano-mb 500
+    python benchmarks/bench_restore_sql.py --tamano-mb 500 --solo-streaming
+"""
+
+import argparse
+import gzip
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+FILAS_POR_INSERT = 500
+
+
+def generar_dump(ruta, tamano_mb):
+    """Escribir un dump sintético de ~tamano_mb MB (sin comprimir)"""
+    objetivo = tamano_mb * 1024 * 1024
+    escritos = 0
+    aleatorio = random.Random(42)
+    with gzip.open(ruta, 'wt', encoding='utf-8', compresslevel=1) as f:
+        cabecera = (
+            "-- MySQL dump sintético\n"
+            "/*!40101 SET @OLD_CHARACTER_SET_CLIENT=@@CHARACTER_SET_CLIENT */;\n"
+            "/*!40101 SET NAMES utf8mb4 */;\n"
+            "DROP TABLE IF EXISTS `avance_actividad`;\n"
+            "CREATE TABLE `avance_actividad` (\n"
+            "  `id` int NOT NULL AUTO_INCREMENT,\n"
+            "  `observaciones` text,\n"
+            "  PRIMARY KEY (`id`)\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;\n"
+            "DELIMITER ;;\n"
+            "/*!50003 CREATE TRIGGER tr BEFORE INSERT ON avance_actividad FOR EACH ROW BEGIN SET @a=1; END */;;\n"
+            "DELIMITER ;\n"
+        )
+        f.write(cabecera)
+        escritos += len(cabecera)
+        fila_id = 0
+        while escritos < objetivo:
+            filas = []
+            for _ in range(FILAS_POR_INSERT):
+                fila_id += 1
+                texto = f"Avance {fila_id}; revisión d\\'obra -- lote {aleatorio.randint(1, 9999)}"
+                filas.append(f"({fila_id},'{texto}',{aleatorio.random() * 100:.2f})")
+            linea = f"INSERT INTO `avance_actividad` VALUES {','.join(filas)};\n"
+            f.write(linea)
+            escritos += len(linea)
+    return escritos
+
+
+def parser_anterior(sql_content):
+    """Copia del parser carácter a carácter previo a la lectura en streaming"""
+    statements = []
+    current_statement = ''
+    in_string = False
+    string_char = ''
+    in_multi_comment = False
+
+    for line in sql_content.split('\n'):
+        i = 0
+        in_single_comment = False
+        while i < len(line):
+            char = line[i]
+            next_char = line[i+1] if i+1 < len(line) else ''
+            if not in_string and char == '-' and next_char == '-':
+                in_single_comment = True
+                break
+            if not in_string and char == '/' and next_char == '*':
+                in_multi_comment = True
+                i += 2
+                continue
+            if in_multi_comment and char == '*' and next_char == '/':
+                in_multi_comment = False
+                i += 2
+                continue
+            if in_multi_comment:
+                i += 1
+                continue
+            if not in_string and char in ('"', "'"):
+                in_string = True
+                string_char = char
+            elif in_string and char == string_char and (i == 0 or line[i-1] != '\\'):
+                in_string = False
+            if not in_string and not in_multi_comment and char == ';':
+                stmt = current_statement.strip()
+                if stmt:
+                    statements.append(stmt)
+                current_statement = ''
+                i += 1
+                continue
+            current_statement += char
+            i += 1
+        if not in_single_comment:
+            current_statement += '\n'
+    if current_statement.strip():
+        statements.append(current_statement.strip())
+    return statements
+
+
+def medir_en_proceso(modo, ruta):
+    """Ejecutado en un subproceso: parsea el dump e imprime sentencias y segundos"""
+    from app.utils.sql_stream import LectorDumpSQL
+
+    inicio = time.perf_counter()
+    if modo == 'anterior':
+        with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+            contenido = f.read()
+        total = len(parser_anterior(contenido))
+    else:
+        total = 0
+        with LectorDumpSQL(ruta) as lector:
+            for _ in lector:
+                total += 1
+    print(f"{total} {time.perf_counter() - inicio:.3f}")
+
+
+def ejecutar_modo(modo, ruta):
+    proceso = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--medir', modo, '--archivo', ruta],
+        capture_output=True, text=True, check=True
+    )
+    sentencias, segundos = proceso.stdout.split()[-2:]
+    # ru_maxrss del último hijo terminado (KB en Linux)
+    rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return int(sentencias), float(segundos), rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamano-mb', type=int, default=500)
+    parser.add_argument('--solo-streaming', action='store_true', help='No medir el parser anterior (muy lento)')
+    parser.add_argument('--medir', choices=['anterior', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--archivo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        medir_en_proceso(args.medir, args.archivo)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='bench_restore_') as directorio:
+        ruta = os.path.join(directorio, 'dump_sintetico.sql.gz')
+        print(f"📝 Generando dump sintético de {args.tamano_mb} MB...")
+        bytes_sql = generar_dump(ruta, args.tamano_mb)
+        print(f"   {bytes_sql / 1024 / 1024:.0f} MB sin comprimir, {os.path.getsize(ruta) / 1024 / 1024:.0f} MB en disco")
+
+        # streaming primero: RUSAGE_CHILDREN es el máximo acumulado de los hijos
+        modos = ['streaming'] if args.solo_streaming else ['streaming', 'anterior']
+        for modo in modos:
+            sentencias, segundos, rss_mb = ejecutar_modo(modo, ruta)
+            print(f"{modo:>10}: {sentencias:,} sentencias | {segundos:.1f} s | RSS pico {rss_mb:.0f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
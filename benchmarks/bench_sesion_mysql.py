@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: configuración de sesión MySQL por request vs. por conexión
+==========================================================================
+
+Compara, bajo carga concurrente, el costo de un "request" típico (checkout
+del pool + una consulta + commit) en dos modos:
+
+- por_request: el comportamiento anterior, 8 SET SESSION en cada request.
+- por_conexion: los SET se aplican una vez en el evento ``connect`` del pool
+  (configurar_sesion_mysql) y cada request solo ejecuta su consulta.
+
+Requiere un MySQL accesible (DATABASE_URL o --url).
+
+Uso:
+    python benchmarks/bench_sesion_mysql.py --hilos 16 --requests 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text
+
+from app import configurar_sesion_mysql, SESION_MYSQL_MARCADOR
+
+# Sentencias que before_request enviaba en cada request
+SET_POR_REQUEST = [
+    "SET NAMES 'utf8mb4'",
+    "SET CHARACTER SET utf8mb4",
+    "SET character_set_connection=utf8mb4",
+    "SET SESSION wait_timeout = 1800",
+    "SET SESSION interactive_timeout = 1800",
+    "SET SESSION net_read_timeout = 600",
+    "SET SESSION net_write_timeout = 600",
+    "SET SESSION max_execution_time = 1800000",
+]
+
+
+def crear_engine(url, modo, pool_size):
+    engine = create_engine(url, pool_size=pool_size, max_overflow=0, pool_pre_ping=False)
+    if modo == 'por_conexion':
+        event.listen(engine, 'connect', configurar_sesion_mysql)
+
+        @event.listens_for(engine, 'checkout')
+        def verificar(dbapi_connection, connection_record, connection_proxy):
+            if not connection_record.info.get(SESION_MYSQL_MARCADOR):
+                configurar_sesion_mysql(dbapi_connection, connection_record)
+    return engine
+
+
+def simular_request(engine, modo):
+    inicio = time.perf_counter()
+    with engine.connect() as conn:
+        if modo == 'por_request':
+            for sql in SET_POR_REQUEST:
+                conn.execute(text(sql))
+        conn.execute(text('SELECT 1'))
+        conn.commit()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def medir(url, modo, hilos, total_requests):
+    engine = crear_engine(url, modo, pool_size=hilos)
+    try:
+        # Calentar el pool para que ambos modos partan con conexiones abiertas
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            list(executor.map(lambda _: simular_request(engine, modo), range(hilos * 2)))
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            latencias = list(executor.map(lambda _: simular_request(engine, modo), range(total_requests)))
+        duracion = time.perf_counter() - inicio
+    finally:
+        engine.dispose()
+
+    latencias.sort()
+    return {
+        'modo': modo,
+        'requests': total_requests,
+        'hilos': hilos,
+        'p50_ms': statistics.median(latencias),
+        'p95_ms': latencias[int(len(latencias) * 0.95) - 1],
+        'media_ms': statistics.fmean(latencias),
+        'requests_por_segundo': total_requests / duracion,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=os.environ.get('DATABASE_URL'), help='URL SQLAlchemy de MySQL')
+    parser.add_argument('--hilos', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    if not args.url or not args.url.startswith('mysql'):
+        print("❌ Se requiere una URL MySQL (DATABASE_URL o --url)")
+        return 1
+
+    resultados = [medir(args.url, modo, args.hilos, args.requests) for modo in ('por_request', 'por_conexion')]
+
+    for r in resultados:
+        print(f"{r['modo']:>13}: p50 {r['p50_ms']:.2f} ms | p95 {r['p95_ms']:.2f} ms | "
+              f"media {r['media_ms']:.2f} ms | {r['requests_por_segundo']:.0f} req/s")
+
+    antes, despues = resultados
+    print(f"\n⏱️ Ahorro por request (media): {antes['media_ms'] - despues['media_ms']:.2f} ms "
+          f"con {args.hilos} hilos concurrentes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
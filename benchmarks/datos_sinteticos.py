@@ -0,0 +1,331 @@
+"""
+Generador determinista de datos sintéticos para benchmarks
+==========================================================
+
+Con la misma semilla produce exactamente los mismos datos:
+
+- generar_actividades: plan de actividades con EDT jerárquico (fases,
+  paquetes y tareas hasta `profundidad` niveles), fechas encadenadas por
+  predecesoras, recursos y progreso. Es la base de todo lo demás.
+- generar_dataset: inserta en la base de datos activa N proyectos × M
+  actividades × K trabajadores, con sus avances (avance_actividad) e
+  historial de avances en distintos estados de validación.
+- generar_gantt_xlsx / generar_control_xlsx: archivos con el formato de
+  plantilla_proyecto_gantt.xlsx y de la exportación de control, listos para
+  subir a /subir_gantt_xlsx y /subir_control_actividades.
+
+Se usa desde bench_endpoints.py; también puede poblar una base de desarrollo:
+
+    from benchmarks.datos_sinteticos import generar_dataset
+    with app.app_context():
+        generar_dataset(proyectos=50, actividades=500, trabajadores=80)
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import openpyxl
+
+# Encabezados de plantilla_proyecto_gantt.xlsx
+COLUMNAS_GANTT = [
+    'Id', 'Nivel de esquema', 'EDT', 'Nombre de tarea', 'Duración',
+    'Comienzo', 'Fin', 'Predecesoras', 'Nombres de los recursos'
+]
+
+# Encabezados de la exportación de control (exportar_actividades_xlsx)
+COLUMNAS_CONTROL = COLUMNAS_GANTT + ['Progreso (%)']
+
+NOMBRES_FASE = ['Diagnóstico', 'Diseño', 'Licitación', 'Construcción', 'Habilitación', 'Cierre']
+NOMBRES_TAREA = [
+    'Levantamiento', 'Planos de arquitectura', 'Cálculo estructural', 'Especificaciones técnicas',
+    'Instalaciones eléctricas', 'Instalaciones sanitarias', 'Revisión de especialidades',
+    'Presupuesto', 'Obras civiles', 'Terminaciones', 'Recepción', 'Informe final'
+]
+
+FECHA_BASE = date(2026, 1, 5)
+
+
+def codigo_recurso(indice):
+    """nombrecorto del trabajador sintético `indice` (R001, R002...)"""
+    return f'R{indice + 1:03d}'
+
+
+def generar_edt(cantidad, profundidad, aleatorio):
+    """
+    Lista [(edt, nivel)] en preorden: un resumen raíz '1' y bajo él una
+    jerarquía de hasta `profundidad` niveles con ramas de tamaño variable.
+    """
+    ruta = [1]
+    filas = [('1', 1)]
+    while len(filas) < cantidad:
+        nivel = len(ruta)
+        opcion = aleatorio.random()
+        if nivel < 2 or (nivel < profundidad and opcion < 0.35):
+            ruta.append(1)  # Primer hijo
+        elif nivel > 2 and opcion > 0.85:
+            ruta.pop()  # Siguiente hermano del padre
+            ruta[-1] += 1
+        else:
+            ruta[-1] += 1  # Siguiente hermano
+        filas.append(('.'.join(str(parte) for parte in ruta), len(ruta)))
+    return filas
+
+
+def generar_actividades(cantidad, codigos_recursos, profundidad=4, semilla=42, inicio=FECHA_BASE):
+    """
+    Plan de `cantidad` actividades de un proyecto.
+
+    Las tareas hoja duran 1-20 días y la mayoría depende de la tarea anterior
+    (fin a comienzo); los resúmenes abarcan a sus hijos.
+
+    Returns:
+        list[dict]: id (fila, 1..n), nivel, edt, nombre, duracion, inicio, fin,
+        predecesoras, recursos y progreso (0-100), en preorden.
+    """
+    aleatorio = random.Random(semilla)
+    estructura = generar_edt(cantidad, profundidad, aleatorio)
+    actividades = []
+    for indice, (edt, nivel) in enumerate(estructura):
+        es_resumen = indice + 1 < len(estructura) and estructura[indice + 1][1] > nivel
+        base = NOMBRES_FASE if nivel <= 2 else NOMBRES_TAREA
+        actividades.append({
+            'id': indice + 1,
+            'nivel': nivel,
+            'edt': edt,
+            'nombre': f'{aleatorio.choice(base)} {edt}',
+            'resumen': es_resumen,
+            'duracion': 0,
+            'inicio': None,
+            'fin': None,
+            'predecesoras': None,
+            'recursos': None,
+            'progreso': 0.0,
+        })
+
+    # Tareas hoja: fechas encadenadas y recursos
+    anterior = None
+    for actividad in actividades:
+        if actividad['resumen']:
+            continue
+        duracion = aleatorio.randint(1, 20)
+        if anterior and aleatorio.random() < 0.7:
+            actividad['predecesoras'] = str(anterior['id'])
+            comienzo = anterior['fin'] + timedelta(days=1)
+        else:
+            comienzo = anterior['inicio'] if anterior else inicio
+        actividad.update(duracion=duracion, inicio=comienzo, fin=comienzo + timedelta(days=duracion - 1))
+        if codigos_recursos:
+            elegidos = aleatorio.sample(codigos_recursos, min(len(codigos_recursos), aleatorio.randint(1, 2)))
+            actividad['recursos'] = ';'.join(f'{codigo}[{aleatorio.choice((50, 100))}%]' for codigo in elegidos)
+        actividad['progreso'] = float(aleatorio.choice((0, 0, 10, 25, 50, 75, 100)))
+        anterior = actividad
+
+    # Resúmenes: de abajo hacia arriba abarcan a sus hijos directos
+    for indice in range(len(actividades) - 1, -1, -1):
+        actividad = actividades[indice]
+        if not actividad['resumen']:
+            continue
+        hijos = []
+        for siguiente in actividades[indice + 1:]:
+            if siguiente['nivel'] <= actividad['nivel']:
+                break
+            if siguiente['nivel'] == actividad['nivel'] + 1:
+                hijos.append(siguiente)
+        actividad['inicio'] = min(hijo['inicio'] for hijo in hijos)
+        actividad['fin'] = max(hijo['fin'] for hijo in hijos)
+        actividad['duracion'] = (actividad['fin'] - actividad['inicio']).days + 1
+        actividad['progreso'] = round(sum(hijo['progreso'] for hijo in hijos) / len(hijos), 2)
+
+    return actividades
+
+
+def _fila_gantt(actividad, formato_fecha='%Y-%m-%d'):
+    return [
+        actividad['id'], actividad['nivel'], actividad['edt'], actividad['nombre'], actividad['duracion'],
+        actividad['inicio'].strftime(formato_fecha), actividad['fin'].strftime(formato_fecha),
+        actividad['predecesoras'], actividad['recursos']
+    ]
+
+
+def generar_gantt_xlsx(ruta, actividades=200, trabajadores=20, profundidad=4, semilla=42):
+    """Escribir un Gantt con el formato de plantilla_proyecto_gantt.xlsx; devuelve el plan"""
+    codigos = [codigo_recurso(i) for i in range(trabajadores)]
+    plan = generar_actividades(actividades, codigos, profundidad=profundidad, semilla=semilla)
+
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Sheet1')
+    hoja.append(COLUMNAS_GANTT)
+    for actividad in plan:
+        hoja.append(_fila_gantt(actividad))
+    libro.save(ruta)
+    return plan
+
+
+def generar_control_xlsx(ruta, requerimiento_id, semilla=42):
+    """
+    Escribir un archivo de control (formato de exportar_actividades_xlsx) para
+    las actividades de un requerimiento de la base activa, con el progreso de
+    las tareas hoja modificado de forma determinista.
+
+    Returns:
+        int: filas escritas
+    """
+    from app import db
+    from app.models import ActividadProyecto
+
+    aleatorio = random.Random(semilla)
+    filas = db.session.execute(
+        db.select(
+            ActividadProyecto.id, ActividadProyecto.nivel_esquema, ActividadProyecto.edt,
+            ActividadProyecto.nombre_tarea, ActividadProyecto.duracion, ActividadProyecto.fecha_inicio,
+            ActividadProyecto.fecha_fin, ActividadProyecto.predecesoras, ActividadProyecto.recursos,
+            ActividadProyecto.progreso
+        ).where(ActividadProyecto.requerimiento_id == requerimiento_id).order_by(ActividadProyecto.id)
+    ).all()
+
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Actividades')
+    hoja.append(COLUMNAS_CONTROL)
+    for fila in filas:
+        progreso = float(fila.progreso or 0)
+        if fila.recursos:
+            progreso = float(min(100, progreso + aleatorio.choice((0, 5, 10, 25))))
+        hoja.append([
+            fila.id, fila.nivel_esquema, fila.edt, fila.nombre_tarea, fila.duracion,
+            fila.fecha_inicio.strftime('%d/%m/%Y'), fila.fecha_fin.strftime('%d/%m/%Y'),
+            fila.predecesoras, fila.recursos, progreso
+        ])
+    libro.save(ruta)
+    return len(filas)
+
+
+def _crear_catalogos():
+    """Sector, tipo de recinto, recintos, estados y grupos mínimos (ids fijos)"""
+    from app import db
+    from app.models import Estado, Grupo, Recinto, Sector, TipoRecinto
+
+    db.session.add(Sector(id=1, nombre='Sector Benchmark'))
+    db.session.add(TipoRecinto(id=1, nombre='Tipo Benchmark', id_sector=1))
+    db.session.add_all([Recinto(id=i, nombre=f'Recinto {i}', id_tiporecinto=1) for i in (1, 2, 3)])
+    db.session.add_all([
+        Estado(id=i, nombre=nombre) for i, nombre in enumerate(
+            ['Ingresado', 'En revisión', 'Aceptado', 'Desarrollo Aceptado', 'Desarrollo Completado'], start=1
+        )
+    ])
+    db.session.add_all([Grupo(id=i, nombre=f'Grupo {i}') for i in (1, 2)])
+    db.session.flush()
+
+
+def generar_dataset(proyectos=20, actividades=200, trabajadores=50, avances=3, profundidad=4, semilla=42):
+    """
+    Poblar la base activa (dentro de un app_context) con datos sintéticos.
+
+    Crea los catálogos mínimos, `trabajadores` trabajadores (el primero es
+    SUPERADMIN), `proyectos` requerimientos en estados 4 y 5 con `actividades`
+    actividades cada uno, un avance_actividad por recurso de cada tarea hoja y
+    `avances` registros de historial por tarea hoja con avance.
+
+    Returns:
+        dict: ids generados y totales por tabla
+    """
+    from app import db
+    from app.models import (
+        ActividadProyecto, AvanceActividad, HistorialAvanceActividad, Requerimiento,
+        Trabajador, UserRole
+    )
+
+    aleatorio = random.Random(semilla)
+    _crear_catalogos()
+
+    codigos = [codigo_recurso(i) for i in range(trabajadores)]
+    db.session.execute(Trabajador.__table__.insert(), [
+        {
+            'nombre': f'Trabajador {codigo}', 'nombrecorto': codigo, 'email': f'{codigo.lower()}@benchmark.cl',
+            'nombre_normalizado': Trabajador.normalizar_clave(f'Trabajador {codigo}'),
+            'nombrecorto_normalizado': Trabajador.normalizar_clave(codigo),
+            'activo': True, 'intentos_fallidos': 0, 'recinto_id': 1 + i % 3,
+            'rol': UserRole.SUPERADMIN if i == 0 else None
+        }
+        for i, codigo in enumerate(codigos)
+    ])
+    ids_trabajador = dict(db.session.execute(
+        db.select(Trabajador.nombrecorto, Trabajador.id).where(Trabajador.nombrecorto.in_(codigos))
+    ).all())
+
+    db.session.execute(Requerimiento.__table__.insert(), [
+        {
+            'nombre': f'Proyecto sintético {i + 1}', 'fecha': datetime(2026, 1, 1), 'id_sector': 1,
+            'id_tiporecinto': 1, 'id_recinto': 1 + i % 3, 'id_estado': 4 if i % 2 == 0 else 5,
+            'id_grupo': 1 + i % 2, 'activo': True
+        }
+        for i in range(proyectos)
+    ])
+    ids_proyecto = db.session.execute(
+        db.select(Requerimiento.id).where(Requerimiento.nombre.like('Proyecto sintético %'))
+        .order_by(Requerimiento.id)
+    ).scalars().all()
+
+    totales = {'actividades': 0, 'avances': 0, 'historial': 0}
+    for orden, requerimiento_id in enumerate(ids_proyecto):
+        plan = generar_actividades(actividades, codigos, profundidad=profundidad, semilla=semilla + orden)
+        db.session.execute(ActividadProyecto.__table__.insert(), [
+            {
+                'requerimiento_id': requerimiento_id, 'edt': actividad['edt'], 'nombre_tarea': actividad['nombre'],
+                'nivel_esquema': actividad['nivel'], 'fecha_inicio': actividad['inicio'],
+                'fecha_fin': actividad['fin'], 'duracion': actividad['duracion'], 'id_gantt': actividad['id'],
+                'predecesoras': actividad['predecesoras'], 'recursos': actividad['recursos'],
+                'progreso': actividad['progreso'], 'porcentaje_avance_validado': 0, 'activo': True
+            }
+            for actividad in plan
+        ])
+        ids_por_edt = dict(db.session.execute(
+            db.select(ActividadProyecto.edt, ActividadProyecto.id)
+            .where(ActividadProyecto.requerimiento_id == requerimiento_id)
+        ).all())
+
+        filas_avance = []
+        filas_historial = []
+        for actividad in plan:
+            if actividad['resumen'] or not actividad['recursos']:
+                continue
+            actividad_id = ids_por_edt[actividad['edt']]
+            responsables = [ids_trabajador[recurso.split('[')[0]] for recurso in actividad['recursos'].split(';')]
+            for trabajador_id in responsables:
+                filas_avance.append({
+                    'requerimiento_id': requerimiento_id, 'trabajador_id': trabajador_id,
+                    'actividad_id': actividad_id, 'porcentaje_asignacion': 100.0,
+                    'progreso_actual': actividad['progreso'], 'progreso_anterior': 0.0,
+                    'fecha_registro': actividad['inicio']
+                })
+            if not actividad['progreso']:
+                continue
+            # Historial: `avances` pasos crecientes hasta el progreso actual
+            anterior = 0.0
+            for paso in range(1, avances + 1):
+                nuevo = round(actividad['progreso'] * paso / avances, 2)
+                estado = aleatorio.choice(('pendiente', 'pendiente', 'validado', 'rechazado'))
+                filas_historial.append({
+                    'requerimiento_id': requerimiento_id, 'trabajador_id': responsables[0],
+                    'actividad_id': actividad_id, 'progreso_anterior': anterior, 'progreso_nuevo': nuevo,
+                    'diferencia': nuevo - anterior,
+                    'fecha_cambio': datetime.combine(actividad['inicio'], datetime.min.time()) + timedelta(days=paso),
+                    'sesion_guardado': f'bench-{requerimiento_id}-{paso}',
+                    'validado': estado != 'pendiente', 'estado_validacion': estado
+                })
+                anterior = nuevo
+
+        if filas_avance:
+            db.session.execute(AvanceActividad.__table__.insert(), filas_avance)
+        if filas_historial:
+            db.session.execute(HistorialAvanceActividad.__table__.insert(), filas_historial)
+        totales['actividades'] += len(plan)
+        totales['avances'] += len(filas_avance)
+        totales['historial'] += len(filas_historial)
+
+    db.session.commit()
+    return {
+        'admin_id': ids_trabajador[codigos[0]],
+        'trabajadores': [ids_trabajador[codigo] for codigo in codigos],
+        'proyectos': list(ids_proyecto),
+        **totales,
+    }
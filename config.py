@@ -78,6 +78,14 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'xlsx', 'xls', 'csv'}
     
+    # Tareas en segundo plano: False = las ejecuta el worker (python manage.py worker);
+    # True = se ejecutan dentro de la request que las encola (tests, sin worker)
+    TAREAS_EN_PROCESO = os.environ.get('TAREAS_EN_PROCESO', 'False').lower() == 'true'
+    
+    # Perfil SQL: un endpoint que excede su @presupuesto_consultas registra un
+    # warning; en modo estricto el request falla (para detectar N+1 en tests)
+    PRESUPUESTO_CONSULTAS_ESTRICTO = os.environ.get('PRESUPUESTO_CONSULTAS_ESTRICTO', 'False').lower() == 'true'
+    
     # Cache
     CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
     CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))
@@ -137,6 +145,8 @@ class TestingConfig(Config):
     # Configuraciones para tests
     SKIP_DB_INIT = True
     PRESERVE_CONTEXT_ON_EXCEPTION = False
+    TAREAS_EN_PROCESO = True
+    PRESUPUESTO_CONSULTAS_ESTRICTO = True
     
     @staticmethod
     def init_app(app):
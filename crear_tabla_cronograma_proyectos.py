@@ -0,0 +1,87 @@
+"""
+Script para la ruta crítica de los proyectos: agrega a actividad_proyecto el Id
+del Gantt y las columnas de resultado (fechas tempranas/tardías, holgura,
+es_critica), los conteos de críticas a resumen_proyecto, crea la tabla
+cronograma_proyecto y calcula la ruta crítica de todos los proyectos.
+Ejecutar: docker-compose exec proyectos_app python crear_tabla_cronograma_proyectos.py
+
+Las actividades importadas antes de este script no tienen id_gantt: sus
+predecesoras se resuelven por la posición de la fila (orden de id), que es el
+Id de MS Project mientras el Gantt no se haya reordenado. Volver a subir la
+carta Gantt guarda el Id del archivo y las predecesoras.
+"""
+
+from app import create_app, db
+from sqlalchemy import text
+
+COLUMNAS_ACTIVIDAD = [
+    ("id_gantt", "INT NULL COMMENT 'Id de la fila en el archivo Gantt' AFTER dias_corridos"),
+    ("inicio_temprano", "DATE NULL"),
+    ("fin_temprano", "DATE NULL"),
+    ("inicio_tardio", "DATE NULL"),
+    ("fin_tardio", "DATE NULL"),
+    ("holgura_total", "INT NULL COMMENT 'Holgura total en días'"),
+    ("es_critica", "BOOLEAN DEFAULT FALSE NOT NULL COMMENT 'En la ruta crítica'"),
+]
+
+COLUMNAS_RESUMEN = [
+    ("actividades_criticas", "INT DEFAULT 0 NOT NULL"),
+    ("criticas_atrasadas", "INT DEFAULT 0 NOT NULL"),
+]
+
+
+def _agregar_columnas(tabla, columnas):
+    for nombre, definicion in columnas:
+        try:
+            db.session.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {definicion}"))
+            db.session.commit()
+            print(f"✅ Columna {tabla}.{nombre} agregada")
+        except Exception as e:
+            if "Duplicate column name" in str(e):
+                print(f"⚠️  Columna {tabla}.{nombre} ya existe")
+                db.session.rollback()
+            else:
+                raise
+
+
+def crear_tabla_cronograma_proyectos():
+    app = create_app()
+
+    with app.app_context():
+        print("\n" + "="*80)
+        print("🔧 RUTA CRÍTICA DE PROYECTOS")
+        print("="*80 + "\n")
+
+        try:
+            from app.models import CronogramaProyecto, ResumenProyecto
+            from app.services.resumen_proyectos_service import refrescar_resumenes
+            from app.services.ruta_critica_service import recalcular_cronogramas
+
+            print("📋 Agregando columnas de ruta crítica a actividad_proyecto...")
+            _agregar_columnas('actividad_proyecto', COLUMNAS_ACTIVIDAD)
+
+            print("\n📋 Agregando conteos de críticas a resumen_proyecto...")
+            ResumenProyecto.__table__.create(db.engine, checkfirst=True)
+            _agregar_columnas('resumen_proyecto', COLUMNAS_RESUMEN)
+
+            # checkfirst: no falla si la tabla ya existe
+            CronogramaProyecto.__table__.create(db.engine, checkfirst=True)
+            print("\n✅ Tabla cronograma_proyecto lista")
+
+            total = recalcular_cronogramas()
+            refrescar_resumenes()
+            db.session.commit()
+            print(f"✅ Ruta crítica calculada para {total} proyectos (resúmenes actualizados)")
+
+            print("\n" + "="*80)
+            print("🎉 RUTA CRÍTICA LISTA")
+            print("="*80 + "\n")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    crear_tabla_cronograma_proyectos()
@@ -0,0 +1,41 @@
+"""
+Script para crear la tabla del resumen materializado de proyectos (resumen_proyecto)
+y calcular el resumen inicial de todos los proyectos
+Ejecutar: docker-compose exec proyectos_app python crear_tabla_resumen_proyectos.py
+Recálculo nocturno (cron): docker-compose exec proyectos_app python manage.py reconstruir-resumenes
+"""
+
+from app import create_app, db
+
+def crear_tabla_resumen_proyectos():
+    app = create_app()
+
+    with app.app_context():
+        print("\n" + "="*80)
+        print("🔧 CREANDO TABLA DE RESUMEN DE PROYECTOS")
+        print("="*80 + "\n")
+
+        try:
+            from app.models import ResumenProyecto
+            from app.services.resumen_proyectos_service import refrescar_resumenes
+
+            # checkfirst: no falla si la tabla ya existe
+            ResumenProyecto.__table__.create(db.engine, checkfirst=True)
+            print("✅ Tabla resumen_proyecto lista (con índice idx_resumen_proyecto_vigente)")
+
+            total = refrescar_resumenes()
+            db.session.commit()
+            print(f"✅ Resumen calculado para {total} proyectos")
+
+            print("\n" + "="*80)
+            print("🎉 TABLA CREADA EXITOSAMENTE")
+            print("="*80 + "\n")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    crear_tabla_resumen_proyectos()
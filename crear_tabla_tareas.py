@@ -0,0 +1,34 @@
+"""
+Script para crear la tabla de la cola de tareas en segundo plano (tarea_segundo_plano)
+Ejecutar: docker-compose exec proyectos_app python crear_tabla_tareas.py
+Luego iniciar el worker: docker-compose up -d proyectos_worker
+"""
+
+from app import create_app, db
+
+def crear_tabla_tareas():
+    app = create_app()
+
+    with app.app_context():
+        print("\n" + "="*80)
+        print("🔧 CREANDO TABLA DE TAREAS EN SEGUNDO PLANO")
+        print("="*80 + "\n")
+
+        try:
+            from app.models import TareaSegundoPlano
+
+            # checkfirst: no falla si la tabla ya existe
+            TareaSegundoPlano.__table__.create(db.engine, checkfirst=True)
+            print("✅ Tabla tarea_segundo_plano lista (con índice idx_tarea_estado_disponible)")
+
+            print("\n" + "="*80)
+            print("🎉 TABLA CREADA EXITOSAMENTE")
+            print("="*80 + "\n")
+
+        except Exception as e:
+            print(f"\n❌ Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    crear_tabla_tareas()
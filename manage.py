@@ -216,6 +216,61 @@ def routes():
     print("-" * 80)
     print(f"Total: {len(rules)} rutas")
 
+@app.cli.command()
+@with_appcontext
+def reconstruir_resumenes():
+    """Recalcular el resumen de cronograma de todos los proyectos (cron nocturno)"""
+    from app.services.resumen_proyectos_service import refrescar_resumenes
+
+    print("📊 Recalculando resumen de proyectos...")
+    try:
+        total = refrescar_resumenes()
+        db.session.commit()
+        print(f"✅ {total} resúmenes de proyecto recalculados")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+@app.cli.command()
+@with_appcontext
+def recalcular_cronogramas():
+    """Recalcular la ruta crítica y las holguras de todos los proyectos"""
+    from app.services.ruta_critica_service import recalcular_cronogramas as recalcular
+
+    print("🧮 Recalculando ruta crítica de proyectos...")
+    try:
+        total = recalcular()
+        db.session.commit()
+        print(f"✅ Ruta crítica recalculada para {total} proyectos")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+@app.cli.command()
+@click.option('--nombre', default=None, help='Identificador del worker (por defecto host:pid)')
+@click.option('--espera', default=2.0, help='Segundos entre consultas cuando la cola está vacía')
+@click.option('--una-vez', is_flag=True, help='Ejecutar las tareas disponibles y terminar')
+def worker(nombre, espera, una_vez):
+    """Procesar la cola de tareas en segundo plano (Gantt, control, backups)"""
+    import signal
+    from app.services.tareas_service import Worker
+
+    proceso = Worker(app, nombre=nombre, espera=espera)
+    if una_vez:
+        ejecutadas = 0
+        while proceso.ejecutar_una():
+            ejecutadas += 1
+        print(f"✅ {ejecutadas} tareas ejecutadas")
+        return
+
+    # SIGTERM (docker stop) termina tras la tarea en curso; lo que quede
+    # pendiente lo retoma el próximo worker
+    signal.signal(signal.SIGTERM, proceso.detener)
+    signal.signal(signal.SIGINT, proceso.detener)
+    proceso.run()
+
 if __name__ == '__main__':
     app.cli()
     """Mostrar todas las rutas disponibles"""
@@ -0,0 +1,75 @@
+"""
+Script para mover los archivos Gantt de gantt_archivo al almacén en disco
+Ejecutar: docker-compose exec proyectos_app python migrar_gantt_archivos.py
+
+1. Agrega la columna sha256 y permite archivo NULL.
+2. Copia cada blob al almacén direccionado por contenido y deja archivo en NULL.
+3. Compacta la tabla para devolver el espacio de los blobs.
+"""
+
+from app import create_app, db
+from sqlalchemy import text
+
+def migrar_archivos():
+    app = create_app()
+
+    with app.app_context():
+        from app.models import GanttArchivo
+        from app.services.gantt_store import obtener_gantt_store, asegurar_en_store
+
+        print("\n" + "="*80)
+        print("📦 MIGRANDO ARCHIVOS GANTT AL ALMACÉN EN DISCO")
+        print("="*80 + "\n")
+
+        try:
+            print("📋 Ajustando columnas de gantt_archivo...")
+            try:
+                db.session.execute(text("""
+                    ALTER TABLE gantt_archivo
+                    ADD COLUMN sha256 VARCHAR(64) NULL AFTER id_requerimiento,
+                    ADD INDEX ix_gantt_archivo_sha256 (sha256)
+                """))
+                db.session.commit()
+                print("✅ Columna sha256 agregada")
+            except Exception as e:
+                if "Duplicate column name" in str(e):
+                    print("⚠️  Columna sha256 ya existe")
+                    db.session.rollback()
+                else:
+                    raise
+
+            db.session.execute(text("ALTER TABLE gantt_archivo MODIFY archivo LONGBLOB NULL"))
+            db.session.commit()
+            print("✅ Columna archivo ahora admite NULL")
+
+            store = obtener_gantt_store()
+            ids = [fila[0] for fila in db.session.execute(
+                text("SELECT id FROM gantt_archivo WHERE archivo IS NOT NULL")
+            )]
+            print(f"\n📋 {len(ids)} archivos por migrar a {store.raiz}")
+
+            # Uno por uno: cada blob puede pesar varios MB
+            for gantt_id in ids:
+                gantt = db.session.get(GanttArchivo, gantt_id)
+                sha256 = asegurar_en_store(gantt, store)
+                db.session.commit()
+                db.session.expunge(gantt)
+                print(f"   ✅ {gantt_id}: {gantt.nombre_archivo} -> {sha256[:12]}")
+
+            if ids:
+                db.session.execute(text("OPTIMIZE TABLE gantt_archivo"))
+                db.session.commit()
+                print("\n✅ Tabla compactada")
+
+            print("\n" + "="*80)
+            print("🎉 ARCHIVOS GANTT MIGRADOS EXITOSAMENTE")
+            print("="*80 + "\n")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrar_archivos()
@@ -4,10 +4,31 @@ Configuración central para tests con pytest
 import pytest
 import tempfile
 import os
+from flask import Flask
 from app import create_app
-from app.models import db, User, CustomRole, Page, UserPagePermission
+from app.models import db, CustomRole, Page
 from werkzeug.security import generate_password_hash
 
+@pytest.fixture
+def sqlite_app():
+    """Aplicación mínima con SQLite en memoria, sin create_app (tests de servicios)
+
+    Cada módulo puede extenderla redefiniendo el fixture con el mismo nombre:
+
+        @pytest.fixture
+        def sqlite_app(sqlite_app):
+            sqlite_app.register_blueprint(controllers_bp)
+            return sqlite_app
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
 @pytest.fixture(scope='session')
 def app():
     """Fixture de aplicación Flask para testing"""
@@ -56,6 +77,10 @@ def auth_client(client):
 
 def _create_test_data():
     """Crear datos de prueba básicos"""
+    # User y UserPagePermission ya no existen en app.models: se importan aquí
+    # para que el resto de los fixtures no dependa de ellos
+    from app.models import User, UserPagePermission
+    
     # Crear roles
     superadmin_role = CustomRole(name='SUPERADMIN', description='Super Administrator')
     user_role = CustomRole(name='USER', description='Regular User')
@@ -109,11 +134,13 @@ def _create_test_data():
 @pytest.fixture
 def superadmin_user(app):
     """Usuario superadmin para tests"""
+    from app.models import User
     with app.app_context():
         return User.query.filter_by(username='superadmin').first()
 
 @pytest.fixture
 def regular_user(app):
     """Usuario regular para tests"""
+    from app.models import User
     with app.app_context():
         return User.query.filter_by(username='testuser').first()
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Tests del backup en streaming (BackupManager.create_backup) con un mysqldump falso
+"""
+import gzip
+import hashlib
+import json
+import os
+import stat
+import sys
+import time
+
+import pytest
+from flask import Flask
+
+from app.routes.admin_routes import BackupManager
+from app.services.backup_service import enhanced_backup_service
+
+DUMP_FALSO = """-- MySQL dump falso
+CREATE TABLE `trabajadores` (`id` int);
+INSERT INTO `trabajadores` VALUES (1),(2),(3);
+CREATE TABLE `actividades` (`id` int);
+INSERT INTO `actividades` VALUES (1);
+INSERT INTO `actividades` VALUES (2),(3);
+"""
+
+
+def _binario_falso(tmp_path, repeticiones=1, codigo_salida=0, stderr='', espera=0):
+    """Script ejecutable que imita a mysqldump escribiendo DUMP_FALSO en stdout"""
+    script = tmp_path / 'mysqldump_falso.py'
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        f"time.sleep({espera})\n"
+        f"dump = {DUMP_FALSO!r}\n"
+        f"for _ in range({repeticiones}):\n"
+        "    sys.stdout.write(dump)\n"
+        f"sys.stderr.write({stderr!r})\n"
+        f"sys.exit({codigo_salida})\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """BackupManager apuntando a un directorio temporal, sin consultar MySQL"""
+    app = Flask(__name__)
+    monkeypatch.chdir(tmp_path)
+    with app.app_context():
+        manager = BackupManager()
+        manager.chunk_size = 64  # Bloques pequeños para ejercitar los cortes entre bloques
+        manager.intervalo_progreso = 0
+        monkeypatch.setattr(manager, '_estimar_tamano_dump', lambda db_config: len(DUMP_FALSO) * 10)
+        yield manager
+
+
+class TestBackupStreaming:
+
+    def test_backup_comprimido_con_checksum_y_contadores(self, manager, tmp_path):
+        manager.mysqldump_bin = _binario_falso(tmp_path, repeticiones=10)
+
+        resultado = manager.create_backup(backup_name='prueba')
+
+        assert resultado['success'] is True
+        filepath = os.path.join(manager.backup_dir, resultado['filename'])
+        with gzip.open(filepath, 'rb') as f:
+            contenido = f.read()
+        assert contenido == (DUMP_FALSO * 10).encode()
+        assert resultado['checksum_sha256'] == hashlib.sha256(contenido).hexdigest()
+
+        with open(manager.get_metadata_path(resultado['filename'])) as f:
+            metadata = json.load(f)
+        assert metadata['uncompressed_size'] == len(contenido)
+        assert metadata['tables'] == 20
+        assert metadata['insert_statements'] == 30
+        assert metadata['estimated_rows'] == 60
+        assert not os.path.exists(filepath + '.part')
+
+    def test_progreso_visible_en_tracker(self, manager, tmp_path):
+        manager.mysqldump_bin = _binario_falso(tmp_path, repeticiones=5)
+
+        manager.create_backup()
+
+        tracker = enhanced_backup_service.progress_tracker
+        assert tracker.progress_percent == 100
+        assert tracker.details['bytes_leidos'] > 0
+
+    def test_backup_sin_comprimir(self, manager, tmp_path):
+        manager.mysqldump_bin = _binario_falso(tmp_path)
+
+        resultado = manager.create_backup(compress=False)
+
+        assert resultado['filename'].endswith('.sql')
+        with open(os.path.join(manager.backup_dir, resultado['filename']), 'rb') as f:
+            assert f.read() == DUMP_FALSO.encode()
+
+    def test_error_de_mysqldump_no_deja_archivos(self, manager, tmp_path):
+        manager.mysqldump_bin = _binario_falso(tmp_path, codigo_salida=2, stderr='Access denied')
+
+        resultado = manager.create_backup(backup_name='fallido')
+
+        assert resultado['success'] is False
+        assert 'Access denied' in resultado['message']
+        assert os.listdir(manager.backup_dir) == []
+
+    def test_mysqldump_bloqueado_sin_escribir_se_mata(self, manager, tmp_path):
+        # Imita un mysqldump esperando un metadata lock: no escribe nada en stdout
+        manager.mysqldump_bin = _binario_falso(tmp_path, espera=60)
+        manager.timeout_segundos = 1
+
+        inicio = time.monotonic()
+        resultado = manager.create_backup(backup_name='bloqueado')
+
+        assert time.monotonic() - inicio < 30
+        assert resultado['success'] is False
+        assert 'tiempo máximo' in resultado['message']
+        assert os.listdir(manager.backup_dir) == []
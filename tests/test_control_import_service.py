@@ -0,0 +1,154 @@
+"""
+Tests de la importación del archivo de control (app/services/control_import_service.py)
+"""
+from datetime import date, datetime
+from io import BytesIO
+
+import openpyxl
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, HistorialControl, Trabajador
+from app.services.control_import_service import ImportadorControl, mapear_columnas_control, separar_recursos
+
+ENCABEZADOS = ['Id', 'Nivel de esquema', 'EDT', 'Nombre de tarea', 'Duración', 'Comienzo', 'Fin',
+               'Predecesoras', 'Nombres de los recursos', 'Progreso (%)']
+
+
+def _crear_actividades(requerimiento_id, cantidad):
+    actividades = [
+        ActividadProyecto(requerimiento_id=requerimiento_id, edt=f'1.{i}', nombre_tarea=f'Tarea {i}',
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10), duracion=9, progreso=0)
+        for i in range(1, cantidad + 1)
+    ]
+    db.session.add_all(actividades)
+    db.session.commit()
+    return actividades
+
+
+def _archivo(filas):
+    workbook = openpyxl.Workbook()
+    hoja = workbook.active
+    hoja.append(ENCABEZADOS)
+    for fila in filas:
+        hoja.append(fila)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _fila(actividad, progreso=0, recursos='', nombre=None):
+    return [actividad.id, 2, actividad.edt, nombre or actividad.nombre_tarea, '9 días',
+            '01/01/2026', datetime(2026, 1, 10), '', recursos, progreso]
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return len(sentencias)
+
+
+def _importar(archivo, requerimiento_id=None):
+    importador = ImportadorControl(requerimiento_id=requerimiento_id, sesion_subida='s1', nombre_archivo='control.xlsx')
+    assert importador.leer(archivo) == []
+    resumen = importador.calcular_diff()
+    return importador, resumen
+
+
+class TestFunciones:
+
+    def test_mapeo_de_columnas_exportadas(self):
+        columnas = mapear_columnas_control(ENCABEZADOS)
+        assert columnas['Id'] == 0
+        assert columnas['EDT'] == 2
+        assert columnas['% completado'] == 9
+
+    def test_separar_recursos(self):
+        assert separar_recursos('ARQ1; ARQ2') == ['ARQ1', 'ARQ2']
+        assert separar_recursos('ARQ1, ARQ2') == ['ARQ1', 'ARQ2']
+        assert separar_recursos('ARQ1') == ['ARQ1']
+
+
+class TestImportadorControl:
+
+    def test_diff_resuelve_por_id_sin_mezclar_proyectos(self, sqlite_app):
+        proyecto_1 = _crear_actividades(1, 2)
+        proyecto_2 = _crear_actividades(2, 2)
+
+        _, resumen = _importar(_archivo([
+            _fila(proyecto_2[0], progreso=50),
+            _fila(proyecto_2[1]),
+            ['', 1, '9.9', 'No existe', 1, '01/01/2026', '02/01/2026', '', '', 0],
+        ]))
+
+        assert resumen['actualizadas'] == 1
+        assert resumen['sin_cambios'] == 1
+        assert resumen['no_encontradas'] == [{'fila': 4, 'edt': '9.9'}]
+        cambio = resumen['cambios'][0]
+        assert cambio['actividad_id'] == proyecto_2[0].id
+        assert cambio['campos'] == {'progreso': [0.0, 50.0]}
+        # Simulación: nada se escribe
+        assert db.session.get(ActividadProyecto, proyecto_2[0].id).progreso == 0
+        assert HistorialControl.query.count() == 0
+        assert proyecto_1[0].progreso == 0
+
+    def test_proyecto_destino_resuelve_por_edt(self, sqlite_app):
+        _crear_actividades(1, 1)
+        proyecto_2 = _crear_actividades(2, 1)
+
+        _, resumen = _importar(_archivo([
+            ['', 2, '1.1', 'Renombrada', '9', '01/01/2026', '10/01/2026', '', '', 0.25]
+        ]), requerimiento_id=2)
+
+        assert resumen['cambios'][0]['actividad_id'] == proyecto_2[0].id
+        assert resumen['cambios'][0]['campos']['progreso'] == [0.0, 25.0]
+
+    def test_aplicar_escribe_cambios_historial_y_avances(self, sqlite_app):
+        actividades = _crear_actividades(1, 2)
+        db.session.add(Trabajador(nombre='Arquitecto', nombrecorto='ARQ1', activo=True))
+        db.session.commit()
+
+        importador, _ = _importar(_archivo([
+            _fila(actividades[0], progreso=0.4, recursos='ARQ1; DESCONOCIDO', nombre='Nueva'),
+            _fila(actividades[1]),
+        ]))
+        assert importador.aplicar() == 1
+        db.session.commit()
+
+        actualizada = db.session.get(ActividadProyecto, actividades[0].id)
+        assert actualizada.nombre_tarea == 'Nueva'
+        assert float(actualizada.progreso) == 40.0
+        assert actualizada.recursos == 'ARQ1; DESCONOCIDO'
+        historial = HistorialControl.query.one()
+        assert historial.actividad_id == actividades[0].id
+        assert historial.datos_anteriores['nombre_tarea'] == 'Tarea 1'
+        assert historial.datos_nuevos['progreso'] == 40.0
+        avance = AvanceActividad.query.one()
+        assert avance.actividad_id == actividades[0].id and avance.progreso_actual == 40.0
+
+        # Reimportar el mismo archivo no duplica avances ni historial
+        importador, resumen = _importar(_archivo([
+            _fila(actividades[0], progreso=0.4, recursos='ARQ1; DESCONOCIDO', nombre='Nueva'),
+        ]))
+        assert resumen['actualizadas'] == 0
+        assert importador.aplicar() == 0
+
+    def test_consultas_constantes(self, sqlite_app):
+        db.session.add(Trabajador(nombre='Arquitecto', nombrecorto='ARQ1', activo=True))
+        pocas = _crear_actividades(1, 3)
+        muchas = _crear_actividades(2, 300)
+
+        def importar(actividades):
+            archivo = _archivo([_fila(a, progreso=30, recursos='ARQ1') for a in actividades])
+            return lambda: _importar(archivo)[0].aplicar()
+
+        assert _contar_consultas(importar(pocas)) == _contar_consultas(importar(muchas)) == 7
@@ -0,0 +1,102 @@
+"""
+Tests de las agregaciones del dashboard de control (app/services/dashboard_service.py)
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, EquipoTrabajo, Trabajador
+from app.services.dashboard_service import resumen_proyectos, calcular_progreso_esperado, evaluar_cronograma
+
+HOY = date(2026, 1, 11)
+
+
+def _crear_proyecto(proyecto_id, trabajadores):
+    """Raíz al 40% + 2 hojas (una completa), 20 días de plazo, 2 avances y equipo"""
+    db.session.add_all([
+        ActividadProyecto(requerimiento_id=proyecto_id, edt='1', nombre_tarea='Raíz', nivel_esquema=1,
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 21), duracion=20, progreso=40),
+        ActividadProyecto(requerimiento_id=proyecto_id, edt='1.1', nombre_tarea='A', nivel_esquema=2,
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 11), duracion=10, progreso=100),
+        ActividadProyecto(requerimiento_id=proyecto_id, edt='1.2', nombre_tarea='B', nivel_esquema=2,
+                          fecha_inicio=date(2026, 1, 11), fecha_fin=date(2026, 1, 21), duracion=10, progreso=0),
+    ])
+    for trabajador in trabajadores:
+        db.session.add(AvanceActividad(requerimiento_id=proyecto_id, trabajador_id=trabajador.id,
+                                       progreso_actual=50, fecha_registro=HOY))
+        db.session.add(EquipoTrabajo(id_requerimiento=proyecto_id, id_trabajador=trabajador.id, id_especialidad=1))
+    db.session.commit()
+
+
+@pytest.fixture
+def trabajadores(sqlite_app):
+    lista = [Trabajador(nombre=f'Trabajador {i}', nombrecorto=f'T{i}', activo=True) for i in range(2)]
+    db.session.add_all(lista)
+    db.session.commit()
+    return lista
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return len(sentencias)
+
+
+class TestReglasCronograma:
+
+    def test_progreso_esperado(self):
+        assert calcular_progreso_esperado(date(2026, 1, 1), date(2026, 1, 21), HOY) == 50.0
+        assert calcular_progreso_esperado(date(2026, 2, 1), date(2026, 3, 1), HOY) == 0
+        assert calcular_progreso_esperado(date(2025, 1, 1), date(2025, 2, 1), HOY) == 100
+        assert calcular_progreso_esperado(HOY, HOY, HOY) is None
+        assert calcular_progreso_esperado(None, HOY, HOY) is None
+
+    def test_umbral_de_atraso(self):
+        assert evaluar_cronograma(48, 50) == ('En tiempo', 0)
+        assert evaluar_cronograma(40, 50) == ('Atrasado', 10)
+        assert evaluar_cronograma(60, 50) == ('Adelantado', 10)
+
+
+class TestResumenProyectos:
+
+    def test_metricas_de_un_proyecto(self, trabajadores):
+        _crear_proyecto(1, trabajadores)
+
+        metricas = resumen_proyectos([1], hoy=HOY)[1]
+
+        assert metricas == {
+            'total_actividades': 3,
+            'actividades_completadas': 1,
+            'progreso': 40.0,
+            'progreso_esperado': 50.0,
+            'estado_cronograma': 'Atrasado',
+            'porcentaje_atraso_adelanto': 10.0,
+            'total_trabajadores': 2,
+            'responsable': 'Trabajador 0'
+        }
+
+    def test_proyecto_sin_actividades(self, sqlite_app):
+        metricas = resumen_proyectos([7], hoy=HOY)[7]
+        assert metricas['total_actividades'] == 0
+        assert metricas['progreso'] == 0
+        assert metricas['estado_cronograma'] == 'En tiempo'
+        assert metricas['responsable'] is None
+
+    def test_consultas_constantes(self, trabajadores):
+        _crear_proyecto(1, trabajadores)
+        consultas_uno = _contar_consultas(lambda: resumen_proyectos([1], hoy=HOY))
+
+        for proyecto_id in range(2, 21):
+            _crear_proyecto(proyecto_id, trabajadores)
+        consultas_veinte = _contar_consultas(lambda: resumen_proyectos(range(1, 21), hoy=HOY))
+
+        assert consultas_uno == consultas_veinte == 4
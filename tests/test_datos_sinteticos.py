@@ -0,0 +1,67 @@
+"""
+Tests del generador de datos sintéticos para benchmarks (benchmarks/datos_sinteticos.py)
+"""
+import openpyxl
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, HistorialAvanceActividad, Requerimiento, Trabajador
+from app.services.gantt_import_service import importar_gantt_xlsx
+from benchmarks.datos_sinteticos import (
+    COLUMNAS_GANTT, generar_actividades, generar_control_xlsx, generar_dataset, generar_gantt_xlsx
+)
+
+
+class TestPlanDeActividades:
+
+    def test_determinista(self):
+        codigos = ['R001', 'R002', 'R003']
+        assert generar_actividades(150, codigos, semilla=7) == generar_actividades(150, codigos, semilla=7)
+        assert generar_actividades(150, codigos, semilla=7) != generar_actividades(150, codigos, semilla=8)
+
+    def test_jerarquia_edt_y_fechas(self):
+        plan = generar_actividades(300, ['R001'], profundidad=4)
+        por_edt = {actividad['edt']: actividad for actividad in plan}
+
+        assert len(plan) == len(por_edt) == 300
+        assert max(actividad['nivel'] for actividad in plan) == 4
+        for actividad in plan[1:]:
+            padre = por_edt[actividad['edt'].rsplit('.', 1)[0]]
+            assert padre['resumen'] and padre['nivel'] == actividad['nivel'] - 1
+            assert padre['inicio'] <= actividad['inicio'] and actividad['fin'] <= padre['fin']
+            if actividad['predecesoras']:
+                assert plan[int(actividad['predecesoras']) - 1]['fin'] < actividad['inicio']
+
+
+class TestArchivos:
+
+    def test_gantt_con_formato_de_plantilla_se_importa(self, sqlite_app, tmp_path):
+        db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+        db.session.commit()
+        ruta = tmp_path / 'gantt.xlsx'
+        plan = generar_gantt_xlsx(ruta, actividades=120, trabajadores=5)
+
+        assert next(openpyxl.load_workbook(ruta).active.iter_rows(max_row=1, values_only=True)) == tuple(COLUMNAS_GANTT)
+        resultado = importar_gantt_xlsx(str(ruta), 1)
+        assert resultado['actividades_procesadas'] == len(plan) == 120
+        assert not resultado['errores']
+
+    def test_control_refleja_las_actividades(self, sqlite_app, tmp_path):
+        generar_dataset(proyectos=1, actividades=40, trabajadores=4)
+        ruta = tmp_path / 'control.xlsx'
+
+        assert generar_control_xlsx(ruta, 1) == 40
+        filas = list(openpyxl.load_workbook(ruta).active.iter_rows(min_row=2, values_only=True))
+        assert {fila[0] for fila in filas} == set(db.session.scalars(db.select(ActividadProyecto.id)))
+
+
+class TestDataset:
+
+    def test_totales_y_superadmin(self, sqlite_app):
+        datos = generar_dataset(proyectos=3, actividades=50, trabajadores=6, avances=2)
+
+        assert len(datos['proyectos']) == Requerimiento.query.count() == 3
+        assert ActividadProyecto.query.count() == datos['actividades'] == 150
+        assert AvanceActividad.query.count() == datos['avances'] > 0
+        assert HistorialAvanceActividad.query.count() == datos['historial'] > 0
+        assert db.session.get(Trabajador, datos['admin_id']).is_superadmin()
+        assert {proyecto.id_estado for proyecto in Requerimiento.query} == {4, 5}
@@ -0,0 +1,83 @@
+"""
+Tests de las exportaciones en streaming (app/services/export_service.py)
+"""
+import csv
+import io
+from datetime import date
+
+import openpyxl
+import pytest
+
+from app import db
+from app.models import ActividadProyecto, Requerimiento
+from app.services import export_service
+from app.services.export_service import generar_csv, escribir_xlsx
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app):
+    """La aplicación SQLite de conftest con el blueprint de controladores"""
+    from app.controllers_main import controllers_bp
+
+    sqlite_app.register_blueprint(controllers_bp)
+    return sqlite_app
+
+
+@pytest.fixture
+def actividades(sqlite_app):
+    db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+    db.session.add_all([
+        ActividadProyecto(requerimiento_id=1, edt=f'1.{i}', nombre_tarea=f'Tarea {i}', nivel_esquema=2,
+                          fecha_inicio=date(2026, 1, 5), fecha_fin=date(2026, 1, 9), duracion=4,
+                          progreso=0.5 if i == 1 else 40, recursos='ARQ1')
+        for i in range(1, 26)
+    ])
+    db.session.commit()
+
+
+class TestGeneradores:
+
+    def test_csv_por_bloques(self, monkeypatch):
+        monkeypatch.setattr(export_service, 'CHUNK_FILAS', 10)
+        bloques = list(generar_csv(['A', 'B'], ([i, f'fila {i}'] for i in range(25)), filas_previas=[['Titulo']]))
+
+        assert len(bloques) == 3
+        filas = list(csv.reader(io.StringIO(''.join(bloques).lstrip('\ufeff')), delimiter=';'))
+        assert filas[0] == ['Titulo']
+        assert filas[1] == ['A', 'B']
+        assert filas[-1] == ['24', 'fila 24']
+
+    def test_xlsx_write_only(self):
+        destino = io.BytesIO()
+        total = escribir_xlsx(destino, 'Hoja', ['Id', 'Progreso'], iter([[1, 50.0], [2, 75.5]]),
+                              anchos=[8, 12], formatos={1: '0.0"%"'}, filas_previas=[[('Título', 16)]])
+        assert total == 2
+
+        hoja = openpyxl.load_workbook(destino).active
+        assert hoja.title == 'Hoja'
+        assert [c.value for c in hoja[2]] == ['Id', 'Progreso']
+        assert hoja['B4'].value == 75.5 and hoja['B4'].number_format == '0.0"%"'
+
+
+class TestEndpointsExportacion:
+
+    def test_xlsx_de_actividades_con_formato_de_control(self, sqlite_app, actividades):
+        from app.services.control_import_service import mapear_columnas_control
+
+        respuesta = sqlite_app.test_client().get('/exportar_actividades_xlsx')
+        assert respuesta.status_code == 200
+        assert respuesta.mimetype == export_service.MIMETYPE_XLSX
+
+        filas = list(openpyxl.load_workbook(io.BytesIO(respuesta.data)).active.iter_rows(values_only=True))
+        assert set(mapear_columnas_control(filas[0])) >= {'Id', 'EDT', 'Nombre de tarea', '% completado'}
+        assert len(filas) == 26
+        assert filas[1][2] == '1.1' and filas[1][5] == '05/01/2026' and filas[1][9] == 50.0
+
+    def test_csv_en_streaming(self, sqlite_app, actividades):
+        respuesta = sqlite_app.test_client().get('/exportar_actividades_xlsx?formato=csv')
+        assert respuesta.is_streamed
+        assert 'attachment' in respuesta.headers['Content-Disposition']
+
+        filas = list(csv.reader(io.StringIO(respuesta.get_data(as_text=True).lstrip('\ufeff')), delimiter=';'))
+        assert filas[0][0] == 'Id'
+        assert len(filas) == 26
@@ -0,0 +1,123 @@
+"""
+Tests de la normalización de fechas por columna (app/services/fechas_service.py)
+"""
+from datetime import date, datetime
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from app.services.control_import_service import ImportadorControl
+from app.services.fechas_service import NormalizadorFechas, aplicar_formato, detectar_formato
+from app.services.gantt_import_service import mapear_columnas, normalizar_lote
+
+
+def _sin_respaldo(valor):
+    raise AssertionError(f'No debería usar la conversión lenta para {valor!r}')
+
+
+class TestFormatos:
+
+    @pytest.mark.parametrize('texto, formato, esperada', [
+        ('2026-01-05', 'iso', date(2026, 1, 5)),
+        ('2026-01-05T08:00:00', 'iso', date(2026, 1, 5)),
+        ('05/01/2026', 'dia_mes_anio', date(2026, 1, 5)),
+        ('vie 29-01-10 9:00', 'dia_mes_anio', date(2010, 1, 29)),
+        ('lun 05-01-26', 'dia_mes_anio', date(2026, 1, 5)),
+        ('miércoles 29-04-26', 'dia_mes_anio', date(2026, 4, 29)),
+        ('Wednesday, 4/29/26', 'mes_dia_anio', date(2026, 4, 29)),
+        ('2026/01/05', 'anio_mes_dia', date(2026, 1, 5)),
+        ('Mon 1/25/26', 'mes_dia_anio', date(2026, 1, 25)),
+        ('5 de enero de 2026', 'nombre_mes', date(2026, 1, 5)),
+        ('mié 29-abr-26 8:00', 'nombre_mes', date(2026, 4, 29)),
+        ('15 Aug 1999', 'nombre_mes', date(1999, 8, 15)),
+    ])
+    def test_detecta_y_convierte(self, texto, formato, esperada):
+        assert detectar_formato([texto]) == formato
+        assert pd.Timestamp(aplicar_formato([texto], formato)[0]).date() == esperada
+
+    def test_fecha_inexistente_queda_nat(self):
+        convertidas = aplicar_formato(['31/02/2026', '29/02/2028', '01/13/2026'], 'dia_mes_anio')
+        assert pd.isna(convertidas[0]) and pd.Timestamp(convertidas[1]).date() == date(2028, 2, 29)
+        assert pd.isna(convertidas[2])
+        assert detectar_formato(['sin fecha']) is None
+
+
+class TestNormalizador:
+
+    def test_formato_dominante_de_la_columna(self):
+        # 05/01 es ambiguo, pero la columna trae 25/01: día/mes
+        fechas = NormalizadorFechas(respaldo=_sin_respaldo)
+        convertidas = fechas.convertir_a_date(['25/01/2026', '05/01/2026', None, '', datetime(2026, 3, 4, 10)], 'Comienzo')
+        assert convertidas == [date(2026, 1, 25), date(2026, 1, 5), None, None, date(2026, 3, 4)]
+        assert fechas.formato('Comienzo') == 'dia_mes_anio'
+
+        # En otra columna mes/día/año convierte más de la muestra y gana
+        otras = fechas.convertir_a_date(['01/25/2026', '01/05/2026'], 'Fin')
+        assert otras == [date(2026, 1, 25), date(2026, 1, 5)] and fechas.formato('Fin') == 'mes_dia_anio'
+
+    def test_columna_con_formatos_mezclados(self):
+        # Gana día/mes/año por empate, pero las demás filas prueban los otros formatos
+        fechas = NormalizadorFechas(respaldo=_sin_respaldo)
+        convertidas = fechas.convertir_a_date(
+            ['vie 29-01-10 9:00', 'lunes 03-06-24', '3 de junio de 2024', 'miércoles 5 de junio de 2024', '2024-06-04'],
+            'Comienzo'
+        )
+        assert convertidas == [date(2010, 1, 29), date(2024, 6, 3), date(2024, 6, 3), date(2024, 6, 5), date(2024, 6, 4)]
+        assert fechas.formato('Comienzo') == 'dia_mes_anio'
+
+    def test_fechas_fuera_del_rango_de_nanosegundos_quedan_vacias(self):
+        # datetime64[ns] no las representa: no deben convertirse en otras fechas
+        fechas = NormalizadorFechas(respaldo=lambda valor: valor)
+        convertidas = fechas.convertir_a_date(
+            [datetime(1, 1, 1), date(1600, 1, 1), date(2262, 6, 1), date(2026, 1, 5)], 'Comienzo'
+        )
+        assert convertidas == [None, None, None, date(2026, 1, 5)]
+
+    def test_solo_los_valores_atipicos_usan_el_respaldo(self):
+        vistos = []
+
+        def respaldo(valor):
+            vistos.append(valor)
+            return date(2026, 2, 2) if valor == 'Feb 2, 2026' else None
+
+        fechas = NormalizadorFechas(respaldo=respaldo)
+        convertidas = fechas.convertir_a_date(['2026-01-05', 'Feb 2, 2026', 'pendiente', 'Feb 2, 2026'], 'Fin')
+        assert convertidas == [date(2026, 1, 5), date(2026, 2, 2), None, date(2026, 2, 2)]
+        assert vistos == ['Feb 2, 2026', 'pendiente']
+
+    def test_memoriza_entre_lotes(self):
+        fechas = NormalizadorFechas(respaldo=lambda valor: None)
+        lote = ['lun 05-01-26 8:00', 'mar 06-01-26 8:00', '??'] * 5000
+        fechas.convertir(lote, 'Comienzo')
+        fechas.convertir(lote, 'Comienzo')
+        # Un solo valor atípico distinto, convertido una vez en total
+        assert fechas.conversiones_lentas == 1
+
+
+class TestImportaciones:
+
+    def test_gantt_con_fechas_de_texto(self):
+        encabezados = ['EDT', 'Nombre de tarea', 'Comienzo', 'Fin']
+        filas = [(1, ('1', 'Tarea', 'vie 29-01-10 9:00', 'lun 01-02-10 17:00')),
+                 (2, ('2', 'Otra', '29/01/2010', 'sin fecha'))]
+        validas, errores = normalizar_lote(filas, mapear_columnas(encabezados))
+        assert list(validas['fecha_inicio']) == [date(2010, 1, 29)]
+        assert list(validas['fecha_fin']) == [date(2010, 2, 1)]
+        assert len(errores) == 1 and 'Fila 2' in errores[0]
+
+    def test_control_convierte_por_columna(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(['EDT', 'Nombre de tarea', 'Comienzo', 'Fin'])
+        workbook.active.append(['1.1', 'Tarea', 'vie 29-01-10 9:00', datetime(2010, 2, 5)])
+        workbook.active.append(['1.2', 'Otra', '2010-02-01', None])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+
+        importador = ImportadorControl()
+        assert importador.leer(buffer) == []
+        assert [(f['fecha_inicio'], f['fecha_fin']) for f in importador.filas] == [
+            (date(2010, 1, 29), date(2010, 2, 5)), (date(2010, 2, 1), None)
+        ]
@@ -0,0 +1,94 @@
+"""
+Tests del payload columnar de /gantt_data con ETag (app/services/gantt_data_service.py)
+"""
+import pytest
+from datetime import date, datetime
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, Requerimiento
+from app.services.gantt_data_service import version_gantt, columnas_actividades, filas_a_columnas
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app):
+    """La aplicación SQLite de conftest con el blueprint de controladores"""
+    from app.controllers_main import controllers_bp
+
+    sqlite_app.register_blueprint(controllers_bp)
+    return sqlite_app
+
+
+@pytest.fixture
+def proyecto(sqlite_app):
+    db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+    db.session.add_all([
+        ActividadProyecto(requerimiento_id=1, edt='1.1', nombre_tarea='Excavación', nivel_esquema=2,
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 5), duracion=4, progreso=50),
+        ActividadProyecto(requerimiento_id=1, edt='1', nombre_tarea='Obra', nivel_esquema=1,
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10), duracion=9, progreso=None),
+    ])
+    db.session.commit()
+    return 1
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return resultado, len(sentencias)
+
+
+class TestGanttDataColumnar:
+
+    def test_columnas_sin_alias(self, proyecto):
+        columnas = columnas_actividades(proyecto)
+
+        assert list(columnas) == ['ID', 'EDT', 'Nivel de esquema', 'Nombre de tarea', 'Comienzo',
+                                  'Fin', 'Duración', 'Recursos', 'Progreso', 'Crítica', 'Holgura']
+        assert columnas['EDT'] == ['1', '1.1']
+        assert columnas['Comienzo'] == ['2026-01-01', '2026-01-01']
+        assert columnas['Progreso'] == [0.0, 50.0]
+
+    def test_filas_a_columnas(self):
+        assert filas_a_columnas([{'EDT': '1', 'Fin': ''}, {'EDT': '2', 'Fin': '2026-01-02'}]) == {
+            'EDT': ['1', '2'], 'Fin': ['', '2026-01-02']
+        }
+
+    def test_etag_cambia_con_las_actividades(self, proyecto):
+        etag, _ = version_gantt(proyecto)
+        assert version_gantt(proyecto)[0] == etag
+
+        actividad = ActividadProyecto.query.filter_by(edt='1.1').one()
+        actividad.progreso = 75
+        actividad.updated_at = datetime(2030, 1, 1)
+        db.session.commit()
+        etag_2, _ = version_gantt(proyecto)
+        assert etag_2 != etag
+
+        db.session.delete(actividad)
+        db.session.commit()
+        assert version_gantt(proyecto)[0] != etag_2
+
+    def test_if_none_match_responde_304_con_una_consulta(self, sqlite_app, proyecto):
+        cliente = sqlite_app.test_client()
+        respuesta = cliente.get('/gantt_data/1')
+        datos = respuesta.get_json()
+        assert respuesta.status_code == 200
+        assert datos['formato'] == 'columnar'
+        assert datos['info']['total_actividades'] == 2
+        etag = respuesta.headers['ETag']
+
+        respuesta, consultas = _contar_consultas(
+            lambda: cliente.get('/gantt_data/1', headers={'If-None-Match': etag})
+        )
+        assert respuesta.status_code == 304
+        assert respuesta.data == b''
+        assert consultas == 1
@@ -0,0 +1,106 @@
+"""
+Tests del motor de importación de Gantt (app/services/gantt_import_service.py)
+"""
+import pytest
+from datetime import date
+from openpyxl import Workbook
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, Trabajador
+from app.services.gantt_import_service import (
+    GanttIngestor, mapear_columnas, normalizar_lote, parsear_recursos
+)
+
+
+def _crear_xlsx(path, filas):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['Id', 'EDT', 'Nombre de tarea', 'Duración', 'Comienzo', 'Fin',
+               'Nombres de los recursos', '% completado', 'Nivel de esquema'])
+    for fila in filas:
+        ws.append(fila)
+    wb.save(path)
+
+
+class TestNormalizacion:
+    """Tests de las funciones puras de normalización"""
+
+    def test_mapear_columnas_exacta_y_parcial(self):
+        columnas = mapear_columnas(['EDT', 'Task Name', 'Inicio', 'Fecha de fin', None])
+        assert columnas['EDT'] == 0
+        assert columnas['Nombre de tarea'] == 1
+        assert columnas['Comienzo'] == 2
+        assert columnas['Fin'] == 3
+
+    def test_parsear_recursos(self):
+        assert parsear_recursos('PM1[100%];arq1[50%]') == [('PM1', 100), ('ARQ1', 50)]
+        assert parsear_recursos('PM1, ARQ-2') == [('PM1', 100), ('ARQ2', 100)]
+        assert parsear_recursos('') == []
+
+    def test_normalizar_lote_valida_y_reporta_errores(self):
+        columnas = mapear_columnas(['EDT', 'Nombre de tarea', 'Comienzo', 'Fin', 'Duración', 'Progreso'])
+        filas = [
+            (1, ('1', 'Proyecto', date(2026, 1, 5), '2026-01-20', '12 días', 0.5)),
+            (2, ('1.1', '', date(2026, 1, 5), date(2026, 1, 6), 1, '50%')),
+            (3, ('1.2', 'Sin fecha', None, date(2026, 1, 6), 1, 0)),
+        ]
+        validas, errores = normalizar_lote(filas, columnas)
+
+        assert list(validas['edt']) == ['1']
+        fila = validas.iloc[0]
+        assert fila['fecha_inicio'] == date(2026, 1, 5)
+        assert fila['fecha_fin'] == date(2026, 1, 20)
+        assert fila['duracion'] == 12
+        assert fila['progreso'] == pytest.approx(0.5)
+        assert len(errores) == 2
+
+
+class TestGanttIngestor:
+    """Tests de la importación completa contra SQLite"""
+
+    def test_importar_crea_actividades_avances_y_trabajadores(self, sqlite_app, tmp_path):
+        db.session.add(Trabajador(nombre='Jefe Proyecto', nombrecorto='pm1', activo=True))
+        db.session.commit()
+
+        archivo = tmp_path / 'gantt.xlsx'
+        _crear_xlsx(archivo, [
+            [1, '1', 'Proyecto', 10, date(2026, 1, 5), date(2026, 1, 16), '', 0, 1],
+            [2, '1.1', 'Diseño', 5, date(2026, 1, 5), date(2026, 1, 9), 'PM1[100%];ARQ1[50%]', 0, 2],
+            [3, '1.2', 'Obra', 5, date(2026, 1, 12), date(2026, 1, 16), 'ARQ1', 0, 2],
+            [4, '1.2', 'Duplicada', 5, date(2026, 1, 12), date(2026, 1, 16), '', 0, 2],
+        ])
+
+        resultado = GanttIngestor(requerimiento_id=1, tamano_lote=2).importar(str(archivo))
+
+        assert resultado['success'] is True
+        assert resultado['actividades_procesadas'] == 3
+        assert resultado['avances_creados'] == 3
+        assert len(resultado['errores']) == 1
+        assert ActividadProyecto.query.filter_by(requerimiento_id=1).count() == 3
+        assert AvanceActividad.query.filter_by(requerimiento_id=1).count() == 3
+        assert Trabajador.query.filter_by(nombrecorto='ARQ1').count() == 1
+
+    def test_reimportar_reemplaza_datos_anteriores(self, sqlite_app, tmp_path):
+        archivo = tmp_path / 'gantt.xlsx'
+        _crear_xlsx(archivo, [
+            [1, '1', 'Proyecto', 5, date(2026, 1, 5), date(2026, 1, 9), 'PM1', 0, 1],
+        ])
+
+        GanttIngestor(requerimiento_id=1).importar(str(archivo))
+        resultado = GanttIngestor(requerimiento_id=1).importar(str(archivo))
+
+        assert resultado['success'] is True
+        assert ActividadProyecto.query.filter_by(requerimiento_id=1).count() == 1
+        assert AvanceActividad.query.filter_by(requerimiento_id=1).count() == 1
+
+    def test_columnas_requeridas_faltantes(self, sqlite_app, tmp_path):
+        wb = Workbook()
+        wb.active.append(['Columna', 'Otra'])
+        wb.active.append(['a', 'b'])
+        archivo = tmp_path / 'malo.xlsx'
+        wb.save(archivo)
+
+        resultado = GanttIngestor(requerimiento_id=1).importar(str(archivo))
+
+        assert resultado['success'] is False
+        assert 'columnas requeridas' in resultado['error']
@@ -0,0 +1,110 @@
+"""
+Tests del almacén de archivos Gantt direccionado por contenido (app/services/gantt_store.py)
+"""
+import hashlib
+import os
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from app.services import gantt_store
+from app.services.gantt_store import GanttFileStore, asegurar_en_store
+
+
+@pytest.fixture
+def contenido_xlsx():
+    df = pd.DataFrame({
+        'EDT': ['1', '1.1'],
+        'Nombre de tarea': ['Proyecto', 'Excavación'],
+        'Comienzo': [datetime(2026, 1, 5), datetime(2026, 1, 5)],
+        'Fin': ['2026-01-20', None],
+        'Duración': [10, 5],
+    })
+    buffer = BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+
+class GanttArchivoFalso:
+    id = 1
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.sha256 = None
+        self.tamano_archivo = None
+
+
+class TestGanttFileStore:
+
+    def test_contenido_identico_se_guarda_una_vez(self, tmp_path, contenido_xlsx):
+        store = GanttFileStore(str(tmp_path))
+
+        sha256, tamano, nuevo = store.guardar_stream(BytesIO(contenido_xlsx))
+        sha256_2, _, nuevo_2 = store.guardar_bytes(contenido_xlsx)
+
+        assert sha256 == sha256_2 == hashlib.sha256(contenido_xlsx).hexdigest()
+        assert tamano == len(contenido_xlsx)
+        assert nuevo and not nuevo_2
+        assert store.ruta(sha256).endswith(os.path.join(sha256[:2], sha256[2:4], f'{sha256}.xlsx'))
+        assert os.listdir(tmp_path / 'tmp') == []
+
+    def test_actividades_normalizadas_y_parseadas_una_vez(self, tmp_path, contenido_xlsx, monkeypatch):
+        lecturas = []
+        leer_original = gantt_store._leer_planilla
+        monkeypatch.setattr(gantt_store, '_leer_planilla',
+                            lambda ruta, tipo_archivo: lecturas.append(ruta) or leer_original(ruta, tipo_archivo))
+
+        store = GanttFileStore(str(tmp_path))
+        sha256, _, _ = store.guardar_bytes(contenido_xlsx)
+        actividades = store.actividades(sha256)
+
+        assert actividades[0] == {
+            'EDT': 1, 'Nombre de tarea': 'Proyecto', 'Comienzo': '2026-01-05',
+            'Fin': '2026-01-20', 'Duración': 10
+        }
+        assert actividades[1]['Fin'] == ''
+
+        # Mismo proceso (LRU) y otro worker (JSON junto al archivo): sin reparsear
+        assert store.actividades(sha256) is actividades
+        assert GanttFileStore(str(tmp_path)).actividades(sha256) == actividades
+        assert len(lecturas) == 1
+
+    def test_actividades_de_un_xml_de_ms_project(self, tmp_path):
+        contenido = (
+            '<?xml version="1.0" encoding="UTF-8"?><Project xmlns="http://schemas.microsoft.com/project">'
+            '<MinutesPerDay>480</MinutesPerDay><Tasks>'
+            '<Task><UID>0</UID><ID>0</ID><Name>Proyecto</Name><OutlineLevel>0</OutlineLevel></Task>'
+            '<Task><UID>1</UID><ID>1</ID><Name>Excavación</Name><WBS>1.1</WBS><OutlineLevel>2</OutlineLevel>'
+            '<Start>2026-01-05T08:00:00</Start><Finish>2026-01-09T17:00:00</Finish><Duration>PT40H0M0S</Duration>'
+            '<PercentComplete>50</PercentComplete></Task>'
+            '<Task><UID>2</UID><ID>2</ID><Name>Trazado</Name><WBS>1.2</WBS><OutlineLevel>2</OutlineLevel>'
+            '<Start>2026-01-12T08:00:00</Start><Finish>2026-01-12T17:00:00</Finish><Duration>PT8H0M0S</Duration>'
+            '<PredecessorLink><PredecessorUID>1</PredecessorUID><Type>1</Type></PredecessorLink></Task>'
+            '</Tasks><Resources><Resource><UID>1</UID><Name>Ana Pérez</Name></Resource></Resources>'
+            '<Assignments><Assignment><TaskUID>1</TaskUID><ResourceUID>1</ResourceUID></Assignment></Assignments>'
+            '</Project>'
+        ).encode('utf-8')
+        store = GanttFileStore(str(tmp_path))
+        sha256, _, _ = store.guardar_bytes(contenido)
+
+        actividades = store.actividades(sha256, 'xml')
+
+        assert [(a['EDT'], a['Nombre de tarea'], a['Comienzo'], a['Fin']) for a in actividades] == [
+            ('1.1', 'Excavación', '2026-01-05', '2026-01-09'), ('1.2', 'Trazado', '2026-01-12', '2026-01-12')
+        ]
+        assert actividades[0]['Nombres de los recursos'] == 'Ana Pérez' and actividades[0]['% completado'] == 0.5
+        assert (actividades[0]['Duración'], actividades[1]['Predecesoras']) == (5, '1')
+
+    def test_migracion_de_blob_legacy(self, tmp_path, contenido_xlsx):
+        store = GanttFileStore(str(tmp_path))
+        gantt = GanttArchivoFalso(contenido_xlsx)
+
+        sha256 = asegurar_en_store(gantt, store)
+
+        assert gantt.sha256 == sha256 and gantt.archivo is None
+        assert gantt.tamano_archivo == len(contenido_xlsx)
+        with store.abrir(sha256) as f:
+            assert f.read() == contenido_xlsx
+        assert asegurar_en_store(gantt, store) == sha256
@@ -0,0 +1,100 @@
+"""
+Tests del cache versionado de menús (app/services/menu_service.py)
+"""
+import pytest
+from flask import g
+
+from app import db
+from app.models import Category, Page, PagePermission, UserRole, CacheVersion, VERSION_PERMISOS
+from app.services.menu_service import MenuService
+
+
+class UsuarioFalso:
+    is_authenticated = True
+
+    def __init__(self, user_id, rol, custom_role_id=None):
+        self.id = user_id
+        self.rol = rol
+        self.custom_role_id = custom_role_id
+
+
+@pytest.fixture
+def menu_base(sqlite_app):
+    categoria = Category(name='Proyectos', icon='fas fa-folder')
+    db.session.add(categoria)
+    db.session.flush()
+    pagina = Page(route='/proyectos', name='Proyectos', category_id=categoria.id)
+    db.session.add(pagina)
+    db.session.flush()
+    db.session.add(PagePermission(page_id=pagina.id, system_role=UserRole.SUPERADMIN, role_name='SUPERADMIN'))
+    db.session.commit()
+    return pagina
+
+
+def _nueva_request(app):
+    """Simula el inicio de otra request: contexto de aplicación nuevo, g vacío"""
+    ctx = app.app_context()
+    ctx.push()
+    return ctx
+
+
+class TestMenuCache:
+
+    def test_flush_de_permisos_incrementa_version(self, menu_base):
+        version = CacheVersion.obtener(VERSION_PERMISOS)
+        menu_base.icon = 'fas fa-star'
+        db.session.commit()
+
+        assert CacheVersion.obtener(VERSION_PERMISOS) == version + 1
+
+    def test_cache_compartido_por_rol_y_reconstruido_al_cambiar_version(self, sqlite_app, menu_base):
+        servicio = MenuService()
+
+        ctx = _nueva_request(sqlite_app)
+        menu_1 = servicio.get_user_menu(UsuarioFalso(1, UserRole.SUPERADMIN))
+        menu_2 = servicio.get_user_menu(UsuarioFalso(2, UserRole.SUPERADMIN))
+        ctx.pop()
+        assert menu_1 is menu_2
+        assert menu_1[0]['pages'][0]['icon'] == 'fas fa-file'
+
+        # Otro proceso cambia el icono: la versión en BD sube y este proceso reconstruye
+        menu_base.icon = 'fas fa-star'
+        db.session.commit()
+
+        ctx = _nueva_request(sqlite_app)
+        menu_3 = servicio.get_user_menu(UsuarioFalso(1, UserRole.SUPERADMIN))
+        ctx.pop()
+        assert menu_3 is not menu_1
+        assert menu_3[0]['pages'][0]['icon'] == 'fas fa-star'
+
+    def test_limite_lru(self, sqlite_app, menu_base):
+        servicio = MenuService(max_entradas=2)
+        ctx = _nueva_request(sqlite_app)
+        for custom_role_id in (1, 2, 3):
+            servicio.get_user_menu(UsuarioFalso(1, None, custom_role_id))
+        ctx.pop()
+
+        assert len(servicio.menu_cache) == 2
+        assert [clave[1] for clave in servicio.menu_cache] == ['2', '3']
+
+    def test_version_se_lee_una_vez_por_request(self, sqlite_app, menu_base):
+        servicio = MenuService()
+        ctx = _nueva_request(sqlite_app)
+        servicio.get_user_menu(UsuarioFalso(1, UserRole.SUPERADMIN))
+        assert g.permisos_version == CacheVersion.obtener(VERSION_PERMISOS)
+
+        servicio.clear_cache()
+        assert 'permisos_version' not in g
+        assert len(servicio.menu_cache) == 0
+        ctx.pop()
+
+    def test_paginas_sin_duplicados(self, menu_base):
+        from app.models import CustomRole
+        rol = CustomRole(name='Revisor')
+        db.session.add(rol)
+        db.session.flush()
+        db.session.add(PagePermission(page_id=menu_base.id, custom_role_id=rol.id, role_name='REVISOR'))
+        db.session.commit()
+
+        paginas = MenuService()._get_user_allowed_pages(UserRole.SUPERADMIN, rol.id)
+        assert [p['id'] for p in paginas] == [menu_base.id]
@@ -0,0 +1,133 @@
+"""
+Tests del importador de MS Project XML (app/services/mspdi_import_service.py)
+"""
+import os
+import tracemalloc
+
+import pytest
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, CronogramaProyecto, Requerimiento, Trabajador
+from app.services.mspdi_import_service import es_mspdi, importar_gantt_mspdi, iterar_mspdi
+from app.services.ruta_critica_service import asegurar_cronogramas
+from benchmarks.datos_sinteticos import generar_gantt_xlsx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+XML_KARCE = os.path.join(RAIZ, 'DOCS', 'SISTEMA', 'P007_SISTEMA_KARCE.xml')
+
+CABECERA = '<?xml version="1.0" encoding="UTF-8"?>\n<Project xmlns="http://schemas.microsoft.com/project">' \
+           '<MinutesPerDay>480</MinutesPerDay><Calendars><Calendar><UID>1</UID></Calendar></Calendars>'
+
+
+def _tarea(uid, id, wbs, nombre, inicio, fin, horas, vinculos='', **extra):
+    campos = ''.join(f'<{clave}>{valor}</{clave}>' for clave, valor in extra.items())
+    return (f'<Task><UID>{uid}</UID><ID>{id}</ID><Name>{nombre}</Name><WBS>{wbs}</WBS>'
+            f'<OutlineLevel>{wbs.count(".") + 1}</OutlineLevel><Start>{inicio}T08:00:00</Start>'
+            f'<Finish>{fin}T17:00:00</Finish><Duration>PT{horas}H0M0S</Duration>{campos}{vinculos}</Task>')
+
+
+def _vinculo(uid, tipo=1, desfase=0, formato=7):
+    return (f'<PredecessorLink><PredecessorUID>{uid}</PredecessorUID><Type>{tipo}</Type>'
+            f'<CrossProject>0</CrossProject><LinkLag>{desfase}</LinkLag><LagFormat>{formato}</LagFormat></PredecessorLink>')
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app):
+    """La aplicación SQLite de conftest con un requerimiento"""
+    db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+    db.session.commit()
+    return sqlite_app
+
+
+@pytest.fixture
+def xml_pequeno(tmp_path):
+    ruta = tmp_path / 'proyecto.xml'
+    ruta.write_text(
+        CABECERA + '<Tasks>'
+        + _tarea(0, 0, '0', 'Proyecto', '2026-03-02', '2026-03-13', 80)  # Resumen del proyecto
+        + _tarea(10, 1, '1', 'Obra', '2026-03-02', '2026-03-13', 80, Summary=1)
+        # Predecesora posterior en el archivo (UID 12) con desfase de 2 días (9600 décimas de minuto)
+        + _tarea(11, 2, '1.1', 'Excavación', '2026-03-02', '2026-03-04', 24, _vinculo(12, tipo=3, desfase=9600),
+                 PercentComplete=50)
+        + _tarea(12, 3, '1.2', 'Trazado', '2026-03-02', '2026-03-02', 8)
+        + _tarea(13, 4, '1.3', 'Entrega', '2026-03-13', '2026-03-13', 0, _vinculo(11) + _vinculo(12, tipo=0))
+        + '<Task><UID>14</UID><ID>5</ID><IsNull>1</IsNull></Task>'
+        + _tarea(15, 6, '1.4', 'Descartada', '2026-03-02', '2026-03-02', 8, Active=0)
+        + '</Tasks><Resources>'
+        '<Resource><UID>0</UID><ID>0</ID><Type>1</Type></Resource>'
+        '<Resource><UID>1</UID><ID>1</ID><Name>Ana Pérez</Name><Type>1</Type></Resource>'
+        '<Resource><UID>2</UID><ID>2</ID><Name>PM1</Name><Type>1</Type></Resource>'
+        '<Resource><UID>3</UID><ID>3</ID><Name>Hormigón</Name><Type>0</Type></Resource>'
+        '</Resources><Assignments>'
+        '<Assignment><UID>1</UID><TaskUID>11</TaskUID><ResourceUID>1</ResourceUID><Units>0.5</Units></Assignment>'
+        '<Assignment><UID>2</UID><TaskUID>11</TaskUID><ResourceUID>2</ResourceUID><Units>1</Units></Assignment>'
+        '<Assignment><UID>3</UID><TaskUID>12</TaskUID><ResourceUID>3</ResourceUID><Units>1</Units></Assignment>'
+        '<Assignment><UID>4</UID><TaskUID>13</TaskUID><ResourceUID>-65535</ResourceUID><Units>1</Units></Assignment>'
+        '</Assignments></Project>',
+        encoding='utf-8'
+    )
+    return str(ruta)
+
+
+class TestMSPDI:
+
+    def test_tareas_vinculos_y_asignaciones(self, sqlite_app, xml_pequeno):
+        resultado = importar_gantt_mspdi(xml_pequeno, 1, tamano_lote=2)
+
+        assert resultado['success']
+        assert (resultado['actividades_procesadas'], resultado['avances_creados'], resultado['total_filas']) == (4, 2, 5)
+        assert resultado['errores'] == ['Tarea 6: inactiva en MS Project, no se importa']
+
+        actividades = {a.edt: a for a in ActividadProyecto.query}
+        excavacion = actividades['1.1']
+        assert (excavacion.id_gantt, excavacion.duracion, float(excavacion.progreso)) == (2, 3, 50.0)
+        assert excavacion.predecesoras == '3CC+2 días'
+        assert excavacion.recursos == 'ANAPEREZ[50%];PM1[100%]'
+        assert actividades['1.3'].predecesoras == '2;3FF' and actividades['1.3'].duracion == 0
+        assert actividades['1.2'].recursos is None  # Recurso de material: no es trabajador
+
+        assert {t.nombrecorto for t in Trabajador.query} == {'ANAPEREZ', 'PM1'}
+        assert {a.porcentaje_asignacion for a in AvanceActividad.query} == {50, 100}
+
+    def test_reimportar_reemplaza(self, sqlite_app, xml_pequeno):
+        importar_gantt_mspdi(xml_pequeno, 1)
+        importar_gantt_mspdi(xml_pequeno, 1)
+        assert ActividadProyecto.query.count() == 4
+        assert AvanceActividad.query.count() == 2
+
+    def test_xml_de_ms_project_real(self, sqlite_app):
+        resultado = importar_gantt_mspdi(XML_KARCE, 1)
+
+        assert resultado['success'] and not resultado['errores']
+        assert resultado['actividades_procesadas'] == 68
+        assert ActividadProyecto.query.filter_by(edt='1.1.1.1').one().predecesoras == '10;59;26;36;48;65'
+        assert Trabajador.query.count() == 7
+
+        asegurar_cronogramas([1])
+        cronograma = db.session.get(CronogramaProyecto, 1)
+        assert cronograma.enlaces == 101 and cronograma.enlaces_invalidos == 0
+        assert cronograma.actividades_criticas > 0
+
+    def test_deteccion_de_formato(self, tmp_path, xml_pequeno):
+        ruta = tmp_path / 'gantt.xlsx'
+        generar_gantt_xlsx(ruta, actividades=5, trabajadores=1)
+        assert es_mspdi(xml_pequeno) and es_mspdi(XML_KARCE)
+        assert not es_mspdi(str(ruta))
+
+    def test_memoria_constante(self, tmp_path):
+        def pico(tareas):
+            ruta = tmp_path / f'grande_{tareas}.xml'
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                archivo.write(CABECERA + '<Tasks>')
+                for i in range(1, tareas + 1):
+                    archivo.write(_tarea(i, i, f'1.{i}', f'Tarea {i}', '2026-03-02', '2026-03-03', 16, _vinculo(i - 1)))
+                archivo.write('</Tasks></Project>')
+
+            tracemalloc.start()
+            assert sum(1 for tipo, _ in iterar_mspdi(str(ruta)) if tipo == 'tarea') == tareas
+            _, maximo = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return maximo
+
+        # Diez veces más tareas no multiplican la memoria pico
+        assert pico(10000) < 2 * pico(1000)
@@ -0,0 +1,151 @@
+"""
+Tests del perfil SQL por request y los presupuestos de consultas (app/performance.py)
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask_login import LoginManager
+
+from app import db
+from app.controllers_main import controllers_bp
+from app.models import ActividadProyecto, HistorialAvanceActividad, Requerimiento, Trabajador
+from app.performance import (
+    PresupuestoConsultasExcedido, perfilar_consultas, presupuesto_consultas,
+    setup_performance_monitoring
+)
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app):
+    """La aplicación SQLite de conftest en modo testing y con el monitoreo de performance activo"""
+    sqlite_app.config['TESTING'] = True
+    LoginManager(sqlite_app).user_loader(lambda user_id: None)
+    setup_performance_monitoring(sqlite_app)
+    return sqlite_app
+
+
+@pytest.fixture
+def historial(sqlite_app):
+    """20 avances, cada uno de un trabajador y una actividad distintos"""
+    db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+    trabajadores = [Trabajador(nombre=f'Trabajador {i}', nombrecorto=f'T{i}', activo=True) for i in range(20)]
+    actividades = [
+        ActividadProyecto(requerimiento_id=1, edt=f'1.{i}', nombre_tarea=f'Tarea {i}', duracion=9, progreso=0,
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10))
+        for i in range(20)
+    ]
+    db.session.add_all(trabajadores + actividades)
+    db.session.flush()
+    for i in range(20):
+        db.session.add(HistorialAvanceActividad(
+            requerimiento_id=1, trabajador_id=trabajadores[i].id, actividad_id=actividades[i].id,
+            progreso_anterior=0, progreso_nuevo=10, diferencia=10, sesion_guardado=f'sesion-{i}',
+            fecha_cambio=datetime(2026, 1, 1) + timedelta(hours=i)
+        ))
+    db.session.commit()
+
+
+def _leer_trabajadores(veces):
+    for _ in range(veces):
+        db.session.execute(db.select(Trabajador.id)).all()
+
+
+class TestPerfilSQL:
+
+    def test_cuenta_consultas_y_detecta_repetidas(self, sqlite_app):
+        with perfilar_consultas() as perfil:
+            _leer_trabajadores(6)
+            db.session.execute(db.select(Requerimiento.id)).all()
+
+        assert perfil.consultas == 7 and perfil.tiempo_db > 0
+        repetidas = perfil.repetidas()
+        assert len(repetidas) == 1 and repetidas[0]['veces'] == 6
+        assert 'trabajador' in repetidas[0]['sentencia']
+
+    def test_fuera_del_bloque_no_registra(self, sqlite_app):
+        with perfilar_consultas() as perfil:
+            pass
+        _leer_trabajadores(1)
+        assert perfil.consultas == 0
+
+
+class TestMiddleware:
+
+    def test_header_server_timing(self, sqlite_app):
+        @sqlite_app.route('/leer')
+        def leer():
+            _leer_trabajadores(2)
+            return 'ok'
+
+        respuesta = sqlite_app.test_client().get('/leer')
+        assert respuesta.headers['Server-Timing'].startswith('db;dur=')
+        assert 'desc="2 consultas"' in respuesta.headers['Server-Timing']
+        assert ', app;dur=' in respuesta.headers['Server-Timing']
+
+    def test_presupuesto_excedido(self, sqlite_app):
+        @sqlite_app.route('/n_mas_uno')
+        @presupuesto_consultas(3)
+        def n_mas_uno():
+            _leer_trabajadores(5)
+            return 'ok'
+
+        with pytest.raises(PresupuestoConsultasExcedido, match='5 consultas'):
+            sqlite_app.test_client().get('/n_mas_uno')
+
+        # Fuera del modo estricto solo se registra el warning
+        sqlite_app.config['PRESUPUESTO_CONSULTAS_ESTRICTO'] = False
+        assert sqlite_app.test_client().get('/n_mas_uno').status_code == 200
+
+
+class TestPresupuestosDeEndpoints:
+    """Los endpoints pesados de controllers_main no superan su presupuesto con muchas filas"""
+
+    @pytest.fixture(autouse=True)
+    def registrar_blueprint(self, sqlite_app):
+        sqlite_app.register_blueprint(controllers_bp)
+
+    def test_historial_avances_sin_n_mas_uno(self, sqlite_app, historial):
+        respuesta = sqlite_app.test_client().get('/api/historial-avances')
+        datos = respuesta.get_json()
+        assert datos['total_cambios'] == 20
+        assert {sesion['trabajador'] for sesion in datos['sesiones']} == {f'Trabajador {i}' for i in range(20)}
+        assert 'desc="1 consultas"' in respuesta.headers['Server-Timing']
+
+    @pytest.mark.parametrize('url', [
+        '/gantt_data/1',
+        '/exportar_actividades_xlsx',
+        '/exportar_avances_trabajador/1/1',
+    ])
+    def test_exportaciones_y_gantt(self, sqlite_app, historial, url):
+        respuesta = sqlite_app.test_client().get(url)
+        assert respuesta.status_code == 200
+
+    def test_resumen_proyectos_con_resumenes_no_vigentes(self, sqlite_app):
+        """La primera lectura tras una escritura recalcula resúmenes y ruta crítica dentro del presupuesto"""
+        sqlite_app.config['SECRET_KEY'] = 'test'
+        sqlite_app.login_manager.user_loader(lambda user_id: db.session.get(Trabajador, int(user_id)))
+        usuario = Trabajador(nombre='Jefe', nombrecorto='JEFE', activo=True)
+        db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=5))
+        db.session.add_all([usuario] + [
+            ActividadProyecto(requerimiento_id=1, edt=f'1.{i}', nombre_tarea=f'Tarea {i}', duracion=9, progreso=0,
+                              fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10))
+            for i in range(20)
+        ])
+        db.session.commit()
+
+        cliente = sqlite_app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion['_user_id'] = str(usuario.id)
+
+        def leer():
+            # Contexto de aplicación propio (sesión SQLAlchemy y g nuevos), como un request real
+            with sqlite_app.app_context():
+                return cliente.get('/api/resumen_proyectos')
+
+        # Sin resumen ni ruta crítica calculados (modo estricto: TESTING)
+        frio = leer()
+        assert frio.status_code == 200 and frio.get_json()['total_proyectos'] == 1
+        assert 'desc="11 consultas"' in frio.headers['Server-Timing']
+
+        caliente = leer()
+        assert 'desc="2 consultas"' in caliente.headers['Server-Timing']
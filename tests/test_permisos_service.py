@@ -0,0 +1,107 @@
+"""
+Tests del snapshot de permisos por request (app/services/permisos_service.py)
+"""
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Category, Page, PagePermission, CustomRole, Trabajador
+from app.services import permisos_service
+from app.services.permisos_service import PermisosSnapshot
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app):
+    """La aplicación SQLite de conftest sin snapshots de permisos de otros tests"""
+    permisos_service.invalidar_snapshots()
+    return sqlite_app
+
+
+@pytest.fixture
+def usuario(sqlite_app):
+    """Trabajador con rol personalizado que ve /users (Usuarios) y /reports (Sistema)"""
+    rol = CustomRole(name='GESTOR')
+    usuarios = Category(name='Usuarios')
+    sistema = Category(name='Sistema')
+    db.session.add_all([rol, usuarios, sistema])
+    db.session.flush()
+    paginas = [
+        Page(route='/users', name='Usuarios', category_id=usuarios.id),
+        Page(route='/reports', name='Reportes', category_id=sistema.id),
+        Page(route='/inactiva', name='Inactiva', category_id=sistema.id, active=False),
+    ]
+    db.session.add_all(paginas)
+    db.session.flush()
+    for pagina in paginas:
+        db.session.add(PagePermission(page_id=pagina.id, custom_role_id=rol.id, role_name=rol.name))
+    trabajador = Trabajador(nombre='Gestor', nombrecorto='GES', activo=True, custom_role_id=rol.id)
+    db.session.add(trabajador)
+    db.session.commit()
+    return trabajador
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return len(sentencias)
+
+
+class TestPermisosSnapshot:
+
+    def test_snapshot_es_inmutable(self):
+        snapshot = PermisosSnapshot(1, rutas=['/a'])
+        with pytest.raises(AttributeError):
+            snapshot.rutas = frozenset()
+        assert snapshot.tiene_ruta('/a')
+
+    def test_verificaciones_usan_el_snapshot(self, usuario):
+        assert usuario.has_page_permission('/users')
+        assert not usuario.has_page_permission('/inactiva')
+        assert usuario.can_access_category('Sistema')
+        assert not usuario.can_access_category('Administración')
+        assert usuario.can_manage_users()
+        assert not usuario.is_admin()
+        assert {p.route for p in usuario.get_accessible_pages()} == {'/users', '/reports'}
+
+    def test_consultas_por_request(self, sqlite_app, usuario):
+        def verificar_todo():
+            usuario.is_admin()
+            usuario.is_supervisor()
+            usuario.can_manage_users()
+            usuario.can_manage_projects()
+            usuario.can_view_reports()
+            usuario.has_page_permission('/users')
+
+        db.session.refresh(usuario)  # el commit del fixture expiró sus atributos
+
+        with sqlite_app.app_context():
+            # versión de permisos + carga del snapshot
+            assert _contar_consultas(verificar_todo) == 2
+
+        with sqlite_app.app_context():
+            # otra request: solo la versión, el snapshot sale del cache del proceso
+            assert _contar_consultas(verificar_todo) == 1
+
+    def test_escritura_de_permisos_invalida_el_cache(self, sqlite_app, usuario):
+        with sqlite_app.app_context():
+            assert not usuario.can_access_category('Administración')
+
+        administracion = Category(name='Administración')
+        db.session.add(administracion)
+        db.session.flush()
+        pagina = Page(route='/admin', name='Admin', category_id=administracion.id)
+        db.session.add(pagina)
+        db.session.flush()
+        db.session.add(PagePermission(page_id=pagina.id, custom_role_id=usuario.custom_role_id, role_name='GESTOR'))
+        db.session.commit()
+
+        with sqlite_app.app_context():
+            assert usuario.is_admin()
@@ -0,0 +1,108 @@
+"""
+Tests del cálculo de progreso jerárquico EDT (app/services/progreso_service.py)
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad
+from app.services.progreso_service import ArbolProgresoEDT, calcular_progreso_hoja, edt_padre
+
+
+def _actividad(edt, duracion, progreso=0):
+    actividad = ActividadProyecto(
+        requerimiento_id=1, edt=edt, nombre_tarea=f'Tarea {edt}',
+        fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10),
+        duracion=duracion, progreso=progreso
+    )
+    db.session.add(actividad)
+    return actividad
+
+
+def _avance(actividad, trabajador_id, asignacion, progreso):
+    db.session.add(AvanceActividad(
+        requerimiento_id=1, trabajador_id=trabajador_id, actividad_id=actividad.id,
+        porcentaje_asignacion=asignacion, progreso_actual=progreso,
+        fecha_registro=date(2026, 1, 1)
+    ))
+
+
+@pytest.fixture
+def proyecto(sqlite_app):
+    """Proyecto 1 > (1.1 > 1.1.1, 1.1.2), 1.2"""
+    raiz = _actividad('1', 30)
+    a11 = _actividad('1.1', 20)
+    a111 = _actividad('1.1.1', 10)
+    a112 = _actividad('1.1.2', 10)
+    a12 = _actividad('1.2', 10)
+    db.session.flush()
+    _avance(a111, 1, 100, 50)
+    _avance(a112, 1, 100, 0)
+    _avance(a12, 2, 100, 100)
+    db.session.commit()
+    return {a.edt: a.id for a in (raiz, a11, a111, a112, a12)}
+
+
+class TestFunciones:
+
+    def test_calcular_progreso_hoja_pondera_por_asignacion(self):
+        assert calcular_progreso_hoja(10, [(100, 50), (50, 100)]) == pytest.approx(200 / 3)
+        assert calcular_progreso_hoja(10, []) == 0.0
+        assert calcular_progreso_hoja(0, [(100, 50)]) == 0.0
+
+    def test_edt_padre(self):
+        assert edt_padre('1.2.3') == '1.2'
+        assert edt_padre('1') is None
+
+
+class TestArbolProgresoEDT:
+
+    def test_recalcular_propaga_a_todos_los_ancestros(self, proyecto):
+        cambios = ArbolProgresoEDT(1).recalcular([proyecto['1.1.1'], proyecto['1.2']])
+        db.session.commit()
+
+        progreso = {a.edt: float(a.progreso) for a in ActividadProyecto.query.all()}
+        assert progreso['1.1.1'] == pytest.approx(50)
+        assert progreso['1.1'] == pytest.approx(25)
+        # (25 * 20 + 100 * 10) / 30
+        assert progreso['1'] == pytest.approx(50)
+        assert set(cambios) == {proyecto['1.1.1'], proyecto['1.2'], proyecto['1.1'], proyecto['1']}
+
+    def test_actividades_inactivas_no_cuentan_en_el_padre(self, proyecto):
+        db.session.get(ActividadProyecto, proyecto['1.1.2']).activo = False
+        db.session.commit()
+
+        ArbolProgresoEDT(1).recalcular([proyecto['1.1.1']])
+        db.session.commit()
+
+        # Solo 1.1.1 (50%) pondera en 1.1; 1.1.2 queda fuera del árbol
+        assert float(db.session.get(ActividadProyecto, proyecto['1.1']).progreso) == pytest.approx(50)
+
+    def test_sin_propagar_solo_actualiza_hojas(self, proyecto):
+        ArbolProgresoEDT(1).recalcular([proyecto['1.1.1']], propagar=False)
+        db.session.commit()
+
+        assert float(db.session.get(ActividadProyecto, proyecto['1.1.1']).progreso) == pytest.approx(50)
+        assert float(db.session.get(ActividadProyecto, proyecto['1.1']).progreso) == 0
+
+    def test_recalcular_usa_numero_constante_de_consultas(self, proyecto):
+        sentencias = []
+
+        def contar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        try:
+            ArbolProgresoEDT(1).recalcular_todo()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', contar)
+
+        # carga de actividades + carga de avances + un UPDATE por lotes + marca del resumen
+        assert len(sentencias) == 4
+
+    def test_recalcular_todo_sin_cambios_no_escribe(self, proyecto):
+        ArbolProgresoEDT(1).recalcular_todo()
+        db.session.commit()
+
+        assert ArbolProgresoEDT(1).recalcular_todo() == {}
@@ -0,0 +1,126 @@
+"""
+Tests de la resolución de recursos Gantt a trabajadores (app/services/recursos_service.py)
+"""
+from datetime import date
+
+import pytest
+from openpyxl import Workbook
+from sqlalchemy import event
+
+from app import db
+from app.models import AvanceActividad, Trabajador
+from app.services.gantt_import_service import GanttIngestor
+from app.services.recursos_service import (
+    ResolutorRecursos, buscar_trabajador_por_clave, codigo_trabajador, compactar_clave, normalizar_clave
+)
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app):
+    """La aplicación SQLite de conftest con tres trabajadores"""
+    db.session.add_all([
+        Trabajador(nombre='Ana  Pérez', nombrecorto='APEREZ', email='ana@empresa.com', activo=True),
+        Trabajador(nombre='José Núñez', nombrecorto='arq-1', activo=True),
+        Trabajador(nombre='PM1', nombrecorto='jefe', activo=True),
+    ])
+    db.session.commit()
+    return sqlite_app
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return resultado, len(sentencias)
+
+
+class TestNormalizacion:
+
+    @pytest.mark.parametrize('texto, clave, compacta, codigo', [
+        ('  Ana   PÉREZ ', 'ana perez', 'anaperez', 'ANAPEREZ'),
+        ('ARQ-1', 'arq-1', 'arq1', 'ARQ1'),
+        ('Straße', 'strasse', 'strasse', 'STRASSE'),
+        ('   ', None, None, None),
+        (None, None, None, None),
+    ])
+    def test_claves(self, texto, clave, compacta, codigo):
+        assert normalizar_clave(texto) == clave
+        assert compactar_clave(texto) == compacta
+        assert codigo_trabajador(texto) == codigo
+
+    def test_el_modelo_guarda_las_claves(self, sqlite_app):
+        trabajador = Trabajador.query.filter_by(nombrecorto='arq-1').one()
+        assert (trabajador.nombre_normalizado, trabajador.nombrecorto_normalizado) == ('jose nunez', 'arq-1')
+        trabajador.nombrecorto = 'ÁRQ 2'
+        db.session.commit()
+        assert db.session.get(Trabajador, trabajador.id).nombrecorto_normalizado == 'arq 2'
+
+
+class TestResolutor:
+
+    def test_prioridad_codigo_compacto_y_nombre(self, sqlite_app):
+        resolutor, consultas = _contar_consultas(lambda: ResolutorRecursos().cargar())
+        assert consultas == 1
+
+        ids = {t.nombrecorto: t.id for t in Trabajador.query}
+        assert resolutor.resolver('aperez') == ids['APEREZ']
+        assert resolutor.resolver('ANA PEREZ') == ids['APEREZ']      # Por nombre, sin tildes
+        assert resolutor.resolver('ARQ1') == ids['arq-1']            # Código compacto
+        assert resolutor.resolver('jose  nuñez') == ids['arq-1']
+        assert resolutor.resolver('pm1') == ids['jefe']              # Nombre de otro trabajador
+        assert resolutor.resolver('Desconocido') is None
+        assert resolutor.codigo('Ana Pérez') == 'APEREZ'
+        assert resolutor.codigo('Nuevo Recurso') == 'NUEVORECURSO'
+
+    def test_pendientes_se_crean_en_un_insert(self, sqlite_app):
+        db.session.add(Trabajador(nombre='Otro', nombrecorto='X', email='nuevo@empresa.com', activo=True))
+        db.session.commit()
+        resolutor = ResolutorRecursos().cargar()
+        assert resolutor.registrar('Nuevo') == 'NUEVO'
+        assert resolutor.registrar('nuevo') == 'NUEVO'
+        assert resolutor.registrar('Ana Pérez') == 'ANAPEREZ' and resolutor.pendientes == ['ANAPEREZ', 'NUEVO']
+
+        creados, consultas = _contar_consultas(resolutor.crear_pendientes)
+        # Emails ocupados, INSERT y lectura de ids
+        assert consultas == 3 and set(creados) == {'ANAPEREZ', 'NUEVO'}
+        nuevo = db.session.get(Trabajador, creados['NUEVO'])
+        assert nuevo.email.startswith('nuevo2') and nuevo.nombrecorto_normalizado == 'nuevo'
+        assert resolutor.resolver('nuevo') == creados['NUEVO'] and not resolutor.pendientes
+
+    def test_carga_restringida_y_busqueda_puntual(self, sqlite_app):
+        resolutor, consultas = _contar_consultas(lambda: ResolutorRecursos().cargar(['José Nuñez', 'zzz']))
+        assert consultas == 1
+        assert resolutor.resolver('jose nunez') is not None and resolutor.resolver('aperez') is None
+
+        assert buscar_trabajador_por_clave('ANA PÉREZ').nombrecorto == 'APEREZ'
+        assert buscar_trabajador_por_clave('PM1').nombrecorto == 'jefe'
+        assert buscar_trabajador_por_clave('nadie') is None
+
+
+class TestImportacion:
+
+    def test_gantt_resuelve_sin_consultas_por_recurso(self, sqlite_app, tmp_path):
+        wb = Workbook()
+        wb.active.append(['ID', 'EDT', 'Nombre de tarea', 'Duración', 'Comienzo', 'Fin', 'Recursos'])
+        for i in range(1, 301):
+            recursos = 'APEREZ[50%];ARQ1;NUEVO1' if i % 2 else 'jefe, NUEVO2'
+            wb.active.append([i, f'1.{i}', f'Tarea {i}', 1, date(2026, 1, 5), date(2026, 1, 5), recursos])
+        archivo = tmp_path / 'gantt.xlsx'
+        wb.save(archivo)
+
+        resultado, consultas = _contar_consultas(
+            lambda: GanttIngestor(requerimiento_id=1, tamano_lote=100).importar(str(archivo))
+        )
+
+        assert resultado['success'] and resultado['avances_creados'] == 750
+        assert Trabajador.query.count() == 5
+        assert AvanceActividad.query.count() == 750
+        # Sin consultas por recurso: el total no crece con las 750 asignaciones
+        assert consultas < 30
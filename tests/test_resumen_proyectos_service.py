@@ -0,0 +1,149 @@
+"""
+Tests del resumen materializado de proyectos (app/services/resumen_proyectos_service.py)
+"""
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, Requerimiento, ResumenProyecto
+from app.services.progreso_service import ArbolProgresoEDT
+from app.services.resumen_proyectos_service import (
+    ESTADO_ATRASADO, ESTADO_EN_FECHA, actividades_con_estado, calcular_resumen, estado_cronograma,
+    refrescar_resumenes, resumenes_proyectos
+)
+
+HOY = date(2026, 3, 1)
+
+
+def _proyecto(requerimiento_id, actividades=4, id_estado=5):
+    """Proyecto con un resumen '1' y `actividades - 1` hojas de 10 días desde el 1 de febrero"""
+    db.session.add(Requerimiento(id=requerimiento_id, nombre=f'Proyecto {requerimiento_id}', id_sector=1,
+                                 id_tiporecinto=1, id_recinto=1, id_estado=id_estado))
+    db.session.add(ActividadProyecto(requerimiento_id=requerimiento_id, edt='1', nombre_tarea='Resumen',
+                                     fecha_inicio=date(2026, 2, 1), fecha_fin=date(2026, 4, 1), duracion=60,
+                                     progreso=50))
+    for i in range(1, actividades):
+        db.session.add(ActividadProyecto(
+            requerimiento_id=requerimiento_id, edt=f'1.{i}', nombre_tarea=f'Tarea {i}', nivel_esquema=2,
+            fecha_inicio=date(2026, 2, 1), fecha_fin=date(2026, 2, 11), duracion=10, progreso=100 if i == 1 else 0
+        ))
+    db.session.commit()
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return resultado, len(sentencias)
+
+
+class TestCalculo:
+
+    @pytest.mark.parametrize('inicio, fin, progreso, esperado', [
+        (date(2026, 3, 5), date(2026, 3, 15), 0, (0, ESTADO_EN_FECHA)),      # No comienza
+        (date(2026, 2, 1), date(2026, 2, 10), 90, (100, ESTADO_ATRASADO)),   # Venció sin terminar
+        (date(2026, 2, 1), date(2026, 2, 10), 100, (100, ESTADO_EN_FECHA)),
+        (date(2026, 2, 20), date(2026, 3, 10), 45, (50.0, ESTADO_EN_FECHA)),  # Dentro de la tolerancia
+        (date(2026, 2, 20), date(2026, 3, 10), 40, (50.0, ESTADO_ATRASADO)),
+        (date(2026, 3, 1), date(2026, 3, 1), 0, (0, ESTADO_EN_FECHA)),       # Hito
+    ])
+    def test_estado_cronograma(self, inicio, fin, progreso, esperado):
+        assert estado_cronograma(inicio, fin, progreso, HOY) == esperado
+
+    def test_categorias_excluyentes_y_ponderacion_por_hojas(self):
+        def actividad(edt, inicio, fin, duracion, progreso, critica=False):
+            return SimpleNamespace(edt=edt, fecha_inicio=inicio, fecha_fin=fin, duracion=duracion, progreso=progreso,
+                                   es_critica=critica)
+
+        resumen = calcular_resumen([
+            actividad('1', date(2026, 2, 1), date(2026, 4, 1), 60, 45, True),       # Resumen: no pondera
+            actividad('1.1', date(2026, 2, 1), date(2026, 2, 10), 10, 100),         # Terminada
+            actividad('1.2', date(2026, 2, 1), date(2026, 2, 10), 10, 50, True),    # Crítica atrasada
+            actividad('1.3', date(2026, 3, 10), date(2026, 3, 20), 30, 0, True),    # No iniciada
+        ], HOY)
+
+        assert resumen['total_actividades'] == 4
+        assert (resumen['actividades_terminadas'], resumen['actividades_atrasadas'],
+                resumen['actividades_no_iniciadas'], resumen['actividades_en_fecha']) == (1, 1, 1, 1)
+        assert resumen['progreso_ponderado'] == 30.0  # (100*10 + 50*10 + 0*30) / 50
+        assert resumen['progreso_esperado'] == 40.0   # (100*10 + 100*10 + 0*30) / 50
+        assert (resumen['actividades_criticas'], resumen['criticas_atrasadas']) == (3, 1)
+
+
+class TestResumenMaterializado:
+
+    def test_lectura_unica_cuando_esta_vigente(self, sqlite_app):
+        _proyecto(1, actividades=5)
+        _proyecto(2, actividades=50)
+        _proyecto(3, id_estado=4)  # No aparece en /resumen
+
+        proyectos, _ = _contar_consultas(lambda: resumenes_proyectos(HOY))
+        assert [p['id'] for p in proyectos] == [1, 2]
+        assert proyectos[0]['total_actividades'] == 5 and proyectos[0]['actividades_terminadas'] == 1
+        assert proyectos[1]['actividades_atrasadas'] == 48
+
+        _, consultas = _contar_consultas(lambda: resumenes_proyectos(HOY))
+        assert consultas == 1
+
+    def test_proyecto_sin_actividades_no_se_recalcula_cada_vez(self, sqlite_app):
+        db.session.add(Requerimiento(id=1, nombre='Vacío', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=5))
+        db.session.commit()
+
+        assert resumenes_proyectos(HOY) == []
+        assert _contar_consultas(lambda: resumenes_proyectos(HOY))[1] == 1
+
+    def test_escritura_orm_marca_y_recalcula_solo_ese_proyecto(self, sqlite_app):
+        _proyecto(1)
+        _proyecto(2)
+        resumenes_proyectos(HOY)
+
+        actividad = ActividadProyecto.query.filter_by(requerimiento_id=1, edt='1.2').one()
+        actividad.progreso = 100
+        db.session.commit()
+        assert not db.session.get(ResumenProyecto, 1).vigente
+        assert db.session.get(ResumenProyecto, 2).vigente
+
+        proyectos = {p['id']: p for p in resumenes_proyectos(HOY)}
+        assert proyectos[1]['actividades_terminadas'] == 2
+        assert db.session.get(ResumenProyecto, 1).vigente
+
+    def test_escritura_masiva_de_progreso_marca_el_proyecto(self, sqlite_app):
+        _proyecto(1)
+        resumenes_proyectos(HOY)
+
+        arbol = ArbolProgresoEDT(1)
+        arbol.recalcular_todo()
+        db.session.commit()
+        assert not db.session.get(ResumenProyecto, 1).vigente
+
+    def test_cambio_de_dia_recalcula_el_progreso_esperado(self, sqlite_app):
+        _proyecto(1)
+        antes = {p['id']: p for p in resumenes_proyectos(date(2026, 1, 1))}[1]
+        despues = {p['id']: p for p in resumenes_proyectos(HOY)}[1]
+        assert antes['actividades_atrasadas'] == 0 and despues['actividades_atrasadas'] == 2
+        assert db.session.get(ResumenProyecto, 1).fecha_calculo == HOY
+
+    def test_reconstruccion_completa(self, sqlite_app):
+        _proyecto(1)
+        _proyecto(2, id_estado=4)
+
+        assert refrescar_resumenes(hoy=HOY) == 2
+        db.session.commit()
+        assert ResumenProyecto.query.count() == 2
+
+    def test_detalle_de_actividades(self, sqlite_app):
+        _proyecto(1)
+        actividades = actividades_con_estado(1, HOY)
+        assert [a['edt'] for a in actividades] == ['1', '1.1', '1.2', '1.3']
+        assert actividades[1]['estado_cronograma'] == ESTADO_EN_FECHA
+        assert actividades[2]['estado_cronograma'] == ESTADO_ATRASADO
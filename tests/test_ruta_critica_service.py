@@ -0,0 +1,214 @@
+"""
+Tests de la ruta crítica y holguras (app/services/ruta_critica_service.py)
+"""
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, CronogramaProyecto, Requerimiento
+from app.services.gantt_import_service import importar_gantt_xlsx
+from app.services.resumen_proyectos_service import resumenes_proyectos
+from app.services.ruta_critica_service import (
+    asegurar_cronogramas, calcular_ruta_critica, parsear_predecesoras, recalcular_cronogramas
+)
+from benchmarks.datos_sinteticos import generar_gantt_xlsx
+
+
+def _actividad(id, edt, inicio, fin, predecesoras=None, duracion=None, id_gantt=None):
+    return SimpleNamespace(id=id, edt=edt, id_gantt=id_gantt, fecha_inicio=inicio, fecha_fin=fin,
+                           duracion=(fin - inicio).days + 1 if duracion is None else duracion,
+                           predecesoras=predecesoras)
+
+
+def _red_basica():
+    """Resumen '1' con A -> B -> hito D, y C en paralelo con holgura"""
+    return [
+        _actividad(1, '1', date(2026, 2, 1), date(2026, 2, 10)),
+        _actividad(2, '1.1', date(2026, 2, 1), date(2026, 2, 5)),                   # A
+        _actividad(3, '1.2', date(2026, 2, 6), date(2026, 2, 10), '2'),              # B
+        _actividad(4, '1.3', date(2026, 2, 1), date(2026, 2, 3)),                    # C
+        _actividad(5, '1.4', date(2026, 2, 10), date(2026, 2, 10), '3;4', duracion=0),  # Hito D
+    ]
+
+
+def _proyecto(requerimiento_id=1):
+    """La red básica guardada en base de datos, con las fechas de la tabla"""
+    db.session.add(Requerimiento(id=requerimiento_id, nombre='Proyecto', id_sector=1, id_tiporecinto=1,
+                                 id_recinto=1, id_estado=5))
+    for actividad in _red_basica():
+        db.session.add(ActividadProyecto(
+            requerimiento_id=requerimiento_id, edt=actividad.edt, nombre_tarea=f'Tarea {actividad.edt}',
+            fecha_inicio=actividad.fecha_inicio, fecha_fin=actividad.fecha_fin, duracion=actividad.duracion,
+            predecesoras=actividad.predecesoras, id_gantt=actividad.id, progreso=0
+        ))
+    db.session.commit()
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return resultado, len(sentencias)
+
+
+class TestParseo:
+
+    @pytest.mark.parametrize('texto, esperado', [
+        ('3', ([(3, 'FC', 0)], 0)),
+        ('2;3', ([(2, 'FC', 0), (3, 'FC', 0)], 0)),
+        ('5CC+2 días', ([(5, 'CC', 2)], 0)),
+        ('7 FF-1d', ([(7, 'FF', -1)], 0)),
+        ('4SS+1 wk, 6sf', ([(4, 'CC', 7), (6, 'CF', 0)], 0)),
+        ('2FS+50%', ([(2, 'FC', 0)], 0)),
+        ('3FC-30 min', ([(3, 'FC', 0)], 0)),
+        ('3FC+960 m', ([(3, 'FC', 2)], 0)),
+        ('3FC+16 h', ([(3, 'FC', 2)], 0)),
+        ('3FC+1 ms', ([(3, 'FC', 30)], 0)),
+        ('3FC+2 meses', ([(3, 'FC', 60)], 0)),
+        ('3FC+1 mo', ([(3, 'FC', 30)], 0)),
+        ('3FC+2 s', ([(3, 'FC', 14)], 0)),
+        ('3FC+1,5 días', ([(3, 'FC', 2)], 0)),
+        ('3FC+1,5 días,4', ([(3, 'FC', 2), (4, 'FC', 0)], 0)),
+        ('2,3', ([(2, 'FC', 0), (3, 'FC', 0)], 0)),
+        ('x;3', ([(3, 'FC', 0)], 1)),
+        (None, ([], 0)),
+    ])
+    def test_formatos_de_ms_project(self, texto, esperado):
+        assert parsear_predecesoras(texto) == esperado
+
+
+class TestCalculo:
+
+    def test_pasadas_adelante_y_atras(self):
+        resultados, estadisticas = calcular_ruta_critica(_red_basica())
+
+        criticas = {actividad_id for actividad_id, r in resultados.items() if r['es_critica']}
+        assert criticas == {1, 2, 3, 5}
+        assert resultados[4]['holgura_total'] == 7
+        assert (resultados[4]['inicio_tardio'], resultados[4]['fin_tardio']) == (date(2026, 2, 8), date(2026, 2, 10))
+        assert (resultados[3]['inicio_temprano'], resultados[3]['fin_temprano']) == (date(2026, 2, 6), date(2026, 2, 10))
+        # El hito ocurre el día en que termina su predecesora
+        assert resultados[5]['inicio_temprano'] == resultados[5]['fin_temprano'] == date(2026, 2, 10)
+        # El resumen toma el rango y la menor holgura de sus hojas
+        assert (resultados[1]['inicio_temprano'], resultados[1]['fin_temprano']) == (date(2026, 2, 1), date(2026, 2, 10))
+        assert resultados[1]['holgura_total'] == 0
+        assert estadisticas == {'inicio': date(2026, 2, 1), 'fin': date(2026, 2, 10), 'actividades_criticas': 4,
+                                'enlaces': 3, 'enlaces_invalidos': 0, 'enlaces_en_ciclo': 0}
+
+    @pytest.mark.parametrize('vinculo, inicio_y, holgura_y', [
+        ('1CC+2d', date(2026, 2, 3), 4),   # Comienza 2 días después que X
+        ('1FF', date(2026, 2, 7), 0),      # Termina junto con X
+        ('1', date(2026, 2, 11), 0),       # Fin a comienzo
+    ])
+    def test_tipos_de_vinculo(self, vinculo, inicio_y, holgura_y):
+        resultados, _ = calcular_ruta_critica([
+            _actividad(1, '1', date(2026, 2, 1), date(2026, 2, 10)),
+            _actividad(2, '2', date(2026, 2, 1), date(2026, 2, 4), vinculo),
+        ])
+        assert resultados[2]['inicio_temprano'] == inicio_y
+        assert resultados[2]['holgura_total'] == holgura_y
+        assert resultados[1]['es_critica']
+
+    def test_vinculo_desde_un_resumen_alcanza_a_todas_sus_hojas(self):
+        resultados, _ = calcular_ruta_critica([
+            _actividad(1, '1', date(2026, 2, 1), date(2026, 2, 5)),
+            _actividad(2, '1.1', date(2026, 2, 1), date(2026, 2, 2)),
+            _actividad(3, '1.2', date(2026, 2, 1), date(2026, 2, 5)),
+            _actividad(4, '2', date(2026, 2, 1), date(2026, 2, 3), '1'),
+        ])
+        assert resultados[4]['inicio_temprano'] == date(2026, 2, 6)
+        assert resultados[2]['holgura_total'] == 3 and not resultados[2]['es_critica']
+        assert resultados[3]['es_critica']
+
+    def test_referencias_por_id_gantt(self):
+        # Sin id_gantt la posición hace de Id; con id_gantt se usa el del archivo
+        resultados, estadisticas = calcular_ruta_critica([
+            _actividad(10, '1', date(2026, 2, 1), date(2026, 2, 5), id_gantt=7),
+            _actividad(11, '2', date(2026, 2, 1), date(2026, 2, 2), '7;99', id_gantt=8),
+        ])
+        assert resultados[11]['inicio_temprano'] == date(2026, 2, 6)
+        assert (estadisticas['enlaces'], estadisticas['enlaces_invalidos']) == (1, 1)
+
+    def test_dependencias_circulares_no_bloquean_el_calculo(self):
+        resultados, estadisticas = calcular_ruta_critica([
+            _actividad(1, '1', date(2026, 2, 1), date(2026, 2, 2), '2'),
+            _actividad(2, '2', date(2026, 2, 3), date(2026, 2, 4), '1'),
+            _actividad(3, '3', date(2026, 2, 5), date(2026, 2, 6), '2'),
+        ])
+        assert estadisticas['enlaces_en_ciclo'] == 1
+        # Fuera del ciclo el orden se respeta: 3 sigue a 2, que sigue a 1
+        assert resultados[2]['inicio_temprano'] == date(2026, 2, 3)
+        assert resultados[3]['inicio_temprano'] == date(2026, 2, 5)
+        assert all(r['es_critica'] for r in resultados.values())
+
+
+class TestPersistencia:
+
+    def test_recalculo_guarda_resultados_sin_tocar_updated_at(self, sqlite_app):
+        _proyecto()
+        marca = datetime(2020, 1, 1)
+        db.session.execute(ActividadProyecto.__table__.update().values(updated_at=marca))
+
+        assert recalcular_cronogramas([1]) == 1
+        db.session.commit()
+
+        paralela = ActividadProyecto.query.filter_by(edt='1.3').one()
+        assert (paralela.holgura_total, paralela.es_critica) == (7, False)
+        assert ActividadProyecto.query.filter_by(es_critica=True).count() == 4
+        assert {a.updated_at for a in ActividadProyecto.query} == {marca}
+        cronograma = db.session.get(CronogramaProyecto, 1)
+        assert cronograma.vigente and cronograma.fin == date(2026, 2, 10) and cronograma.actividades_criticas == 4
+
+        assert _contar_consultas(lambda: asegurar_cronogramas([1])) == (0, 1)
+
+    def test_solo_fechas_y_vinculos_invalidan(self, sqlite_app):
+        _proyecto()
+        recalcular_cronogramas([1])
+        db.session.commit()
+
+        paralela = ActividadProyecto.query.filter_by(edt='1.3').one()
+        paralela.progreso = 50
+        db.session.commit()
+        assert db.session.get(CronogramaProyecto, 1).vigente
+
+        paralela.fecha_fin = date(2026, 2, 12)
+        db.session.commit()
+        assert not db.session.get(CronogramaProyecto, 1).vigente
+
+        assert asegurar_cronogramas([1]) == 1
+        db.session.commit()
+        assert ActividadProyecto.query.filter_by(edt='1.3').one().es_critica
+
+    def test_importacion_gantt_guarda_id_y_predecesoras(self, sqlite_app, tmp_path):
+        db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+        db.session.commit()
+        ruta = tmp_path / 'gantt.xlsx'
+        plan = generar_gantt_xlsx(ruta, actividades=60, trabajadores=3)
+        assert importar_gantt_xlsx(str(ruta), 1)['success']
+
+        primera = ActividadProyecto.query.filter_by(edt=plan[0]['edt']).one()
+        assert primera.id_gantt == plan[0]['id']
+        con_predecesora = next(a for a in plan if a['predecesoras'])
+        assert ActividadProyecto.query.filter_by(edt=con_predecesora['edt']).one().predecesoras == con_predecesora['predecesoras']
+
+        asegurar_cronogramas([1])
+        cronograma = db.session.get(CronogramaProyecto, 1)
+        assert cronograma.enlaces == sum(1 for a in plan if a['predecesoras'])
+        assert cronograma.enlaces_invalidos == 0 and cronograma.actividades_criticas > 0
+
+    def test_resumen_cuenta_criticas_atrasadas(self, sqlite_app):
+        _proyecto()
+        proyecto, = resumenes_proyectos(date(2026, 2, 20))
+        # Todo venció sin avance (el hito no cuenta como atrasado); C es la única no crítica
+        assert proyecto['actividades_atrasadas'] == 4
+        assert (proyecto['actividades_criticas'], proyecto['criticas_atrasadas']) == (4, 3)
@@ -0,0 +1,119 @@
+"""
+Tests del lector de dumps SQL en streaming (app/utils/sql_stream.py)
+"""
+import gzip
+import io
+
+import pytest
+
+from app.utils.sql_stream import LectorDumpSQL, iterar_sentencias
+
+
+def _sentencias(sql):
+    return list(iterar_sentencias(io.StringIO(sql)))
+
+
+class TestIterarSentencias:
+
+    def test_delimitador_dentro_de_strings_e_identificadores(self):
+        sql = (
+            "CREATE TABLE `a;b` (id int);\n"
+            "INSERT INTO t VALUES ('x;y','it''s','a\\';b',\"q;\");\n"
+        )
+        assert _sentencias(sql) == [
+            "CREATE TABLE `a;b` (id int)",
+            "INSERT INTO t VALUES ('x;y','it''s','a\\';b',\"q;\")",
+        ]
+
+    def test_comentarios_se_descartan_salvo_ejecutables(self):
+        sql = (
+            "-- MySQL dump\n"
+            "/*!40101 SET NAMES utf8mb4 */;\n"
+            "/* bloque;\n multilinea */ SELECT 1; # fin\n"
+            "SELECT '-- no es comentario', '/* tampoco */';\n"
+        )
+        assert _sentencias(sql) == [
+            "/*!40101 SET NAMES utf8mb4 */",
+            "SELECT 1",
+            "SELECT '-- no es comentario', '/* tampoco */'",
+        ]
+
+    def test_string_multilinea(self):
+        assert _sentencias("INSERT INTO t VALUES ('linea 1;\nlinea 2');") == [
+            "INSERT INTO t VALUES ('linea 1;\nlinea 2')"
+        ]
+
+    def test_delimiter_para_triggers(self):
+        sql = (
+            "DELIMITER ;;\n"
+            "CREATE TRIGGER tr BEFORE INSERT ON t FOR EACH ROW BEGIN SET @a=1; SET @b=2; END ;;\n"
+            "DELIMITER ;\n"
+            "SELECT 2"
+        )
+        assert _sentencias(sql) == [
+            "CREATE TRIGGER tr BEFORE INSERT ON t FOR EACH ROW BEGIN SET @a=1; SET @b=2; END",
+            "SELECT 2",
+        ]
+
+
+class TestLectorDumpSQL:
+
+    @pytest.mark.parametrize('comprimido', [True, False])
+    def test_lee_gzip_y_plano_con_bom(self, tmp_path, comprimido):
+        contenido = '\ufeffINSERT INTO t VALUES (\'ñandú\');\nSELECT 1;\n'.encode('utf-8')
+        ruta = tmp_path / ('dump.sql.gz' if comprimido else 'dump.sql')
+        ruta.write_bytes(gzip.compress(contenido) if comprimido else contenido)
+
+        with LectorDumpSQL(str(ruta), prefijo=['SET FOREIGN_KEY_CHECKS=0'], sufijo=['COMMIT']) as lector:
+            sentencias = list(lector)
+
+        assert sentencias == [
+            'SET FOREIGN_KEY_CHECKS=0',
+            "INSERT INTO t VALUES ('ñandú')",
+            'SELECT 1',
+            'COMMIT',
+        ]
+        assert lector.sentencias_leidas == 4
+        assert lector.fraccion_leida == 1.0
+
+
+class TestEjecucionEnStreaming:
+
+    def test_execute_statements_optimized_consume_el_lector(self, tmp_path, monkeypatch):
+        from app.services.backup_service import EnhancedBackupManager
+
+        class CursorFalso:
+            def __init__(self, ejecutadas):
+                self.ejecutadas = ejecutadas
+
+            def execute(self, sql):
+                self.ejecutadas.append(sql)
+
+            def close(self):
+                pass
+
+        class ConexionFalsa:
+            open = True
+
+            def __init__(self):
+                self.ejecutadas = []
+
+            def cursor(self):
+                return CursorFalso(self.ejecutadas)
+
+            def commit(self):
+                pass
+
+        ruta = tmp_path / 'dump.sql.gz'
+        ruta.write_bytes(gzip.compress(b''.join(b'INSERT INTO t VALUES (%d);\n' % n for n in range(7))))
+        monkeypatch.setattr('time.sleep', lambda segundos: None)
+
+        manager = EnhancedBackupManager(backup_dir=str(tmp_path))
+        conexion = ConexionFalsa()
+        with LectorDumpSQL(str(ruta)) as lector:
+            stats = manager._execute_statements_optimized(conexion, lector, {'batch_size': 3})
+
+        assert stats['executed'] == 7
+        assert stats['batches'] == 3
+        assert conexion.ejecutadas[-1] == 'INSERT INTO t VALUES (6)'
+        assert manager.progress_tracker.progress_percent == 100
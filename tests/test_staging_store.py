@@ -0,0 +1,74 @@
+"""
+Tests del almacén temporal en disco (app/services/staging_store.py) y de las
+actividades temporales de proyectos_controller que lo usan
+"""
+import os
+import time
+from datetime import date, datetime
+
+import pytest
+from flask import Flask, session
+
+from app.services.staging_store import StagingStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StagingStore(str(tmp_path / 'staging'), ttl=60)
+
+
+class TestStagingStore:
+
+    def test_ida_y_vuelta_conserva_fechas(self, store):
+        datos = [{'edt': '1.1', 'fecha_inicio': date(2026, 1, 5), 'registro': datetime(2026, 1, 5, 8, 30)}]
+        token = store.guardar(datos)
+
+        assert store.cargar(token) == datos
+        assert isinstance(store.cargar(token)[0]['fecha_inicio'], date)
+
+    def test_reemplazar_mantiene_el_token(self, store):
+        token = store.guardar([1])
+        assert store.guardar([1, 2], token=token) == token
+        assert store.cargar(token) == [1, 2]
+
+    def test_expiracion_y_eliminacion(self, store):
+        vencido = store.guardar(['viejo'])
+        vigente = store.guardar(['nuevo'])
+        antes = time.time() - 120
+        os.utime(store._ruta(vencido), (antes, antes))
+
+        assert store.cargar(vencido, defecto=[]) == []
+        assert not os.path.exists(store._ruta(vencido))
+
+        store.eliminar(vigente)
+        assert store.cargar(vigente) is None
+
+    def test_tokens_invalidos(self, store):
+        assert store.cargar('../../etc/passwd', defecto=[]) == []
+        with pytest.raises(ValueError):
+            store.guardar([], token='../fuera')
+
+
+class TestActividadesTemporales:
+
+    def test_en_la_sesion_solo_viaja_el_token(self, tmp_path):
+        from app.controllers.proyectos_controller import (
+            get_actividades_temp, set_actividades_temp_storage, clear_actividades_temp_storage
+        )
+
+        app = Flask(__name__)
+        app.config.update(SECRET_KEY='test', STAGING_FOLDER=str(tmp_path))
+        actividades = [{'edt': str(i), 'nombre_tarea': 'x' * 200, 'fecha_inicio': date(2026, 1, 1)} for i in range(500)]
+
+        with app.test_request_context():
+            session['actividades_temp_storage'] = {'7': [{'edt': 'legacy'}]}
+            set_actividades_temp_storage(7, actividades)
+
+            assert 'actividades_temp_storage' not in session
+            assert list(session['actividades_temp_tokens']) == ['7']
+            assert get_actividades_temp(7) == actividades
+            assert get_actividades_temp(8) == []
+
+            clear_actividades_temp_storage(7)
+            assert get_actividades_temp(7) == []
+            assert os.listdir(tmp_path) == []
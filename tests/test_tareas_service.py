@@ -0,0 +1,175 @@
+"""
+Tests de la cola de tareas en segundo plano (app/services/tareas_service.py)
+"""
+import os
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+import openpyxl
+import pytest
+
+from app import db
+from app.controllers_main import controllers_bp  # Registra los handlers de Gantt y control
+from app.models import ActividadProyecto, Requerimiento, TareaSegundoPlano
+from app.services import tareas_service
+from app.services.tareas_service import (
+    encolar, procesar_pendientes, cancelar, recuperar_abandonadas, reclamar, TareaFallida
+)
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app, tmp_path):
+    """La aplicación SQLite de conftest; las tareas esperan al worker"""
+    sqlite_app.config.update(TAREAS_EN_PROCESO=False, STAGING_FOLDER=str(tmp_path))
+    return sqlite_app
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Registro de handlers aislado para cada test"""
+    registro = {}
+    monkeypatch.setattr(tareas_service, '_HANDLERS', registro)
+    return registro
+
+
+def _tarea(tarea_id):
+    db.session.expire_all()
+    return db.session.get(TareaSegundoPlano, tarea_id)
+
+
+class TestCola:
+
+    def test_ejecuta_y_guarda_progreso_y_resultado(self, sqlite_app, handlers):
+        vistos = []
+
+        @tareas_service.registrar_tarea('sumar')
+        def sumar(contexto, a, b):
+            contexto.progreso(50, 'Sumando', forzar=True, parcial=a)
+            # Otro proceso vería el progreso ya confirmado
+            with db.engine.connect() as conexion:
+                vistos.append(conexion.execute(db.select(TareaSegundoPlano.progreso)).scalar())
+            return {'suma': a + b}
+
+        tarea_id = encolar('sumar', {'a': 2, 'b': 3})
+        assert _tarea(tarea_id).estado == 'pendiente'
+
+        assert procesar_pendientes() == 1
+        tarea = _tarea(tarea_id)
+        assert tarea.estado == 'completada' and tarea.progreso == 100
+        assert tarea.resultado == {'suma': 5}
+        assert tarea.detalles == {'parcial': 2} and tarea.intentos == 1
+        assert vistos == [50]
+
+    def test_reclamo_unico(self, sqlite_app, handlers):
+        tareas_service.registrar_tarea('nada')(lambda contexto: None)
+        tarea_id = encolar('nada')
+
+        assert reclamar('worker-a') == tarea_id
+        assert reclamar('worker-b') is None
+        assert _tarea(tarea_id).worker == 'worker-a'
+
+    def test_tipo_desconocido(self, sqlite_app, handlers):
+        with pytest.raises(ValueError):
+            encolar('no_existe')
+
+    def test_en_proceso(self, sqlite_app, handlers):
+        tareas_service.registrar_tarea('inmediata')(lambda contexto: 'ok')
+        sqlite_app.config['TAREAS_EN_PROCESO'] = True
+
+        assert _tarea(encolar('inmediata')).resultado == 'ok'
+
+
+class TestReintentosYCancelacion:
+
+    def test_reintento_con_espera_y_luego_fallida(self, sqlite_app, handlers):
+        @tareas_service.registrar_tarea('inestable', max_intentos=2)
+        def inestable(contexto):
+            raise ConnectionError('base de datos caída')
+
+        tarea_id = encolar('inestable')
+        procesar_pendientes()
+        tarea = _tarea(tarea_id)
+        assert tarea.estado == 'pendiente' and tarea.intentos == 1
+        assert tarea.disponible_desde > datetime.utcnow()
+        assert procesar_pendientes() == 0  # Aún no vence la espera
+
+        tarea.disponible_desde = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        procesar_pendientes()
+        tarea = _tarea(tarea_id)
+        assert tarea.estado == 'fallida' and tarea.error == 'base de datos caída'
+
+    def test_error_definitivo_sin_reintentos(self, sqlite_app, handlers):
+        @tareas_service.registrar_tarea('invalida')
+        def invalida(contexto):
+            raise TareaFallida('Archivo sin columnas')
+
+        tarea_id = encolar('invalida')
+        procesar_pendientes()
+        assert _tarea(tarea_id).estado == 'fallida' and _tarea(tarea_id).intentos == 1
+
+    def test_cancelar_pendiente_y_en_curso(self, sqlite_app, handlers):
+        ejecutadas = []
+
+        @tareas_service.registrar_tarea('larga')
+        def larga(contexto):
+            ejecutadas.append(contexto.tarea_id)
+            cancelar(contexto.tarea_id)  # Como si llegara desde otra request
+            contexto.progreso(10, 'Paso 1', forzar=True)
+            ejecutadas.append('no llega')
+
+        pendiente = encolar('larga')
+        assert cancelar(pendiente)
+        en_curso = encolar('larga')
+
+        procesar_pendientes()
+        assert _tarea(pendiente).estado == 'cancelada'
+        assert _tarea(en_curso).estado == 'cancelada'
+        assert ejecutadas == [en_curso]
+        assert not cancelar(en_curso)
+
+    def test_recupera_tareas_de_un_worker_caido(self, sqlite_app, handlers):
+        tareas_service.registrar_tarea('nada')(lambda contexto: None)
+        reintentable, agotada = encolar('nada'), encolar('nada', max_intentos=1)
+        reclamar('caido', tarea_id=reintentable)
+        reclamar('caido', tarea_id=agotada)
+        TareaSegundoPlano.query.update({'latido': datetime.utcnow() - timedelta(hours=1)})
+        db.session.commit()
+
+        assert recuperar_abandonadas() == 1
+        assert _tarea(reintentable).estado == 'pendiente' and _tarea(reintentable).worker is None
+        assert _tarea(agotada).estado == 'fallida'
+
+
+class TestImportacionControlEnSegundoPlano:
+
+    def test_subida_asincrona(self, sqlite_app):
+        from flask_login import LoginManager
+
+        LoginManager(sqlite_app).user_loader(lambda user_id: None)
+        sqlite_app.register_blueprint(controllers_bp)
+        sqlite_app.config['TAREAS_EN_PROCESO'] = True
+
+        db.session.add(Requerimiento(id=1, nombre='Proyecto', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+        actividad = ActividadProyecto(requerimiento_id=1, edt='1.1', nombre_tarea='Tarea', duracion=9, progreso=0,
+                                      fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10))
+        db.session.add(actividad)
+        db.session.commit()
+
+        libro = openpyxl.Workbook()
+        libro.active.append(['Id', 'EDT', 'Nombre de tarea', 'Comienzo', 'Fin', 'Progreso (%)'])
+        libro.active.append([actividad.id, '1.1', 'Tarea', '01/01/2026', '10/01/2026', 40])
+        archivo = BytesIO()
+        libro.save(archivo)
+        archivo.seek(0)
+
+        respuesta = sqlite_app.test_client().post('/subir_control_actividades', data={
+            'archivo': (archivo, 'control.xlsx'), 'asincrono': '1'
+        })
+        assert respuesta.status_code == 202
+
+        tarea = _tarea(respuesta.get_json()['tarea_id'])
+        assert tarea.estado == 'completada', tarea.error
+        assert tarea.resultado['actualizadas'] == 1
+        assert float(db.session.get(ActividadProyecto, actividad.id).progreso) == 40
+        assert not os.path.exists(tarea.parametros['ruta'])
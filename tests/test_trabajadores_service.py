@@ -0,0 +1,89 @@
+"""
+Tests del análisis de trabajadores huérfanos (app/services/trabajadores_service.py)
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, AvanceActividad, HistorialAvanceActividad, Trabajador, TrabajadorRecinto
+from app.services.trabajadores_service import analizar_trabajadores, eliminar_trabajadores_huerfanos, clasificar
+
+
+def _trabajador(codigo):
+    trabajador = Trabajador(nombre=f'Trabajador {codigo}', nombrecorto=codigo, email=f'{codigo.lower()}@empresa.com', activo=True)
+    db.session.add(trabajador)
+    db.session.flush()
+    return trabajador
+
+
+@pytest.fixture
+def trabajadores(sqlite_app):
+    """Un trabajador por estado, más un admin que nunca se toca"""
+    actividad = ActividadProyecto(requerimiento_id=1, edt='1', nombre_tarea='Obra',
+                                  fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10), duracion=9)
+    db.session.add(actividad)
+    huerfano = _trabajador('HUE')
+    activo = _trabajador('ACT')
+    historico = _trabajador('HIS')
+    con_recinto = _trabajador('REC')
+    db.session.add(Trabajador(nombre='Admin', nombrecorto='admin', email='admin@empresa.com', activo=True))
+    db.session.flush()
+    db.session.add(AvanceActividad(requerimiento_id=1, trabajador_id=activo.id, actividad_id=actividad.id,
+                                   fecha_registro=date(2026, 1, 1)))
+    db.session.add(HistorialAvanceActividad(requerimiento_id=1, trabajador_id=historico.id, actividad_id=actividad.id))
+    db.session.add(TrabajadorRecinto(trabajador_id=con_recinto.id, recinto_id=1))
+    db.session.commit()
+    return {'huerfano': huerfano.id, 'activo': activo.id, 'historico': historico.id, 'recinto': con_recinto.id}
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return resultado, len(sentencias)
+
+
+class TestAnalisisTrabajadores:
+
+    def test_clasificar(self):
+        base = dict.fromkeys(['recursos_asignados', 'avances_pendientes', 'avances_historicos',
+                              'requerimientos_asignados', 'recintos_adicionales'], 0)
+        assert clasificar(base) == 'SIN_ASIGNACIONES'
+        assert clasificar({**base, 'avances_historicos': 2}) == 'HISTORICO_SIN_ASIGNACIONES'
+        assert clasificar({**base, 'avances_historicos': 2, 'avances_pendientes': 1}) == 'ACTIVO_CON_ASIGNACIONES'
+
+    def test_reporte_en_una_consulta(self, trabajadores):
+        reporte, consultas = _contar_consultas(analizar_trabajadores)
+
+        assert consultas == 1
+        assert reporte['total'] == 4
+        assert [t['id'] for t in reporte['SIN_ASIGNACIONES']] == [trabajadores['huerfano']]
+        assert [t['id'] for t in reporte['HISTORICO_SIN_ASIGNACIONES']] == [trabajadores['historico']]
+        activos = {t['id']: t for t in reporte['ACTIVO_CON_ASIGNACIONES']}
+        assert set(activos) == {trabajadores['activo'], trabajadores['recinto']}
+        assert activos[trabajadores['activo']]['avances_pendientes'] == 1
+        assert activos[trabajadores['recinto']]['sector'] == 'Sin sector'
+
+    def test_detalle_de_actividades(self, trabajadores):
+        reporte, consultas = _contar_consultas(lambda: analizar_trabajadores(con_actividades=True))
+
+        assert consultas == 2
+        activo = next(t for t in reporte['ACTIVO_CON_ASIGNACIONES'] if t['id'] == trabajadores['activo'])
+        assert [a['nombre'] for a in activo['actividades_detalle']] == ['Obra']
+
+    def test_eliminacion_por_lote_revalida_referencias(self, trabajadores):
+        eliminados = eliminar_trabajadores_huerfanos(list(trabajadores.values()))
+        db.session.commit()
+
+        assert eliminados == [trabajadores['huerfano']]
+        assert db.session.get(Trabajador, trabajadores['huerfano']) is None
+        assert db.session.get(Trabajador, trabajadores['activo']) is not None
+        assert Trabajador.query.filter_by(nombrecorto='admin').count() == 1
@@ -0,0 +1,232 @@
+"""
+Tests del listado paginado, las estadísticas y la validación por lotes de avances
+(app/services/validacion_avances_service.py)
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import event
+
+from app import db
+from app.models import ActividadProyecto, HistorialAvanceActividad, Requerimiento, Trabajador
+from app.services.validacion_avances_service import (
+    filtros_avances, contar_avances, pagina_avances, codificar_cursor, decodificar_cursor,
+    estadisticas_validacion, invalidar_estadisticas
+)
+
+
+@pytest.fixture
+def sqlite_app(sqlite_app):
+    """La aplicación SQLite de conftest sin estadísticas cacheadas de otros tests"""
+    invalidar_estadisticas()
+    return sqlite_app
+
+
+@pytest.fixture
+def avances(sqlite_app):
+    """25 avances en dos proyectos; varios comparten fecha_cambio para probar el desempate por id"""
+    db.session.add_all([
+        Requerimiento(id=1, nombre='Proyecto 1', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4),
+        Requerimiento(id=2, nombre='Proyecto 2', id_sector=1, id_tiporecinto=1, id_recinto=2, id_estado=4),
+    ])
+    trabajador = Trabajador(nombre='Arquitecto', nombrecorto='ARQ1', email='arq1@empresa.com', activo=True)
+    supervisor = Trabajador(nombre='Supervisor', nombrecorto='SUP', email='sup@empresa.com', activo=True)
+    db.session.add_all([trabajador, supervisor])
+    actividades = [
+        ActividadProyecto(requerimiento_id=req, edt='1', nombre_tarea=f'Tarea {req}',
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10), duracion=9)
+        for req in (1, 2)
+    ]
+    db.session.add_all(actividades)
+    db.session.flush()
+
+    base = datetime(2026, 1, 1, 8, 0)
+    for i in range(25):
+        requerimiento = 1 if i % 5 else 2
+        estado = ('rechazado' if i % 8 == 0 else 'validado') if i % 4 == 0 else 'pendiente'
+        db.session.add(HistorialAvanceActividad(
+            requerimiento_id=requerimiento, trabajador_id=trabajador.id,
+            actividad_id=actividades[requerimiento - 1].id,
+            progreso_anterior=i, progreso_nuevo=i + 1, diferencia=1,
+            fecha_cambio=base + timedelta(hours=i // 3),
+            validado=i % 4 == 0, validado_por_id=supervisor.id if i % 4 == 0 else None,
+            comentario_validacion=('RECHAZADO - Motivo: x' if i % 8 == 0 else 'Aprobado') if i % 4 == 0 else None,
+            estado_validacion=estado
+        ))
+    db.session.commit()
+
+
+def _contar_consultas(funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return resultado, sentencias
+
+
+def _recorrer(condiciones, limite):
+    ids, cursor = [], None
+    while True:
+        pagina = pagina_avances(condiciones, cursor=cursor, limite=limite)
+        ids.extend(a['id'] for a in pagina['avances'])
+        cursor = pagina['siguiente_cursor']
+        if not cursor:
+            return ids
+
+
+class TestListadoPaginado:
+
+    def test_cursor_ida_y_vuelta(self):
+        fecha = datetime(2026, 3, 4, 5, 6, 7)
+        assert decodificar_cursor(codificar_cursor(fecha, 42)) == (fecha, 42)
+        with pytest.raises(ValueError):
+            decodificar_cursor('no-es-un-cursor')
+
+    def test_paginas_cubren_todo_sin_repetir(self, avances):
+        condiciones = filtros_avances(estado='todos')
+        esperados = [h.id for h in HistorialAvanceActividad.query.order_by(
+            HistorialAvanceActividad.fecha_cambio.desc(), HistorialAvanceActividad.id.desc())]
+
+        assert _recorrer(condiciones, limite=4) == esperados
+        assert _recorrer(condiciones, limite=100) == esperados
+
+    def test_filtros_de_estado_y_recinto(self, avances):
+        pendientes = pagina_avances(filtros_avances(estado='pendiente'), limite=100)['avances']
+        rechazados = pagina_avances(filtros_avances(estado='rechazado'), limite=100)['avances']
+        validados = pagina_avances(filtros_avances(estado='validado'), limite=100)['avances']
+
+        assert {a['estado_visual'] for a in pendientes} == {'Pendiente'}
+        assert {a['estado_visual'] for a in rechazados} == {'Rechazado'}
+        assert {a['estado_visual'] for a in validados} == {'Validado'}
+        assert len(pendientes) + len(rechazados) + len(validados) == 25
+        assert validados[0]['validado_por_nombre'] == 'Supervisor'
+
+        del_recinto = pagina_avances(filtros_avances(estado='todos', recinto_id=2), limite=100)['avances']
+        assert {a['proyecto_id'] for a in del_recinto} == {2}
+
+    def test_conteo_con_tope(self, avances):
+        condiciones = filtros_avances(estado='todos', proyecto_id=1)
+        assert contar_avances(condiciones) == (20, True)
+        assert contar_avances(condiciones, tope=10) == (10, False)
+
+
+class TestEstadisticas:
+
+    def test_un_group_by_y_cache_hasta_la_proxima_escritura(self, avances):
+        estadisticas, sentencias = _contar_consultas(estadisticas_validacion)
+        assert estadisticas == {'total': 25, 'pendientes': 18, 'validados': 3, 'rechazados': 4}
+        assert len([s for s in sentencias if 'GROUP BY' in s]) == 1
+        assert not any('LIKE' in s for s in sentencias)
+
+        # Cache: solo se lee la versión
+        _, sentencias = _contar_consultas(estadisticas_validacion)
+        assert not any('GROUP BY' in s for s in sentencias)
+
+        # Cualquier escritura de historial invalida (también en otros procesos, vía CacheVersion)
+        pendiente = HistorialAvanceActividad.query.filter_by(estado_validacion='pendiente').first()
+        pendiente.validado = True
+        pendiente.estado_validacion = 'validado'
+        db.session.commit()
+        assert estadisticas_validacion()['validados'] == 4
+
+    def test_por_recinto(self, avances):
+        assert estadisticas_validacion(recinto_id=2)['total'] == 5
+        assert estadisticas_validacion(recinto_id=1)['total'] == 20
+
+
+@pytest.fixture
+def proyecto_con_reportes(sqlite_app):
+    """Proyecto con padre '1' y hojas '1.1' y '1.2', cada una con un reporte pendiente"""
+    from app.models import AvanceActividad
+
+    db.session.add(Requerimiento(id=1, nombre='Proyecto 1', id_sector=1, id_tiporecinto=1, id_recinto=1, id_estado=4))
+    trabajador = Trabajador(nombre='Arquitecto', nombrecorto='ARQ1', email='arq1@empresa.com', activo=True)
+    supervisor = Trabajador(nombre='Supervisor', nombrecorto='SUP', email='sup@empresa.com', activo=True)
+    db.session.add_all([trabajador, supervisor])
+    actividades = [
+        ActividadProyecto(requerimiento_id=1, edt=edt, nombre_tarea=f'Tarea {edt}', duracion=10, progreso=0,
+                          fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 1, 10))
+        for edt in ('1', '1.1', '1.2')
+    ]
+    db.session.add_all(actividades)
+    db.session.flush()
+
+    historiales = []
+    for actividad in actividades[1:]:
+        db.session.add(AvanceActividad(requerimiento_id=1, trabajador_id=trabajador.id, actividad_id=actividad.id,
+                                       progreso_actual=60, fecha_registro=date(2026, 1, 2)))
+        historial = HistorialAvanceActividad(requerimiento_id=1, trabajador_id=trabajador.id, actividad_id=actividad.id,
+                                             progreso_anterior=0, progreso_nuevo=60, diferencia=60)
+        db.session.add(historial)
+        historiales.append(historial)
+    db.session.commit()
+    return {'supervisor': supervisor, 'historiales': [h.id for h in historiales],
+            'actividades': {a.edt: a.id for a in actividades}}
+
+
+class TestValidacionLote:
+
+    def test_lote_invalido_no_aplica_nada(self, proyecto_con_reportes):
+        from app.services.validacion_avances_service import ValidacionLote
+
+        validar, corregir = proyecto_con_reportes['historiales']
+        lote = ValidacionLote([
+            {'historial_id': validar, 'accion': 'validar'},
+            {'historial_id': corregir, 'accion': 'corregir', 'porcentaje_corregido': 150},
+            {'historial_id': 999, 'accion': 'validar'},
+        ], proyecto_con_reportes['supervisor'])
+
+        errores = lote.validar_operaciones()
+        assert {e['historial_id'] for e in errores} == {corregir, 999}
+        assert HistorialAvanceActividad.query.filter_by(estado_validacion='pendiente').count() == 2
+
+    def test_sin_permiso_de_recinto(self, proyecto_con_reportes):
+        from app.services.validacion_avances_service import ValidacionLote
+
+        lote = ValidacionLote([{'historial_id': proyecto_con_reportes['historiales'][0], 'accion': 'validar'}],
+                              proyecto_con_reportes['supervisor'], recinto_id=2)
+        assert lote.validar_operaciones()[0]['error'] == 'Sin permisos para este proyecto'
+
+    def test_aplica_todo_y_recalcula_el_proyecto_una_vez(self, proyecto_con_reportes, monkeypatch):
+        from app.models import AvanceActividad
+        from app.services import validacion_avances_service
+        from app.services.validacion_avances_service import ValidacionLote
+
+        recalculos = []
+        original = validacion_avances_service.ArbolProgresoEDT.recalcular
+
+        def contar_recalculo(arbol, actividad_ids, propagar=True):
+            recalculos.append(set(actividad_ids))
+            return original(arbol, actividad_ids, propagar)
+
+        monkeypatch.setattr(validacion_avances_service.ArbolProgresoEDT, 'recalcular', contar_recalculo)
+
+        validar, corregir = proyecto_con_reportes['historiales']
+        lote = ValidacionLote([
+            {'historial_id': validar, 'accion': 'validar'},
+            {'historial_id': str(corregir), 'accion': 'corregir', 'porcentaje_corregido': '80', 'comentario': 'Revisado'},
+        ], proyecto_con_reportes['supervisor'])
+        assert lote.validar_operaciones() == []
+        resumen = lote.aplicar()
+        db.session.commit()
+
+        actividades = proyecto_con_reportes['actividades']
+        assert resumen['validados'] == 1 and resumen['corregidos'] == 1 and resumen['proyectos'] == [1]
+        assert recalculos == [{actividades['1.1'], actividades['1.2']}]
+
+        assert float(db.session.get(ActividadProyecto, actividades['1.1']).porcentaje_avance_validado) == 60
+        assert float(db.session.get(ActividadProyecto, actividades['1.2']).porcentaje_avance_validado) == 80
+        assert AvanceActividad.query.filter_by(actividad_id=actividades['1.2']).one().progreso_actual == 80
+        # Padre: promedio de 60 y 80 ponderado por duración
+        assert float(db.session.get(ActividadProyecto, actividades['1']).progreso) == 70
+        assert HistorialAvanceActividad.query.filter_by(estado_validacion='validado').count() == 3
+
+        # Reenviar el mismo lote no vuelve a aplicar nada
+        lote = ValidacionLote([{'historial_id': validar, 'accion': 'rechazar'}], proyecto_con_reportes['supervisor'])
+        assert lote.validar_operaciones() == []
+        assert lote.aplicar()['omitidos'] == [validar]